@@ -0,0 +1,95 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for pw_console.log_buffer"""
+
+import collections
+import random
+import unittest
+
+from pw_console.log_buffer import LogBuffer
+
+# Enough lines to span several chunks.
+_LINE_COUNT = 10000
+
+
+class TestLogBuffer(unittest.TestCase):
+    """Tests for LogBuffer."""
+
+    def test_append_and_index(self) -> None:
+        logs = LogBuffer()
+        for i in range(_LINE_COUNT):
+            logs.append(i)  # type: ignore
+
+        self.assertEqual(_LINE_COUNT, len(logs))
+        self.assertEqual(list(range(_LINE_COUNT)), list(logs))
+        for i in [0, 1, 4095, 4096, 4097, 8191, 8192, _LINE_COUNT - 1]:
+            self.assertEqual(i, logs[i])
+        self.assertEqual(_LINE_COUNT - 1, logs[-1])
+        self.assertEqual(0, logs[-_LINE_COUNT])
+        self.assertEqual([4095, 4096, 4097], logs[4095:4098])
+
+        with self.assertRaises(IndexError):
+            _ = logs[_LINE_COUNT]
+        with self.assertRaises(IndexError):
+            _ = logs[-_LINE_COUNT - 1]
+
+    def test_popleft(self) -> None:
+        logs = LogBuffer(range(_LINE_COUNT))  # type: ignore
+        for i in range(_LINE_COUNT - 2):
+            self.assertEqual(i, logs.popleft())
+            self.assertEqual(i + 1, logs[0])
+
+        self.assertEqual([_LINE_COUNT - 2, _LINE_COUNT - 1], list(logs))
+        logs.popleft()
+        logs.popleft()
+        self.assertEqual(0, len(logs))
+        self.assertEqual([], list(logs))
+        with self.assertRaises(IndexError):
+            logs.popleft()
+
+        logs.append(1)  # type: ignore
+        self.assertEqual([1], list(logs))
+
+    def test_matches_deque(self) -> None:
+        """Compare random operations with a deque."""
+        rng = random.Random(1)
+        logs = LogBuffer()
+        expected: collections.deque = collections.deque()
+
+        for i in range(5 * _LINE_COUNT):
+            operation = rng.random()
+            if operation < 0.5:
+                logs.append(i)  # type: ignore
+                expected.append(i)
+            elif operation < 0.7:
+                logs.appendleft(i)  # type: ignore
+                expected.appendleft(i)
+            elif expected:
+                self.assertEqual(expected.popleft(), logs.popleft())
+
+            self.assertEqual(len(expected), len(logs))
+            if expected:
+                index = rng.randrange(len(expected))
+                self.assertEqual(expected[index], logs[index])
+                self.assertEqual(expected[-1], logs[-1])
+
+        self.assertEqual(list(expected), list(logs))
+
+        logs.clear()
+        self.assertEqual(0, len(logs))
+        self.assertEqual([], list(logs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for pw_console.log_scan"""
+
+import asyncio
+import threading
+from typing import Any, List, Tuple
+import unittest
+
+from pw_console.log_buffer import LogBuffer
+from pw_console.log_scan import scan_logs_backwards
+
+
+class TestScanLogsBackwards(unittest.IsolatedAsyncioTestCase):
+    """Tests for scan_logs_backwards."""
+
+    async def test_matches_in_batches_newest_first(self) -> None:
+        logs = LogBuffer(range(100))  # type: ignore
+        batches: List[List[Tuple[int, Any]]] = []
+
+        await scan_logs_backwards(
+            get_logs=lambda: (logs, 0),
+            first_position=10,
+            last_position=89,
+            matches=lambda log: log % 7 == 0,  # type: ignore
+            on_matches=batches.append,
+            batch_size=25,
+        )
+
+        self.assertEqual(
+            [
+                [(84, 84), (77, 77), (70, 70)],
+                [(63, 63), (56, 56), (49, 49), (42, 42)],
+                [(35, 35), (28, 28), (21, 21)],
+                [(14, 14)],
+            ],
+            batches,
+        )
+
+    async def test_candidates(self) -> None:
+        logs = LogBuffer(range(100))  # type: ignore
+        checked = []
+
+        def matches(log) -> bool:
+            checked.append(log)
+            return log % 7 == 0
+
+        found: List[Tuple[int, Any]] = []
+        await scan_logs_backwards(
+            get_logs=lambda: (logs, 0),
+            first_position=10,
+            last_position=89,
+            matches=matches,
+            on_matches=found.extend,
+            batch_size=25,
+            candidates=[49, 56, 63, 64, 95],
+            indexed_from=40,
+        )
+
+        # Only candidates are checked from indexed_from onwards.
+        self.assertEqual(
+            [49, 56, 63, 64] + list(range(15, 40)) + list(range(10, 15)),
+            checked,
+        )
+        self.assertEqual(
+            [(63, 63), (56, 56), (49, 49), (35, 35), (28, 28), (21, 21)]
+            + [(14, 14)],
+            found,
+        )
+
+    async def test_lines_dropped_during_scan(self) -> None:
+        logs = LogBuffer(range(100))  # type: ignore
+        dropped = 0
+        found = []
+
+        def on_matches(matches) -> None:
+            nonlocal dropped
+            found.extend(matches)
+            # Drop the oldest 30 lines after the first batch.
+            while dropped < 30:
+                logs.popleft()
+                dropped += 1
+
+        await scan_logs_backwards(
+            get_logs=lambda: (logs, dropped),
+            first_position=0,
+            last_position=99,
+            matches=lambda log: log % 10 == 0,  # type: ignore
+            on_matches=on_matches,
+            batch_size=20,
+        )
+
+        # Matches are reported with their current index, and the scan stops
+        # at the oldest remaining line.
+        self.assertEqual(
+            [
+                (90, 90),
+                (80, 80),
+                (40, 70),
+                (30, 60),
+                (20, 50),
+                (10, 40),
+                (0, 30),
+            ],
+            found,
+        )
+
+    async def test_cancel(self) -> None:
+        logs = LogBuffer(range(100000))  # type: ignore
+        first_batch = threading.Event()
+        checked = []
+
+        def matches(log) -> bool:
+            checked.append(log)
+            first_batch.set()
+            return True
+
+        task = asyncio.create_task(
+            scan_logs_backwards(
+                get_logs=lambda: (logs, 0),
+                first_position=0,
+                last_position=99999,
+                matches=matches,
+                on_matches=lambda _matches: None,
+            )
+        )
+        while not first_batch.is_set():
+            await asyncio.sleep(0)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        # The worker thread stops early.
+        await asyncio.sleep(0.1)
+        self.assertLess(len(checked), 100000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,11 +21,12 @@ from pw_console.log_store import LogStore
 from pw_console.console_prefs import ConsolePrefs
 
 
-def _create_log_store():
+def _create_log_store(**kwargs):
     log_store = LogStore(
         prefs=ConsolePrefs(
             project_file=False, project_user_file=False, user_file=False
-        )
+        ),
+        **kwargs,
     )
 
     assert not log_store.table.prefs.show_python_file
@@ -140,6 +141,106 @@ class TestLogStore(unittest.TestCase):
             log_store.render_table_header(),
         )
 
+    def test_max_history_size(self) -> None:
+        """Test the oldest logs are dropped once the line limit is reached."""
+        log_store, _viewer = _create_log_store()
+        log_store.max_history_size = 3
+
+        for logger_name in ['log_store.test', 'log_store.dev']:
+            test_log = logging.getLogger(logger_name)
+            with self.assertLogs(test_log, level='DEBUG') as _log_context:
+                test_log.addHandler(log_store)
+                for i in range(3):
+                    test_log.debug('Test log %s', i)
+
+        self.assertEqual(3, log_store.get_total_count())
+        self.assertEqual(3, log_store.evicted_count)
+        self.assertEqual(3, log_store.first_log_number())
+        self.assertEqual(
+            ['Test log 0', 'Test log 1', 'Test log 2'],
+            [log.record.message for log in log_store.logs],
+        )
+        self.assertEqual([3, 4, 5], [log.number for log in log_store.logs])
+        # Channels with no remaining logs are removed.
+        self.assertEqual({'log_store.dev': 3}, log_store.channel_counts)
+        self.assertEqual(
+            sum(log.estimated_size for log in log_store.logs),
+            log_store.history_bytes,
+        )
+
+        log_store.clear_logs()
+        self.assertEqual(6, log_store.first_log_number())
+        self.assertEqual(0, log_store.history_bytes)
+
+    def test_max_history_bytes(self) -> None:
+        """Test the oldest logs are dropped once the byte limit is reached."""
+        log_store, _viewer = _create_log_store()
+        test_log = logging.getLogger('log_store.test')
+
+        with self.assertLogs(test_log, level='DEBUG') as _log_context:
+            test_log.addHandler(log_store)
+            test_log.debug('Test log %s', 0)
+            log_store.max_history_bytes = 3 * log_store.history_bytes
+            for i in range(1, 10):
+                test_log.debug('Test log %s', i)
+            # A long line evicts several short ones.
+            test_log.debug('Long test log %s', 'x' * 300)
+
+        self.assertLessEqual(
+            log_store.history_bytes, log_store.max_history_bytes
+        )
+        messages = [log.record.message for log in log_store.logs]
+        self.assertLess(len(messages), 3)
+        self.assertEqual('Long test log ' + 'x' * 300, messages[-1])
+        self.assertEqual(11 - len(messages), log_store.evicted_count)
+
+        # The newest log is kept even if it alone is over the limit.
+        with self.assertLogs(test_log, level='DEBUG') as _log_context:
+            test_log.addHandler(log_store)
+            test_log.debug('Longer test log %s', 'x' * 5000)
+
+        self.assertEqual(1, log_store.get_total_count())
+        self.assertEqual({'log_store.test': 1}, log_store.channel_counts)
+
+    def test_search_index(self) -> None:
+        """Test the search index follows the stored logs."""
+        log_store, _viewer = _create_log_store(
+            search_index_max_bytes=1024 * 1024
+        )
+        log_store.max_history_size = 50
+        search_index = log_store.search_index
+        assert search_index
+
+        test_log = logging.getLogger('log_store.test')
+        with self.assertLogs(test_log, level='DEBUG') as _log_context:
+            test_log.addHandler(log_store)
+            for i in range(100):
+                test_log.debug('Test log %s', i)
+
+        # Dropped logs are removed from the index.
+        self.assertEqual(50, search_index.first_number)
+        self.assertEqual(100, search_index.next_number)
+
+        # Only the newest logs are indexed once the index is too big.
+        search_index.max_bytes = search_index.estimated_size() // 2
+        with self.assertLogs(test_log, level='DEBUG') as _log_context:
+            test_log.addHandler(log_store)
+            test_log.debug('Test log %s', 100)
+
+        self.assertLessEqual(
+            search_index.estimated_size(), search_index.max_bytes
+        )
+        self.assertGreater(search_index.first_number, 51)
+        self.assertEqual(101, search_index.next_number)
+
+        log_store.clear_logs()
+        self.assertEqual(101, search_index.first_number)
+        self.assertEqual(0, search_index.estimated_size())
+
+    def test_search_index_disabled(self) -> None:
+        log_store, _viewer = _create_log_store()
+        self.assertIsNone(log_store.search_index)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -23,6 +23,7 @@ from parameterized import parameterized  # type: ignore
 from prompt_toolkit.data_structures import Point
 
 from pw_console.console_prefs import ConsolePrefs
+from pw_console.log_store import LogStore
 from pw_console.log_view import LogView
 from pw_console.log_screen import ScreenLine
 from pw_console.text_formatting import (
@@ -36,7 +37,7 @@ _PYTHON_3_8 = sys.version_info >= (
 )
 
 
-def _create_log_view():
+def _create_log_view(log_store=None):
     log_pane = MagicMock()
     log_pane.pane_resized = MagicMock(return_value=True)
     log_pane.current_log_pane_width = 80
@@ -47,7 +48,7 @@ def _create_log_view():
         project_file=False, project_user_file=False, user_file=False
     )
     application.prefs.reset_config()
-    log_view = LogView(log_pane, application)
+    log_view = LogView(log_pane, application, log_store)
     return log_view, log_pane
 
 
@@ -440,6 +441,47 @@ class TestLogView(unittest.TestCase):
         log_view.log_screen.get_lines.reset_mock()
         log_view.log_screen.reset_logs.reset_mock()
 
+    def test_history_eviction_shifts_indexes(self) -> None:
+        """Test indexes follow their log lines when old logs are dropped."""
+        log_view, _log_pane = self._create_log_view_with_logs(log_count=20)
+        log_store = log_view.log_store
+        log_store.max_history_size = 20
+        log_view.render_content()
+
+        log_view.toggle_follow()
+        log_view.log_index = 10
+        log_view.marked_logs_start = 5
+        log_view.marked_logs_end = 8
+        for log_index in [2, 10, 15]:
+            log_view.save_search_matched_line(log_index)
+
+        test_log = logging.getLogger('log_view.test')
+        with self.assertLogs(test_log, level='DEBUG') as _log_context:
+            test_log.addHandler(log_store)
+            for i in range(20, 25):
+                test_log.debug('Test log %s', i)
+        log_view.render_content()
+
+        self.assertEqual(log_view.get_total_count(), 20)
+        self.assertEqual(log_view.get_current_line(), 5)
+        self.assertEqual(
+            log_store.logs[log_view.log_index].record.message, 'Test log 10'
+        )
+        self.assertEqual(log_view.marked_logs_start, 0)
+        self.assertEqual(log_view.marked_logs_end, 3)
+        self.assertEqual(log_view.search_matched_lines, {5: 0, 10: 1})
+
+        # Drop the rest of the selection.
+        with self.assertLogs(test_log, level='DEBUG') as _log_context:
+            test_log.addHandler(log_store)
+            for i in range(25, 30):
+                test_log.debug('Test log %s', i)
+
+        self.assertIsNone(log_view.marked_logs_start)
+        self.assertIsNone(log_view.marked_logs_end)
+        self.assertEqual(log_view.get_current_line(), 0)
+        self.assertEqual(log_view.search_matched_lines, {0: 0, 5: 1})
+
 
 if _PYTHON_3_8:
     from unittest import IsolatedAsyncioTestCase  # type: ignore # pylint: disable=no-name-in-module
@@ -455,8 +497,8 @@ if _PYTHON_3_8:
 
         # pylint: enable=invalid-name
 
-        def _create_log_view_from_list(self, log_messages):
-            log_view, log_pane = _create_log_view()
+        def _create_log_view_from_list(self, log_messages, log_store=None):
+            log_view, log_pane = _create_log_view(log_store)
 
             test_log = logging.getLogger('log_view.test')
             with self.assertLogs(test_log, level='DEBUG') as _log_context:
@@ -581,7 +623,8 @@ if _PYTHON_3_8:
             )
             self.assertEqual(log_text_no_datetime, expected_export_text)
 
-            # Select the bottom log line
+            # Select the bottom log line, which follow mode keeps on the
+            # newest match.
             log_view.render_content()
             log_view.visual_select_line(Point(0, 9))  # Window height is 10
             # Export to text
@@ -593,13 +636,97 @@ if _PYTHON_3_8:
             self.assertEqual(
                 # Remove date, time, and level
                 log_text[24:].strip(),
-                expected_matched_lines[0].strip(),
+                expected_matched_lines[-1].strip(),
             )
 
             # Clear filters and check the numbe of lines is back to normal.
             log_view.clear_filters()
             self.assertEqual(log_view.get_total_count(), len(input_logs))
 
+        async def test_filtered_history_eviction(self) -> None:
+            """Test dropped logs are removed from the filtered logs."""
+            log_view, _log_pane = self._create_log_view_from_list(
+                [(f'Log item {i}', {}) for i in range(10)]
+            )
+            log_view.render_content()
+
+            log_view.new_search('item [0-4]', interactive=False)
+            log_view.apply_filter()
+            await log_view.filter_existing_logs_task
+            self.assertEqual(log_view.get_total_count(), 5)
+
+            log_view.log_store.max_history_size = 10
+            test_log = logging.getLogger('log_view.test')
+            with self.assertLogs(test_log, level='DEBUG') as _log_context:
+                test_log.addHandler(log_view.log_store)
+                for i in range(3):
+                    test_log.debug('New item %s', i)
+
+            self.assertEqual(
+                [log.record.message for log in log_view.filtered_logs],
+                [
+                    'Log item 3',
+                    'Log item 4',
+                    'New item 0',
+                    'New item 1',
+                    'New item 2',
+                ],
+            )
+            log_view.render_content()
+            self.assertEqual(log_view.get_total_count(), 5)
+            self.assertEqual(log_view.get_current_line(), 4)
+
+        async def test_partially_indexed_filtering(self) -> None:
+            """Test logs that are too old to be indexed are still filtered."""
+            log_view, _log_pane = self._create_log_view_from_list(
+                [(f'Log item {i}', {}) for i in range(100)],
+                LogStore(search_index_max_bytes=1024 * 1024),
+            )
+            search_index = log_view.log_store.search_index
+            assert search_index
+            search_index.max_bytes = search_index.estimated_size() // 2
+            while search_index.over_limit():
+                search_index.remove(
+                    log_view.log_store.logs[search_index.first_number]
+                )
+            self.assertGreater(search_index.first_number, 0)
+            log_view.render_content()
+
+            log_view.new_search('item 2')
+            await log_view.search_match_count_task
+            expected_lines = [2] + list(range(20, 30))
+            self.assertEqual(
+                sorted(log_view.search_matched_lines), expected_lines
+            )
+
+            log_view.apply_filter()
+            await log_view.filter_existing_logs_task
+            self.assertEqual(
+                [log.record.message for log in log_view.filtered_logs],
+                [f'Log item {i}' for i in expected_lines],
+            )
+
+        async def test_changing_filter_cancels_filtering(self) -> None:
+            """Test past logs are only filtered with the newest filters."""
+            log_view, _log_pane = self._create_log_view_from_list(
+                [(f'Log item {i}', {}) for i in range(100)]
+            )
+            log_view.render_content()
+
+            log_view.new_search('item [0-4]', interactive=False)
+            log_view.apply_filter()
+            first_task = log_view.filter_existing_logs_task
+
+            log_view.new_search('item 4', interactive=False)
+            log_view.apply_filter()
+            await log_view.filter_existing_logs_task
+
+            self.assertTrue(first_task.cancelled())
+            self.assertEqual(
+                [log.record.message for log in log_view.filtered_logs],
+                ['Log item 4'] + [f'Log item {i}' for i in range(40, 50)],
+            )
+
 
 if __name__ == '__main__':
     unittest.main()
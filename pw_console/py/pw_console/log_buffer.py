@@ -0,0 +1,130 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""LogBuffer stores log lines in fixed size chunks."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Iterable, Iterator, List, Optional, overload
+
+from pw_console.log_line import LogLine
+
+# Log lines per chunk. Must be a power of two.
+_CHUNK_SIZE_BITS = 12
+_CHUNK_SIZE = 1 << _CHUNK_SIZE_BITS
+_CHUNK_MASK = _CHUNK_SIZE - 1
+
+
+class LogBuffer(Sequence):
+    """A sequence of log lines stored in fixed size chunks.
+
+    Indexing a ``collections.deque`` takes time proportional to the distance
+    from its nearest end. LogBuffer keeps a list of fixed size chunks instead,
+    so any log line is found with a shift and a mask. Lines are appended to
+    the last chunk and removed from the first chunk, which is dropped once it
+    is empty.
+
+    This supports the ``collections.deque`` methods used on log lines:
+    ``append()``, ``appendleft()``, ``popleft()``, ``extend()`` and
+    ``clear()``.
+    """
+
+    def __init__(self, logs: Iterable[LogLine] = ()) -> None:
+        self._chunks: List[List[Optional[LogLine]]] = []
+        # Position of the first log line in self._chunks[0].
+        self._start = 0
+        self._length = 0
+        self.extend(logs)
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> LogLine:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[LogLine]:
+        ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('LogBuffer index out of range')
+
+        position = index + self._start
+        return self._chunks[position >> _CHUNK_SIZE_BITS][
+            position & _CHUNK_MASK
+        ]
+
+    def __iter__(self) -> Iterator[LogLine]:
+        remaining = self._length
+        start = self._start
+        for chunk in self._chunks:
+            end = min(start + remaining, _CHUNK_SIZE)
+            for i in range(start, end):
+                yield chunk[i]  # type: ignore
+            remaining -= end - start
+            start = 0
+
+    def append(self, log: LogLine) -> None:
+        """Add a log line to the end."""
+        position = self._start + self._length
+        if position == len(self._chunks) * _CHUNK_SIZE:
+            self._chunks.append([None] * _CHUNK_SIZE)
+        self._chunks[-1][position & _CHUNK_MASK] = log
+        self._length += 1
+
+    def extend(self, logs: Iterable[LogLine]) -> None:
+        """Add log lines to the end."""
+        for log in logs:
+            self.append(log)
+
+    def appendleft(self, log: LogLine) -> None:
+        """Add a log line to the beginning."""
+        if self._start == 0:
+            self._chunks.insert(0, [None] * _CHUNK_SIZE)
+            self._start = _CHUNK_SIZE
+        self._start -= 1
+        self._chunks[0][self._start] = log
+        self._length += 1
+
+    def popleft(self) -> LogLine:
+        """Remove and return the first log line."""
+        if not self._length:
+            raise IndexError('pop from an empty LogBuffer')
+
+        first_chunk = self._chunks[0]
+        log = first_chunk[self._start]
+        # Release the reference so the log line can be freed.
+        first_chunk[self._start] = None
+        self._start += 1
+        self._length -= 1
+
+        if not self._length:
+            self.clear()
+        elif self._start == _CHUNK_SIZE:
+            del self._chunks[0]
+            self._start = 0
+        return log  # type: ignore
+
+    def clear(self) -> None:
+        """Remove all log lines."""
+        self._chunks = []
+        self._start = 0
+        self._length = 0
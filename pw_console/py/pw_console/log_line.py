@@ -34,6 +34,10 @@ class LogLine:
     def __post_init__(self):
         self.metadata = None
         self.fragment_cache = None
+        # Position of this line among all lines added to its LogStore.
+        self.number: int = 0
+        # Approximate memory used by this line, set by its LogStore.
+        self.estimated_size: int = 0
 
     def time(self):
         """Return a datetime object for the log record."""
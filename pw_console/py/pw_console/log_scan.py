@@ -0,0 +1,156 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Background scanning of log history for filter and search matches."""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import threading
+from typing import (
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TYPE_CHECKING,
+)
+
+if TYPE_CHECKING:
+    from pw_console.log_line import LogLine
+
+# Log lines checked by the worker thread at a time. Matches are reported to
+# the UI after each batch.
+BATCH_SIZE = 10000
+
+# Log lines checked between checks for cancellation in the worker thread.
+_CANCEL_CHECK_INTERVAL = 500
+
+
+def _find_matches(
+    logs: List[LogLine],
+    matches: Callable[[LogLine], bool],
+    cancelled: threading.Event,
+) -> List[int]:
+    """Return the positions in logs of lines that match."""
+    found = []
+    for i, log in enumerate(logs):
+        if i % _CANCEL_CHECK_INTERVAL == 0 and cancelled.is_set():
+            break
+        if matches(log):
+            found.append(i)
+    return found
+
+
+def _position_batches(
+    first_position: int,
+    last_position: int,
+    batch_size: int,
+    candidates: Optional[Sequence[int]],
+    indexed_from: int,
+) -> Iterator[Sequence[int]]:
+    """Yield batches of positions to check, newest batch first."""
+    end_position = last_position + 1
+
+    if candidates is not None:
+        # Only the candidates among the indexed lines need checking.
+        indexed_start = max(first_position, indexed_from)
+        low = bisect.bisect_left(candidates, indexed_start)
+        high = bisect.bisect_left(candidates, end_position)
+        while high > low:
+            start = max(low, high - batch_size)
+            yield candidates[start:high]
+            high = start
+        end_position = min(end_position, indexed_start)
+
+    while end_position > first_position:
+        start_position = max(first_position, end_position - batch_size)
+        yield range(start_position, end_position)
+        end_position = start_position
+
+
+async def scan_logs_backwards(
+    get_logs: Callable[[], Tuple[Sequence[LogLine], int]],
+    first_position: int,
+    last_position: int,
+    matches: Callable[[LogLine], bool],
+    on_matches: Callable[[List[Tuple[int, LogLine]]], None],
+    batch_size: int = BATCH_SIZE,
+    candidates: Optional[Sequence[int]] = None,
+    indexed_from: int = 0,
+) -> None:
+    """Find matching log lines on a worker thread, newest first.
+
+    Log lines are checked in batches from last_position back to
+    first_position. Positions are log indexes plus the number of lines dropped
+    from the beginning of the logs, so they stay the same as old lines are
+    dropped during the scan.
+
+    Cancelling the calling task stops the scan. The worker thread stops within
+    a few hundred lines.
+
+    Args:
+        get_logs: Returns the logs to scan and the number of lines dropped from
+            their beginning so far.
+        first_position: Position of the oldest line to check.
+        last_position: Position of the newest line to check.
+        matches: Returns True if a log line matches. Called on the worker
+            thread, so it must not depend on state that changes during the
+            scan.
+        on_matches: Called on the event loop after each batch with the current
+            log indexes and lines that matched, newest first.
+        batch_size: Log lines to check at a time.
+        candidates: Sorted positions of the lines at or after indexed_from
+            that may match, from a search index. Other lines at or after
+            indexed_from are skipped. If None, all lines are checked.
+        indexed_from: Position of the oldest line covered by candidates.
+    """
+    loop = asyncio.get_running_loop()
+    cancelled = threading.Event()
+
+    try:
+        for positions in _position_batches(
+            first_position, last_position, batch_size, candidates, indexed_from
+        ):
+            logs, dropped = get_logs()
+            if positions[-1] < dropped:
+                # The remaining lines were dropped.
+                break
+
+            if isinstance(positions, range):
+                start_index = max(0, positions[0] - dropped)
+                end_index = positions[-1] + 1 - dropped
+                indexes: Sequence[int] = range(start_index, end_index)
+                batch = list(logs[start_index:end_index])
+            else:
+                indexes = [p - dropped for p in positions if p >= dropped]
+                batch = [logs[i] for i in indexes]
+
+            found = await loop.run_in_executor(
+                None, _find_matches, batch, matches, cancelled
+            )
+
+            # Lines may have been dropped while the worker was busy.
+            _logs, dropped_during_batch = get_logs()
+            shift = dropped_during_batch - dropped
+            results = [
+                (indexes[i] - shift, batch[i])
+                for i in reversed(found)
+                if indexes[i] >= shift
+            ]
+            if results:
+                on_matches(results)
+    finally:
+        cancelled.set()
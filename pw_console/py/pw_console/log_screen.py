@@ -32,6 +32,7 @@ from pw_console.text_formatting import (
 )
 
 if TYPE_CHECKING:
+    from pw_console.log_buffer import LogBuffer
     from pw_console.log_line import LogLine
     from pw_console.log_pane import LogPane
 
@@ -89,13 +90,13 @@ class ScreenLine:
     fragments: StyleAndTextTuples
 
     # Log index reference for this screen line. This is the index to where the
-    # log message resides in the parent LogStore.logs deque. It is set to None
+    # log message resides in the parent LogStore.logs buffer. It is set to None
     # if this is an empty ScreenLine. If a log message requires line wrapping
     # then each resulting ScreenLine instance will have the same log_index
     # value.
     #
     # This log_index may also be the integer index into a LogView.filtered_logs
-    # deque depending on if log messages are being filtered by the user. The
+    # buffer depending on if log messages are being filtered by the user. The
     # LogScreen class below doesn't need to do anything different in either
     # case. It's the responsibility of LogScreen.get_log_source() to return the
     # correct source.
@@ -128,7 +129,7 @@ class LogScreen:
     log lines as the user moves the cursor."""
 
     # Callable functions to retrieve logs and display formatting.
-    get_log_source: Callable[[], Tuple[int, collections.deque[LogLine]]]
+    get_log_source: Callable[[], Tuple[int, LogBuffer]]
     get_line_wrapping: Callable[[], bool]
     get_log_formatter: Callable[
         [], Optional[Callable[[LogLine], StyleAndTextTuples]]
@@ -204,6 +205,22 @@ class LogScreen:
         # Make sure the bottom line is highlighted.
         self.move_cursor_to_bottom()
 
+    def shift_log_indexes(self, offset: int) -> None:
+        """Add offset to log indexes after logs are added or dropped before
+        the existing logs in the source.
+
+        Lines of dropped logs stay on screen until they are scrolled away but
+        can no longer be selected."""
+        for line in self.line_buffer:
+            if line.log_index is None:
+                continue
+            line.log_index += offset
+            if line.log_index < 0:
+                line.log_index = None
+        self.last_appended_log_index = max(
+            -1, self.last_appended_log_index + offset
+        )
+
     def resize(self, width, height) -> None:
         """Update screen width and height.
 
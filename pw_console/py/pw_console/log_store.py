@@ -14,7 +14,6 @@
 """LogStore saves logs and acts as a Python logging handler."""
 
 from __future__ import annotations
-import collections
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional, TYPE_CHECKING
@@ -22,13 +21,19 @@ from typing import Dict, List, Optional, TYPE_CHECKING
 from pw_cli.color import colors as pw_cli_colors
 
 from pw_console.console_prefs import ConsolePrefs
+from pw_console.log_buffer import LogBuffer
 from pw_console.log_line import LogLine
 from pw_console.text_formatting import strip_ansi
+from pw_console.trigram_index import TrigramIndex
 from pw_console.widgets.table import TableView
 
 if TYPE_CHECKING:
     from pw_console.log_view import LogView
 
+# Approximate memory used by a LogLine besides its strings: the LogRecord and
+# its attributes, the LogLine, and its parsed metadata.
+_LOG_LINE_OVERHEAD_BYTES = 1200
+
 
 class LogStore(logging.Handler):
     """Pigweed Console logging handler.
@@ -75,10 +80,36 @@ class LogStore(logging.Handler):
 
         console.setup_python_logging()
         console.embed()
+
+    Only the most recent logs are kept. Once more than ``max_history_size``
+    lines are stored, or their estimated memory use exceeds
+    ``max_history_bytes``, the oldest lines are dropped as new ones arrive.
+
+    If ``search_index_max_bytes`` is set, new logs are also added to a
+    TrigramIndex that speeds up searching and filtering past logs, at the cost
+    of more work as each log arrives. If the index grows beyond
+    ``search_index_max_bytes``, only the most recent logs are indexed.
     """
 
-    def __init__(self, prefs: Optional[ConsolePrefs] = None):
-        """Initializes the LogStore instance."""
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        prefs: Optional[ConsolePrefs] = None,
+        max_history_size: int = 1000000,
+        max_history_bytes: int = 512 * 1024 * 1024,
+        search_index_max_bytes: int = 0,
+    ):
+        """Initializes the LogStore instance.
+
+        Args:
+            prefs: Console preferences used for formatting.
+            max_history_size: Only allow this many log lines in memory.
+            max_history_bytes: Only allow log lines with this much estimated
+                memory use.
+            search_index_max_bytes: Estimated memory use limit of the search
+                index. The index is disabled if this is 0, the default.
+        """
 
         # ConsolePrefs may not be passed on init. For example, if the user is
         # creating a LogStore to capture log messages before console startup.
@@ -87,12 +118,27 @@ class LogStore(logging.Handler):
                 project_file=False, project_user_file=False, user_file=False
             )
         self.prefs = prefs
-        # Log storage deque for fast addition and deletion from the beginning
-        # and end of the iterable.
-        self.logs: collections.deque = collections.deque()
+        # Log storage with fast indexing, addition at the end and deletion
+        # from the beginning.
+        self.logs: LogBuffer = LogBuffer()
 
         # Only allow this many log lines in memory.
-        self.max_history_size: int = 1000000
+        self.max_history_size: int = max_history_size
+        # Only allow this many estimated bytes of log lines in memory.
+        self.max_history_bytes: int = max_history_bytes
+        # Estimated memory use of the stored log lines.
+        self.history_bytes: int = 0
+        # Number of log lines dropped from the beginning of self.logs since
+        # this LogStore was created. Viewers compare this to the value they
+        # last saw to shift their indexes.
+        self.evicted_count: int = 0
+
+        # Index of log line text for searches, if enabled.
+        self.search_index: Optional[TrigramIndex] = (
+            TrigramIndex(search_index_max_bytes)
+            if search_index_max_bytes > 0
+            else None
+        )
 
         # Counts of logs per python logger name
         self.channel_counts: Dict[str, int] = {}
@@ -142,7 +188,11 @@ class LogStore(logging.Handler):
 
     def clear_logs(self):
         """Erase all stored pane lines."""
-        self.logs = collections.deque()
+        self.evicted_count += len(self.logs)
+        self.history_bytes = 0
+        self.logs = LogBuffer()
+        if self.search_index:
+            self.search_index.clear(self.evicted_count)
         self.channel_counts = {}
         self.channel_formatted_prefix_widths = {}
         self.line_index = 0
@@ -163,6 +213,45 @@ class LogStore(logging.Handler):
         total = self.get_total_count()
         return 0 if total < 0 else total - 1
 
+    def first_log_number(self) -> int:
+        """Return the number of the oldest stored log line.
+
+        Every log line is numbered in order of arrival, starting with 0.
+        ``self.logs[i]`` is log line number ``first_log_number() + i``.
+        """
+        return self.evicted_count
+
+    def _evict_logs(self) -> None:
+        """Drop the oldest log lines until the history fits its limits.
+
+        The newest line is always kept."""
+        while len(self.logs) > 1 and (
+            len(self.logs) > self.max_history_size
+            or self.history_bytes > self.max_history_bytes
+        ):
+            log = self.logs.popleft()
+            self.history_bytes -= log.estimated_size
+            self.evicted_count += 1
+            if self.search_index:
+                self.search_index.remove(log)
+
+            name = log.record.name
+            self.channel_counts[name] -= 1
+            if not self.channel_counts[name]:
+                del self.channel_counts[name]
+
+    def _index_log(self, log: LogLine) -> None:
+        """Add a log line to the search index, keeping it within its limit."""
+        if not self.search_index:
+            return
+
+        self.search_index.add(log)
+        # Stop indexing the oldest logs if the index is too big.
+        while self.search_index.over_limit():
+            self.search_index.remove(
+                self.logs[self.search_index.first_number - self.evicted_count]
+            )
+
     def _update_log_prefix_width(self, record: logging.LogRecord):
         """Save the formatted prefix width if this is a new logger channel
         name."""
@@ -211,13 +300,21 @@ class LogStore(logging.Handler):
         formatted_log = self.format(record)
         ansi_stripped_log = strip_ansi(formatted_log)
         # Save this log.
-        self.logs.append(
-            LogLine(
-                record=record,
-                formatted_log=formatted_log,
-                ansi_stripped_log=ansi_stripped_log,
-            )
+        log = LogLine(
+            record=record,
+            formatted_log=formatted_log,
+            ansi_stripped_log=ansi_stripped_log,
+        )
+        log.number = self.evicted_count + len(self.logs)
+        log.estimated_size = (
+            _LOG_LINE_OVERHEAD_BYTES
+            + len(formatted_log)
+            + len(ansi_stripped_log)
+            + len(record.message)
         )
+        self.logs.append(log)
+        self.history_bytes += log.estimated_size
+        self._index_log(log)
         # Increment this logger count
         self.channel_counts[record.name] = (
             self.channel_counts.get(record.name, 0) + 1
@@ -234,6 +331,9 @@ class LogStore(logging.Handler):
         # Check for bigger column widths.
         self.table.update_metadata_column_widths(self.logs[-1])
 
+        # Drop the oldest logs if over the history limits.
+        self._evict_logs()
+
     def emit(self, record) -> None:
         """Process a new log record.
 
@@ -25,12 +25,21 @@ import operator
 from pathlib import Path
 import re
 from threading import Thread
-from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+)
 
 from prompt_toolkit.data_structures import Point
 from prompt_toolkit.formatted_text import StyleAndTextTuples
 import websockets
 
+from pw_console.log_buffer import LogBuffer
 from pw_console.log_filter import (
     DEFAULT_SEARCH_MATCHER,
     LogFilter,
@@ -38,6 +47,7 @@ from pw_console.log_filter import (
     SearchMatcher,
     preprocess_search_regex,
 )
+from pw_console.log_scan import scan_logs_backwards
 from pw_console.log_screen import ScreenLine, LogScreen
 from pw_console.log_store import LogStore
 from pw_console.python_logging import log_record_to_json
@@ -115,7 +125,7 @@ class LogView:
         self.filters: 'collections.OrderedDict[str, LogFilter]' = (
             collections.OrderedDict()
         )
-        self.filtered_logs: collections.deque = collections.deque()
+        self.filtered_logs: LogBuffer = LogBuffer()
         self.filter_existing_logs_task: Optional[asyncio.Task] = None
 
         # Current log line index state variables:
@@ -135,6 +145,10 @@ class LogView:
         self._user_scroll_event: bool = False
 
         self._last_log_store_index = 0
+        # LogStore.evicted_count when last checked, and the number of log lines
+        # dropped from self.filtered_logs because they were evicted.
+        self._log_store_evicted_count = self.log_store.evicted_count
+        self._filtered_logs_evicted_count = 0
         self._new_logs_since_last_render = True
         self._new_logs_since_last_websocket_serve = True
         self._last_served_websocket_index = -1
@@ -352,6 +366,7 @@ class LogView:
 
         # Clear matched lines
         self.search_matched_lines = {}
+        self._cancel_search_match_count()
 
         if interactive:
             # Start count historical search matches task.
@@ -366,16 +381,31 @@ class LogView:
 
     def save_search_matched_line(self, log_index: int) -> None:
         """Save the log_index at position as a matched line."""
-        self.search_matched_lines[log_index] = 0
+        self.save_search_matched_lines([log_index])
+
+    def save_search_matched_lines(self, log_indexes: Iterable[int]) -> None:
+        """Save each log_index in log_indexes as a matched line."""
+        matched_lines = set(self.search_matched_lines)
+        matched_lines.update(log_indexes)
         # Keep matched lines sorted by position
         self.search_matched_lines = {
             # Save this log_index and its match number.
             log_index: match_number
-            for match_number, log_index in enumerate(
-                sorted(self.search_matched_lines.keys())
-            )
+            for match_number, log_index in enumerate(sorted(matched_lines))
         }
 
+    def _cancel_search_match_count(self) -> None:
+        """Stop counting search matches."""
+        if self.search_match_count_task:
+            self.search_match_count_task.cancel()
+            self.search_match_count_task = None
+
+    def _cancel_filtering(self) -> None:
+        """Stop filtering past log lines."""
+        if self.filter_existing_logs_task:
+            self.filter_existing_logs_task.cancel()
+            self.filter_existing_logs_task = None
+
     def disable_search_highlighting(self):
         self.log_pane.log_view.search_highlight = False
 
@@ -384,7 +414,8 @@ class LogView:
         if not self.follow:
             self.toggle_follow()
 
-        # Reset filtered logs.
+        # Stop filtering with the previous filters and reset filtered logs.
+        self._cancel_filtering()
         self.filtered_logs.clear()
         # Reset scrollback start
         self._scrollback_start_index = 0
@@ -424,20 +455,21 @@ class LogView:
         self._reset_log_screen_on_next_render = True
 
     def clear_search(self):
+        self._cancel_search_match_count()
         self.search_matched_lines = {}
         self.search_text = None
         self.search_filter = None
         self.search_highlight = False
         self._reset_log_screen_on_next_render = True
 
-    def _get_log_lines(self) -> Tuple[int, collections.deque[LogLine]]:
+    def _get_log_lines(self) -> Tuple[int, LogBuffer]:
         logs = self.filtered_logs if self.filtering_on else self.log_store.logs
         return self._scrollback_start_index, logs
 
     def _get_visible_log_lines(self):
         _, logs = self._get_log_lines()
         if self._scrollback_start_index > 0:
-            return collections.deque(
+            return LogBuffer(
                 itertools.islice(logs, self.hidden_line_count(), len(logs))
             )
         return logs
@@ -463,6 +495,7 @@ class LogView:
         if not self.filtering_on:
             return
         self.clear_search()
+        self._cancel_filtering()
         self.filtering_on = False
         self.filters: 'collections.OrderedDict[str, re.Pattern]' = (
             collections.OrderedDict()
@@ -473,39 +506,115 @@ class LogView:
         if not self.follow:
             self.toggle_follow()
 
+    def _evicted_log_count(self) -> int:
+        """Number of log lines dropped from the current log source."""
+        if self.filtering_on:
+            return self._filtered_logs_evicted_count
+        return self._log_store_evicted_count
+
+    def _search_index_candidates(
+        self, log_filters: List[LogFilter]
+    ) -> Tuple[Optional[List[int]], int]:
+        """Find the log store lines that may match all log_filters.
+
+        Returns the numbers of the indexed lines that may match, or None if
+        every line must be checked, and the number of the oldest indexed line.
+        """
+        search_index = self.log_store.search_index
+        if not search_index:
+            return None, 0
+
+        candidates: Optional[List[int]] = None
+        for log_filter in log_filters:
+            numbers = search_index.candidates(log_filter)
+            if numbers is None:
+                continue
+            if candidates is None:
+                candidates = numbers
+            else:
+                candidates = sorted(set(candidates).intersection(numbers))
+        return candidates, search_index.first_number
+
     async def count_search_matches(self):
-        """Count search matches and save their locations."""
+        """Count search matches and save their locations.
+
+        Lines are checked in batches on a worker thread, and the matches found
+        so far are shown after each batch.
+        """
         # Wait for any filter_existing_logs_task to finish.
         if self.filtering_on and self.filter_existing_logs_task:
             await self.filter_existing_logs_task
 
-        starting_index = self.get_last_log_index()
-        ending_index, logs = self._get_log_lines()
+        search_filter = self.search_filter
+        if not search_filter:
+            return
 
-        # From the end of the log store to the beginning.
-        for i in range(starting_index, ending_index - 1, -1):
-            # Is this log a match?
-            if self.search_filter.matches(logs[i]):
-                self.save_search_matched_line(i)
-            # Pause every 100 lines or so
-            if i % 100 == 0:
-                await asyncio.sleep(0.1)
+        def save_matches(matches: List[Tuple[int, LogLine]]) -> None:
+            self.save_search_matched_lines(i for i, _log in matches)
+            self.log_pane.application.logs_redraw()
+
+        evicted_count = self._evicted_log_count()
+        last_position = self.get_last_log_index() + evicted_count
+        # The search index refers to lines in the log store, so it can only
+        # be used if no filters are applied.
+        candidates, indexed_from = (
+            (None, 0)
+            if self.filtering_on
+            else self._search_index_candidates([search_filter])
+        )
+        await scan_logs_backwards(
+            get_logs=lambda: (
+                self._get_log_lines()[1],
+                self._evicted_log_count(),
+            ),
+            first_position=self._scrollback_start_index + evicted_count,
+            last_position=last_position,
+            matches=search_filter.matches,
+            on_matches=save_matches,
+            candidates=candidates,
+            indexed_from=indexed_from,
+        )
+        self.log_pane.application.redraw_ui()
 
     async def filter_past_logs(self):
-        """Filter past log lines."""
-        starting_index = self.log_store.get_last_log_index()
-        ending_index = -1
-
-        # From the end of the log store to the beginning.
-        for i in range(starting_index, ending_index, -1):
-            # Is this log a match?
-            if self.filter_scan(self.log_store.logs[i]):
-                # Add to the beginning of the deque.
-                self.filtered_logs.appendleft(self.log_store.logs[i])
-            # TODO(tonymd): Tune these values.
-            # Pause every 100 lines or so
-            if i % 100 == 0:
-                await asyncio.sleep(0.1)
+        """Filter past log lines.
+
+        Lines are checked in batches on a worker thread. The matches found so
+        far are shown after each batch, newest first.
+        """
+        # Use a copy of the filters; they may change while the worker runs.
+        filters = list(self.filters.values())
+
+        def matches(log: LogLine) -> bool:
+            return all(log_filter.matches(log) for log_filter in filters)
+
+        def add_matches(matches: List[Tuple[int, LogLine]]) -> None:
+            # Add to the beginning of the filtered logs.
+            for _index, log in matches:
+                self.filtered_logs.appendleft(log)
+            # Keep indexes on the same lines.
+            self._shift_log_indexes(len(matches))
+            self._reset_log_screen_on_next_render = True
+            if self.follow:
+                self.follow_event = FollowEvent.STICKY_FOLLOW
+            self.log_pane.application.logs_redraw()
+
+        evicted_count = self.log_store.evicted_count
+        last_position = self.log_store.get_last_log_index() + evicted_count
+        candidates, indexed_from = self._search_index_candidates(filters)
+        await scan_logs_backwards(
+            get_logs=lambda: (
+                self.log_store.logs,
+                self.log_store.evicted_count,
+            ),
+            first_position=evicted_count,
+            last_position=last_position,
+            matches=matches,
+            on_matches=add_matches,
+            candidates=candidates,
+            indexed_from=indexed_from,
+        )
+        self.log_pane.application.redraw_ui()
 
     def set_log_pane(self, log_pane: 'LogPane'):
         """Set the parent LogPane instance."""
@@ -573,6 +682,85 @@ class LogView:
 
         return filter_match_count == len(self.filters)
 
+    def _drop_evicted_logs(self) -> None:
+        """Shift log indexes after the LogStore drops its oldest lines."""
+        evicted_count = self.log_store.evicted_count
+        store_dropped = evicted_count - self._log_store_evicted_count
+        if store_dropped <= 0:
+            return
+        self._log_store_evicted_count = evicted_count
+        self._last_log_store_index = max(
+            0, self._last_log_store_index - store_dropped
+        )
+
+        # Remove dropped lines from the beginning of the filtered logs.
+        filtered_dropped = 0
+        while (
+            self.filtered_logs and self.filtered_logs[0].number < evicted_count
+        ):
+            self.filtered_logs.popleft()
+            filtered_dropped += 1
+        self._filtered_logs_evicted_count += filtered_dropped
+
+        # Indexes of the log source not in view.
+        if self.filtering_on:
+            self._log_index = max(0, self._log_index - store_dropped)
+        else:
+            self._filtered_log_index = max(
+                0, self._filtered_log_index - filtered_dropped
+            )
+
+        dropped = filtered_dropped if self.filtering_on else store_dropped
+        if dropped:
+            self._shift_log_indexes(-dropped)
+
+    def _shift_log_indexes(self, offset: int) -> None:
+        """Add offset to the indexes into the current log source.
+
+        Used when lines are added or dropped before the existing lines. Indexes
+        of dropped lines are removed.
+        """
+        if self.filtering_on:
+            self._filtered_log_index = max(0, self._filtered_log_index + offset)
+        else:
+            self._log_index = max(0, self._log_index + offset)
+        self._last_log_index = max(0, self._last_log_index + offset)
+
+        if self._scrollback_start_index > 0:
+            self._scrollback_start_index = max(
+                0, self._scrollback_start_index + offset
+            )
+        if self._last_served_websocket_index >= 0:
+            self._last_served_websocket_index = max(
+                -1, self._last_served_websocket_index + offset
+            )
+
+        if (
+            self.marked_logs_start is not None
+            and self.marked_logs_end is not None
+        ):
+            if self.marked_logs_end + offset < 0:
+                # All selected lines were dropped.
+                self.marked_logs_start = None
+                self.marked_logs_end = None
+            else:
+                self.marked_logs_start = max(0, self.marked_logs_start + offset)
+                self.marked_logs_end += offset
+
+        # Forget dropped search matches and renumber the rest.
+        self.search_matched_lines = {
+            log_index + offset: match_number
+            for match_number, log_index in enumerate(
+                i for i in self.search_matched_lines if i + offset >= 0
+            )
+        }
+        if self.last_search_matched_log is not None:
+            self.last_search_matched_log += offset
+            if self.last_search_matched_log < 0:
+                self.last_search_matched_log = None
+
+        self.log_screen.shift_log_indexes(offset)
+
     def new_logs_arrived(self):
         """Check newly arrived log messages.
 
@@ -582,6 +770,9 @@ class LogView:
         instance ``self.log_store``. This function should not redraw the screen
         or scroll.
         """
+        # Adjust for any old logs dropped by the log store.
+        self._drop_evicted_logs()
+
         latest_total = self.log_store.get_total_count()
 
         if self.filtering_on:
@@ -592,11 +783,14 @@ class LogView:
 
         if self.search_filter:
             last_matched_log: Optional[int] = None
+            matched_lines = []
             # Scan newly arived log lines
             for i in range(self._last_log_store_index, latest_total):
                 if self.search_filter.matches(self.log_store.logs[i]):
-                    self.save_search_matched_line(i)
+                    matched_lines.append(i)
                     last_matched_log = i
+            if matched_lines:
+                self.save_search_matched_lines(matched_lines)
             if last_matched_log and self.follow_search_match:
                 # Set the follow event flag for the next render_content call.
                 self.follow_event = FollowEvent.SEARCH_MATCH
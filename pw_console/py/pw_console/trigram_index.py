@@ -0,0 +1,245 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""TrigramIndex narrows down the log lines a search needs to check."""
+
+from __future__ import annotations
+
+from array import array
+import bisect
+import collections
+import re
+import string
+from typing import (
+    DefaultDict,
+    Deque,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    TYPE_CHECKING,
+)
+
+# pylint: disable=ungrouped-imports
+try:
+    # Python 3.11 and later.
+    from re import _constants as sre_constants  # type: ignore
+    from re import _parser as sre_parse  # type: ignore
+except ImportError:
+    import sre_constants  # type: ignore # pylint: disable=deprecated-module
+    import sre_parse  # type: ignore # pylint: disable=deprecated-module
+# pylint: enable=ungrouped-imports
+
+if TYPE_CHECKING:
+    from pw_console.log_filter import LogFilter
+    from pw_console.log_line import LogLine
+
+# Lowercases ASCII letters, and the other characters that case-insensitive
+# regexes match with ASCII letters. Every other character is kept, so folded
+# text is the same length as the original.
+_FOLD_CASE = str.maketrans(
+    {
+        **dict(zip(string.ascii_uppercase, string.ascii_lowercase)),
+        'İ': 'i',  # Latin capital letter I with dot above
+        'ı': 'i',  # Latin small letter dotless i
+        'ſ': 's',  # Latin small letter long s
+        'K': 'k',  # Kelvin sign
+    }
+)
+
+# Approximate memory used by each trigram's entry, besides its line numbers.
+_TRIGRAM_OVERHEAD_BYTES = 200
+# Bytes per line number in a trigram's entry.
+_LINE_NUMBER_BYTES = 8
+# Removed line numbers are only deleted once there are at least this many.
+_MIN_COMPACT_COUNT = 64 * 1024
+
+
+def _trigrams(folded_text: str) -> Set[str]:
+    return {folded_text[i : i + 3] for i in range(len(folded_text) - 2)}
+
+
+def _new_postings() -> array:
+    return array('q')
+
+
+def _required_literals(parsed_pattern) -> List[str]:
+    """Return strings every match of a parsed regex must contain.
+
+    Only ASCII characters are included, since case-insensitive matching of
+    other characters can change the length of the text.
+    """
+    # pylint: disable=no-member
+    literals: List[str] = []
+    run: List[str] = []
+
+    def end_run() -> None:
+        if run:
+            literals.append(''.join(run))
+            run.clear()
+
+    for op, arg in parsed_pattern:
+        if op is sre_constants.LITERAL and arg < 128:
+            run.append(chr(arg))
+            continue
+
+        end_run()
+        if op is sre_constants.SUBPATTERN:
+            literals.extend(_required_literals(arg[-1]))
+        elif (
+            op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+            and arg[0] >= 1
+        ):
+            literals.extend(_required_literals(arg[2]))
+        # Anything else, such as alternatives or character sets, may match
+        # different text in each line.
+
+    end_run()
+    return literals
+
+
+class TrigramIndex:
+    """An index of the three character strings in each log line.
+
+    The index maps each trigram, a string of three characters, to the numbers
+    of the log lines that contain it. A line can only match a regex if it
+    contains every trigram of the literal text the regex requires, so checking
+    those lines is enough. Letters are indexed in lowercase so this works for
+    case-insensitive searches as well.
+
+    Log lines must be added in order of their ``LogLine.number``, and removed
+    from the oldest. If the index grows beyond ``max_bytes``, the oldest lines
+    are removed from it; ``first_number`` is the oldest line that is still
+    indexed.
+    """
+
+    def __init__(self, max_bytes: int, first_number: int = 0) -> None:
+        self.max_bytes = max_bytes
+        self.clear(first_number)
+
+    def clear(self, first_number: int) -> None:
+        """Remove all lines. The next line added will be first_number."""
+        self.first_number = first_number
+        # Number of the next line to add.
+        self.next_number = first_number
+        # Sorted line numbers for each trigram. Numbers before first_number
+        # were removed, and are deleted in batches by _compact().
+        self._postings: DefaultDict[str, array] = collections.defaultdict(
+            _new_postings
+        )
+        # Number of trigrams in each indexed line, oldest first.
+        self._line_trigram_counts: Deque[int] = collections.deque()
+        self._posting_count = 0
+        self._removed_count = 0
+
+    def estimated_size(self) -> int:
+        """Approximate memory used by the index, in bytes."""
+        return (
+            self._posting_count * _LINE_NUMBER_BYTES
+            + len(self._postings) * _TRIGRAM_OVERHEAD_BYTES
+        )
+
+    def over_limit(self) -> bool:
+        return (
+            self.next_number > self.first_number
+            and self.estimated_size() > self.max_bytes
+        )
+
+    def add(self, log: LogLine) -> None:
+        """Index a log line, which must be the next line by number."""
+        if log.number != self.next_number:
+            # Lines were skipped; indexed lines must be consecutive.
+            self.clear(log.number)
+
+        trigrams = _trigrams(log.ansi_stripped_log.translate(_FOLD_CASE))
+        postings = self._postings
+        for trigram in trigrams:
+            postings[trigram].append(log.number)
+        self._line_trigram_counts.append(len(trigrams))
+        self._posting_count += len(trigrams)
+        self.next_number = log.number + 1
+
+    def remove(self, log: LogLine) -> None:
+        """Remove the oldest indexed line, if log is that line."""
+        if log.number != self.first_number or (
+            self.first_number == self.next_number
+        ):
+            return
+
+        self.first_number += 1
+        if self.first_number == self.next_number:
+            self.clear(self.first_number)
+            return
+
+        trigram_count = self._line_trigram_counts.popleft()
+        self._posting_count -= trigram_count
+        self._removed_count += trigram_count
+        if self._removed_count >= max(
+            _MIN_COMPACT_COUNT, self._posting_count // 2
+        ):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Delete removed line numbers, and trigrams with no lines left."""
+        for trigram, numbers in list(self._postings.items()):
+            start = bisect.bisect_left(numbers, self.first_number)
+            if start == len(numbers):
+                del self._postings[trigram]
+            elif start:
+                del numbers[:start]
+        self._removed_count = 0
+
+    def _lines_containing(self, trigrams: Iterable[str]) -> List[int]:
+        """Return the sorted numbers of lines that contain all trigrams."""
+        postings = []
+        for trigram in trigrams:
+            numbers = self._postings.get(trigram)
+            if numbers is None:
+                return []
+            start = bisect.bisect_left(numbers, self.first_number)
+            if start == len(numbers):
+                return []
+            postings.append(numbers[start:])
+
+        postings.sort(key=len)
+        matching_numbers = set(postings[0])
+        for numbers in postings[1:]:
+            matching_numbers.intersection_update(numbers)
+            if not matching_numbers:
+                break
+        return sorted(matching_numbers)
+
+    def candidates(self, log_filter: LogFilter) -> Optional[List[int]]:
+        """Return the numbers of indexed lines that may match log_filter.
+
+        Returns None if the index can't narrow down the lines, for example if
+        the filter is inverted or checks a metadata field. Lines before
+        first_number are not indexed and must always be checked.
+        """
+        if log_filter.invert or log_filter.field:
+            return None
+
+        try:
+            parsed_pattern = sre_parse.parse(
+                log_filter.regex.pattern, log_filter.regex.flags
+            )
+        except (re.error, TypeError, ValueError):
+            return None
+
+        trigrams: Set[str] = set()
+        for literal in _required_literals(parsed_pattern):
+            trigrams.update(_trigrams(literal.translate(_FOLD_CASE)))
+        if not trigrams:
+            return None
+
+        return self._lines_containing(trigrams)
@@ -0,0 +1,167 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for pw_console.trigram_index"""
+
+import logging
+import random
+import re
+import unittest
+
+from parameterized import parameterized  # type: ignore
+
+from pw_console.log_filter import (
+    LogFilter,
+    SearchMatcher,
+    preprocess_search_regex,
+)
+from pw_console.log_line import LogLine
+from pw_console.trigram_index import TrigramIndex
+
+_LINES = [
+    'Starting device',
+    'Connected to device over USB',
+    'RPC error: DEADLINE_EXCEEDED',
+    'rpc ok',
+    'Temperature is 36.5 Kelvin',
+    'Trying again',
+    '\x1b[31mError\x1b[0m in the logs',
+]
+
+
+def _log_line(text: str, number: int) -> LogLine:
+    log = LogLine(
+        record=logging.makeLogRecord({'msg': text}),
+        formatted_log=text,
+        ansi_stripped_log=text,
+    )
+    log.number = number
+    return log
+
+
+def _log_filter(
+    text: str,
+    matcher: SearchMatcher = SearchMatcher.REGEX,
+    invert: bool = False,
+    field=None,
+) -> LogFilter:
+    regex_text, regex_flags = preprocess_search_regex(text, matcher=matcher)
+    return LogFilter(
+        regex=re.compile(regex_text, regex_flags),
+        input_text=text,
+        invert=invert,
+        field=field,
+    )
+
+
+def _create_index(lines=None, max_bytes=1024 * 1024):
+    index = TrigramIndex(max_bytes)
+    logs = [_log_line(text, i) for i, text in enumerate(lines or _LINES)]
+    for log in logs:
+        index.add(log)
+    return index, logs
+
+
+class TestTrigramIndex(unittest.TestCase):
+    """Tests for TrigramIndex."""
+
+    @parameterized.expand(
+        [
+            ('literal', 'device', [0, 1]),
+            ('ignore case', 'rpc', [2, 3]),
+            # Letters are indexed in lowercase.
+            ('upper case', 'RPC', [2, 3]),
+            ('regex', r'dev.*USB', [1]),
+            ('fuzzy groups', '(error)(.*?)(deadline)', [2]),
+            ('repeat', r'(?:try)+ing', [5]),
+            ('kelvin sign', 'kelvin', [4]),
+            ('not present', 'flash', []),
+        ]
+    )
+    def test_candidates(self, _name, text, expected) -> None:
+        index, _logs = _create_index()
+        self.assertEqual(expected, index.candidates(_log_filter(text)))
+
+    @parameterized.expand(
+        [
+            ('short literal', 'ok'),
+            ('alternatives', 'device|rpc'),
+            ('character class', '[a-z]+'),
+            ('optional', '(?:device)?'),
+        ]
+    )
+    def test_candidates_not_narrowed(self, _name, text) -> None:
+        index, _logs = _create_index()
+        self.assertIsNone(index.candidates(_log_filter(text)))
+
+    def test_inverted_and_field_filters_not_narrowed(self) -> None:
+        index, _logs = _create_index()
+        self.assertIsNone(index.candidates(_log_filter('device', invert=True)))
+        self.assertIsNone(index.candidates(_log_filter('device', field='lvl')))
+
+    def test_candidates_include_all_matches(self) -> None:
+        """Compare candidates with matching every line."""
+        rng = random.Random(1)
+        alphabet = 'abcABC İıſK.'
+        lines = [
+            ''.join(rng.choice(alphabet) for _ in range(rng.randrange(20)))
+            for _ in range(500)
+        ]
+        index, logs = _create_index(lines)
+
+        for _ in range(300):
+            text = ''.join(rng.choice('abcABC') for _ in range(3))
+            for matcher in SearchMatcher:
+                log_filter = _log_filter(text, matcher)
+                candidates = index.candidates(log_filter)
+                self.assertIsNotNone(candidates)
+                matched = [
+                    log.number for log in logs if log_filter.matches(log)
+                ]
+                self.assertLessEqual(set(matched), set(candidates))
+
+    def test_remove(self) -> None:
+        index, logs = _create_index()
+        # Only the oldest line can be removed.
+        index.remove(logs[1])
+        self.assertEqual(0, index.first_number)
+
+        index.remove(logs[0])
+        index.remove(logs[1])
+        self.assertEqual(2, index.first_number)
+        self.assertEqual([], index.candidates(_log_filter('device')))
+
+        for log in logs[2:]:
+            index.remove(log)
+        self.assertEqual(0, index.estimated_size())
+        self.assertFalse(index.over_limit())
+
+    def test_over_limit(self) -> None:
+        index, logs = _create_index(max_bytes=3000)
+        self.assertTrue(index.over_limit())
+        while index.over_limit():
+            index.remove(logs[index.first_number])
+
+        self.assertLessEqual(index.estimated_size(), 3000)
+        self.assertGreater(index.first_number, 0)
+        self.assertEqual(len(logs), index.next_number)
+
+    def test_add_out_of_order_restarts(self) -> None:
+        index, _logs = _create_index()
+        index.add(_log_line('Rebooting device', 100))
+        self.assertEqual(100, index.first_number)
+        self.assertEqual([100], index.candidates(_log_filter('device')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Times pw_protobuf code generation for a large synthetic set of protos.
+
+The protos are built directly as FileDescriptorProtos, so protoc is not needed.
+Each file defines messages with nested messages and enums, and its fields refer
+to types in the same file and in the other files' packages.
+"""
+
+import argparse
+from pathlib import Path
+import time
+from typing import List
+
+from google.protobuf.descriptor_pb2 import (
+    DescriptorProto,
+    FieldDescriptorProto,
+    FileDescriptorProto,
+)
+
+from pw_protobuf import codegen_pwpb, proto_tree
+
+_FIELD = FieldDescriptorProto
+
+
+def _add_message(
+    message: DescriptorProto,
+    package: str,
+    index: int,
+    fields: int,
+    references: List[str],
+) -> None:
+    """Fills in a message with scalar, enum, nested, and message fields."""
+    enum = message.enum_type.add(name='Kind')
+    for value in range(4):
+        enum.value.add(name=f'KIND_{value}', number=value)
+
+    nested = message.nested_type.add(name='Nested')
+    nested.field.add(name='value', number=1, type=_FIELD.TYPE_UINT32)
+
+    own_name = f'.{package}.Message{index}'
+    for number in range(1, fields + 1):
+        name = f'field_{number}'
+        kind = number % 5
+        if kind == 0:
+            message.field.add(name=name, number=number, type=_FIELD.TYPE_INT32)
+        elif kind == 1:
+            message.field.add(
+                name=name,
+                number=number,
+                type=_FIELD.TYPE_ENUM,
+                type_name=f'{own_name}.Kind',
+            )
+        elif kind == 2:
+            message.field.add(
+                name=name,
+                number=number,
+                type=_FIELD.TYPE_MESSAGE,
+                type_name=f'{own_name}.Nested',
+            )
+        else:
+            message.field.add(
+                name=name,
+                number=number,
+                type=_FIELD.TYPE_MESSAGE,
+                label=_FIELD.LABEL_REPEATED,
+                type_name=references[
+                    (index * fields + number) % len(references)
+                ],
+            )
+
+
+def synthetic_protos(
+    files: int, messages: int, fields: int
+) -> List[FileDescriptorProto]:
+    """Creates files that reference each other's messages."""
+    packages = [f'pw.benchmark.package{i}' for i in range(files)]
+    all_messages = [
+        f'.{package}.Message{i}'
+        for package in packages
+        for i in range(messages)
+    ]
+
+    protos = []
+    for file_index, package in enumerate(packages):
+        proto_file = FileDescriptorProto(
+            name=f'pw_benchmark/file{file_index}.proto',
+            package=package,
+            syntax='proto3',
+        )
+        for index in range(messages):
+            _add_message(
+                proto_file.message_type.add(name=f'Message{index}'),
+                package,
+                index,
+                fields,
+                all_messages,
+            )
+        protos.append(proto_file)
+
+    return protos
+
+
+def benchmark(protos: List[FileDescriptorProto]) -> None:
+    tree_s = 0.0
+    codegen_s = 0.0
+    output_bytes = 0
+
+    for proto_file in protos:
+        start = time.perf_counter()
+        proto_tree.build_node_tree(proto_file)
+        tree_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for output in codegen_pwpb.process_proto_file(
+            proto_file,
+            proto_options=[],
+            suppress_legacy_namespace=False,
+            exclude_legacy_snake_case_field_name_enums=False,
+        ):
+            output_bytes += len(output.content())
+        codegen_s += time.perf_counter() - start
+
+    # process_proto_file builds its own tree, so the codegen time includes a
+    # second tree construction.
+    # Show which sources were measured, since an installed pw_protobuf may be
+    # imported instead of the one in this checkout.
+    print(f'pw_protobuf:      {Path(proto_tree.__file__).parent}')
+    print(f'Files:            {len(protos)}')
+    print(f'build_node_tree:  {tree_s * 1e3:10.1f} ms')
+    print(f'codegen (total):  {codegen_s * 1e3:10.1f} ms')
+    print(f'per file:         {codegen_s / len(protos) * 1e3:10.1f} ms')
+    print(f'generated:        {output_bytes / 1e6:10.1f} MB')
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--messages', type=int, default=20)
+    parser.add_argument('--fields', type=int, default=20)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    benchmark(synthetic_protos(args.files, args.messages, args.fields))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests the pw_protobuf protoc plugin and its codegen cache."""
+
+import os
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+from google.protobuf.compiler import plugin_pb2
+from google.protobuf.descriptor_pb2 import (
+    FieldDescriptorProto,
+    FileDescriptorProto,
+)
+
+from pw_protobuf import codegen_cache, codegen_pwpb, plugin
+
+
+def _test_proto() -> FileDescriptorProto:
+    proto_file = FileDescriptorProto(
+        name='pw_test/test.proto', package='pw.test_plugin', syntax='proto3'
+    )
+    message = proto_file.message_type.add(name='Record')
+    message.field.add(
+        name='value', number=1, type=FieldDescriptorProto.TYPE_UINT32
+    )
+    message.field.add(
+        name='data',
+        number=2,
+        type=FieldDescriptorProto.TYPE_BYTES,
+        label=FieldDescriptorProto.LABEL_OPTIONAL,
+    )
+    return proto_file
+
+
+def _request(parameter: str = '') -> plugin_pb2.CodeGeneratorRequest:
+    request = plugin_pb2.CodeGeneratorRequest(parameter=parameter)
+    request.proto_file.append(_test_proto())
+    return request
+
+
+def _generate(
+    request: plugin_pb2.CodeGeneratorRequest,
+) -> plugin_pb2.CodeGeneratorResponse:
+    response = plugin_pb2.CodeGeneratorResponse()
+    plugin.process_proto_request(request, response)
+    return response
+
+
+class PluginCacheTest(unittest.TestCase):
+    """Tests caching generated code across plugin invocations."""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._cache_dir = Path(self._temp_dir.name) / 'cache'
+        self._include_dir = Path(self._temp_dir.name) / 'include'
+        env = {codegen_cache.CACHE_DIR_ENV_VAR: str(self._cache_dir)}
+        self._env = mock.patch.dict(os.environ, env)
+        self._env.start()
+
+    def tearDown(self) -> None:
+        self._env.stop()
+        self._temp_dir.cleanup()
+
+    def _cache_entries(self):
+        return sorted(self._cache_dir.glob('*/*.pb'))
+
+    def test_miss_then_hit(self) -> None:
+        with mock.patch.dict(os.environ, clear=True):
+            uncached = _generate(_request())
+
+        first = _generate(_request())
+        self.assertEqual(1, len(self._cache_entries()))
+
+        with mock.patch.object(
+            codegen_pwpb, 'process_proto_file'
+        ) as process_proto_file:
+            second = _generate(_request())
+
+        process_proto_file.assert_not_called()
+        self.assertEqual(uncached, first)
+        self.assertEqual(first, second)
+
+    def test_plugin_parameters_change_key(self) -> None:
+        legacy = _generate(_request())
+        no_legacy = _generate(_request('--no-legacy-namespace'))
+        no_snake_case = _generate(
+            _request('--exclude-legacy-snake-case-field-name-enums')
+        )
+
+        self.assertEqual(3, len(self._cache_entries()))
+        self.assertNotEqual(legacy, no_legacy)
+        self.assertNotEqual(legacy, no_snake_case)
+
+    def test_options_file_changes_key(self) -> None:
+        parameter = f'-I{self._include_dir}'
+        without_options = _generate(_request(parameter))
+
+        options_file = self._include_dir / 'pw_test' / 'test.options'
+        options_file.parent.mkdir(parents=True)
+        options_file.write_text('pw.test_plugin.Record.data max_size:16\n')
+        with_options = _generate(_request(parameter))
+
+        options_file.write_text('pw.test_plugin.Record.data max_size:32\n')
+        changed_options = _generate(_request(parameter))
+
+        self.assertEqual(3, len(self._cache_entries()))
+        self.assertNotEqual(without_options, with_options)
+        self.assertNotEqual(with_options, changed_options)
+        self.assertIn('16', with_options.file[0].content)
+
+        # Unchanged options hit the entry that was just stored.
+        with mock.patch.object(
+            codegen_pwpb, 'process_proto_file'
+        ) as process_proto_file:
+            self.assertEqual(changed_options, _generate(_request(parameter)))
+        process_proto_file.assert_not_called()
+
+
+class CodegenCachePutTest(unittest.TestCase):
+    """Tests storing cache entries."""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._cache_dir = Path(self._temp_dir.name)
+        self._cache = codegen_cache.CodegenCache(self._cache_dir, 'test', 'v1')
+        self._key = self._cache.key(_test_proto())
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def _files(self):
+        return sorted(p for p in self._cache_dir.rglob('*') if p.is_file())
+
+    def test_put_and_get(self) -> None:
+        self._cache.put(self._key, [('a.h', 'content')])
+        self.assertEqual([('a.h', 'content')], self._cache.get(self._key))
+        self.assertEqual(1, len(self._files()))
+
+    def test_failed_rename_removes_temp_file(self) -> None:
+        with mock.patch.object(
+            os, 'replace', side_effect=OSError('disk full')
+        ), self.assertLogs(codegen_cache.__name__, 'WARNING'):
+            self._cache.put(self._key, [('a.h', 'content')])
+
+        self.assertEqual([], self._files())
+        self.assertIsNone(self._cache.get(self._key))
+
+    def test_unexpected_error_removes_temp_file(self) -> None:
+        with mock.patch.object(
+            os, 'replace', side_effect=KeyboardInterrupt
+        ), self.assertRaises(KeyboardInterrupt):
+            self._cache.put(self._key, [('a.h', 'content')])
+
+        self.assertEqual([], self._files())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for pw_protobuf.proto_tree"""
+
+import unittest
+
+from google.protobuf.descriptor_pb2 import (
+    FieldDescriptorProto,
+    FileDescriptorProto,
+)
+
+from pw_protobuf.proto_tree import (
+    ProtoMessage,
+    ProtoNode,
+    ProtoPackage,
+    build_node_tree,
+)
+
+_FIELD = FieldDescriptorProto
+
+
+def _test_proto() -> FileDescriptorProto:
+    proto_file = FileDescriptorProto(name='test.proto', package='pw.test')
+    outer = proto_file.message_type.add(name='Outer')
+    outer.nested_type.add(name='Inner')
+    for number, type_name in enumerate(
+        [
+            '.pw.test.Outer.Inner',
+            '.other.pkg.Thing',
+            '.other.pkg.Thing.Part',
+            '.other.pkg.Thing',
+            'Outer.Inner',
+        ],
+        1,
+    ):
+        outer.field.add(
+            name=f'field_{number}',
+            number=number,
+            type=_FIELD.TYPE_MESSAGE,
+            type_name=type_name,
+        )
+    return proto_file
+
+
+class TestBuildNodeTree(unittest.TestCase):
+    """Tests resolving field types while building a tree."""
+
+    def setUp(self) -> None:
+        self.root, self.package = build_node_tree(_test_proto())
+        outer = self.package.find('Outer')
+        assert isinstance(outer, ProtoMessage)
+        self.outer = outer
+        self.types = [field.type_node() for field in outer.fields()]
+
+    def test_fully_qualified_type(self) -> None:
+        self.assertIs(self.outer.find('Inner'), self.types[0])
+
+    def test_relative_type(self) -> None:
+        self.assertIs(self.outer.find('Inner'), self.types[4])
+
+    def test_external_types_created_once(self) -> None:
+        thing = self.root.find('other.pkg.Thing')
+        assert thing is not None
+        self.assertEqual(ProtoNode.Type.EXTERNAL, thing.type())
+        self.assertIs(thing, self.types[1])
+        self.assertIs(thing, self.types[3])
+        self.assertIs(thing.find('Part'), self.types[2])
+
+    def test_external_namespace(self) -> None:
+        part = self.types[2]
+        assert part is not None
+        self.assertEqual('other.pkg.Thing.Part', part.proto_path())
+        self.assertEqual(
+            'pw::pwpb_codegen_private::other::pkg::Thing::Part',
+            part.cpp_namespace(),
+        )
+
+
+class TestTreeQueriesAfterMutation(unittest.TestCase):
+    """Tests that queries reflect changes to a tree made after a query."""
+
+    def setUp(self) -> None:
+        self.root, self.package = build_node_tree(_test_proto())
+        outer = self.package.find('Outer')
+        inner = self.package.find('Outer.Inner')
+        assert outer is not None and inner is not None
+        self.outer = outer
+        self.inner = inner
+
+    def test_node_moved_to_other_package(self) -> None:
+        self.assertEqual('pw.test.Outer.Inner', self.inner.proto_path())
+        self.assertEqual(4, self.inner.depth())
+        self.assertEqual(
+            'pw::test::pwpb::Outer::Inner', self.inner.cpp_namespace()
+        )
+        self.assertEqual(
+            'Outer::Inner', self.inner.cpp_namespace(root=self.package)
+        )
+        self.assertEqual('::pw_test_Outer_Inner', self.inner.nanopb_struct())
+        self.assertIs(self.outer, self.inner.common_ancestor(self.outer))
+
+        moved = ProtoPackage('moved')
+        self.root.add_child(moved)
+        moved.add_child(self.inner)
+
+        self.assertIsNone(self.outer.find('Inner'))
+        self.assertIs(self.inner, self.root.find('moved.Inner'))
+        self.assertEqual('moved.Inner', self.inner.proto_path())
+        self.assertEqual(2, self.inner.depth())
+        self.assertEqual('moved::pwpb::Inner', self.inner.cpp_namespace())
+        self.assertEqual(
+            'moved::pwpb::Inner', self.inner.cpp_namespace(root=self.package)
+        )
+        self.assertEqual('::moved_Inner', self.inner.nanopb_struct())
+        self.assertIs(self.root, self.inner.common_ancestor(self.outer))
+
+    def test_ancestor_added_above_node(self) -> None:
+        message = ProtoMessage('Record')
+        self.root.add_child(message)
+        self.assertEqual('Record', message.proto_path())
+        self.assertEqual(1, message.depth())
+
+        package = ProtoPackage('late')
+        self.root.add_child(package)
+        package.add_child(message)
+
+        self.assertEqual('late.Record', message.proto_path())
+        self.assertEqual(2, message.depth())
+        self.assertEqual('late::pwpb::Record', message.cpp_namespace())
+
+    def test_queries_on_other_trees_unaffected(self) -> None:
+        namespace = self.inner.cpp_namespace()
+        build_node_tree(_test_proto())
+        self.assertEqual(namespace, self.inner.cpp_namespace())
+        self.assertIs(self.inner, self.root.find('pw.test.Outer.Inner'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Persistent cache of generated code for protoc plugins.
+
+Generated code depends only on a .proto file's FileDescriptorProto, the
+generator, and the generator's options. The cache stores the output files under
+a hash of those inputs, so repeated protoc invocations for unchanged protos
+skip building ProtoNode trees and emitting code.
+
+Caching is opt-in. Set the PW_PROTOBUF_CODEGEN_CACHE environment variable to a
+directory to enable it for the pw_protobuf and pw_rpc plugins. The generator's
+Python sources are part of the cache key, so changes to the generator
+invalidate previous entries.
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+import tempfile
+from types import ModuleType
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+from google.protobuf.compiler import plugin_pb2
+from google.protobuf.descriptor_pb2 import FileDescriptorProto
+
+from pw_protobuf.output_file import OutputFile
+
+_LOG = logging.getLogger(__name__)
+
+CACHE_DIR_ENV_VAR = 'PW_PROTOBUF_CODEGEN_CACHE'
+
+# Bump to invalidate every existing cache entry if the storage format changes.
+_FORMAT_VERSION = b'1'
+
+# (file name, file content) for each generated file.
+GeneratedFiles = List[Tuple[str, str]]
+
+
+def source_digest(*modules: ModuleType) -> str:
+    """Returns a hash of the source files of the provided modules."""
+    digest = hashlib.sha256()
+    for module in modules:
+        if module.__file__ is None:
+            raise ValueError(f'Module {module.__name__} has no source file')
+        digest.update(module.__name__.encode())
+        digest.update(Path(module.__file__).read_bytes())
+    return digest.hexdigest()
+
+
+class CodegenCache:
+    """Stores generated files by a hash of their inputs.
+
+    Each entry is a serialized CodeGeneratorResponse in its own file. Entries
+    are written atomically, so concurrent protoc invocations may share a cache
+    directory.
+    """
+
+    def __init__(
+        self, directory: Union[Path, str], generator: str, version: str
+    ) -> None:
+        self.directory = Path(directory)
+        self._prefix = b'\0'.join(
+            (_FORMAT_VERSION, generator.encode(), version.encode())
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, proto_file: FileDescriptorProto, *options: bytes) -> str:
+        """Returns the cache key for a .proto file and generator options."""
+        digest = hashlib.sha256(self._prefix)
+        serialized = proto_file.SerializeToString(deterministic=True)
+        for part in (serialized, *options):
+            # Prefix each part with its length so parts can't run together.
+            digest.update(len(part).to_bytes(8, 'little'))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f'{key}.pb'
+
+    def get(self, key: str) -> Optional[GeneratedFiles]:
+        """Returns the cached files for a key, or None if not cached."""
+        try:
+            data = self._path(key).read_bytes()
+            response = plugin_pb2.CodeGeneratorResponse.FromString(data)
+        except FileNotFoundError:
+            return None
+        except Exception as err:  # pylint: disable=broad-except
+            _LOG.warning(
+                'Ignoring corrupt codegen cache entry %s: %s', key, err
+            )
+            return None
+
+        return [(file.name, file.content) for file in response.file]
+
+    def put(self, key: str, files: GeneratedFiles) -> None:
+        """Stores generated files. Errors are logged, not raised."""
+        response = plugin_pb2.CodeGeneratorResponse()
+        for name, content in files:
+            response.file.add(name=name, content=content)
+
+        path = self._path(key)
+        temp_path: Optional[Path] = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                dir=path.parent, prefix=f'.{key}', delete=False
+            ) as temp:
+                temp_path = Path(temp.name)
+                temp.write(response.SerializeToString())
+            os.replace(temp_path, path)
+            temp_path = None
+        except OSError as err:
+            _LOG.warning('Failed to write codegen cache entry %s: %s', key, err)
+        finally:
+            # Don't leave partially written entries behind.
+            if temp_path is not None:
+                try:
+                    temp_path.unlink()
+                except OSError:
+                    pass
+
+    def generate(
+        self,
+        proto_file: FileDescriptorProto,
+        options: Iterable[bytes],
+        generate: Callable[[], Iterable[OutputFile]],
+    ) -> GeneratedFiles:
+        """Returns cached files for a .proto, generating them if needed."""
+        key = self.key(proto_file, *options)
+
+        files = self.get(key)
+        if files is not None:
+            self.hits += 1
+            return files
+
+        self.misses += 1
+        files = [(output.name(), output.content()) for output in generate()]
+        self.put(key, files)
+        return files
+
+
+def from_environment(
+    generator: str, *modules: ModuleType
+) -> Optional[CodegenCache]:
+    """Returns a CodegenCache if PW_PROTOBUF_CODEGEN_CACHE is set.
+
+    Args:
+      generator: A name that distinguishes the generator's output.
+      modules: The modules that implement the generator. Their sources are
+          hashed into the cache key.
+    """
+    directory = os.environ.get(CACHE_DIR_ENV_VAR)
+    if not directory:
+        return None
+
+    return CodegenCache(directory, generator, source_digest(*modules))
+
+
+def generate_files(
+    cache: Optional[CodegenCache],
+    proto_file: FileDescriptorProto,
+    options: Iterable[bytes],
+    generate: Callable[[], Iterable[OutputFile]],
+) -> GeneratedFiles:
+    """Generates files for a .proto, using the cache if there is one."""
+    if cache is not None:
+        return cache.generate(proto_file, options, generate)
+
+    return [(output.name(), output.content()) for output in generate()]
@@ -18,6 +18,7 @@ This file implements a protobuf compiler plugin which generates C++ headers for
 protobuf messages in the pw_protobuf format.
 """
 
+import functools
 import sys
 from argparse import ArgumentParser, Namespace
 from pathlib import Path
@@ -25,7 +26,14 @@ from shlex import shlex
 
 from google.protobuf.compiler import plugin_pb2
 
-from pw_protobuf import codegen_pwpb, options
+from pw_protobuf import (
+    codegen_cache,
+    codegen_pwpb,
+    options,
+    output_file,
+    proto_tree,
+    symbol_name_mapping,
+)
 
 
 def parse_parameter_options(parameter: str) -> Namespace:
@@ -85,11 +93,35 @@ def process_proto_request(
       res: A CodeGeneratorResponse to populate with the plugin's output.
     """
     args = parse_parameter_options(req.parameter)
+    cache = codegen_cache.from_environment(
+        'pw_protobuf.pwpb',
+        sys.modules[__name__],
+        codegen_cache,
+        codegen_pwpb,
+        options,
+        output_file,
+        proto_tree,
+        symbol_name_mapping,
+    )
+
     for proto_file in req.proto_file:
         proto_options = options.load_options(
             args.include_paths, Path(proto_file.name)
         )
-        output_files = codegen_pwpb.process_proto_file(
+        cache_key_options = [
+            b'%d%d'
+            % (
+                args.no_legacy_namespace,
+                args.exclude_legacy_snake_case_field_name_enums,
+            ),
+            *(
+                name.encode() + b'\0' + opts.SerializeToString()
+                for name, opts in proto_options
+            ),
+        ]
+
+        generate = functools.partial(
+            codegen_pwpb.process_proto_file,
             proto_file,
             proto_options,
             suppress_legacy_namespace=args.no_legacy_namespace,
@@ -97,10 +129,10 @@ def process_proto_request(
                 args.exclude_legacy_snake_case_field_name_enums
             ),
         )
-        for output_file in output_files:
-            fd = res.file.add()
-            fd.name = output_file.name()
-            fd.content = output_file.content()
+        for name, content in codegen_cache.generate_files(
+            cache, proto_file, cache_key_options, generate
+        ):
+            res.file.add(name=name, content=content)
 
 
 def main() -> int:
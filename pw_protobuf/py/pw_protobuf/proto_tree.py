@@ -19,6 +19,7 @@ import enum
 import itertools
 
 from typing import (
+    Any,
     Callable,
     Dict,
     Iterator,
@@ -73,10 +74,26 @@ class ProtoNode(abc.ABC):
         EXTERNAL = 4
         SERVICE = 5
 
+    # Incremented whenever a node is added to any tree. Properties derived from
+    # a node's position in its tree are memoized, and the memoized values are
+    # discarded when the generation changes. Trees are only modified while
+    # they are built, so code generation computes each property once.
+    _generation = 0
+
     def __init__(self, name: str):
         self._name: str = name
         self._children: Dict[str, 'ProtoNode'] = collections.OrderedDict()
         self._parent: Optional['ProtoNode'] = None
+        self._cpp_name: Optional[str] = None
+        self._memo: Dict[Any, Any] = {}
+        self._memo_generation = ProtoNode._generation
+
+    def _memoized(self) -> Dict[Any, Any]:
+        """Returns this node's memoized properties for the current tree."""
+        if self._memo_generation != ProtoNode._generation:
+            self._memo = {}
+            self._memo_generation = ProtoNode._generation
+        return self._memo
 
     @abc.abstractmethod
     def type(self) -> 'ProtoNode.Type':
@@ -93,9 +110,11 @@ class ProtoNode(abc.ABC):
 
     def cpp_name(self) -> str:
         """The name of this node in generated C++ code."""
-        return symbol_name_mapping.fix_cc_identifier(self._name).replace(
-            '.', '::'
-        )
+        if self._cpp_name is None:
+            self._cpp_name = symbol_name_mapping.fix_cc_identifier(
+                self._name
+            ).replace('.', '::')
+        return self._cpp_name
 
     def _package_or_external(self) -> 'ProtoNode':
         """Returns this node's deepest package or external ancestor node.
@@ -105,6 +124,12 @@ class ProtoNode(abc.ABC):
         regular proto tree. This is because there is no way to find the package
         name of a node referring to an external symbol.
         """
+        memo = self._memoized()
+        try:
+            return memo['package_or_external']
+        except KeyError:
+            pass
+
         node: Optional['ProtoNode'] = self
         while (
             node
@@ -114,6 +139,7 @@ class ProtoNode(abc.ABC):
             node = node.parent()
 
         assert node, 'proto tree was built without a root'
+        memo['package_or_external'] = node
         return node
 
     def cpp_namespace(
@@ -137,6 +163,20 @@ class ProtoNode(abc.ABC):
             By default, this is "pwpb", which reflects the default behaviour
             of the pwpb codegen.
         """
+        memo = self._memoized()
+        key = ('cpp_namespace', root, codegen_subnamespace)
+        try:
+            return memo[key]
+        except KeyError:
+            pass
+
+        namespace = self._compute_cpp_namespace(root, codegen_subnamespace)
+        memo[key] = namespace
+        return namespace
+
+    def _compute_cpp_namespace(
+        self, root: Optional['ProtoNode'], codegen_subnamespace: Optional[str]
+    ) -> str:
         self_pkg_or_ext = self._package_or_external()
         root_pkg_or_ext = (
             root._package_or_external()  # pylint: disable=protected-access
@@ -212,8 +252,15 @@ class ProtoNode(abc.ABC):
 
     def proto_path(self) -> str:
         """Fully-qualified package path of the node."""
+        memo = self._memoized()
+        try:
+            return memo['proto_path']
+        except KeyError:
+            pass
+
         path = '.'.join(self._attr_hierarchy(lambda node: node.name(), None))
-        return path.lstrip('.')
+        memo['proto_path'] = path = path.lstrip('.')
+        return path
 
     def pwpb_struct(self) -> str:
         """Name of the pw_protobuf struct for this proto."""
@@ -232,8 +279,15 @@ class ProtoNode(abc.ABC):
         return f'::{self._nanopb_name()}'
 
     def _nanopb_name(self) -> str:
+        memo = self._memoized()
+        try:
+            return memo['nanopb_name']
+        except KeyError:
+            pass
+
         name = '_'.join(self._attr_hierarchy(lambda node: node.name(), None))
-        return name.lstrip('_')
+        memo['nanopb_name'] = name = name.lstrip('_')
+        return name
 
     def common_ancestor(self, other: 'ProtoNode') -> Optional['ProtoNode']:
         """Finds the earliest common ancestor of this node and other."""
@@ -241,6 +295,20 @@ class ProtoNode(abc.ABC):
         if other is None:
             return None
 
+        memo = self._memoized()
+        key = ('common_ancestor', other)
+        try:
+            return memo[key]
+        except KeyError:
+            pass
+
+        ancestor = self._find_common_ancestor(other)
+        memo[key] = ancestor
+        return ancestor
+
+    def _find_common_ancestor(
+        self, other: 'ProtoNode'
+    ) -> Optional['ProtoNode']:
         own_depth = self.depth()
         other_depth = other.depth()
         diff = abs(own_depth - other_depth)
@@ -268,11 +336,18 @@ class ProtoNode(abc.ABC):
 
     def depth(self) -> int:
         """Returns the depth of this node from the root."""
+        memo = self._memoized()
+        try:
+            return memo['depth']
+        except KeyError:
+            pass
+
         depth = 0
         node = self._parent
         while node:
             depth += 1
             node = node.parent()
+        memo['depth'] = depth
         return depth
 
     def add_child(self, child: 'ProtoNode') -> None:
@@ -297,6 +372,8 @@ class ProtoNode(abc.ABC):
         self._children[child.name()] = child
         # pylint: enable=protected-access
 
+        ProtoNode._generation += 1
+
     def find(self, path: str) -> Optional['ProtoNode']:
         """Finds a node within this node's subtree.
 
@@ -487,6 +564,7 @@ class ProtoMessageField:
         codegen_options: Optional[CodegenOptions] = None,
     ):
         self._field_name = symbol_name_mapping.fix_cc_identifier(field_name)
+        self._name = self.upper_camel_case(self._field_name)
         self._number: int = field_number
         self._type: int = field_type
         self._type_node: Optional[ProtoNode] = type_node
@@ -495,7 +573,7 @@ class ProtoMessageField:
         self._options: Optional[CodegenOptions] = codegen_options
 
     def name(self) -> str:
-        return self.upper_camel_case(self._field_name)
+        return self._name
 
     def field_name(self) -> str:
         return self._field_name
@@ -602,39 +680,69 @@ def _add_enum_fields(enum_node: ProtoNode, proto_enum) -> None:
         enum_node.add_value(value.name, value.number)
 
 
-def _create_external_nodes(root: ProtoNode, path: str) -> ProtoNode:
+# Maps the fully-qualified path of each node in a tree, without the leading
+# '.', to the node.
+_NodeIndex = Dict[str, ProtoNode]
+
+
+def _index_tree(global_root: ProtoNode) -> _NodeIndex:
+    """Indexes every node in a tree by its fully-qualified path."""
+    index: _NodeIndex = {}
+
+    def add_subtree(node: ProtoNode, path: str) -> None:
+        index[path] = node
+        for child in node.children():
+            add_subtree(
+                child, f'{path}.{child.name()}' if path else child.name()
+            )
+
+    add_subtree(global_root, '')
+    return index
+
+
+def _create_external_nodes(
+    root: ProtoNode, path: str, index: _NodeIndex
+) -> ProtoNode:
     """Creates external nodes for a path starting from the given root."""
 
     node = root
+    prefix = root.proto_path()
     for part in path.split('.'):
+        prefix = f'{prefix}.{part}' if prefix else part
         child = node.find(part)
         if not child:
             child = ProtoExternal(part)
             node.add_child(child)
+            index[prefix] = child
         node = child
 
     return node
 
 
 def _find_or_create_node(
-    global_root: ProtoNode, package_root: ProtoNode, path: str
+    global_root: ProtoNode,
+    package_root: ProtoNode,
+    path: str,
+    index: _NodeIndex,
 ) -> ProtoNode:
     """Searches the proto tree for a node by path, creating it if not found."""
 
     if path[0] == '.':
-        # Fully qualified path.
+        # Fully qualified path. These are what protoc produces, so look them up
+        # in the index rather than walking the tree.
         root_relative_path = path[1:]
         search_root = global_root
+        node = index.get(root_relative_path)
     else:
         root_relative_path = path
         search_root = package_root
+        node = search_root.find(root_relative_path)
 
-    node = search_root.find(root_relative_path)
     if node is None:
         # Create nodes for field types that don't exist within this
         # compilation context, such as those imported from other .proto
         # files.
-        node = _create_external_nodes(search_root, root_relative_path)
+        node = _create_external_nodes(search_root, root_relative_path, index)
 
     return node
 
@@ -645,12 +753,14 @@ def _add_message_fields(
     message: ProtoNode,
     proto_message,
     proto_options,
+    index: _NodeIndex,
 ) -> None:
     """Adds fields from a protobuf message descriptor to a message node."""
     assert message.type() == ProtoNode.Type.MESSAGE
     message = cast(ProtoMessage, message)
 
     type_node: Optional[ProtoNode]
+    message_path = message.proto_path()
 
     for field in proto_message.field:
         if field.type_name:
@@ -658,7 +768,7 @@ def _add_message_fields(
             # field's type object, for example ".pw.protobuf.test.KeyValuePair".
             # Try to find the node for this object within the current context.
             type_node = _find_or_create_node(
-                global_root, package_root, field.type_name
+                global_root, package_root, field.type_name, index
             )
         else:
             type_node = None
@@ -670,7 +780,7 @@ def _add_message_fields(
 
         codegen_options = (
             options.match_options(
-                '.'.join((message.proto_path(), field.name)), proto_options
+                '.'.join((message_path, field.name)), proto_options
             )
             if proto_options is not None
             else None
@@ -713,6 +823,7 @@ def _add_service_methods(
     package_root: ProtoNode,
     service: ProtoNode,
     proto_service,
+    index: _NodeIndex,
 ) -> None:
     assert service.type() == ProtoNode.Type.SERVICE
     service = cast(ProtoService, service)
@@ -728,10 +839,10 @@ def _add_service_methods(
             method_type = ProtoServiceMethod.Type.UNARY
 
         request_node = _find_or_create_node(
-            global_root, package_root, method.input_type
+            global_root, package_root, method.input_type, index
         )
         response_node = _find_or_create_node(
-            global_root, package_root, method.output_type
+            global_root, package_root, method.output_type, index
         )
 
         service.add_method(
@@ -749,10 +860,12 @@ def _populate_fields(
 ) -> None:
     """Traverses a proto file, adding all message and enum fields to a tree."""
 
+    index = _index_tree(global_root)
+
     def populate_message(node, message):
         """Recursively populates nested messages and enums."""
         _add_message_fields(
-            global_root, package_root, node, message, proto_options
+            global_root, package_root, node, message, proto_options, index
         )
 
         for proto_enum in message.enum_type:
@@ -772,7 +885,9 @@ def _populate_fields(
     for service in proto_file.service:
         service_node = package_root.find(service.name)
         assert service_node is not None
-        _add_service_methods(global_root, package_root, service_node, service)
+        _add_service_methods(
+            global_root, package_root, service_node, service, index
+        )
 
 
 def _build_hierarchy(
@@ -19,3 +19,4 @@ __path__ = extend_path(__path__, __name__)  # type: ignore
 
 from pw_rpc.client import Client
 from pw_rpc.descriptors import Channel, ChannelManipulator
+from pw_rpc.packets import PayloadMode
@@ -0,0 +1,630 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Defines an asyncio-based RPC ClientImpl to use with pw_rpc.Client.
+
+asyncio_client.Impl exposes RPCs as awaitables and async iterators. Packets may
+be processed by the pw_rpc.Client on any thread; RPC events are forwarded to the
+event loop in batches, so a single loop can keep many RPCs in flight without a
+blocked thread per call.
+
+.. code-block:: python
+
+  client = pw_rpc.Client.from_modules(
+      asyncio_client.Impl(), channels, modules)
+  rpcs = client.channel(1).rpcs
+
+  # Unary RPCs are awaitable and produce a status and a response.
+  status, response = await rpcs.MyService.MyUnary(some_field=123)
+
+  # Server streaming RPCs are async iterators.
+  async for response in rpcs.MyService.MyServerStreaming(some_field=123):
+      process(response)
+
+  # Client and bidirectional streaming calls send requests with send().
+  call = rpcs.MyService.MyBidirectionalStreaming.invoke()
+  call.send(some_field=123)
+  status, responses = await call.finish_and_wait()
+
+The loop that receives RPC events is provided when the Impl is created. If it
+is not provided, the running loop of the first invoked RPC is used.
+"""
+
+import asyncio
+import collections
+import logging
+import threading
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from google.protobuf.message import Message
+from pw_status import Status
+
+from pw_rpc import client
+from pw_rpc.client import PendingRpc
+from pw_rpc.descriptors import Channel, Method, Service
+from pw_rpc.packets import PayloadMode, Request
+from pw_rpc.callback_client.call import (
+    OptionalTimeout,
+    StreamResponse,
+    UnaryResponse,
+    UseDefault,
+)
+from pw_rpc.callback_client.errors import RpcError, RpcTimeout
+
+_LOG = logging.getLogger(__package__)
+
+
+class Call:
+    """Represents an in-progress or completed asyncio RPC call.
+
+    Call objects are only accessed from the event loop thread. The Impl forwards
+    packets from the thread that processes them to the call.
+    """
+
+    def __init__(
+        self,
+        impl: 'Impl',
+        rpc: PendingRpc,
+        default_timeout_s: Optional[float],
+    ) -> None:
+        self._impl = impl
+        self._rpc = rpc
+        self.default_timeout_s = default_timeout_s
+
+        self.status: Optional[Status] = None
+        self.error: Optional[Status] = None
+        self._responses: Deque[Any] = collections.deque()
+        # Futures of the tasks waiting for the next event.
+        self._waiters: Set[asyncio.Future] = set()
+
+    def _invoke(
+        self,
+        request: Optional[Message],
+        ignore_errors: bool,
+        payload_mode: PayloadMode = PayloadMode.MESSAGE,
+    ) -> None:
+        """Calls the RPC. This must be called immediately after __init__."""
+        self._impl.rpcs.send_request(  # type: ignore[union-attr]
+            self._rpc,
+            request,
+            self,
+            ignore_errors=ignore_errors,
+            override_pending=True,
+            payload_mode=payload_mode,
+        )
+
+    @property
+    def call_id(self) -> int:
+        return self._rpc.call_id
+
+    @property
+    def method(self) -> Method:
+        return self._rpc.method
+
+    def completed(self) -> bool:
+        """True if the RPC call has completed, successfully or from an error."""
+        return self.status is not None or self.error is not None
+
+    def cancel(self) -> bool:
+        """Cancels the RPC; returns whether the RPC was active."""
+        if self.completed():
+            return False
+
+        self.error = Status.CANCELLED
+        self._wake()
+        return self._impl.rpcs.send_cancel(  # type: ignore[union-attr]
+            self._rpc
+        )
+
+    def _send_client_stream(
+        self, request_proto: Optional[Request], request_fields: dict
+    ) -> None:
+        self._check_errors()
+
+        if self.status is not None:
+            raise RpcError(self._rpc, Status.FAILED_PRECONDITION)
+
+        self._impl.rpcs.send_client_stream(  # type: ignore[union-attr]
+            self._rpc, self.method.get_request(request_proto, request_fields)
+        )
+
+    def _finish_client_stream(self, requests: Iterable[Message]) -> None:
+        for request in requests:
+            self._send_client_stream(request, {})
+
+        if self.completed():
+            return
+
+        try:
+            self._impl.rpcs.send_client_stream_end(  # type: ignore[union-attr]
+                self._rpc
+            )
+        except client.Error:
+            # The RPC finished, but its completion has not reached the event
+            # loop yet. There is no client stream left to end.
+            pass
+
+    def _check_errors(self) -> None:
+        if self.error:
+            raise RpcError(self._rpc, self.error)
+
+    def _timeout(self, timeout_s: OptionalTimeout) -> Optional[float]:
+        if timeout_s is UseDefault.VALUE:
+            return self.default_timeout_s
+        return timeout_s
+
+    async def _wait_for_event(self, timeout_s: Optional[float]) -> None:
+        """Waits until a response is received or the RPC terminates."""
+        waiter = self._impl.loop.create_future()
+        self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout_s)
+        except asyncio.TimeoutError:
+            raise RpcTimeout(self._rpc, timeout_s)
+        finally:
+            self._waiters.discard(waiter)
+
+    async def _next_response(self, timeout_s: OptionalTimeout) -> Any:
+        """Returns the next response; raises StopAsyncIteration when done."""
+        timeout = self._timeout(timeout_s)
+
+        while not self._responses:
+            self._check_errors()
+
+            if self.status is not None:
+                raise StopAsyncIteration
+
+            await self._wait_for_event(timeout)
+
+        return self._responses.popleft()
+
+    async def _wait_until_completed(self, timeout_s: OptionalTimeout) -> None:
+        timeout = self._timeout(timeout_s)
+
+        while not self.completed():
+            await self._wait_for_event(timeout)
+
+        self._check_errors()
+
+    async def _unary_wait(self, timeout_s: OptionalTimeout) -> UnaryResponse:
+        await self._wait_until_completed(timeout_s)
+
+        assert self.status is not None and self._responses
+        return UnaryResponse(self.status, self._responses[-1])
+
+    async def _stream_wait(self, timeout_s: OptionalTimeout) -> StreamResponse:
+        responses: List[Any] = []
+        try:
+            while True:
+                responses.append(await self._next_response(timeout_s))
+        except StopAsyncIteration:
+            pass
+
+        assert self.status is not None
+        return StreamResponse(self.status, responses)
+
+    def _wake(self) -> None:
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _handle_response(self, response: Any) -> None:
+        self._responses.append(response)
+        self._wake()
+
+    def _handle_completion(self, status: Status) -> None:
+        self.status = status
+        self._wake()
+
+    def _handle_error(self, error: Status) -> None:
+        self.error = error
+        self._wake()
+
+    def __enter__(self) -> 'Call':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.cancel()
+
+    async def __aenter__(self) -> 'Call':
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        self.cancel()
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.method})'
+
+
+class UnaryCall(Call):
+    """Tracks the state of a unary RPC call. Await it for the response."""
+
+    @property
+    def response(self) -> Any:
+        return self._responses[-1] if self._responses else None
+
+    async def wait(
+        self, timeout_s: OptionalTimeout = UseDefault.VALUE
+    ) -> UnaryResponse:
+        return await self._unary_wait(timeout_s)
+
+    def __await__(self) -> Generator[Any, None, UnaryResponse]:
+        return self.wait().__await__()
+
+
+class ServerStreamingCall(Call):
+    """Tracks the state of a server streaming RPC call.
+
+    Iterate over the call with async for to receive responses as they arrive.
+    Awaiting the call collects the remaining responses and the status.
+    """
+
+    async def wait(
+        self, timeout_s: OptionalTimeout = UseDefault.VALUE
+    ) -> StreamResponse:
+        return await self._stream_wait(timeout_s)
+
+    def __await__(self) -> Generator[Any, None, StreamResponse]:
+        return self.wait().__await__()
+
+    def __aiter__(self) -> 'ServerStreamingCall':
+        return self
+
+    async def __anext__(self) -> Any:
+        return await self._next_response(UseDefault.VALUE)
+
+
+class ClientStreamingCall(Call):
+    """Tracks the state of a client streaming RPC call."""
+
+    @property
+    def response(self) -> Any:
+        return self._responses[-1] if self._responses else None
+
+    def send(
+        self, _rpc_request_proto: Optional[Request] = None, **request_fields
+    ) -> None:
+        """Sends client stream request to the server."""
+        self._send_client_stream(_rpc_request_proto, request_fields)
+
+    async def finish_and_wait(
+        self,
+        requests: Iterable[Message] = (),
+        *,
+        timeout_s: OptionalTimeout = UseDefault.VALUE,
+    ) -> UnaryResponse:
+        """Ends the client stream and waits for the RPC to complete."""
+        self._finish_client_stream(requests)
+        return await self._unary_wait(timeout_s)
+
+
+class BidirectionalStreamingCall(ServerStreamingCall):
+    """Tracks the state of a bidirectional streaming RPC call."""
+
+    def send(
+        self, _rpc_request_proto: Optional[Request] = None, **request_fields
+    ) -> None:
+        """Sends a message to the server in the client stream."""
+        self._send_client_stream(_rpc_request_proto, request_fields)
+
+    async def finish_and_wait(
+        self,
+        requests: Iterable[Message] = (),
+        *,
+        timeout_s: OptionalTimeout = UseDefault.VALUE,
+    ) -> StreamResponse:
+        """Ends the client stream and waits for the RPC to complete."""
+        self._finish_client_stream(requests)
+        return await self._stream_wait(timeout_s)
+
+
+class _MethodClient:
+    """A method that can be invoked for a particular channel."""
+
+    _CALL_TYPE: type = Call
+
+    def __init__(
+        self,
+        impl: 'Impl',
+        channel: Channel,
+        method: Method,
+        default_timeout_s: Optional[float],
+    ) -> None:
+        self._impl = impl
+        self._channel = channel
+        self._method = method
+        self.default_timeout_s: Optional[float] = default_timeout_s
+
+        # How responses are delivered for calls that don't specify a mode.
+        self.payload_mode = PayloadMode.MESSAGE
+
+    @property
+    def channel(self) -> Channel:
+        return self._channel
+
+    @property
+    def method(self) -> Method:
+        return self._method
+
+    @property
+    def service(self) -> Service:
+        return self._method.service
+
+    @property
+    def request(self) -> type:
+        """Returns the request proto class."""
+        return self.method.request_type
+
+    @property
+    def response(self) -> type:
+        """Returns the response proto class."""
+        return self.method.response_type
+
+    def _start_call(
+        self,
+        request: Optional[Message],
+        timeout_s: OptionalTimeout,
+        ignore_errors: bool = False,
+        payload_mode: Optional[PayloadMode] = None,
+    ) -> Any:
+        """Creates the Call object and invokes the RPC using it."""
+        if timeout_s is UseDefault.VALUE:
+            timeout_s = self.default_timeout_s
+
+        if payload_mode is None:
+            payload_mode = self.payload_mode
+
+        # Bind the event loop before the request goes out, since the response
+        # may be processed on another thread before this function returns.
+        _ = self._impl.loop
+
+        rpcs = self._impl.rpcs
+        assert rpcs is not None
+        rpc = PendingRpc(
+            self._channel, self.service, self.method, rpcs.allocate_call_id()
+        )
+        call = self._CALL_TYPE(self._impl, rpc, timeout_s)
+        call._invoke(  # pylint: disable=protected-access
+            request, ignore_errors, payload_mode
+        )
+        return call
+
+    def __repr__(self) -> str:
+        return (
+            f'{type(self).__name__}({self.method.full_name}, '
+            f'channel={self._channel.id})'
+        )
+
+
+class _RequestMethodClient(_MethodClient):
+    """Base for unary and server streaming methods, which take a request."""
+
+    def invoke(
+        self,
+        request: Optional[Message] = None,
+        *,
+        request_args: Optional[Dict[str, Any]] = None,
+        timeout_s: OptionalTimeout = UseDefault.VALUE,
+        payload_mode: Optional[PayloadMode] = None,
+    ) -> Any:
+        """Invokes the RPC and returns a call object."""
+        return self._start_call(
+            self.method.get_request(request, request_args),
+            timeout_s,
+            payload_mode=payload_mode,
+        )
+
+    def open(
+        self,
+        request: Optional[Message] = None,
+        *,
+        request_args: Optional[Dict[str, Any]] = None,
+        payload_mode: Optional[PayloadMode] = None,
+    ) -> Any:
+        """Returns a call object for the RPC, even if it cannot be invoked."""
+        return self._start_call(
+            self.method.get_request(request, request_args),
+            None,
+            True,
+            payload_mode,
+        )
+
+    # TODO(hepler): Use / to mark the first arg as positional-only
+    #     when when Python 3.7 support is no longer required.
+    def __call__(
+        self,
+        _rpc_request_proto: Optional[Message] = None,
+        *,
+        pw_rpc_timeout_s: OptionalTimeout = UseDefault.VALUE,
+        **request_fields,
+    ) -> Any:
+        return self.invoke(
+            self.method.get_request(_rpc_request_proto, request_fields),
+            timeout_s=pw_rpc_timeout_s,
+        )
+
+
+class _UnaryMethodClient(_RequestMethodClient):
+    _CALL_TYPE = UnaryCall
+
+
+class _ServerStreamingMethodClient(_RequestMethodClient):
+    _CALL_TYPE = ServerStreamingCall
+
+
+class _StreamingRequestMethodClient(_MethodClient):
+    """Base for client and bidirectional streaming methods."""
+
+    def invoke(
+        self,
+        *,
+        timeout_s: OptionalTimeout = UseDefault.VALUE,
+        payload_mode: Optional[PayloadMode] = None,
+    ) -> Any:
+        """Invokes the RPC and returns a call object."""
+        return self._start_call(None, timeout_s, True, payload_mode)
+
+    def open(self, *, payload_mode: Optional[PayloadMode] = None) -> Any:
+        """Returns a call object for the RPC, even if it cannot be invoked."""
+        return self._start_call(None, None, True, payload_mode)
+
+    async def __call__(
+        self,
+        requests: Iterable[Message] = (),
+        *,
+        timeout_s: OptionalTimeout = UseDefault.VALUE,
+    ) -> Any:
+        call = self.invoke()
+        return await call.finish_and_wait(  # pylint: disable=no-member
+            requests, timeout_s=timeout_s
+        )
+
+
+class _ClientStreamingMethodClient(_StreamingRequestMethodClient):
+    _CALL_TYPE = ClientStreamingCall
+
+
+class _BidirectionalStreamingMethodClient(_StreamingRequestMethodClient):
+    _CALL_TYPE = BidirectionalStreamingCall
+
+
+_METHOD_CLIENTS = {
+    Method.Type.UNARY: _UnaryMethodClient,
+    Method.Type.SERVER_STREAMING: _ServerStreamingMethodClient,
+    Method.Type.CLIENT_STREAMING: _ClientStreamingMethodClient,
+    Method.Type.BIDIRECTIONAL_STREAMING: _BidirectionalStreamingMethodClient,
+}
+
+_Event = Tuple[Callable[[Any], None], Any]
+
+
+class Impl(client.ClientImpl):
+    """asyncio-based ClientImpl, for use with pw_rpc.Client.
+
+    Packets may be processed on any thread. RPC events are queued and delivered
+    to the event loop with a single call_soon_threadsafe per batch of events.
+
+    Args:
+        loop: The event loop in which RPC events are delivered. If None, the
+            running loop is used when the first RPC is invoked.
+    """
+
+    def __init__(
+        self,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        default_unary_timeout_s: Optional[float] = None,
+        default_stream_timeout_s: Optional[float] = None,
+    ) -> None:
+        super().__init__()
+        self._loop = loop
+        self._default_unary_timeout_s = default_unary_timeout_s
+        self._default_stream_timeout_s = default_stream_timeout_s
+
+        self._lock = threading.Lock()
+        self._events: List[_Event] = []
+        self._flush_scheduled = False
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The event loop to which RPC events are delivered."""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+
+        return self._loop
+
+    @property
+    def default_unary_timeout_s(self) -> Optional[float]:
+        return self._default_unary_timeout_s
+
+    @property
+    def default_stream_timeout_s(self) -> Optional[float]:
+        return self._default_stream_timeout_s
+
+    def method_client(self, channel: Channel, method: Method) -> _MethodClient:
+        """Returns an object that invokes a method using the given channel."""
+        if method.server_streaming:
+            timeout_s = self.default_stream_timeout_s
+        else:
+            timeout_s = self.default_unary_timeout_s
+
+        return _METHOD_CLIENTS[method.type](self, channel, method, timeout_s)
+
+    def _post(self, event: Callable[[Any], None], arg: Any) -> None:
+        """Queues an event for the loop, scheduling a flush if needed."""
+        with self._lock:
+            self._events.append((event, arg))
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+
+        assert self._loop is not None, 'RPC events require an event loop'
+        self._loop.call_soon_threadsafe(self._flush)
+
+    def _flush(self) -> None:
+        """Delivers all queued events. Runs in the event loop."""
+        with self._lock:
+            events, self._events = self._events, []
+            self._flush_scheduled = False
+
+        for event, arg in events:
+            event(arg)
+
+    def handle_response(
+        self,
+        rpc: PendingRpc,
+        context: Call,
+        payload,
+        *,
+        args: tuple = (),
+        kwargs: Optional[dict] = None,
+    ) -> None:
+        assert not args and not kwargs, 'Forwarding args & kwargs not supported'
+        # pylint: disable=protected-access
+        self._post(context._handle_response, payload)
+
+    def handle_completion(
+        self,
+        rpc: PendingRpc,
+        context: Call,
+        status: Status,
+        *,
+        args: tuple = (),
+        kwargs: Optional[dict] = None,
+    ) -> None:
+        assert not args and not kwargs, 'Forwarding args & kwargs not supported'
+        # pylint: disable=protected-access
+        self._post(context._handle_completion, status)
+
+    def handle_error(
+        self,
+        rpc: PendingRpc,
+        context: Call,
+        status: Status,
+        *,
+        args: tuple = (),
+        kwargs: Optional[dict] = None,
+    ) -> None:
+        assert not args and not kwargs, 'Forwarding args & kwargs not supported'
+        # pylint: disable=protected-access
+        self._post(context._handle_error, status)
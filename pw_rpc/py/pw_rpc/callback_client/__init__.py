@@ -50,6 +50,24 @@ provided for the three RPC events:
   * on_completed(call_object, status) - called when the RPC completes
   * on_error(call_object, error) - called if the RPC terminates due to an error
 
+By default, timeouts only apply while a thread waits on a call object. To time
+out calls that are only driven by callbacks, pass a callback_client.Deadlines to
+the callback_client.Impl. A single thread then expires all calls; a call that
+times out is cancelled and on_error is called with Status.DEADLINE_EXCEEDED.
+
+Server and bidirectional streaming calls keep every response for iteration by
+default. Pass a callback_client.ResponseBuffer as the response_buffer argument
+to invoke or open to bound the buffered responses, get watermark callbacks for
+flow control, or stop keeping responses at all.
+
+Responses are decoded into protobuf messages by default. For high-rate streams
+that do not always need the decoded message, pass payload_mode to invoke or
+open, or set payload_mode on a method client to change its default:
+
+  * PayloadMode.LAZY - responses are pw_rpc.packets.LazyPayload objects, which
+    are decoded on first attribute access
+  * PayloadMode.RAW - responses are the serialized payload bytes
+
 The default callbacks simply log the events. If a user-provided callback throws
 an exception, that exception is logged and raised when the user calls functions
 on the call object.
@@ -98,6 +116,9 @@ from pw_rpc.callback_client.call import (
     OnNextCallback,
     OnCompletedCallback,
     OnErrorCallback,
+    OverflowPolicy,
+    ResponseBuffer,
 )
+from pw_rpc.callback_client.deadlines import Deadlines
 from pw_rpc.callback_client.errors import RpcError, RpcTimeout
 from pw_rpc.callback_client.impl import Impl
@@ -13,13 +13,17 @@
 # the License.
 """Classes for handling ongoing RPC calls."""
 
+import collections
+from dataclasses import dataclass
 import enum
 import logging
 import math
 import queue
+import threading
 from typing import (
     Any,
     Callable,
+    Deque,
     Iterable,
     Iterator,
     NamedTuple,
@@ -33,9 +37,11 @@ from pw_protobuf_compiler.python_protos import proto_repr
 from pw_status import Status
 from google.protobuf.message import Message
 
+from pw_rpc.callback_client.deadlines import Deadline, Deadlines
 from pw_rpc.callback_client.errors import RpcTimeout, RpcError
 from pw_rpc.client import PendingRpc, PendingRpcs
 from pw_rpc.descriptors import Method
+from pw_rpc.packets import LazyPayload, PayloadMode, Request
 
 _LOG = logging.getLogger(__package__)
 
@@ -60,6 +66,156 @@ OnErrorCallback = Callable[[CallTypeT, Any], Any]
 
 OptionalTimeout = Union[UseDefault, float, None]
 
+WatermarkCallback = Callable[['Call', int], Any]
+
+
+class OverflowPolicy(enum.Enum):
+    """What to do when a call's response buffer is full."""
+
+    # Discard the oldest buffered response to make room for the new one.
+    DROP_OLDEST = 0
+
+    # Discard the new response. It is still passed to on_next.
+    DROP_NEWEST = 1
+
+    # Cancel the RPC, which then fails with RESOURCE_EXHAUSTED.
+    CANCEL = 2
+
+
+@dataclass(frozen=True)
+class ResponseBuffer:
+    """Configures how a streaming call buffers its responses.
+
+    By default, every response is kept in the call's responses list and queued
+    for iteration until the call object is discarded. For long-running streams,
+    a bound may be set on both, and watermark callbacks may be used to slow the
+    server down (e.g. with a flow-control RPC) when the application cannot keep
+    up with iterating over the responses.
+
+    Attributes:
+      max_size: Maximum number of responses to buffer; None is unbounded.
+          Responses count against the bound until they are read with
+          get_responses(), so set retain_responses to False if responses
+          are only handled in on_next. The responses list also holds at most
+          max_size responses: the most recent with DROP_OLDEST, and the
+          first received with the other policies.
+      overflow: What to do with a new response when the buffer is full.
+      high_watermark: Calls on_high_watermark when this many responses are
+          queued for iteration.
+      low_watermark: Calls on_low_watermark when the queue drains to this
+          many responses after the high watermark was reached.
+      on_high_watermark: Called with the call and the number of queued
+          responses from the thread that processes packets.
+      on_low_watermark: Called with the call and the number of queued
+          responses from the thread that iterates over responses.
+      retain_responses: If False, responses are only passed to on_next. They
+          are neither stored nor available to get_responses() or wait().
+    """
+
+    max_size: Optional[int] = None
+    overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST
+    high_watermark: Optional[int] = None
+    low_watermark: int = 0
+    on_high_watermark: Optional[WatermarkCallback] = None
+    on_low_watermark: Optional[WatermarkCallback] = None
+    retain_responses: bool = True
+
+    def __post_init__(self) -> None:
+        if self.max_size is not None and self.max_size < 1:
+            raise ValueError('max_size must be at least 1')
+
+        if (
+            self.high_watermark is not None
+            and self.low_watermark >= self.high_watermark
+        ):
+            raise ValueError('low_watermark must be below high_watermark')
+
+
+_UNBOUNDED = ResponseBuffer()
+
+
+class _ResponseQueue:
+    """Queue of responses for iteration with an optional bound.
+
+    Supports the subset of the queue.SimpleQueue API used by Call. None is put
+    in the queue to mark the end of the responses; it does not count against
+    the bound.
+    """
+
+    def __init__(
+        self,
+        options: ResponseBuffer,
+        notify: Callable[[str, int], None],
+    ) -> None:
+        self._options = options
+        self._notify = notify
+        self._items: Deque[Any] = collections.deque()
+        self._size = 0  # Number of responses, excluding the end marker.
+        self._above_high_watermark = False
+        self._condition = threading.Condition()
+
+    def put(self, response: Any) -> bool:
+        """Queues a response; returns False if it overflowed the buffer."""
+        options = self._options
+        notify_high = False
+
+        with self._condition:
+            if response is not None:
+                if options.max_size is not None and (
+                    self._size >= options.max_size
+                ):
+                    if options.overflow is not OverflowPolicy.DROP_OLDEST:
+                        return False
+
+                    self._items.popleft()
+                    self._size -= 1
+
+                self._size += 1
+
+                if (
+                    options.high_watermark is not None
+                    and not self._above_high_watermark
+                    and self._size >= options.high_watermark
+                ):
+                    self._above_high_watermark = notify_high = True
+
+            self._items.append(response)
+            self._condition.notify()
+            size = self._size
+
+        if notify_high:
+            self._notify('on_high_watermark', size)
+
+        return True
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._items, timeout if block else 0
+            ):
+                raise queue.Empty
+
+            item = self._items.popleft()
+            if item is None:
+                return None
+
+            self._size -= 1
+            notify_low = (
+                self._above_high_watermark
+                and self._size <= self._options.low_watermark
+            )
+            if notify_low:
+                self._above_high_watermark = False
+            size = self._size
+
+        if notify_low:
+            self._notify('on_low_watermark', size)
+
+        return item
+
+    def empty(self) -> bool:
+        return not self._items
+
 
 class UnaryResponse(NamedTuple):
     """Result from a unary or client streaming RPC: status and response."""
@@ -68,7 +224,7 @@ class UnaryResponse(NamedTuple):
     response: Any
 
     def __repr__(self) -> str:
-        reply = proto_repr(self.response) if self.response else self.response
+        reply = _response_repr(self.response) if self.response else None
         return f'({self.status}, {reply})'
 
 
@@ -81,13 +237,22 @@ class StreamResponse(NamedTuple):
     def __repr__(self) -> str:
         return (
             f'({self.status}, '
-            f'[{", ".join(proto_repr(r) for r in self.responses)}])'
+            f'[{", ".join(_response_repr(r) for r in self.responses)}])'
         )
 
 
+def _response_repr(response: Any) -> str:
+    # Responses are raw bytes if the call was made with PayloadMode.RAW.
+    if isinstance(response, (Message, LazyPayload)):
+        return proto_repr(response)
+    return repr(response)
+
+
 class Call:
     """Represents an in-progress or completed RPC call."""
 
+    # pylint: disable=too-many-instance-attributes
+
     def __init__(
         self,
         rpcs: PendingRpcs,
@@ -96,22 +261,50 @@ class Call:
         on_next: Optional[OnNextCallback],
         on_completed: Optional[OnCompletedCallback],
         on_error: Optional[OnErrorCallback],
+        deadlines: Optional[Deadlines] = None,
+        response_buffer: Optional[ResponseBuffer] = None,
     ) -> None:
         self._rpcs = rpcs
         self._rpc = rpc
         self.default_timeout_s = default_timeout_s
 
+        # If deadlines are provided, the timeout is enforced even when no
+        # thread is waiting on the call.
+        self._deadlines = deadlines
+        self._deadline: Optional[Deadline] = None
+        self._timed_out = False
+
         self.status: Optional[Status] = None
         self.error: Optional[Status] = None
         self._callback_exception: Optional[Exception] = None
-        self._responses: list = []
-        self._response_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+        self._buffer = (
+            _UNBOUNDED if response_buffer is None else response_buffer
+        )
+        self._responses: Union[list, Deque[Any]]
+        if (
+            self._buffer.max_size is not None
+            and self._buffer.overflow is OverflowPolicy.DROP_OLDEST
+        ):
+            self._responses = collections.deque(maxlen=self._buffer.max_size)
+        else:
+            # Other policies keep the first responses, so the length is checked
+            # in _handle_response; a full deque would drop its oldest item.
+            self._responses = []
+        self._response_queue = _ResponseQueue(
+            self._buffer, self._invoke_watermark_callback
+        )
 
         self.on_next = on_next or Call._default_response
         self.on_completed = on_completed or Call._default_completion
         self.on_error = on_error or Call._default_error
 
-    def _invoke(self, request: Optional[Message], ignore_errors: bool) -> None:
+    def _invoke(
+        self,
+        request: Optional[Message],
+        ignore_errors: bool,
+        payload_mode: PayloadMode = PayloadMode.MESSAGE,
+    ) -> None:
         """Calls the RPC. This must be called immediately after __init__."""
         previous = self._rpcs.send_request(
             self._rpc,
@@ -119,6 +312,7 @@ class Call:
             self,
             ignore_errors=ignore_errors,
             override_pending=True,
+            payload_mode=payload_mode,
         )
 
         # TODO(hepler): Remove the cancel_duplicate_calls option.
@@ -131,6 +325,15 @@ class Call:
                 Status.CANCELLED
             )
 
+        if (
+            self._deadlines is not None
+            and self.default_timeout_s is not None
+            and not self.completed()
+        ):
+            self._deadline = self._deadlines.add(
+                self.default_timeout_s, self._handle_deadline_expired
+            )
+
     def _default_response(self, response: Message) -> None:
         _LOG.debug('%s received response: %s', self._rpc, response)
 
@@ -153,7 +356,7 @@ class Call:
         return self.status is not None or self.error is not None
 
     def _send_client_stream(
-        self, request_proto: Optional[Message], request_fields: dict
+        self, request_proto: Optional[Request], request_fields: dict
     ) -> None:
         """Sends a client to the server in the client stream.
 
@@ -231,41 +434,99 @@ class Call:
             return False
 
         self.error = Status.CANCELLED
+        self._cancel_deadline()
         return self._rpcs.send_cancel(self._rpc)
 
     def _check_errors(self) -> None:
         if self._callback_exception:
             raise self._callback_exception
 
+        if self._timed_out:
+            raise RpcTimeout(self._rpc, self.default_timeout_s)
+
         if self.error:
             raise RpcError(self._rpc, self.error)
 
     def _handle_response(self, response: Any) -> None:
-        # TODO(frolv): These lists could grow very large for persistent
-        # streaming RPCs such as logs. The size should be limited.
-        self._responses.append(response)
-        self._response_queue.put(response)
+        if self._buffer.retain_responses:
+            if not self._response_queue.put(response):
+                if self._buffer.overflow is OverflowPolicy.CANCEL:
+                    self._handle_buffer_overflow()
+                    return
+            elif (
+                self._buffer.max_size is None
+                or self._buffer.overflow is OverflowPolicy.DROP_OLDEST
+                or len(self._responses) < self._buffer.max_size
+            ):
+                self._responses.append(response)
+
+        deadline = self._deadline
+        if deadline is not None:
+            assert self._deadlines is not None
+            assert self.default_timeout_s is not None
+            self._deadlines.restart(deadline, self.default_timeout_s)
 
         self._invoke_callback('on_next', response)
 
     def _handle_completion(self, status: Status) -> None:
         self.status = status
+        self._cancel_deadline()
         self._response_queue.put(None)
 
         self._invoke_callback('on_completed', status)
 
     def _handle_error(self, error: Status) -> None:
         self.error = error
+        self._cancel_deadline()
         self._response_queue.put(None)
 
         self._invoke_callback('on_error', error)
 
-    def _invoke_callback(self, callback_name: str, arg: Any) -> None:
+    def _handle_buffer_overflow(self) -> None:
+        _LOG.warning(
+            '%s: response buffer full (%d); cancelling the RPC',
+            self._rpc,
+            self._buffer.max_size,
+        )
+        self._rpcs.send_cancel(self._rpc)
+        self._handle_error(Status.RESOURCE_EXHAUSTED)
+
+    def _handle_deadline_expired(self) -> None:
+        """Terminates the RPC because no response arrived before its timeout.
+
+        Invoked from the Deadlines thread. The RPC is cancelled on the server
+        and its on_error callback receives DEADLINE_EXCEEDED.
+        """
+        # If the RPC is no longer pending, it finished before the deadline.
+        if self.completed() or not self._rpcs.send_cancel(self._rpc):
+            return
+
+        _LOG.debug('%s timed out after %s s', self._rpc, self.default_timeout_s)
+        self._timed_out = True
+        self._handle_error(Status.DEADLINE_EXCEEDED)
+
+    def _cancel_deadline(self) -> None:
+        deadline, self._deadline = self._deadline, None
+        if deadline is not None:
+            Deadlines.cancel(deadline)
+
+    def _invoke_watermark_callback(self, callback_name: str, size: int) -> None:
+        callback = getattr(self._buffer, callback_name)
+        if callback is not None:
+            self._invoke_callback(callback_name, size, callback)
+
+    def _invoke_callback(
+        self,
+        callback_name: str,
+        arg: Any,
+        callback: Optional[Callable[['Call', Any], Any]] = None,
+    ) -> None:
         """Invokes a user-provided callback function for an RPC event."""
 
         # Catch and log any exceptions from the user-provided callback so that
         # exceptions don't terminate the thread handling RPC packets.
-        callback: Callable[[Call, Any], None] = getattr(self, callback_name)
+        if callback is None:
+            callback = getattr(self, callback_name)
 
         try:
             callback(self, arg)
@@ -336,7 +597,7 @@ class ClientStreamingCall(Call):
     # TODO(hepler): Use / to mark the first arg as positional-only
     #     when when Python 3.7 support is no longer required.
     def send(
-        self, _rpc_request_proto: Optional[Message] = None, **request_fields
+        self, _rpc_request_proto: Optional[Request] = None, **request_fields
     ) -> None:
         """Sends client stream request to the server."""
         self._send_client_stream(_rpc_request_proto, request_fields)
@@ -362,7 +623,7 @@ class BidirectionalStreamingCall(Call):
     # TODO(hepler): Use / to mark the first arg as positional-only
     #     when when Python 3.7 support is no longer required.
     def send(
-        self, _rpc_request_proto: Optional[Message] = None, **request_fields
+        self, _rpc_request_proto: Optional[Request] = None, **request_fields
     ) -> None:
         """Sends a message to the server in the client stream."""
         self._send_client_stream(_rpc_request_proto, request_fields)
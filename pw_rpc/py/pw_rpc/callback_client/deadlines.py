@@ -0,0 +1,146 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Shared deadline tracking for callback-driven RPC calls."""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+_LOG = logging.getLogger(__package__)
+
+
+class Deadline:
+    """A handle to a deadline tracked by a Deadlines instance."""
+
+    __slots__ = ('expiration', 'callback', 'active')
+
+    def __init__(self, expiration: float, callback: Callable[[], None]):
+        self.expiration = expiration
+        self.callback = callback
+        self.active = True
+
+
+class Deadlines:
+    """Tracks deadlines for many calls and expires them from one thread.
+
+    Deadlines are kept in a heap. Cancelling or restarting a deadline only
+    updates its handle; stale heap entries are discarded or rescheduled when
+    they reach the top of the heap. This makes cancel and restart O(1), which
+    matters for streaming calls that restart their deadline on every response.
+
+    Expired callbacks are invoked from a single background thread, which is
+    started when the first deadline is added. Set start_thread to False to
+    expire deadlines manually by calling expire().
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        start_thread: bool = True,
+    ) -> None:
+        self._clock = clock
+        self._start_thread = start_thread
+        self._heap: List[Tuple[float, int, Deadline]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, timeout_s: float, callback: Callable[[], None]) -> Deadline:
+        """Calls callback after timeout_s unless the deadline is cancelled."""
+        deadline = Deadline(self._clock() + timeout_s, callback)
+
+        with self._condition:
+            heapq.heappush(
+                self._heap,
+                (deadline.expiration, next(self._sequence), deadline),
+            )
+            if self._heap[0][2] is deadline:
+                self._condition.notify()
+
+            if self._start_thread and self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='pw_rpc deadlines', daemon=True
+                )
+                self._thread.start()
+
+        return deadline
+
+    def restart(self, deadline: Deadline, timeout_s: float) -> None:
+        """Moves a deadline to timeout_s from now.
+
+        Deadlines may only be extended this way. Moving the expiration forward
+        is picked up when the original heap entry expires.
+        """
+        deadline.expiration = self._clock() + timeout_s
+
+    @staticmethod
+    def cancel(deadline: Deadline) -> None:
+        """Prevents the deadline from expiring."""
+        deadline.active = False
+
+    def __len__(self) -> int:
+        """The number of entries in the heap, including cancelled ones."""
+        return len(self._heap)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Invokes the callbacks for all expired deadlines in one sweep.
+
+        Returns:
+          The number of deadlines that expired.
+        """
+        if now is None:
+            now = self._clock()
+
+        expired: List[Deadline] = []
+
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, deadline = heapq.heappop(self._heap)
+
+                if not deadline.active:
+                    continue
+
+                if deadline.expiration > now:  # The deadline was restarted.
+                    heapq.heappush(
+                        self._heap,
+                        (deadline.expiration, next(self._sequence), deadline),
+                    )
+                    continue
+
+                deadline.active = False
+                expired.append(deadline)
+
+        for deadline in expired:
+            try:
+                deadline.callback()
+            except Exception:  # pylint: disable=broad-except
+                _LOG.exception('Deadline callback %s failed', deadline.callback)
+
+        return len(expired)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._heap:
+                    wait_s: Optional[float] = self._heap[0][0] - self._clock()
+                else:
+                    wait_s = None
+
+                if wait_s is None or wait_s > 0:
+                    self._condition.wait(wait_s)
+
+            self.expire()
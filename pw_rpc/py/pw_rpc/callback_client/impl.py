@@ -25,7 +25,9 @@ from google.protobuf.message import Message
 from pw_rpc import client, descriptors
 from pw_rpc.client import PendingRpc, PendingRpcs
 from pw_rpc.descriptors import Channel, Method, Service
+from pw_rpc.packets import PayloadMode
 
+from pw_rpc.callback_client.deadlines import Deadlines
 from pw_rpc.callback_client.call import (
     UseDefault,
     OptionalTimeout,
@@ -40,6 +42,7 @@ from pw_rpc.callback_client.call import (
     OnNextCallback,
     OnCompletedCallback,
     OnErrorCallback,
+    ResponseBuffer,
 )
 
 _LOG = logging.getLogger(__package__)
@@ -71,6 +74,9 @@ class _MethodClient:
         self._method = method
         self.default_timeout_s: Optional[float] = default_timeout_s
 
+        # How responses are delivered for calls that don't specify a mode.
+        self.payload_mode = PayloadMode.MESSAGE
+
     @property
     def channel(self) -> Channel:
         return self._channel
@@ -124,11 +130,16 @@ class _MethodClient:
         on_completed: Optional[OnCompletedCallback],
         on_error: Optional[OnErrorCallback],
         ignore_errors: bool = False,
+        response_buffer: Optional[ResponseBuffer] = None,
+        payload_mode: Optional[PayloadMode] = None,
     ) -> CallTypeT:
         """Creates the Call object and invokes the RPC using it."""
         if timeout_s is UseDefault.VALUE:
             timeout_s = self.default_timeout_s
 
+        if payload_mode is None:
+            payload_mode = self.payload_mode
+
         if self._impl.on_call_hook:
             self._impl.on_call_hook(CallInfo(self._method))
 
@@ -139,9 +150,18 @@ class _MethodClient:
             self._rpcs.allocate_call_id(),
         )
         call = call_type(
-            self._rpcs, rpc, timeout_s, on_next, on_completed, on_error
+            self._rpcs,
+            rpc,
+            timeout_s,
+            on_next,
+            on_completed,
+            on_error,
+            self._impl.deadlines,
+            response_buffer,
+        )
+        call._invoke(  # pylint: disable=protected-access
+            request, ignore_errors, payload_mode
         )
-        call._invoke(request, ignore_errors)  # pylint: disable=protected-access
         return call
 
     def _client_streaming_call_type(
@@ -211,6 +231,7 @@ class _UnaryMethodClient(_MethodClient):
         *,
         request_args: Optional[Dict[str, Any]] = None,
         timeout_s: OptionalTimeout = UseDefault.VALUE,
+        payload_mode: Optional[PayloadMode] = None,
     ) -> UnaryCall:
         """Invokes the unary RPC and returns a call object."""
         return self._start_call(
@@ -220,6 +241,7 @@ class _UnaryMethodClient(_MethodClient):
             on_next,
             on_completed,
             on_error,
+            payload_mode=payload_mode,
         )
 
     def open(
@@ -230,6 +252,7 @@ class _UnaryMethodClient(_MethodClient):
         on_error: Optional[OnErrorCallback] = None,
         *,
         request_args: Optional[Dict[str, Any]] = None,
+        payload_mode: Optional[PayloadMode] = None,
     ) -> UnaryCall:
         """Invokes the unary RPC and returns a call object."""
         return self._start_call(
@@ -240,6 +263,7 @@ class _UnaryMethodClient(_MethodClient):
             on_completed,
             on_error,
             True,
+            payload_mode=payload_mode,
         )
 
 
@@ -253,6 +277,8 @@ class _ServerStreamingMethodClient(_MethodClient):
         *,
         request_args: Optional[Dict[str, Any]] = None,
         timeout_s: OptionalTimeout = UseDefault.VALUE,
+        response_buffer: Optional[ResponseBuffer] = None,
+        payload_mode: Optional[PayloadMode] = None,
     ) -> ServerStreamingCall:
         """Invokes the server streaming RPC and returns a call object."""
         return self._start_call(
@@ -262,6 +288,8 @@ class _ServerStreamingMethodClient(_MethodClient):
             on_next,
             on_completed,
             on_error,
+            response_buffer=response_buffer,
+            payload_mode=payload_mode,
         )
 
     def open(
@@ -272,6 +300,8 @@ class _ServerStreamingMethodClient(_MethodClient):
         on_error: Optional[OnErrorCallback] = None,
         *,
         request_args: Optional[Dict[str, Any]] = None,
+        response_buffer: Optional[ResponseBuffer] = None,
+        payload_mode: Optional[PayloadMode] = None,
     ) -> ServerStreamingCall:
         """Returns a call object for the RPC, even if the RPC cannot be invoked.
 
@@ -286,6 +316,8 @@ class _ServerStreamingMethodClient(_MethodClient):
             on_completed,
             on_error,
             True,
+            response_buffer,
+            payload_mode,
         )
 
 
@@ -297,6 +329,7 @@ class _ClientStreamingMethodClient(_MethodClient):
         on_error: Optional[OnErrorCallback] = None,
         *,
         timeout_s: OptionalTimeout = UseDefault.VALUE,
+        payload_mode: Optional[PayloadMode] = None,
     ) -> ClientStreamingCall:
         """Invokes the client streaming RPC and returns a call object"""
         return self._start_call(
@@ -307,6 +340,7 @@ class _ClientStreamingMethodClient(_MethodClient):
             on_completed,
             on_error,
             True,
+            payload_mode=payload_mode,
         )
 
     def open(
@@ -314,6 +348,8 @@ class _ClientStreamingMethodClient(_MethodClient):
         on_next: Optional[OnNextCallback] = None,
         on_completed: Optional[OnCompletedCallback] = None,
         on_error: Optional[OnErrorCallback] = None,
+        *,
+        payload_mode: Optional[PayloadMode] = None,
     ) -> ClientStreamingCall:
         """Returns a call object for the RPC, even if the RPC cannot be invoked.
 
@@ -328,6 +364,7 @@ class _ClientStreamingMethodClient(_MethodClient):
             on_completed,
             on_error,
             True,
+            payload_mode=payload_mode,
         )
 
     def __call__(
@@ -347,6 +384,8 @@ class _BidirectionalStreamingMethodClient(_MethodClient):
         on_error: Optional[OnErrorCallback] = None,
         *,
         timeout_s: OptionalTimeout = UseDefault.VALUE,
+        response_buffer: Optional[ResponseBuffer] = None,
+        payload_mode: Optional[PayloadMode] = None,
     ) -> BidirectionalStreamingCall:
         """Invokes the bidirectional streaming RPC and returns a call object."""
         return self._start_call(
@@ -356,6 +395,8 @@ class _BidirectionalStreamingMethodClient(_MethodClient):
             on_next,
             on_completed,
             on_error,
+            response_buffer=response_buffer,
+            payload_mode=payload_mode,
         )
 
     def open(
@@ -363,6 +404,9 @@ class _BidirectionalStreamingMethodClient(_MethodClient):
         on_next: Optional[OnNextCallback] = None,
         on_completed: Optional[OnCompletedCallback] = None,
         on_error: Optional[OnErrorCallback] = None,
+        *,
+        response_buffer: Optional[ResponseBuffer] = None,
+        payload_mode: Optional[PayloadMode] = None,
     ) -> BidirectionalStreamingCall:
         """Returns a call object for the RPC, even if the RPC cannot be invoked.
 
@@ -377,6 +421,8 @@ class _BidirectionalStreamingMethodClient(_MethodClient):
             on_completed,
             on_error,
             True,
+            response_buffer,
+            payload_mode,
         )
 
     def __call__(
@@ -403,6 +449,10 @@ class Impl(client.ClientImpl):
     Args:
         on_call_hook: A callable object to handle RPC method calls.
             If hook is set, it will be called before RPC execution.
+        deadlines: If provided, RPC timeouts are enforced with this shared
+            Deadlines instance, including for calls that are only driven by
+            callbacks. A call that times out is cancelled and its on_error
+            callback receives Status.DEADLINE_EXCEEDED.
     """
 
     def __init__(
@@ -411,6 +461,7 @@ class Impl(client.ClientImpl):
         default_stream_timeout_s: Optional[float] = None,
         on_call_hook: Optional[Callable[[CallInfo], Any]] = None,
         cancel_duplicate_calls: Optional[bool] = True,
+        deadlines: Optional[Deadlines] = None,
     ) -> None:
         super().__init__()
         self._default_unary_timeout_s = default_unary_timeout_s
@@ -420,6 +471,7 @@ class Impl(client.ClientImpl):
         # instances of an RPC on the same channel, which is not supported.
         # TODO(hepler): Remove this option when clients have updated.
         self._cancel_duplicate_calls = cancel_duplicate_calls
+        self.deadlines = deadlines
 
     @property
     def default_unary_timeout_s(self) -> Optional[float]:
@@ -15,6 +15,7 @@
 
 import abc
 from dataclasses import dataclass
+import functools
 import logging
 from typing import (
     Any,
@@ -26,11 +27,13 @@ from typing import (
     Optional,
 )
 
-from google.protobuf.message import DecodeError, Message
+from google.protobuf.message import DecodeError
 from pw_status import Status
 
 from pw_rpc import descriptors, packets
 from pw_rpc.descriptors import Channel, Service, Method
+from pw_rpc.metrics import CallMetrics, RpcMetrics
+from pw_rpc.packets import PayloadMode
 from pw_rpc.internal.packet_pb2 import PacketType, RpcPacket
 
 _LOG = logging.getLogger(__package__)
@@ -73,16 +76,45 @@ class PendingRpc(packets.RpcIds):
 
 
 class _PendingRpcMetadata:
-    def __init__(self, context: object):
+    def __init__(
+        self,
+        rpc: PendingRpc,
+        context: object,
+        metrics: Optional[CallMetrics] = None,
+        payload_mode: PayloadMode = PayloadMode.MESSAGE,
+    ):
+        self.rpc = rpc
         self.context = context
+        self.metrics = metrics
+        self.payload_mode = payload_mode
+        self.decode_payload = packets.payload_decoder(
+            rpc.method.response_type, payload_mode
+        )
+
+
+def _pack_ids(
+    channel_id: int, service_id: int, method_id: int, call_id: int
+) -> int:
+    """Packs the four 32-bit IDs of an RPC into a single integer key."""
+    return (
+        (((channel_id << 32) | service_id) << 32 | method_id) << 32
+    ) | call_id
+
+
+def _rpc_key(rpc: packets.RpcIds) -> int:
+    return _pack_ids(rpc.channel_id, rpc.service_id, rpc.method_id, rpc.call_id)
 
 
 class PendingRpcs:
     """Tracks pending RPCs and encodes outgoing RPC packets."""
 
-    def __init__(self) -> None:
-        self._pending: Dict[PendingRpc, _PendingRpcMetadata] = {}
+    def __init__(self, metrics: Optional[RpcMetrics] = None) -> None:
+        # Pending RPCs by their IDs, packed into an integer. Integer keys are
+        # cheap to hash and compare, and incoming packets are dispatched with
+        # them without resolving the service and method first.
+        self._pending: Dict[int, _PendingRpcMetadata] = {}
         self._next_call_id: int = 0
+        self.metrics = metrics
 
     def allocate_call_id(self) -> int:
         call_id = self._next_call_id
@@ -92,31 +124,37 @@ class PendingRpcs:
     def request(
         self,
         rpc: PendingRpc,
-        request: Optional[Message],
+        request: Optional[packets.Request],
         context: object,
         override_pending: bool = True,
     ) -> bytes:
         """Starts the provided RPC and returns the encoded packet to send."""
         # Ensure that every context is a unique object by wrapping it in a list.
         self.open(rpc, context, override_pending)
-        return packets.encode_request(rpc, request)
+        packet = packets.encode_request(rpc, request)
+        self._record_sent(rpc, packet)
+        return packet
 
     def send_request(
         self,
         rpc: PendingRpc,
-        request: Optional[Message],
+        request: Optional[packets.Request],
         context: object,
         *,
         ignore_errors: bool = False,
         override_pending: bool = False,
+        payload_mode: PayloadMode = PayloadMode.MESSAGE,
     ) -> Any:
         """Starts the provided RPC and sends the request packet to the channel.
 
         Returns:
           the previous context object or None
         """
-        previous = self.open(rpc, context, override_pending)
+        previous = self.open(
+            rpc, context, override_pending, payload_mode=payload_mode
+        )
         packet = packets.encode_request(rpc, request)
+        self._record_sent(rpc, packet)
 
         # TODO(hepler): Remove `type: ignore[misc]` below when
         #     https://github.com/python/mypy/issues/10711 is fixed.
@@ -131,7 +169,12 @@ class PendingRpcs:
         return previous
 
     def open(
-        self, rpc: PendingRpc, context: object, override_pending: bool = False
+        self,
+        rpc: PendingRpc,
+        context: object,
+        override_pending: bool = False,
+        *,
+        payload_mode: PayloadMode = PayloadMode.MESSAGE,
     ) -> Any:
         """Creates a context for an RPC, but does not invoke it.
 
@@ -139,18 +182,29 @@ class PendingRpcs:
         invoked by this client. For example, a server may stream logs with a
         server streaming RPC prior to any clients invoking it.
 
+        payload_mode selects how responses are passed to the ClientImpl: as
+        decoded messages, as LazyPayloads, or as raw bytes.
+
         Returns:
           the previous context object or None
         """
         _LOG.debug('Starting %s', rpc)
-        metadata = _PendingRpcMetadata(context)
+        metadata = _PendingRpcMetadata(
+            rpc,
+            context,
+            None
+            if self.metrics is None
+            else self.metrics.start_call(rpc, rpc.method),
+            payload_mode,
+        )
 
         if override_pending:
-            previous = self._pending.get(rpc)
-            self._pending[rpc] = metadata
+            key = _rpc_key(rpc)
+            previous = self._pending.get(key)
+            self._pending[key] = metadata
             return None if previous is None else previous.context
 
-        if self._pending.setdefault(rpc, metadata) is not metadata:
+        if self._pending.setdefault(_rpc_key(rpc), metadata) is not metadata:
             # If the context was not added, the RPC was already pending.
             raise Error(
                 f'Sent request for {rpc}, but it is already pending! '
@@ -159,23 +213,25 @@ class PendingRpcs:
 
         return None
 
-    def send_client_stream(self, rpc: PendingRpc, message: Message) -> None:
-        if rpc not in self._pending:
+    def send_client_stream(
+        self, rpc: PendingRpc, message: packets.Request
+    ) -> None:
+        if _rpc_key(rpc) not in self._pending:
             raise Error(f'Attempt to send client stream for inactive RPC {rpc}')
 
-        rpc.channel.output(  # type: ignore
-            packets.encode_client_stream(rpc, message)
-        )
+        packet = packets.encode_client_stream(rpc, message)
+        self._record_sent(rpc, packet)
+        rpc.channel.output(packet)  # type: ignore
 
     def send_client_stream_end(self, rpc: PendingRpc) -> None:
-        if rpc not in self._pending:
+        if _rpc_key(rpc) not in self._pending:
             raise Error(
                 f'Attempt to send client stream end for inactive RPC {rpc}'
             )
 
-        rpc.channel.output(  # type: ignore
-            packets.encode_client_stream_end(rpc)
-        )
+        packet = packets.encode_client_stream_end(rpc)
+        self._record_sent(rpc, packet)
+        rpc.channel.output(packet)  # type: ignore
 
     def cancel(self, rpc: PendingRpc) -> bytes:
         """Cancels the RPC.
@@ -187,9 +243,14 @@ class PendingRpcs:
           KeyError if the RPC is not pending
         """
         _LOG.debug('Cancelling %s', rpc)
-        del self._pending[rpc]
+        metadata = self._pending.pop(_rpc_key(rpc))
+        packet = packets.encode_cancel(rpc)
+
+        if metadata.metrics is not None:
+            metadata.metrics.cancelled()
+            metadata.metrics.sent(len(packet))
 
-        return packets.encode_cancel(rpc)
+        return packet
 
     def send_cancel(self, rpc: PendingRpc) -> bool:
         """Calls cancel and sends the cancel packet, if any, to the channel."""
@@ -205,10 +266,24 @@ class PendingRpcs:
 
     def get_pending(self, rpc: PendingRpc, status: Optional[Status]):
         """Gets the pending RPC's context. If status is set, clears the RPC."""
+        rpc = self._resolve_open_call_id(rpc)
+
+        if status is None:
+            return self._pending[_rpc_key(rpc)].context
+
+        _LOG.debug('%s finished with status %s', rpc, status)
+        return self._pending.pop(_rpc_key(rpc)).context
+
+    def find(self, rpc: PendingRpc) -> Optional[_PendingRpcMetadata]:
+        """Finds a pending RPC, matching OPEN_CALL_ID as get_pending does."""
+        return self._pending.get(_rpc_key(self._resolve_open_call_id(rpc)))
+
+    def _resolve_open_call_id(self, rpc: PendingRpc) -> PendingRpc:
         if rpc.call_id == OPEN_CALL_ID:
             # Calls with ID `OPEN_CALL_ID` were unrequested, and are updated to
             # have the call ID of the first matching request.
-            for pending in self._pending:
+            for metadata in self._pending.values():
+                pending = metadata.rpc
                 if (
                     pending.channel == rpc.channel
                     and pending.service == rpc.service
@@ -216,11 +291,21 @@ class PendingRpcs:
                 ):
                     rpc = pending
 
-        if status is None:
-            return self._pending[rpc].context
+        return rpc
 
-        _LOG.debug('%s finished with status %s', rpc, status)
-        return self._pending.pop(rpc).context
+    def _record_sent(self, rpc: PendingRpc, packet: bytes) -> None:
+        if self.metrics is not None:
+            metadata = self._pending.get(_rpc_key(rpc))
+            if metadata is not None and metadata.metrics is not None:
+                metadata.metrics.sent(len(packet))
+
+    def look_up(
+        self, channel_id: int, service_id: int, method_id: int, call_id: int
+    ) -> Optional[_PendingRpcMetadata]:
+        """Finds a pending RPC by its IDs without resolving its method."""
+        return self._pending.get(
+            _pack_ids(channel_id, service_id, method_id, call_id)
+        )
 
 
 class ClientImpl(abc.ABC):
@@ -302,12 +387,12 @@ class ServiceClient(descriptors.ServiceAccessor):
     def __init__(
         self, client_impl: ClientImpl, channel: Channel, service: Service
     ):
+        # Method clients are created when first accessed, since clients may
+        # have many services but only use a few of their methods.
         super().__init__(
-            {
-                method: client_impl.method_client(channel, method)
-                for method in service.methods
-            },
+            service.methods,
             as_attrs='members',
+            factory=functools.partial(client_impl.method_client, channel),
         )
 
         self._channel = channel
@@ -356,7 +441,9 @@ def _decode_status(rpc: PendingRpc, packet) -> Optional[Status]:
         return Status.UNKNOWN
 
 
-def _decode_payload(rpc: PendingRpc, packet) -> Optional[Message]:
+def _decode_payload(
+    rpc: PendingRpc, packet, pending: Optional[_PendingRpcMetadata]
+) -> Any:
     if packet.type == PacketType.SERVER_ERROR:
         return None
 
@@ -364,6 +451,9 @@ def _decode_payload(rpc: PendingRpc, packet) -> Optional[Message]:
     if packet.type == PacketType.RESPONSE and rpc.method.server_streaming:
         return None
 
+    if pending is not None:
+        return pending.decode_payload(packet.payload)
+
     return packets.decode_payload(packet, rpc.method.response_type)
 
 
@@ -452,12 +542,18 @@ class Client:
     RPC invocations occur through a ChannelClient.
 
     Users may set an optional response_callback that is called before processing
-    every response or server stream RPC packet.
+    every response or server stream RPC packet. For pending RPCs, it receives
+    the payload in the RPC's PayloadMode.
     """
 
     @classmethod
     def from_modules(
-        cls, impl: ClientImpl, channels: Iterable[Channel], modules: Iterable
+        cls,
+        impl: ClientImpl,
+        channels: Iterable[Channel],
+        modules: Iterable,
+        *,
+        metrics: Optional[RpcMetrics] = None,
     ):
         return cls(
             impl,
@@ -467,6 +563,7 @@ class Client:
                 for module in modules
                 for service in module.DESCRIPTOR.services_by_name.values()
             ),
+            metrics=metrics,
         )
 
     def __init__(
@@ -474,10 +571,21 @@ class Client:
         impl: ClientImpl,
         channels: Iterable[Channel],
         services: Iterable[Service],
+        *,
+        metrics: Optional[RpcMetrics] = None,
     ):
+        """Creates a client.
+
+        Args:
+          impl: the ClientImpl that determines how RPCs are invoked
+          channels: the channels through which RPCs are sent
+          services: the services this client can call
+          metrics: if provided, collects latency, size, and error metrics for
+              each method; see pw_rpc.metrics
+        """
         self._impl = impl
         self._impl.client = self
-        self._impl.rpcs = PendingRpcs()
+        self._impl.rpcs = PendingRpcs(metrics)
 
         self.services = descriptors.Services(services)
 
@@ -493,6 +601,12 @@ class Client:
             Callable[[PendingRpc, Any, Optional[Status]], Any]
         ] = None
 
+    @property
+    def metrics(self) -> Optional[RpcMetrics]:
+        """The RpcMetrics for this client, if metrics are enabled."""
+        assert self._impl.rpcs
+        return self._impl.rpcs.metrics
+
     def channel(self, channel_id: Optional[int] = None) -> ChannelClient:
         """Returns a ChannelClient, which is used to call RPCs on a channel.
 
@@ -547,6 +661,11 @@ class Client:
             _LOG.debug('Raw packet: %r', pw_rpc_raw_packet_data)
             return Status.DATA_LOSS
 
+        if packet.type == PacketType.SERVER_STREAM and self._dispatch_stream(
+            packet, len(pw_rpc_raw_packet_data), impl_args, impl_kwargs
+        ):
+            return Status.OK
+
         if packets.for_server(packet):
             return Status.INVALID_ARGUMENT
 
@@ -576,8 +695,16 @@ class Client:
 
         status = _decode_status(rpc, packet)
 
+        assert self._impl.rpcs
+        pending = self._impl.rpcs.find(rpc)
+
         try:
-            payload = _decode_payload(rpc, packet)
+            # Responses for RPCs that are not pending are only decoded for the
+            # response callback.
+            if pending is None and not self.response_callback:
+                payload = None
+            else:
+                payload = _decode_payload(rpc, packet, pending)
         except DecodeError as err:
             _send_client_error(channel_client, packet, Status.DATA_LOSS)
             _LOG.warning(
@@ -592,6 +719,16 @@ class Client:
             packet.type = PacketType.SERVER_ERROR
             status = Status.DATA_LOSS
 
+        if pending is not None and pending.metrics is not None:
+            _record_received(
+                pending.metrics,
+                len(pw_rpc_raw_packet_data),
+                None
+                if packet.type == PacketType.SERVER_ERROR or payload is None
+                else len(packet.payload),
+                status,
+            )
+
         # If set, call the response callback with non-error packets.
         if self.response_callback and packet.type != PacketType.SERVER_ERROR:
             self.response_callback(  # pylint: disable=not-callable
@@ -599,7 +736,6 @@ class Client:
             )
 
         try:
-            assert self._impl.rpcs
             context = self._impl.rpcs.get_pending(rpc, status)
         except KeyError:
             _send_client_error(
@@ -627,6 +763,51 @@ class Client:
 
         return Status.OK
 
+    def _dispatch_stream(
+        self,
+        packet: RpcPacket,
+        packet_size: int,
+        impl_args: tuple,
+        impl_kwargs: dict,
+    ) -> bool:
+        """Delivers a SERVER_STREAM packet for a pending RPC, if possible.
+
+        Returns False if the packet must take the full processing path, which
+        also handles unknown RPCs and payload decoding errors.
+        """
+        assert self._impl.rpcs
+        # See _look_up_service_and_method regarding masking the IDs.
+        pending = self._impl.rpcs.look_up(
+            packet.channel_id,
+            packet.service_id & 0xFFFFFFFF,
+            packet.method_id & 0xFFFFFFFF,
+            packet.call_id,
+        )
+        if pending is None:
+            return False
+
+        try:
+            payload = pending.decode_payload(packet.payload)
+        except DecodeError:
+            return False
+
+        if pending.metrics is not None:
+            pending.metrics.received(packet_size, len(packet.payload))
+
+        if self.response_callback:
+            self.response_callback(  # pylint: disable=not-callable
+                pending.rpc, payload, None
+            )
+
+        self._impl.handle_response(
+            pending.rpc,
+            pending.context,
+            payload,
+            args=impl_args,
+            kwargs=impl_kwargs,
+        )
+        return True
+
     def _look_up_service_and_method(
         self, packet: RpcPacket, channel_client: ChannelClient
     ) -> PendingRpc:
@@ -659,6 +840,17 @@ class Client:
         )
 
 
+def _record_received(
+    metrics: CallMetrics,
+    packet_size: int,
+    payload_size: Optional[int],
+    status: Optional[Status],
+) -> None:
+    metrics.received(packet_size, payload_size)
+    if status is not None:
+        metrics.finished(status)
+
+
 def _send_client_error(
     client: ChannelClient, packet: RpcPacket, error: Status
 ) -> None:
@@ -16,6 +16,7 @@
 import abc
 from dataclasses import dataclass
 import enum
+import functools
 from inspect import Parameter
 from typing import (
     Any,
@@ -110,7 +111,14 @@ class Service:
 
     _descriptor: ServiceDescriptor
     id: int
-    methods: 'Methods'
+
+    @functools.cached_property
+    def methods(self) -> 'Methods':
+        """The service's methods, which are created on first access."""
+        return Methods(
+            Method.from_descriptor(method_descriptor, self)
+            for method_descriptor in self._descriptor.methods
+        )
 
     @property
     def name(self):
@@ -126,21 +134,7 @@ class Service:
 
     @classmethod
     def from_descriptor(cls, descriptor: ServiceDescriptor) -> 'Service':
-        service = cls(
-            descriptor,
-            ids.calculate(descriptor.full_name),
-            None,  # type: ignore[arg-type]
-        )
-        object.__setattr__(
-            service,
-            'methods',
-            Methods(
-                Method.from_descriptor(method_descriptor, service)
-                for method_descriptor in descriptor.methods
-            ),
-        )
-
-        return service
+        return cls(descriptor, ids.calculate(descriptor.full_name))
 
     def __repr__(self) -> str:
         return f'Service({self.full_name!r})'
@@ -149,14 +143,27 @@ class Service:
         return self.full_name
 
 
+@functools.lru_cache(maxsize=None)
+def _file_descriptor_proto(file) -> descriptor_pb2.FileDescriptorProto:
+    file_pb = descriptor_pb2.FileDescriptorProto()
+    file_pb.MergeFromString(file.serialized_pb)
+    return file_pb
+
+
 def _streaming_attributes(method) -> Tuple[bool, bool]:
+    # Newer protobuf versions provide these attributes directly.
+    try:
+        return method.server_streaming, method.client_streaming
+    except AttributeError:
+        pass
+
     # TODO(hepler): Investigate adding server_streaming and client_streaming
     #     attributes to the generated protobuf code. As a workaround,
-    #     deserialize the FileDescriptorProto to get that information.
+    #     deserialize the FileDescriptorProto to get that information. It is
+    #     cached since large files with many methods would otherwise be parsed
+    #     once per method.
     service = method.containing_service
-
-    file_pb = descriptor_pb2.FileDescriptorProto()
-    file_pb.MergeFromString(service.file.serialized_pb)
+    file_pb = _file_descriptor_proto(service.file)
 
     method_pb = file_pb.service[service.index].method[
         method.index
@@ -233,32 +240,45 @@ def _message_is_type(proto, expected_type) -> bool:
 
 @dataclass(frozen=True, eq=False)
 class Method:
-    """Describes a method in a service."""
+    """Describes a method in a service.
+
+    The streaming attributes and message types are looked up on first access,
+    so that creating Methods for large proto libraries is cheap.
+    """
 
     _descriptor: MethodDescriptor
     service: Service
     id: int
-    server_streaming: bool
-    client_streaming: bool
-    request_type: Any
-    response_type: Any
 
     @classmethod
     def from_descriptor(cls, descriptor: MethodDescriptor, service: Service):
-        input_factory = message_factory.MessageFactory(
-            descriptor.input_type.file.pool
-        )
-        output_factory = message_factory.MessageFactory(
-            descriptor.output_type.file.pool
-        )
-        return Method(
-            descriptor,
-            service,
-            ids.calculate(descriptor.name),
-            *_streaming_attributes(descriptor),
-            input_factory.GetPrototype(descriptor.input_type),
-            output_factory.GetPrototype(descriptor.output_type),
-        )
+        return Method(descriptor, service, ids.calculate(descriptor.name))
+
+    @functools.cached_property
+    def _streaming(self) -> Tuple[bool, bool]:
+        return _streaming_attributes(self._descriptor)
+
+    @property
+    def server_streaming(self) -> bool:
+        return self._streaming[0]
+
+    @property
+    def client_streaming(self) -> bool:
+        return self._streaming[1]
+
+    @functools.cached_property
+    def request_type(self) -> Any:
+        input_type = self._descriptor.input_type
+        return message_factory.MessageFactory(
+            input_type.file.pool
+        ).GetPrototype(input_type)
+
+    @functools.cached_property
+    def response_type(self) -> Any:
+        output_type = self._descriptor.output_type
+        return message_factory.MessageFactory(
+            output_type.file.pool
+        ).GetPrototype(output_type)
 
     class Type(enum.Enum):
         UNARY = 0
@@ -292,21 +312,28 @@ class Method:
             else:
                 return self.Type.SERVER_STREAMING
 
-        return self.Type.CLIENT_STREAMING if self.client_streaming else self.Type.UNARY
+        return (
+            self.Type.CLIENT_STREAMING
+            if self.client_streaming
+            else self.Type.UNARY
+        )
 
     def get_request(
-        self, proto: Optional[Message], proto_kwargs: Optional[Dict[str, Any]]
-    ) -> Message:
+        self,
+        proto: Optional[Union[Message, bytes]],
+        proto_kwargs: Optional[Dict[str, Any]],
+    ) -> Union[Message, bytes]:
         """Returns a request_type protobuf message.
 
         The client implementation may use this to support providing a request
         as either a message object or as keyword arguments for the message's
-        fields (but not both).
+        fields (but not both). A request that is already serialized may be
+        provided as bytes, which are sent as is.
         """
         if proto_kwargs is None:
             proto_kwargs = {}
 
-        if proto and proto_kwargs:
+        if proto is not None and proto_kwargs:
             proto_str = repr(proto).strip() or "''"
             raise TypeError(
                 'Requests must be provided either as a message object or a '
@@ -315,7 +342,12 @@ class Method:
             )
 
         if proto is None:
-            return self.request_type(**proto_kwargs)
+            return self.request_type(  # pylint: disable=not-callable
+                **proto_kwargs
+            )
+
+        if isinstance(proto, bytes):
+            return proto
 
         if not _message_is_type(proto, self.request_type):
             try:
@@ -379,24 +411,44 @@ class _AccessByName(Generic[T]):
 class ServiceAccessor(Collection[T]):
     """Navigates RPC services by name or ID."""
 
-    def __init__(self, members, as_attrs: str = ''):
-        """Creates accessor from an {item: value} dict or [values] iterable."""
-        # If the members arg was passed as a [values] iterable, convert it to
-        # an equivalent dictionary.
-        if not isinstance(members, dict):
-            members = {m: m for m in members}
+    def __init__(
+        self,
+        members,
+        as_attrs: str = '',
+        factory: Optional[Callable[[Any], T]] = None,
+    ):
+        """Creates accessor from an {item: value} dict or [values] iterable.
+
+        If a factory is provided, members is an iterable of items and the value
+        for each item is created by calling factory(item) when it is first
+        accessed. Lazy accessors do not support as_attrs='packages'.
+        """
+        self._factory = factory
+
+        if factory is not None:
+            if as_attrs == 'packages':
+                raise ValueError('Lazy accessors cannot be used as packages')
+            members = list(members)
+            self._items: Dict[int, Any] = {m.id: m for m in members}
+            self._by_id: Dict[int, Any] = {}
+        else:
+            # If the members arg was passed as a [values] iterable, convert it
+            # to an equivalent dictionary.
+            if not isinstance(members, dict):
+                members = {m: m for m in members}
+
+            self._items = {k.id: k for k in members}
+            self._by_id = {k.id: v for k, v in members.items()}
 
-        by_name: Dict[str, Any] = {_name(k): v for k, v in members.items()}
-        self._by_id = {k.id: v for k, v in members.items()}
         # Note: a dictionary is used rather than `setattr` in order to
         # (1) Hint to the type checker that there will be extra fields
         # (2) Ensure that built-in attributes such as `_by_id`` are not
         #     overwritten.
         self._attrs: Dict[str, Any] = {}
+        self._attr_ids: Dict[str, int] = {}
 
         if as_attrs == 'members':
-            for name, member in by_name.items():
-                self._attrs[name] = member
+            self._attr_ids = {_name(m): m.id for m in self._items.values()}
         elif as_attrs == 'packages':
             for package in python_protos.as_packages(
                 (m.package, _AccessByName(m.name, members[m])) for m in members
@@ -405,13 +457,27 @@ class ServiceAccessor(Collection[T]):
         elif as_attrs:
             raise ValueError(f'Unexpected value {as_attrs!r} for as_attrs')
 
+    def _get(self, member_id: int) -> Any:
+        """Returns the value for an ID, creating it if necessary."""
+        try:
+            return self._by_id[member_id]
+        except KeyError:
+            if self._factory is None:
+                raise
+
+        item = self._items[member_id]
+        return self._by_id.setdefault(member_id, self._factory(item))
+
     def __getattr__(self, name: str) -> Any:
-        return self._attrs[name]
+        try:
+            return self._get(self._attr_ids[name])
+        except KeyError:
+            return self._attrs[name]
 
     def __getitem__(self, name_or_id: Union[str, int]) -> Any:
         """Accesses a service/method by the string name or ID."""
         try:
-            return self._by_id[_id(name_or_id)]
+            return self._get(_id(name_or_id))
         except KeyError:
             pass
 
@@ -419,16 +485,16 @@ class ServiceAccessor(Collection[T]):
         raise KeyError(f'Unknown ID {_id(name_or_id)}{name}')
 
     def __iter__(self) -> Iterator[T]:
-        return iter(self._by_id.values())
+        return (self._get(member_id) for member_id in self._items)
 
     def __len__(self) -> int:
-        return len(self._by_id)
+        return len(self._items)
 
     def __contains__(self, name_or_id) -> bool:
-        return _id(name_or_id) in self._by_id
+        return _id(name_or_id) in self._items
 
     def __repr__(self) -> str:
-        members = ', '.join(repr(m) for m in self._by_id.values())
+        members = ', '.join(repr(m) for m in self)
         return f'{self.__class__.__name__}({members})'
 
 
@@ -0,0 +1,274 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""A deterministic channel adapter that emulates a slow, shaped link.
+
+LinkEmulator models the bandwidth, latency, jitter, reordering, and MTU of a
+link. Packets are delivered by events on a VirtualClock rather than by sleeping,
+so hours of traffic over a slow serial link can be simulated in seconds. All
+randomness comes from a seeded generator, so a run is reproducible.
+
+.. code-block:: python
+
+  clock = VirtualClock()
+  uart = LinkConfig.serial(baud=115200, latency_s=0.002)
+
+  to_device = LinkEmulator(uart, clock, seed=1, name='to_device')
+  to_host = LinkEmulator(uart, clock, seed=2, name='to_host')
+  to_device.send_packet = server.process_packet
+  to_host.send_packet = client.process_packet
+
+  ...
+
+  clock.run_until_idle()  # Deliver every packet, advancing virtual time.
+
+LinkEmulator does not drop packets. To add loss, chain it with a
+lossy_channel.LossyChannel by setting one's send_packet to the other.
+"""
+
+from dataclasses import dataclass
+import heapq
+import itertools
+import logging
+import random
+from typing import Any, Callable, List, Optional, Tuple
+
+import pw_rpc
+
+_LOG = logging.getLogger(__name__)
+
+
+class VirtualClock:
+    """A clock that only advances when events are run.
+
+    Events are callbacks scheduled for a point in virtual time. Running events
+    advances the clock to each event's time, in order. Events scheduled for the
+    same time run in the order they were scheduled.
+    """
+
+    def __init__(self, start_s: float = 0.0) -> None:
+        self._now = start_s
+        self._events: List[Tuple[float, int, Callable[[], Any]]] = []
+        self._sequence = itertools.count()
+
+    def time(self) -> float:
+        """The current virtual time in seconds."""
+        return self._now
+
+    def call_at(self, when_s: float, callback: Callable[[], Any]) -> None:
+        """Schedules callback to run at the given virtual time."""
+        heapq.heappush(
+            self._events,
+            (max(when_s, self._now), next(self._sequence), callback),
+        )
+
+    def call_later(self, delay_s: float, callback: Callable[[], Any]) -> None:
+        self.call_at(self._now + delay_s, callback)
+
+    def pending(self) -> int:
+        """The number of events that have not run yet."""
+        return len(self._events)
+
+    def next_event_time(self) -> Optional[float]:
+        return self._events[0][0] if self._events else None
+
+    def run_until(self, when_s: float) -> int:
+        """Runs all events up to when_s and advances the clock to when_s.
+
+        Returns:
+          The number of events that ran.
+        """
+        count = 0
+        while self._events and self._events[0][0] <= when_s:
+            self._now, _, callback = heapq.heappop(self._events)
+            callback()
+            count += 1
+
+        self._now = max(self._now, when_s)
+        return count
+
+    def advance(self, seconds: float) -> int:
+        """Runs the events for the next seconds of virtual time."""
+        return self.run_until(self._now + seconds)
+
+    def run_until_idle(self, max_events: Optional[int] = None) -> int:
+        """Runs events, including newly scheduled ones, until none are left.
+
+        Args:
+          max_events: Stop after this many events, which guards against
+              callbacks that always schedule another event.
+
+        Returns:
+          The number of events that ran.
+        """
+        count = 0
+        while self._events and (max_events is None or count < max_events):
+            self._now, _, callback = heapq.heappop(self._events)
+            callback()
+            count += 1
+
+        return count
+
+
+@dataclass(frozen=True)
+class LinkConfig:
+    """The shape of an emulated link.
+
+    Attributes:
+      bandwidth_bps: Link rate in bits per second, or None for no limit.
+      bits_per_byte: Bits on the wire per byte of payload, such as 10 for a UART
+          with one start and one stop bit.
+      burst_bytes: Token bucket size. Up to this many bytes are sent without
+          serialization delay after the link has been idle. With the default of
+          0, every byte takes 1 / (bandwidth_bps / bits_per_byte) seconds.
+      latency_s: Fixed one-way propagation delay.
+      jitter_s: Each packet's delay is increased by a uniformly random amount
+          up to this value. Jitter does not reorder packets.
+      reorder_probability: Probability that a packet is held back by
+          reorder_delay_s, which lets packets sent after it arrive first.
+      reorder_delay_s: Extra delay for reordered packets.
+      mtu: Packets larger than this many bytes are split into fragments, each
+          of which is passed to send_packet separately. None disables
+          fragmentation.
+    """
+
+    bandwidth_bps: Optional[float] = None
+    bits_per_byte: int = 8
+    burst_bytes: int = 0
+    latency_s: float = 0.0
+    jitter_s: float = 0.0
+    reorder_probability: float = 0.0
+    reorder_delay_s: float = 0.0
+    mtu: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.bandwidth_bps is not None and self.bandwidth_bps <= 0:
+            raise ValueError('bandwidth_bps must be positive')
+        if self.mtu is not None and self.mtu <= 0:
+            raise ValueError('mtu must be positive')
+        if not 0.0 <= self.reorder_probability <= 1.0:
+            raise ValueError('reorder_probability must be between 0 and 1')
+        if min(self.latency_s, self.jitter_s, self.reorder_delay_s) < 0:
+            raise ValueError('Delays cannot be negative')
+
+    @classmethod
+    def serial(cls, baud: int, **kwargs) -> 'LinkConfig':
+        """A UART link with 8 data bits, 1 start bit, and 1 stop bit."""
+        return cls(bandwidth_bps=baud, bits_per_byte=10, **kwargs)
+
+    @property
+    def bytes_per_second(self) -> Optional[float]:
+        if self.bandwidth_bps is None:
+            return None
+        return self.bandwidth_bps / self.bits_per_byte
+
+
+@dataclass
+class LinkStats:
+    """Counts of the traffic that passed through a LinkEmulator."""
+
+    packets: int = 0
+    fragments: int = 0
+    bytes: int = 0
+    reordered: int = 0
+    delivered: int = 0
+
+
+class LinkEmulator(pw_rpc.ChannelManipulator):
+    """Delays and reshapes packets according to a LinkConfig.
+
+    Each packet is sent as if it were queued on a link with a token bucket
+    rate limit, then delivered to send_packet after the link's latency. The
+    delivery is an event on the VirtualClock, so nothing is delivered until
+    the clock's events are run.
+    """
+
+    def __init__(
+        self,
+        config: LinkConfig,
+        clock: Optional[VirtualClock] = None,
+        seed: Optional[int] = None,
+        name: str = '',
+    ) -> None:
+        super().__init__()
+        self.config = config
+        self.clock = VirtualClock() if clock is None else clock
+        self.name = name
+        self.stats = LinkStats()
+        self._rng = random.Random(seed)
+
+        self._tokens = float(config.burst_bytes)
+        self._tokens_updated_s = self.clock.time()
+        self._link_free_s = self.clock.time()
+        self._last_arrival_s = self.clock.time()
+
+    def process_and_send(self, packet: bytes) -> None:
+        self.stats.packets += 1
+
+        reordered = self._rng.random() < self.config.reorder_probability
+        if reordered:
+            self.stats.reordered += 1
+
+        mtu = self.config.mtu or len(packet) or 1
+        for start in range(0, max(len(packet), 1), mtu):
+            self._send_fragment(packet[start : start + mtu], reordered)
+
+    def busy_until(self) -> float:
+        """The virtual time at which all queued bytes will have been sent."""
+        return self._link_free_s
+
+    def _send_fragment(self, fragment: bytes, reordered: bool) -> None:
+        self.stats.fragments += 1
+        self.stats.bytes += len(fragment)
+
+        arrival_s = self._departure_time(len(fragment)) + self.config.latency_s
+        if self.config.jitter_s:
+            arrival_s += self._rng.uniform(0.0, self.config.jitter_s)
+
+        if reordered:
+            arrival_s += self.config.reorder_delay_s
+        else:
+            # Jitter delays packets but keeps them in order, like a queue.
+            arrival_s = max(arrival_s, self._last_arrival_s)
+            self._last_arrival_s = arrival_s
+
+        self.clock.call_at(arrival_s, lambda: self._deliver(fragment))
+
+    def _departure_time(self, size: int) -> float:
+        """Returns when the last byte of a fragment leaves the link."""
+        rate = self.config.bytes_per_second
+        now = max(self.clock.time(), self._link_free_s)
+        if rate is None:
+            return now
+
+        burst = self.config.burst_bytes
+        elapsed = now - self._tokens_updated_s
+        self._tokens = min(float(burst), self._tokens + elapsed * rate) - size
+
+        if self._tokens < 0:
+            now -= self._tokens / rate
+            self._tokens = 0.0
+
+        self._tokens_updated_s = now
+        self._link_free_s = now
+        return now
+
+    def _deliver(self, fragment: bytes) -> None:
+        self.stats.delivered += 1
+        _LOG.debug(
+            '[%s] Delivered %d B at %.6f s',
+            self.name,
+            len(fragment),
+            self.clock.time(),
+        )
+        self.send_packet(fragment)
@@ -217,7 +217,8 @@ class LossyChannel(pw_rpc.ChannelManipulator):
         while self._packets:
             packet = None
 
-            if self._rng.next_packet_out_of_order():
+            # Only reorder if there is an old packet left to choose from.
+            if self._old_packets and self._rng.next_packet_out_of_order():
                 idx = self._rng.choose_out_of_order_packet(
                     len(self._old_packets) - 1
                 )
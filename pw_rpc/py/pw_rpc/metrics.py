@@ -0,0 +1,356 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Opt-in latency, throughput, and error metrics for a pw_rpc Client.
+
+Metrics are collected per channel and method. To enable them, pass an
+RpcMetrics to the Client:
+
+.. code-block:: python
+
+  rpc_metrics = pw_rpc.metrics.RpcMetrics()
+  client = pw_rpc.Client.from_modules(impl, channels, modules,
+                                      metrics=rpc_metrics)
+
+  ...
+
+  for method in rpc_metrics.snapshot():
+      print(method.name, method.first_response_latency_us.percentile(99))
+
+  print(rpc_metrics.to_json(indent=2))
+
+Counters are updated without locking. Each counter is only written from
+either the thread that invokes RPCs or the thread that processes packets, so
+counts are exact as long as each of those roles is taken by a single thread.
+"""
+
+from dataclasses import dataclass, field
+import json
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pw_status import Status
+
+from pw_rpc import packets
+from pw_rpc.descriptors import Method
+
+
+_NO_MIN = 1 << 64
+
+
+class Histogram:
+    """Records non-negative integers in logarithmic buckets.
+
+    Like HdrHistogram, each power of two is split into 2**sub_bucket_bits
+    linear sub-buckets, so the relative error of any recorded value is at most
+    2**-sub_bucket_bits. Values smaller than 2**sub_bucket_bits are exact.
+    Recording a value is O(1) and memory use grows with the logarithm of the
+    largest value.
+    """
+
+    __slots__ = ('_bits', '_sub_buckets', '_counts', '_total', '_min', '_max')
+
+    def __init__(self, sub_bucket_bits: int = 5) -> None:
+        if sub_bucket_bits < 1:
+            raise ValueError('sub_bucket_bits must be at least 1')
+
+        self._bits = sub_bucket_bits
+        self._sub_buckets = 1 << sub_bucket_bits
+        self._counts: Dict[int, int] = {}
+        self._total = 0
+        self._min = _NO_MIN
+        self._max = 0
+
+    def record(self, value: int) -> None:
+        # This is on the packet processing path, so keep it minimal. The count
+        # is derived from the buckets when taking a snapshot, and comparisons
+        # are used instead of the slower min() and max() builtins.
+        # pylint: disable=consider-using-min-builtin,consider-using-max-builtin
+        if value < self._sub_buckets:
+            if value < 0:
+                value = 0
+            index = value
+        else:
+            shift = value.bit_length() - self._bits - 1
+            index = (shift << self._bits) + (value >> shift)
+
+        counts = self._counts
+        counts[index] = counts.get(index, 0) + 1
+
+        self._total += value
+        if value < self._min:
+            self._min = value
+        if value > self._max:
+            self._max = value
+
+    def bucket_range(self, index: int) -> Tuple[int, int]:
+        """Returns the lowest and highest value stored in a bucket."""
+        if index < self._sub_buckets:
+            return index, index
+
+        shift = (index >> self._bits) - 1
+        low = (index - (shift << self._bits)) << shift
+        return low, low + (1 << shift) - 1
+
+    def snapshot(self) -> 'HistogramSnapshot':
+        counts = dict(self._counts)  # Copy first; the dict may be updated.
+        buckets = []
+        for index in sorted(counts):
+            low, high = self.bucket_range(index)
+            buckets.append((low, high, counts[index]))
+
+        count = sum(count for _, _, count in buckets)
+        return HistogramSnapshot(
+            count=count,
+            total=self._total,
+            min=self._min if count else 0,
+            max=self._max,
+            buckets=tuple(buckets),
+        )
+
+
+@dataclass(frozen=True)
+class HistogramSnapshot:
+    """A point-in-time copy of a Histogram.
+
+    Attributes:
+      count: Number of recorded values.
+      total: Sum of the recorded values.
+      min: Smallest recorded value, or 0 if there are none.
+      max: Largest recorded value, or 0 if there are none.
+      buckets: (lowest value, highest value, count) for non-empty buckets in
+          ascending order.
+    """
+
+    count: int
+    total: int
+    min: int
+    max: int
+    buckets: Tuple[Tuple[int, int, int], ...]
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> int:
+        """Returns the value below which percent of the values fall.
+
+        The result is the highest value of the matching bucket, so it is
+        within the histogram's precision of the exact percentile.
+        """
+        if not 0 <= percent <= 100:
+            raise ValueError('percent must be between 0 and 100')
+
+        if not self.count:
+            return 0
+
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+        for _, high, count in self.buckets:
+            seen += count
+            if seen >= rank:
+                return max(self.min, min(high, self.max))
+
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'buckets': [list(bucket) for bucket in self.buckets],
+        }
+
+
+class MethodMetrics:  # pylint: disable=too-many-instance-attributes
+    """Metrics for all calls to one method on one channel."""
+
+    def __init__(
+        self, channel_id: int, method: Method, sub_bucket_bits: int
+    ) -> None:
+        self.channel_id = channel_id
+        self.method = method
+
+        self.calls = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.errors: Dict[Status, int] = {}
+
+        self.first_response_latency_us = Histogram(sub_bucket_bits)
+        self.response_gap_us = Histogram(sub_bucket_bits)
+        self.call_duration_us = Histogram(sub_bucket_bits)
+        self.response_size_bytes = Histogram(sub_bucket_bits)
+
+    def snapshot(self) -> 'MethodSnapshot':
+        response_size_bytes = self.response_size_bytes.snapshot()
+        return MethodSnapshot(
+            channel_id=self.channel_id,
+            name=self.method.full_name,
+            calls=self.calls,
+            completed=self.completed,
+            cancelled=self.cancelled,
+            responses=response_size_bytes.count,
+            bytes_in=self.bytes_in,
+            bytes_out=self.bytes_out,
+            errors={status.name: n for status, n in self.errors.items()},
+            first_response_latency_us=(
+                self.first_response_latency_us.snapshot()
+            ),
+            response_gap_us=self.response_gap_us.snapshot(),
+            call_duration_us=self.call_duration_us.snapshot(),
+            response_size_bytes=response_size_bytes,
+        )
+
+
+class CallMetrics:
+    """Tracks the timing of one call and updates its MethodMetrics."""
+
+    __slots__ = ('_method', '_clock_ns', '_start_ns', '_last_ns')
+
+    def __init__(
+        self, method: MethodMetrics, clock_ns: Callable[[], int]
+    ) -> None:
+        self._method = method
+        self._clock_ns = clock_ns
+        self._start_ns = clock_ns()
+        self._last_ns: Optional[int] = None
+
+        method.calls += 1
+
+    def sent(self, packet_size: int) -> None:
+        self._method.bytes_out += packet_size
+
+    def received(self, packet_size: int, payload_size: Optional[int]) -> None:
+        """Records a packet; payload_size is None if it has no response."""
+        method = self._method
+        method.bytes_in += packet_size
+
+        if payload_size is None:
+            return
+
+        now = self._clock_ns()
+        method.response_size_bytes.record(payload_size)
+
+        last_ns = self._last_ns
+        self._last_ns = now
+
+        if last_ns is None:
+            method.first_response_latency_us.record(
+                (now - self._start_ns) // 1000
+            )
+        else:
+            method.response_gap_us.record((now - last_ns) // 1000)
+
+    def finished(self, status: Status) -> None:
+        """Records the final status from the server."""
+        method = self._method
+        method.call_duration_us.record(
+            (self._clock_ns() - self._start_ns) // 1000
+        )
+
+        if status is Status.OK:
+            method.completed += 1
+        else:
+            method.errors[status] = method.errors.get(status, 0) + 1
+
+    def cancelled(self) -> None:
+        self._method.cancelled += 1
+
+
+@dataclass(frozen=True)
+class MethodSnapshot:  # pylint: disable=too-many-instance-attributes
+    """A point-in-time copy of the metrics for a method on a channel."""
+
+    channel_id: int
+    name: str
+    calls: int
+    completed: int
+    cancelled: int
+    responses: int
+    bytes_in: int
+    bytes_out: int
+    errors: Dict[str, int] = field(default_factory=dict)
+    first_response_latency_us: Optional[HistogramSnapshot] = None
+    response_gap_us: Optional[HistogramSnapshot] = None
+    call_duration_us: Optional[HistogramSnapshot] = None
+    response_size_bytes: Optional[HistogramSnapshot] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for name, value in self.__dict__.items():
+            if isinstance(value, HistogramSnapshot):
+                result[name] = value.to_dict()
+            elif isinstance(value, dict):
+                result[name] = dict(value)
+            else:
+                result[name] = value
+        return result
+
+
+class RpcMetrics:
+    """Collects metrics for the RPCs of a pw_rpc Client."""
+
+    def __init__(
+        self,
+        clock_ns: Callable[[], int] = time.perf_counter_ns,
+        sub_bucket_bits: int = 5,
+    ) -> None:
+        self._clock_ns = clock_ns
+        self._sub_bucket_bits = sub_bucket_bits
+        self._methods: Dict[Tuple[int, int, int], MethodMetrics] = {}
+        self._lock = threading.Lock()
+
+    def method(self, rpc: packets.RpcIds, method: Method) -> MethodMetrics:
+        """Returns the metrics for a method, creating them if necessary."""
+        key = (rpc.channel_id, rpc.service_id, rpc.method_id)
+        try:
+            return self._methods[key]
+        except KeyError:
+            pass
+
+        with self._lock:
+            return self._methods.setdefault(
+                key,
+                MethodMetrics(rpc.channel_id, method, self._sub_bucket_bits),
+            )
+
+    def start_call(self, rpc: packets.RpcIds, method: Method) -> CallMetrics:
+        return CallMetrics(self.method(rpc, method), self._clock_ns)
+
+    def snapshot(self) -> List[MethodSnapshot]:
+        """Returns the current metrics of every method that was called."""
+        with self._lock:
+            methods = list(self._methods.values())
+
+        return [method.snapshot() for method in methods]
+
+    def to_json(self, **json_dumps_args) -> str:
+        """Exports a snapshot of the metrics as a JSON object."""
+        return json.dumps(
+            {'methods': [method.to_dict() for method in self.snapshot()]},
+            **json_dumps_args,
+        )
+
+    def reset(self) -> None:
+        """Discards all metrics. Calls in progress are no longer tracked."""
+        with self._lock:
+            self._methods = {}
@@ -14,7 +14,8 @@
 """Functions for working with pw_rpc packets."""
 
 import dataclasses
-from typing import Optional
+import enum
+from typing import Any, Callable, Optional, Union
 
 from google.protobuf import message
 from pw_status import Status
@@ -34,6 +35,96 @@ def decode_payload(packet, payload_type):
     return payload
 
 
+class PayloadMode(enum.Enum):
+    """How response payloads are delivered to an RPC's callbacks.
+
+    MESSAGE: Decode each payload into its protobuf message (the default).
+    LAZY: Deliver a LazyPayload, which decodes on first attribute access.
+    RAW: Deliver the serialized payload as bytes without decoding it.
+    """
+
+    MESSAGE = 0
+    LAZY = 1
+    RAW = 2
+
+
+class LazyPayload:
+    """A response payload that is decoded when it is first used.
+
+    Attribute access is forwarded to the decoded message, so a LazyPayload can
+    be used in place of the message in most code. Payloads that are never
+    inspected, or are only passed along as bytes, are never decoded. A payload
+    that fails to decode raises google.protobuf.message.DecodeError on first
+    use rather than when the packet is processed.
+    """
+
+    __slots__ = ('_data', '_message_type', '_message')
+
+    def __init__(self, data: bytes, message_type: Any) -> None:
+        self._data = data
+        self._message_type = message_type
+        self._message: Optional[message.Message] = None
+
+    @property
+    def data(self) -> memoryview:
+        """The serialized payload."""
+        return memoryview(self._data)
+
+    @property
+    def message_type(self) -> Any:
+        return self._message_type
+
+    def decoded(self) -> bool:
+        return self._message is not None
+
+    def decode(self) -> message.Message:
+        """Returns the decoded message, decoding it if necessary."""
+        if self._message is None:
+            self._message = self._message_type.FromString(self._data)
+        return self._message
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes that are not slots or class members.
+        if name in LazyPayload.__slots__:
+            raise AttributeError(name)
+        return getattr(self.decode(), name)
+
+    def __bytes__(self) -> bytes:
+        return bytes(self._data)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LazyPayload):
+            return (
+                self._message_type is other._message_type
+                and self._data == other._data
+            ) or self.decode() == other.decode()
+        return self.decode() == other
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        if self._message is None:
+            return (
+                f'LazyPayload({self._message_type.DESCRIPTOR.full_name}, '
+                f'{len(self._data)} B)'
+            )
+        return f'LazyPayload({self._message!r})'
+
+
+def payload_decoder(payload_type, mode: PayloadMode) -> Callable[[bytes], Any]:
+    """Returns a function that converts serialized payloads for a mode."""
+    if mode is PayloadMode.MESSAGE:
+        return payload_type.FromString
+
+    if mode is PayloadMode.LAZY:
+        return lambda data: LazyPayload(data, payload_type)
+
+    if mode is PayloadMode.RAW:
+        return bytes
+
+    raise ValueError(f'Unknown payload mode {mode!r}')
+
+
 @dataclasses.dataclass(eq=True, frozen=True)
 class RpcIds:
     """Integer IDs that uniquely identify a remote procedure call."""
@@ -44,8 +135,18 @@ class RpcIds:
     call_id: int
 
 
-def encode_request(rpc: RpcIds, request: Optional[message.Message]) -> bytes:
-    payload = request.SerializeToString() if request is not None else bytes()
+# A request message, or a request that is already serialized.
+Request = Union[message.Message, bytes]
+
+
+def _serialize(request: Request) -> bytes:
+    if isinstance(request, bytes):
+        return request
+    return request.SerializeToString()
+
+
+def encode_request(rpc: RpcIds, request: Optional[Request]) -> bytes:
+    payload = _serialize(request) if request is not None else bytes()
 
     return packet_pb2.RpcPacket(
         type=packet_pb2.PacketType.REQUEST,
@@ -68,14 +169,14 @@ def encode_response(rpc: RpcIds, response: message.Message) -> bytes:
     ).SerializeToString()
 
 
-def encode_client_stream(rpc: RpcIds, request: message.Message) -> bytes:
+def encode_client_stream(rpc: RpcIds, request: Request) -> bytes:
     return packet_pb2.RpcPacket(
         type=packet_pb2.PacketType.CLIENT_STREAM,
         channel_id=rpc.channel_id,
         service_id=rpc.service_id,
         method_id=rpc.method_id,
         call_id=rpc.call_id,
-        payload=request.SerializeToString(),
+        payload=_serialize(request),
     ).SerializeToString()
 
 
@@ -14,13 +14,23 @@
 """pw_rpc protoc plugin entrypoint to generate code for RPC services."""
 
 import enum
+import functools
 import sys
 
 from google.protobuf.compiler import plugin_pb2
+from pw_protobuf import (
+    codegen_cache,
+    options,
+    output_file,
+    proto_tree,
+    symbol_name_mapping,
+)
 
+from pw_rpc import codegen
 from pw_rpc import codegen_nanopb
 from pw_rpc import codegen_pwpb
 from pw_rpc import codegen_raw
+from pw_rpc import ids
 
 
 class Codegen(enum.Enum):
@@ -29,8 +39,15 @@ class Codegen(enum.Enum):
     PWPB = 2
 
 
+_GENERATORS = {
+    Codegen.RAW: codegen_raw,
+    Codegen.NANOPB: codegen_nanopb,
+    Codegen.PWPB: codegen_pwpb,
+}
+
+
 def process_proto_request(
-    codegen: Codegen,
+    codegen_type: Codegen,
     req: plugin_pb2.CodeGeneratorRequest,
     res: plugin_pb2.CodeGeneratorResponse,
 ) -> None:
@@ -43,23 +60,34 @@ def process_proto_request(
       req: A CodeGeneratorRequest for a proto compilation.
       res: A CodeGeneratorResponse to populate with the plugin's output.
     """
+    generator = _GENERATORS.get(codegen_type)
+    if generator is None:
+        raise NotImplementedError(f'Unknown codegen type {codegen_type}')
+
+    cache = codegen_cache.from_environment(
+        f'pw_rpc.{codegen_type.name.lower()}',
+        sys.modules[__name__],
+        codegen,
+        generator,
+        ids,
+        codegen_cache,
+        options,
+        output_file,
+        proto_tree,
+        symbol_name_mapping,
+    )
+
     for proto_file in req.proto_file:
-        if codegen is Codegen.RAW:
-            output_files = codegen_raw.process_proto_file(proto_file)
-        elif codegen is Codegen.NANOPB:
-            output_files = codegen_nanopb.process_proto_file(proto_file)
-        elif codegen is Codegen.PWPB:
-            output_files = codegen_pwpb.process_proto_file(proto_file)
-        else:
-            raise NotImplementedError(f'Unknown codegen type {codegen}')
-
-        for output_file in output_files:
-            fd = res.file.add()
-            fd.name = output_file.name()
-            fd.content = output_file.content()
-
-
-def main(codegen: Codegen) -> int:
+        for name, content in codegen_cache.generate_files(
+            cache,
+            proto_file,
+            (),
+            functools.partial(generator.process_proto_file, proto_file),
+        ):
+            res.file.add(name=name, content=content)
+
+
+def main(codegen_type: Codegen) -> int:
     """Protobuf compiler plugin entrypoint.
 
     Reads a CodeGeneratorRequest proto from stdin and writes a
@@ -68,7 +96,7 @@ def main(codegen: Codegen) -> int:
     data = sys.stdin.buffer.read()
     request = plugin_pb2.CodeGeneratorRequest.FromString(data)
     response = plugin_pb2.CodeGeneratorResponse()
-    process_proto_request(codegen, request, response)
+    process_proto_request(codegen_type, request, response)
 
     # Declare that this plugin supports optional fields in proto3. No proto
     # message code is generated, so optional in proto3 is supported trivially.
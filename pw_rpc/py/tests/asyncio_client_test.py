@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests using the asyncio client for pw_rpc."""
+
+import asyncio
+import threading
+import unittest
+from typing import List
+
+from pw_protobuf_compiler import python_protos
+from pw_status import Status
+
+from pw_rpc import asyncio_client, callback_client, client, packets
+from pw_rpc.internal import packet_pb2
+
+TEST_PROTO_1 = """\
+syntax = "proto3";
+
+package pw.test_asyncio;
+
+message SomeMessage {
+  uint32 magic_number = 1;
+}
+
+message AnotherMessage {
+  string payload = 1;
+}
+
+service PublicService {
+  rpc SomeUnary(SomeMessage) returns (AnotherMessage) {}
+  rpc SomeServerStreaming(SomeMessage) returns (stream AnotherMessage) {}
+  rpc SomeClientStreaming(stream SomeMessage) returns (AnotherMessage) {}
+  rpc SomeBidiStreaming(stream SomeMessage) returns (stream AnotherMessage) {}
+}
+"""
+
+CLIENT_CHANNEL_ID: int = 489
+
+
+def _packet(
+    packet_type: packet_pb2.PacketType.ValueType,
+    method,
+    call_id: int,
+    status: Status = Status.OK,
+    payload: bytes = b'',
+) -> bytes:
+    return packet_pb2.RpcPacket(
+        type=packet_type,
+        channel_id=CLIENT_CHANNEL_ID,
+        service_id=method.service.id,
+        method_id=method.id,
+        call_id=call_id,
+        status=status.value,
+        payload=payload,
+    ).SerializeToString()
+
+
+# Disable docstring requirements for test functions.
+# pylint: disable=missing-function-docstring
+
+
+class AsyncioClientTest(unittest.IsolatedAsyncioTestCase):
+    """Tests the asyncio pw_rpc client."""
+
+    def setUp(self) -> None:
+        self._protos = python_protos.Library.from_strings(TEST_PROTO_1)
+        self._response = self._protos.packages.pw.test_asyncio.AnotherMessage
+
+        self._client = client.Client.from_modules(
+            asyncio_client.Impl(default_unary_timeout_s=1),
+            [client.Channel(CLIENT_CHANNEL_ID, self._handle_packet)],
+            self._protos.modules(),
+        )
+        self._service = self._client.channel(
+            CLIENT_CHANNEL_ID
+        ).rpcs.pw.test_asyncio.PublicService
+
+        self.requests: List[packet_pb2.RpcPacket] = []
+
+    def _handle_packet(self, data: bytes) -> None:
+        self.requests.append(packets.decode(data))
+
+    def _process_in_thread(self, *raw_packets: bytes) -> None:
+        """Processes packets on another thread, as an RPC reader would."""
+
+        def process() -> None:
+            for packet in raw_packets:
+                self.assertIs(Status.OK, self._client.process_packet(packet))
+
+        thread = threading.Thread(target=process)
+        thread.start()
+        thread.join()
+
+    def _response_packet(self, method, call_id: int, payload: str) -> bytes:
+        return _packet(
+            packet_pb2.PacketType.RESPONSE,
+            method,
+            call_id,
+            payload=self._response(payload=payload).SerializeToString(),
+        )
+
+    def _stream_packet(self, method, call_id: int, payload: str) -> bytes:
+        return _packet(
+            packet_pb2.PacketType.SERVER_STREAM,
+            method,
+            call_id,
+            payload=self._response(payload=payload).SerializeToString(),
+        )
+
+    async def test_unary_await(self) -> None:
+        call = self._service.SomeUnary(magic_number=6)
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual(packet_pb2.PacketType.REQUEST, self.requests[0].type)
+
+        self._process_in_thread(
+            self._response_packet(call.method, call.call_id, '0_o')
+        )
+
+        status, response = await call
+        self.assertIs(Status.OK, status)
+        self.assertEqual('0_o', response.payload)
+        self.assertTrue(call.completed())
+
+    async def test_unary_server_error(self) -> None:
+        call = self._service.SomeUnary(magic_number=6)
+        self._process_in_thread(
+            _packet(
+                packet_pb2.PacketType.SERVER_ERROR,
+                call.method,
+                call.call_id,
+                Status.NOT_FOUND,
+            )
+        )
+
+        with self.assertRaises(callback_client.RpcError) as context:
+            await call
+
+        self.assertIs(Status.NOT_FOUND, context.exception.status)
+
+    async def test_unary_timeout(self) -> None:
+        call = self._service.SomeUnary.invoke(timeout_s=0.001)
+        with self.assertRaises(callback_client.RpcTimeout):
+            await call
+
+    async def test_many_concurrent_unary_calls(self) -> None:
+        calls = [self._service.SomeUnary(magic_number=i) for i in range(1000)]
+        self._process_in_thread(
+            *(
+                self._response_packet(c.method, c.call_id, str(c.call_id))
+                for c in calls
+            )
+        )
+
+        results = await asyncio.gather(*calls)
+        for call, (status, response) in zip(calls, results):
+            self.assertIs(Status.OK, status)
+            self.assertEqual(str(call.call_id), response.payload)
+
+    async def test_concurrent_awaiters_are_all_woken(self) -> None:
+        call = self._service.SomeUnary(magic_number=6)
+        waits = [asyncio.create_task(call.wait(timeout_s=1)) for _ in range(2)]
+        # Let both tasks start waiting for the response.
+        await asyncio.sleep(0)
+
+        self._process_in_thread(
+            self._response_packet(call.method, call.call_id, '0_o')
+        )
+
+        for status, response in await asyncio.gather(*waits):
+            self.assertIs(Status.OK, status)
+            self.assertEqual('0_o', response.payload)
+
+    async def test_server_streaming_async_for(self) -> None:
+        call = self._service.SomeServerStreaming(magic_number=1)
+        method = call.method
+        self._process_in_thread(
+            self._stream_packet(method, call.call_id, 'a'),
+            self._stream_packet(method, call.call_id, 'b'),
+            _packet(packet_pb2.PacketType.RESPONSE, method, call.call_id),
+        )
+
+        payloads = [response.payload async for response in call]
+        self.assertEqual(['a', 'b'], payloads)
+        self.assertIs(Status.OK, call.status)
+
+    async def test_server_streaming_cancel(self) -> None:
+        call = self._service.SomeServerStreaming(magic_number=1)
+        self.assertTrue(call.cancel())
+        self.assertEqual(
+            packet_pb2.PacketType.CLIENT_ERROR, self.requests[-1].type
+        )
+
+        with self.assertRaises(callback_client.RpcError):
+            await call
+
+    async def test_client_streaming(self) -> None:
+        call = self._service.SomeClientStreaming.invoke()
+        call.send(magic_number=1)
+        call.send(magic_number=2)
+
+        self._process_in_thread(
+            self._response_packet(call.method, call.call_id, 'done')
+        )
+
+        status, response = await call.finish_and_wait()
+        self.assertIs(Status.OK, status)
+        self.assertEqual('done', response.payload)
+        self.assertEqual(
+            [packet_pb2.PacketType.CLIENT_STREAM] * 2,
+            [r.type for r in self.requests[1:3]],
+        )
+
+    async def test_bidirectional_streaming(self) -> None:
+        call = self._service.SomeBidiStreaming.invoke()
+        call.send(magic_number=1)
+
+        self._process_in_thread(
+            self._stream_packet(call.method, call.call_id, 'x')
+        )
+        async for response in call:
+            self.assertEqual('x', response.payload)
+            break
+
+        self._process_in_thread(
+            self._stream_packet(call.method, call.call_id, 'y'),
+            _packet(packet_pb2.PacketType.RESPONSE, call.method, call.call_id),
+        )
+        status, responses = await call.finish_and_wait()
+        self.assertIs(Status.OK, status)
+        self.assertEqual(['y'], [r.payload for r in responses])
+
+    async def test_events_are_delivered_in_batches(self) -> None:
+        calls = [self._service.SomeUnary(magic_number=i) for i in range(10)]
+        loop = asyncio.get_running_loop()
+
+        scheduled: List[object] = []
+        original = loop.call_soon_threadsafe
+
+        def count_calls(callback, *args, **kwargs):
+            scheduled.append(callback)
+            return original(callback, *args, **kwargs)
+
+        loop.call_soon_threadsafe = count_calls  # type: ignore[assignment]
+        try:
+            self._process_in_thread(
+                *(self._response_packet(c.method, c.call_id, '') for c in calls)
+            )
+        finally:
+            del loop.call_soon_threadsafe
+
+        await asyncio.gather(*calls)
+        self.assertEqual(1, len(scheduled))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,6 +14,7 @@
 # the License.
 """Tests using the callback client for pw_rpc."""
 
+import threading
 import unittest
 from unittest import mock
 from typing import Any, List, Optional, Tuple
@@ -654,6 +655,62 @@ class ServerStreamingTest(_CallbackClientImplTestBase):
                 ]
             )
 
+    def test_lazy_payloads(self) -> None:
+        rep = self.method.response_type(payload='!!!')
+        self._enqueue_server_stream(CLIENT_CHANNEL_ID, self.method, rep)
+        self._enqueue_response(CLIENT_CHANNEL_ID, self.method, Status.OK)
+
+        call = self.rpc.invoke(payload_mode=packets.PayloadMode.LAZY)
+
+        (response,) = call.get_responses()
+        self.assertIsInstance(response, packets.LazyPayload)
+        self.assertFalse(response.decoded())
+        self.assertEqual(rep.SerializeToString(), bytes(response))
+        self.assertEqual('!!!', response.payload)
+        self.assertEqual(response, rep)
+
+    def test_raw_payloads(self) -> None:
+        rep = self.method.response_type(payload='?')
+        self._enqueue_server_stream(CLIENT_CHANNEL_ID, self.method, rep)
+        self._enqueue_response(CLIENT_CHANNEL_ID, self.method, Status.OK)
+
+        on_next = mock.Mock()
+        call = self.rpc.invoke(
+            on_next=on_next, payload_mode=packets.PayloadMode.RAW
+        )
+
+        on_next.assert_called_once_with(call, rep.SerializeToString())
+        self.assertEqual(
+            f'({Status.OK}, [{rep.SerializeToString()!r}])', repr(call.wait())
+        )
+
+    def test_raw_payloads_skip_decoding(self) -> None:
+        self._enqueue_server_stream(CLIENT_CHANNEL_ID, self.method, b'\xff')
+
+        call = self.rpc.invoke(payload_mode=packets.PayloadMode.RAW)
+
+        self.assertFalse(call.completed())
+        self.assertEqual([b'\xff'], list(call.responses))
+
+    def test_method_payload_mode_default(self) -> None:
+        self.rpc.payload_mode = packets.PayloadMode.RAW
+        rep = self.method.response_type(payload='?')
+
+        self._enqueue_server_stream(CLIENT_CHANNEL_ID, self.method, rep)
+        self._enqueue_response(CLIENT_CHANNEL_ID, self.method, Status.OK)
+        self.assertEqual(
+            [rep.SerializeToString()], self.rpc.invoke().wait().responses
+        )
+
+        self._enqueue_server_stream(CLIENT_CHANNEL_ID, self.method, rep)
+        self._enqueue_response(CLIENT_CHANNEL_ID, self.method, Status.OK)
+        self.assertEqual(
+            [rep],
+            self.rpc.invoke(payload_mode=packets.PayloadMode.MESSAGE)
+            .wait()
+            .responses,
+        )
+
     def test_nonblocking_cancel(self) -> None:
         resp = self.rpc.method.response_type(payload='!!!')
         self._enqueue_server_stream(CLIENT_CHANNEL_ID, self.rpc.method, resp)
@@ -735,6 +792,129 @@ class ServerStreamingTest(_CallbackClientImplTestBase):
         self.assertEqual(list(call.get_responses()), [])
         self.assertEqual(list(call), [])
 
+    def _replies(self, *payloads: str) -> list:
+        replies = [self.method.response_type(payload=p) for p in payloads]
+        for reply in replies:
+            self._enqueue_server_stream(CLIENT_CHANNEL_ID, self.method, reply)
+        return replies
+
+    def test_response_buffer_drop_oldest(self) -> None:
+        replies = self._replies('1', '2', '3')
+        self._enqueue_response(CLIENT_CHANNEL_ID, self.method, Status.OK)
+
+        on_next = mock.Mock()
+        call = self.rpc.invoke(
+            on_next=on_next,
+            response_buffer=callback_client.ResponseBuffer(max_size=2),
+        )
+
+        self.assertEqual(3, on_next.call_count)
+        self.assertEqual(replies[1:], list(call.responses))
+        self.assertEqual(replies[1:], list(call.responses))
+        self.assertIs(Status.OK, call.status)
+
+    def test_response_buffer_drop_newest(self) -> None:
+        replies = self._replies('1', '2', '3')
+
+        call = self.rpc.invoke(
+            response_buffer=callback_client.ResponseBuffer(
+                max_size=2, overflow=callback_client.OverflowPolicy.DROP_NEWEST
+            )
+        )
+
+        self.assertEqual(replies[:2], list(call.responses))
+        self.assertEqual(replies[:2], list(call.get_responses(count=2)))
+        self.assertFalse(call.completed())
+
+        # Reading responses makes room in the queue, but the responses list
+        # still keeps the first responses rather than dropping the oldest.
+        later = self._replies('4')
+        self._process_enqueued_packets()
+        self.assertEqual(later, list(call.get_responses(count=1)))
+        self.assertEqual(replies[:2], list(call.responses))
+
+    def test_response_buffer_cancel_keeps_first_responses(self) -> None:
+        replies = self._replies('1', '2')
+
+        call = self.rpc.invoke(
+            response_buffer=callback_client.ResponseBuffer(
+                max_size=2, overflow=callback_client.OverflowPolicy.CANCEL
+            )
+        )
+        self.assertEqual(replies, list(call.get_responses(count=2)))
+
+        later = self._replies('3')
+        self._process_enqueued_packets()
+        self.assertEqual(later, list(call.get_responses(count=1)))
+        self.assertEqual(replies, list(call.responses))
+        self.assertFalse(call.completed())
+
+    def test_response_buffer_cancel_on_overflow(self) -> None:
+        self._replies('1', '2', '3')
+
+        on_error = mock.Mock()
+        call = self.rpc.invoke(
+            on_error=on_error,
+            response_buffer=callback_client.ResponseBuffer(
+                max_size=2, overflow=callback_client.OverflowPolicy.CANCEL
+            ),
+        )
+
+        self.assertTrue(call.completed())
+        self.assertIs(Status.RESOURCE_EXHAUSTED, call.error)
+        on_error.assert_called_once_with(call, Status.RESOURCE_EXHAUSTED)
+        self.assertEqual(
+            packet_pb2.PacketType.CLIENT_ERROR, self.last_request().type
+        )
+        self.assertEqual(Status.CANCELLED.value, self.last_request().status)
+
+        with self.assertRaises(callback_client.RpcError):
+            list(call.get_responses())
+
+    def test_response_buffer_watermarks(self) -> None:
+        replies = self._replies('1', '2', '3')
+
+        events: list = []
+        call = self.rpc.invoke(
+            response_buffer=callback_client.ResponseBuffer(
+                high_watermark=2,
+                low_watermark=1,
+                on_high_watermark=lambda _, size: events.append(('high', size)),
+                on_low_watermark=lambda _, size: events.append(('low', size)),
+            )
+        )
+        self.assertEqual([('high', 2)], events)
+
+        self.assertEqual(replies[:2], list(call.get_responses(count=2)))
+        self.assertEqual([('high', 2), ('low', 1)], events)
+
+        self._replies('4', '5')
+        self._process_enqueued_packets()
+        self.assertEqual([('high', 2), ('low', 1), ('high', 2)], events)
+
+    def test_response_buffer_not_retained(self) -> None:
+        replies = self._replies('1', '2')
+        self._enqueue_response(CLIENT_CHANNEL_ID, self.method, Status.OK)
+
+        on_next = mock.Mock()
+        call = self.rpc.invoke(
+            on_next=on_next,
+            response_buffer=callback_client.ResponseBuffer(
+                retain_responses=False
+            ),
+        )
+
+        on_next.assert_has_calls([mock.call(call, r) for r in replies])
+        self.assertEqual([], list(call.responses))
+        self.assertEqual((Status.OK, []), tuple(call.wait()))
+
+    def test_response_buffer_invalid_watermarks(self) -> None:
+        with self.assertRaises(ValueError):
+            callback_client.ResponseBuffer(high_watermark=2, low_watermark=2)
+
+        with self.assertRaises(ValueError):
+            callback_client.ResponseBuffer(max_size=0)
+
 
 class ClientStreamingTest(_CallbackClientImplTestBase):
     """Tests for client streaming RPCs."""
@@ -1049,6 +1229,16 @@ class BidirectionalStreamingTest(_CallbackClientImplTestBase):
             self.assertIs(Status.OK, stream.status)
             self.assertIsNone(stream.error)
 
+    def test_send_serialized_request(self) -> None:
+        stream = self.rpc.invoke()
+        request = self.method.request_type(magic_number=55)
+
+        stream.send(request.SerializeToString())
+        self.assertIs(
+            packet_pb2.PacketType.CLIENT_STREAM, self.last_request().type
+        )
+        self.assertEqual(request, self._sent_payload(self.method.request_type))
+
     def test_open(self) -> None:
         self.output_exception = IOError('something went wrong sending!')
         rep1 = self.method.response_type(payload='!!!')
@@ -1200,5 +1390,126 @@ class BidirectionalStreamingTest(_CallbackClientImplTestBase):
         )
 
 
+class DeadlinesTest(_CallbackClientImplTestBase):
+    """Tests enforcing timeouts for callback-driven calls with Deadlines."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.now = 0.0
+        self.deadlines = callback_client.Deadlines(
+            clock=lambda: self.now, start_thread=False
+        )
+        self._client = client.Client.from_modules(
+            callback_client.Impl(
+                default_unary_timeout_s=1.0,
+                default_stream_timeout_s=2.0,
+                deadlines=self.deadlines,
+            ),
+            [client.Channel(CLIENT_CHANNEL_ID, self._handle_packet)],
+            self._protos.modules(),
+        )
+        self._service = self._client.channel(
+            CLIENT_CHANNEL_ID
+        ).rpcs.pw.test1.PublicService
+
+    def test_unary_call_expires(self) -> None:
+        callback = mock.Mock()
+        call = self._service.SomeUnary.invoke(
+            self._request(magic_number=1), on_error=callback
+        )
+
+        self.now = 0.5
+        self.assertEqual(0, self.deadlines.expire())
+        callback.assert_not_called()
+
+        self.now = 1.0
+        self.assertEqual(1, self.deadlines.expire())
+        callback.assert_called_once_with(call, Status.DEADLINE_EXCEEDED)
+
+        self.assertEqual(
+            self.last_request().type, packet_pb2.PacketType.CLIENT_ERROR
+        )
+        self.assertEqual(self.last_request().status, Status.CANCELLED.value)
+
+        with self.assertRaises(callback_client.RpcTimeout):
+            call.wait()
+
+    def test_completed_call_does_not_expire(self) -> None:
+        method = self._service.SomeUnary.method
+        callback = mock.Mock()
+        self._enqueue_response(CLIENT_CHANNEL_ID, method, Status.OK)
+        call = self._service.SomeUnary.invoke(
+            self._request(magic_number=1), on_error=callback
+        )
+        self.assertIs(call.status, Status.OK)
+
+        self.now = 10
+        self.assertEqual(0, self.deadlines.expire())
+        callback.assert_not_called()
+
+    def test_cancelled_call_does_not_expire(self) -> None:
+        callback = mock.Mock()
+        call = self._service.SomeUnary.invoke(on_error=callback)
+        call.cancel()
+
+        self.now = 10
+        self.assertEqual(0, self.deadlines.expire())
+        callback.assert_not_called()
+
+    def test_stream_responses_restart_deadline(self) -> None:
+        method = self._service.SomeServerStreaming.method
+        callback = mock.Mock()
+        call = self._service.SomeServerStreaming.invoke(on_error=callback)
+
+        for i in range(1, 5):
+            self.now = 1.5 * i
+            self._enqueue_server_stream(
+                CLIENT_CHANNEL_ID,
+                method,
+                method.response_type(payload=str(i)),
+                call_id=call.call_id,
+            )
+            self._process_enqueued_packets()
+            self.assertEqual(0, self.deadlines.expire())
+
+        self.now = 8
+        self.assertEqual(1, self.deadlines.expire())
+        callback.assert_called_once_with(call, Status.DEADLINE_EXCEEDED)
+        self.assertEqual(len(call.responses), 4)
+
+    def test_many_calls_expire_in_one_sweep(self) -> None:
+        calls = [self._service.SomeUnary.invoke() for _ in range(1000)]
+
+        self.now = 1.0
+        self.assertEqual(1000, self.deadlines.expire())
+        self.assertEqual(0, len(self.deadlines))
+
+        for call in calls:
+            self.assertIs(call.error, Status.DEADLINE_EXCEEDED)
+
+    def test_no_timeout_never_expires(self) -> None:
+        call = self._service.SomeUnary.invoke(timeout_s=None)
+        self.now = 1e9
+        self.assertEqual(0, self.deadlines.expire())
+        self.assertFalse(call.completed())
+
+
+class DeadlinesThreadTest(unittest.TestCase):
+    """Tests the Deadlines background thread."""
+
+    def test_expires_from_thread(self) -> None:
+        deadlines = callback_client.Deadlines()
+        expired = threading.Event()
+        deadlines.add(0.001, expired.set)
+        self.assertTrue(expired.wait(5))
+
+    def test_earlier_deadline_wakes_thread(self) -> None:
+        deadlines = callback_client.Deadlines()
+        deadlines.add(60, mock.Mock())
+        expired = threading.Event()
+        deadlines.add(0.001, expired.set)
+        self.assertTrue(expired.wait(5))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Microbenchmarks for pw_rpc.Client packet processing."""
+
+import argparse
+import time
+import timeit
+
+from pw_protobuf_compiler import python_protos
+
+from pw_rpc import callback_client, client, metrics
+from pw_rpc.internal.packet_pb2 import PacketType, RpcPacket
+
+_PROTO = """\
+syntax = "proto3";
+
+package pw.benchmark;
+
+message Payload {
+  bytes data = 1;
+}
+
+service Benchmark {
+  rpc Unary(Payload) returns (Payload) {}
+  rpc ServerStream(Payload) returns (stream Payload) {}
+}
+"""
+
+_CHANNEL_ID = 1
+
+
+def _client(service_count: int, enable_metrics: bool) -> client.Client:
+    """Creates a client with the benchmark service and padding services."""
+    padding = '\n'.join(
+        f'service Padding{i} {{ rpc Unary(Payload) returns (Payload) {{}} }}'
+        for i in range(service_count)
+    )
+    protos = python_protos.Library.from_strings(_PROTO + padding)
+    return client.Client.from_modules(
+        callback_client.Impl(),
+        [client.Channel(_CHANNEL_ID, lambda _: None)],
+        protos.modules(),
+        metrics=metrics.RpcMetrics() if enable_metrics else None,
+    )
+
+
+def benchmark_startup(service_count: int) -> float:
+    """Returns the time to create a client for a large proto library."""
+    padding = '\n'.join(
+        f'service Padding{i} {{ rpc Unary(Payload) returns (Payload) {{}} }}'
+        for i in range(service_count)
+    )
+    modules = python_protos.Library.from_strings(_PROTO + padding).modules()
+
+    start = time.perf_counter()
+    client.Client.from_modules(
+        callback_client.Impl(),
+        [client.Channel(_CHANNEL_ID, lambda _: None)],
+        modules,
+    )
+    return time.perf_counter() - start
+
+
+def benchmark_server_stream(
+    iterations: int,
+    payload_size: int,
+    service_count: int,
+    enable_metrics: bool = False,
+) -> float:
+    """Returns the average time to process a SERVER_STREAM packet."""
+    rpc_client = _client(service_count, enable_metrics)
+    method = rpc_client.method('pw.benchmark.Benchmark.ServerStream')
+    method_client = rpc_client.channel(_CHANNEL_ID).rpcs[method.service.id][
+        method.id
+    ]
+    call = method_client.invoke(on_next=lambda *_: None)
+
+    packet = RpcPacket(
+        type=PacketType.SERVER_STREAM,
+        channel_id=_CHANNEL_ID,
+        service_id=method.service.id,
+        method_id=method.id,
+        call_id=call.call_id,
+        payload=method.response_type(
+            data=b'?' * payload_size
+        ).SerializeToString(),
+    ).SerializeToString()
+
+    # Don't retain responses so that memory use doesn't skew the results.
+    # pylint: disable=protected-access
+    call._handle_response = lambda response: None  # type: ignore
+
+    return (
+        timeit.timeit(
+            lambda: rpc_client.process_packet(packet), number=iterations
+        )
+        / iterations
+    )
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=100000)
+    parser.add_argument('--payload-size', type=int, default=64)
+    parser.add_argument(
+        '--services',
+        type=int,
+        default=100,
+        help='Number of extra services registered with the client',
+    )
+    parser.add_argument(
+        '--metrics',
+        action='store_true',
+        help='Collect pw_rpc.metrics while processing packets',
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    startup_s = benchmark_startup(args.services)
+    print(
+        f'Client.from_modules with {args.services + 1} services: '
+        f'{startup_s * 1e3:.2f} ms'
+    )
+
+    seconds = benchmark_server_stream(
+        args.iterations, args.payload_size, args.services, args.metrics
+    )
+    print(
+        f'SERVER_STREAM process_packet: {seconds * 1e6:.2f} us/packet, '
+        f'{1 / seconds:,.0f} packets/s'
+    )
+
+
+if __name__ == '__main__':
+    main()
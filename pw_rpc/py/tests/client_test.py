@@ -15,6 +15,7 @@
 """Tests creating pw_rpc client."""
 
 import unittest
+from unittest import mock
 from typing import Any, Callable, Optional
 
 from pw_protobuf_compiler import python_protos
@@ -102,6 +103,17 @@ def create_client(
     )
 
 
+def _server_stream_packet(method, call_id: int, payload) -> bytes:
+    return RpcPacket(
+        type=PacketType.SERVER_STREAM,
+        channel_id=CLIENT_FIRST_CHANNEL_ID,
+        service_id=method.service.id,
+        method_id=method.id,
+        call_id=call_id,
+        payload=payload,
+    ).SerializeToString()
+
+
 class ChannelClientTest(unittest.TestCase):
     """Tests the ChannelClient."""
 
@@ -429,6 +441,118 @@ class ClientTest(unittest.TestCase):
             Status.OK,
         )
 
+    def test_process_packet_stream_for_pending_call(self) -> None:
+        method = self._client.method('pw.test1.PublicService.SomeBidiStreaming')
+        responses: list = []
+        callback_args: list = []
+        self._client.response_callback = lambda *args: callback_args.append(
+            args
+        )
+
+        call = self._client.channel(
+            CLIENT_FIRST_CHANNEL_ID
+        ).rpcs.pw.test1.PublicService.SomeBidiStreaming.invoke(
+            lambda _, response: responses.append(response)
+        )
+        reply = method.response_type(payload='hello')
+
+        self.assertIs(
+            self._client.process_packet(
+                _server_stream_packet(
+                    method, call.call_id, reply.SerializeToString()
+                )
+            ),
+            Status.OK,
+        )
+        self.assertEqual(responses, [reply])
+        self.assertEqual(len(callback_args), 1)
+        rpc, message, status = callback_args[0]
+        self.assertEqual(rpc.call_id, call.call_id)
+        self.assertIs(rpc.method, method)
+        self.assertEqual(message, reply)
+        self.assertIsNone(status)
+
+    def test_process_packet_stream_decode_error_for_pending_call(self) -> None:
+        method = self._client.method('pw.test1.PublicService.SomeBidiStreaming')
+        call = self._client.channel(
+            CLIENT_FIRST_CHANNEL_ID
+        ).rpcs.pw.test1.PublicService.SomeBidiStreaming.invoke()
+
+        self.assertIs(
+            self._client.process_packet(
+                _server_stream_packet(method, call.call_id, b'\xff')
+            ),
+            Status.OK,
+        )
+        self.assertIs(call.error, Status.DATA_LOSS)
+        self.assertEqual(
+            self._last_packet_sent().status, Status.DATA_LOSS.value
+        )
+
+    def test_process_packet_stream_raw_payload_for_pending_call(self) -> None:
+        method = self._client.method('pw.test1.PublicService.SomeBidiStreaming')
+        call = self._client.channel(
+            CLIENT_FIRST_CHANNEL_ID
+        ).rpcs.pw.test1.PublicService.SomeBidiStreaming.invoke(
+            payload_mode=packets.PayloadMode.RAW
+        )
+
+        self.assertIs(
+            self._client.process_packet(
+                _server_stream_packet(method, call.call_id, b'\xff')
+            ),
+            Status.OK,
+        )
+        self.assertIsNone(call.error)
+        self.assertEqual([b'\xff'], list(call.responses))
+
+    def test_process_packet_not_pending_skips_decoding(self) -> None:
+        method = self._client.method('pw.test1.PublicService.SomeUnary')
+
+        with mock.patch.object(
+            method.response_type, 'FromString'
+        ) as from_string, mock.patch.object(
+            packets, 'decode_payload'
+        ) as decode_payload:
+            self.assertIs(
+                self._client.process_packet(
+                    packets.encode_response(
+                        RpcIds(
+                            CLIENT_FIRST_CHANNEL_ID,
+                            method.service.id,
+                            method.id,
+                            SOME_CALL_ID,
+                        ),
+                        method.response_type(payload='hello'),
+                    )
+                ),
+                Status.OK,
+            )
+
+        from_string.assert_not_called()
+        decode_payload.assert_not_called()
+        self.assertEqual(
+            self._last_packet_sent().status, Status.FAILED_PRECONDITION.value
+        )
+
+    def test_process_packet_stream_after_cancel(self) -> None:
+        method = self._client.method('pw.test1.PublicService.SomeBidiStreaming')
+        call = self._client.channel(
+            CLIENT_FIRST_CHANNEL_ID
+        ).rpcs.pw.test1.PublicService.SomeBidiStreaming.invoke()
+        call.cancel()
+
+        self.assertIs(
+            self._client.process_packet(
+                _server_stream_packet(method, call.call_id, b'')
+            ),
+            Status.OK,
+        )
+        self.assertEqual(
+            self._last_packet_sent().status,
+            Status.FAILED_PRECONDITION.value,
+        )
+
 
 if __name__ == '__main__':
     unittest.main()
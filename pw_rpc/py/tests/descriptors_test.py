@@ -65,6 +65,10 @@ class MethodTest(unittest.TestCase):
                 self._method.request_type(), {'magic_number': 1}
             )
 
+    def test_get_request_with_both_empty_bytes_and_kwargs(self):
+        with self.assertRaisesRegex(TypeError, r'either'):
+            self._method.get_request(b'', {'magic_number': 1})
+
     def test_get_request_neither_message_nor_kwargs(self):
         self.assertEqual(
             self._method.request_type(), self._method.get_request(None, None)
@@ -95,5 +99,67 @@ class MethodTest(unittest.TestCase):
         self.assertIs(result, msg)
 
 
+class LazyDescriptorsTest(unittest.TestCase):
+    """Tests that services and methods are created when first used."""
+
+    def setUp(self):
+        (module,) = python_protos.compile_and_import_strings([TEST_PROTO])
+        self._service = descriptors.Service.from_descriptor(
+            module.DESCRIPTOR.services_by_name['PublicService']
+        )
+
+    def test_methods_created_on_first_access(self):
+        self.assertNotIn('methods', vars(self._service))
+        methods = self._service.methods
+        self.assertIs(methods, self._service.methods)
+        self.assertEqual(4, len(methods))
+
+    def test_method_attributes_resolved_on_first_access(self):
+        method = self._service.methods['SomeBidiStreaming']
+        self.assertNotIn('request_type', vars(method))
+        self.assertNotIn('_streaming', vars(method))
+
+        self.assertIs(method.Type.BIDIRECTIONAL_STREAMING, method.type)
+        self.assertEqual('SomeMessage', method.request_type.DESCRIPTOR.name)
+        self.assertEqual('AnotherMessage', method.response_type.DESCRIPTOR.name)
+        self.assertIs(method.request_type, method.request_type)
+
+    def test_streaming_attributes(self):
+        methods = self._service.methods
+        self.assertIs(methods['SomeUnary'].type, descriptors.Method.Type.UNARY)
+        self.assertIs(
+            methods['SomeServerStreaming'].type,
+            descriptors.Method.Type.SERVER_STREAMING,
+        )
+        self.assertIs(
+            methods['SomeClientStreaming'].type,
+            descriptors.Method.Type.CLIENT_STREAMING,
+        )
+
+    def test_lazy_accessor_creates_values_once(self):
+        created = []
+
+        def factory(method):
+            created.append(method)
+            return method.name.upper()
+
+        accessor = descriptors.ServiceAccessor(
+            self._service.methods, as_attrs='members', factory=factory
+        )
+        self.assertEqual([], created)
+        self.assertEqual(4, len(accessor))
+        self.assertIn('SomeUnary', accessor)
+
+        self.assertEqual('SOMEUNARY', accessor.SomeUnary)
+        self.assertEqual('SOMEUNARY', accessor['SomeUnary'])
+        self.assertEqual(1, len(created))
+
+        self.assertEqual(4, len(list(accessor)))
+        self.assertEqual(4, len(created))
+
+        with self.assertRaises(KeyError):
+            accessor['NotAMethod']  # pylint: disable=pointless-statement
+
+
 if __name__ == '__main__':
     unittest.main()
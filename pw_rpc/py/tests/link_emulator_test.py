@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests the link emulator channel manipulator."""
+
+import unittest
+from typing import List, Tuple
+
+from pw_rpc.link_emulator import LinkConfig, LinkEmulator, VirtualClock
+
+
+class VirtualClockTest(unittest.TestCase):
+    """Tests the virtual clock's event scheduling."""
+
+    def test_events_run_in_time_order(self) -> None:
+        clock = VirtualClock()
+        ran: List[Tuple[str, float]] = []
+
+        clock.call_at(2.0, lambda: ran.append(('b', clock.time())))
+        clock.call_at(1.0, lambda: ran.append(('a', clock.time())))
+        clock.call_at(2.0, lambda: ran.append(('c', clock.time())))
+
+        self.assertEqual(1, clock.advance(1.5))
+        self.assertEqual(1.5, clock.time())
+        self.assertEqual(2, clock.run_until_idle())
+        self.assertEqual([('a', 1.0), ('b', 2.0), ('c', 2.0)], ran)
+
+    def test_events_may_schedule_events(self) -> None:
+        clock = VirtualClock()
+        ticks: List[float] = []
+
+        def tick() -> None:
+            ticks.append(clock.time())
+            if len(ticks) < 3:
+                clock.call_later(0.5, tick)
+
+        clock.call_later(0.5, tick)
+        clock.run_until_idle()
+        self.assertEqual([0.5, 1.0, 1.5], ticks)
+
+
+class LinkEmulatorTest(unittest.TestCase):
+    """Tests shaping packets with LinkEmulator."""
+
+    def setUp(self) -> None:
+        self.clock = VirtualClock()
+        self.received: List[Tuple[float, bytes]] = []
+
+    def _link(self, config: LinkConfig, seed: int = 0) -> LinkEmulator:
+        self.clock = VirtualClock()
+        self.received = []
+
+        link = LinkEmulator(config, self.clock, seed=seed)
+        link.send_packet = lambda data: self.received.append(
+            (self.clock.time(), data)
+        )
+        return link
+
+    def test_serialization_delay(self) -> None:
+        link = self._link(LinkConfig.serial(baud=115200, latency_s=0.01))
+        link(b'?' * 1152)
+        link(b'!' * 1152)
+
+        self.assertEqual([], self.received)
+        self.clock.run_until_idle()
+
+        time_1, time_2 = (t for t, _ in self.received)
+        self.assertAlmostEqual(0.11, time_1)
+        self.assertAlmostEqual(0.21, time_2)
+
+    def test_idle_link_refills_burst(self) -> None:
+        link = self._link(LinkConfig(bandwidth_bps=8000, burst_bytes=100))
+        link(b'x' * 100)
+        link(b'x' * 100)
+        self.clock.run_until_idle()
+        self.assertEqual([0.0, 0.1], [t for t, _ in self.received])
+
+        self.clock.advance(10)
+        link(b'x' * 100)
+        self.clock.run_until_idle()
+        self.assertEqual(10.1, self.received[-1][0])
+
+    def test_fragments_to_mtu(self) -> None:
+        link = self._link(LinkConfig(mtu=10))
+        link(bytes(range(25)))
+        self.clock.run_until_idle()
+
+        self.assertEqual([10, 10, 5], [len(d) for _, d in self.received])
+        self.assertEqual(
+            bytes(range(25)), b''.join(d for _, d in self.received)
+        )
+        self.assertEqual(3, link.stats.fragments)
+
+    def test_jitter_keeps_order(self) -> None:
+        link = self._link(LinkConfig(latency_s=0.1, jitter_s=0.5), seed=3)
+        for i in range(100):
+            link(bytes([i]))
+            self.clock.advance(0.01)
+
+        self.clock.run_until_idle()
+        self.assertEqual(
+            list(range(100)), [data[0] for _, data in self.received]
+        )
+        times = [t for t, _ in self.received]
+        self.assertEqual(sorted(times), times)
+
+    def test_reordering(self) -> None:
+        link = self._link(
+            LinkConfig(reorder_probability=0.2, reorder_delay_s=0.05), seed=1
+        )
+        for i in range(100):
+            link(bytes([i]))
+            self.clock.advance(0.01)
+
+        self.clock.run_until_idle()
+        order = [data[0] for _, data in self.received]
+        self.assertEqual(list(range(100)), sorted(order))
+        self.assertNotEqual(list(range(100)), order)
+        self.assertGreater(link.stats.reordered, 0)
+
+    def test_same_seed_is_deterministic(self) -> None:
+        config = LinkConfig(
+            bandwidth_bps=9600,
+            jitter_s=0.2,
+            reorder_probability=0.3,
+            reorder_delay_s=0.5,
+        )
+
+        runs = []
+        for seed in (7, 7, 8):
+            link = self._link(config, seed)
+            for i in range(50):
+                link(bytes([i]) * 16)
+            self.clock.run_until_idle()
+            runs.append(self.received)
+
+        self.assertEqual(runs[0], runs[1])
+        self.assertNotEqual(runs[0], runs[2])
+
+    def test_hour_long_transfer(self) -> None:
+        """Simulates a stop-and-wait transfer of 40 MB at 115200 baud."""
+        clock = VirtualClock()
+        uart = LinkConfig.serial(baud=115200, latency_s=0.001, jitter_s=0.001)
+        to_device = LinkEmulator(uart, clock, seed=1)
+        to_host = LinkEmulator(uart, clock, seed=2)
+
+        chunk = b'\0' * 1024
+        remaining = [40 * 1024]
+
+        def send_next(_: bytes = b'') -> None:
+            if remaining[0]:
+                remaining[0] -= 1
+                to_device(chunk)
+
+        to_device.send_packet = lambda _: to_host(b'ack')
+        to_host.send_packet = send_next
+
+        send_next()
+        clock.run_until_idle()
+
+        self.assertEqual(0, remaining[0])
+        self.assertEqual(40 * 1024 * 1024, to_device.stats.bytes)
+        # 1027 bytes at 11520 bytes/s plus 2-4 ms latency per round trip.
+        self.assertGreater(clock.time(), 40 * 1024 * (1027 / 11520 + 0.002))
+        self.assertLess(clock.time(), 40 * 1024 * (1027 / 11520 + 0.004))
+        self.assertGreater(clock.time(), 3600)
+
+    def test_invalid_config(self) -> None:
+        with self.assertRaises(ValueError):
+            LinkConfig(bandwidth_bps=0)
+        with self.assertRaises(ValueError):
+            LinkConfig(mtu=0)
+        with self.assertRaises(ValueError):
+            LinkConfig(reorder_probability=2)
+        with self.assertRaises(ValueError):
+            LinkConfig(jitter_s=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Drives load through a pw_rpc Client and an in-process echo server.
+
+The client and server are connected by two simulated links, each of which
+delivers packets on its own thread. Links may drop, delay, duplicate, and
+reorder packets with a LossyChannel and may optionally frame packets with
+HDLC. Worker threads issue calls concurrently in one of several patterns:
+
+  unary          Bursts of unary echo calls.
+  server_stream  Server streams of --stream-length responses.
+  bidi           Bidirectional streams that echo --stream-length requests one
+                 at a time.
+
+For each pattern, the tool reports calls/s, p50/p99 call latency, and the
+number of timeouts and retransmissions. A timed-out unary call or bidi request
+is cancelled or resent up to --retries times before the call fails.
+"""
+
+import argparse
+from dataclasses import dataclass
+import json
+import logging
+from pathlib import Path
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pw_hdlc import decode, encode
+from pw_protobuf_compiler import python_protos
+from pw_status import Status
+
+from pw_rpc import callback_client, client, descriptors, metrics
+from pw_rpc.internal.packet_pb2 import PacketType, RpcPacket
+from pw_rpc.lossy_channel import LossyChannel, RandomLossGenerator
+
+_LOG = logging.getLogger('pw_rpc.load_benchmark')
+
+_PROTO = """\
+syntax = "proto3";
+
+package pw.rpc.load;
+
+message Payload {
+  bytes data = 1;
+}
+
+message StreamRequest {
+  uint32 count = 1;
+  uint32 size = 2;
+}
+
+service Load {
+  rpc Echo(Payload) returns (Payload) {}
+  rpc Stream(StreamRequest) returns (stream Payload) {}
+  rpc BidiEcho(stream Payload) returns (stream Payload) {}
+}
+"""
+
+_CHANNEL_ID = 1
+_HDLC_ADDRESS = ord('R')
+
+PATTERNS = ('unary', 'server_stream', 'bidi')
+
+
+class EchoServer:
+    """A minimal pw_rpc server for the pw.rpc.load.Load service."""
+
+    def __init__(
+        self, services: descriptors.Services, output: Callable[[bytes], Any]
+    ) -> None:
+        self._services = services
+        self._output = output
+
+    def _send(
+        self,
+        request: RpcPacket,
+        packet_type: PacketType.ValueType,
+        payload: bytes = b'',
+    ) -> None:
+        self._output(
+            RpcPacket(
+                type=packet_type,
+                channel_id=request.channel_id,
+                service_id=request.service_id,
+                method_id=request.method_id,
+                call_id=request.call_id,
+                status=Status.OK.value,
+                payload=payload,
+            ).SerializeToString()
+        )
+
+    def process_packet(self, data: bytes) -> None:
+        packet = RpcPacket.FromString(data)
+        try:
+            method = self._services[packet.service_id].methods[packet.method_id]
+        except KeyError:
+            _LOG.warning('Server received packet for unknown method')
+            return
+
+        if packet.type == PacketType.REQUEST:
+            if method.name == 'Echo':
+                self._send(packet, PacketType.RESPONSE, packet.payload)
+            elif method.name == 'Stream':
+                request = method.request_type.FromString(packet.payload)
+                payload = method.response_type(
+                    data=b'\xaa' * request.size
+                ).SerializeToString()
+                for _ in range(request.count):
+                    self._send(packet, PacketType.SERVER_STREAM, payload)
+                self._send(packet, PacketType.RESPONSE)
+        elif packet.type == PacketType.CLIENT_STREAM:
+            self._send(packet, PacketType.SERVER_STREAM, packet.payload)
+        elif packet.type == PacketType.CLIENT_REQUEST_COMPLETION:
+            self._send(packet, PacketType.RESPONSE)
+
+
+@dataclass(frozen=True)
+class LinkConfig:
+    """Impairments applied to each direction of the simulated link."""
+
+    drop_probability: float = 0.0
+    delay_probability: float = 0.0
+    delay_range_ms: Tuple[int, int] = (0, 0)
+    duplicate_probability: float = 0.0
+    reorder_probability: float = 0.0
+    seed: Optional[int] = None
+    hdlc: bool = False
+
+    def lossy(self) -> bool:
+        return any(
+            (
+                self.drop_probability,
+                self.delay_probability,
+                self.duplicate_probability,
+                self.reorder_probability,
+            )
+        )
+
+
+class _Link:
+    """Carries packets in one direction on a dedicated delivery thread."""
+
+    def __init__(
+        self,
+        name: str,
+        receive: Callable[[bytes], Any],
+        config: LinkConfig,
+        seed_offset: int,
+    ) -> None:
+        self._receive = receive
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._send_lock = threading.Lock()
+
+        self._lossy: Optional[LossyChannel] = None
+        if config.lossy():
+            self._lossy = LossyChannel(
+                name,
+                RandomLossGenerator(
+                    duplicated_packet_probability=config.duplicate_probability,
+                    max_duplications_per_packet=1,
+                    out_of_order_probability=config.reorder_probability,
+                    delayed_packet_probability=config.delay_probability,
+                    delayed_packet_range_ms=config.delay_range_ms,
+                    dropped_packet_probability=config.drop_probability,
+                    seed=None
+                    if config.seed is None
+                    else config.seed + seed_offset,
+                ),
+            )
+            self._lossy.send_packet = self._transmit
+
+        self._encode: Optional[Callable[[bytes], bytes]] = None
+        self._decode: Optional[Callable[[bytes], List[bytes]]] = None
+        if config.hdlc:
+            decoder = decode.FrameDecoder()
+            self._encode = lambda data: encode.ui_frame(_HDLC_ADDRESS, data)
+            self._decode = lambda data: [
+                frame.data for frame in decoder.process_valid_frames(data)
+            ]
+
+        self._thread = threading.Thread(
+            target=self._deliver, name=name, daemon=True
+        )
+        self._thread.start()
+
+    def send(self, packet: bytes) -> None:
+        if self._lossy is None:
+            self._transmit(packet)
+            return
+
+        # LossyChannel is not thread safe, and many threads invoke RPCs.
+        with self._send_lock:
+            self._lossy.process_and_send(packet)
+
+    def _transmit(self, packet: bytes) -> None:
+        self._queue.put(
+            packet if self._encode is None else self._encode(packet)
+        )
+
+    def _deliver(self) -> None:
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+
+            packets = [data] if self._decode is None else self._decode(data)
+            for packet in packets:
+                try:
+                    self._receive(packet)
+                except Exception:  # pylint: disable=broad-except
+                    _LOG.exception('Failed to process packet')
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+
+@dataclass(frozen=True)
+class LoadConfig:
+    """The load to generate for one pattern."""
+
+    concurrency: int = 4
+    calls_per_worker: int = 100
+    payload_size: int = 64
+    stream_length: int = 16
+    timeout_s: float = 0.5
+    retries: int = 2
+
+
+@dataclass(frozen=True)
+class PatternResult:
+    """Statistics from running one load pattern."""
+
+    pattern: str
+    calls: int
+    succeeded: int
+    timeouts: int
+    retransmissions: int
+    responses: int
+    lost_responses: int
+    elapsed_s: float
+    latency_us: metrics.HistogramSnapshot
+
+    @property
+    def failed(self) -> int:
+        return self.calls - self.succeeded
+
+    @property
+    def calls_per_s(self) -> float:
+        return self.succeeded / self.elapsed_s if self.elapsed_s else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'pattern': self.pattern,
+            'calls': self.calls,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'timeouts': self.timeouts,
+            'retransmissions': self.retransmissions,
+            'responses': self.responses,
+            'lost_responses': self.lost_responses,
+            'elapsed_s': self.elapsed_s,
+            'calls_per_s': self.calls_per_s,
+            'latency_us': self.latency_us.to_dict(),
+        }
+
+
+class _Stats:
+    """Statistics shared by the workers of one pattern."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.succeeded = 0
+        self.timeouts = 0
+        self.retransmissions = 0
+        self.responses = 0
+        self.lost_responses = 0
+        self.latency_us = metrics.Histogram()
+
+    def record_call(
+        self,
+        succeeded: bool,
+        start_ns: int,
+        timeouts: int = 0,
+        retransmissions: int = 0,
+        responses: int = 0,
+        lost_responses: int = 0,
+    ) -> None:
+        latency_us = (time.perf_counter_ns() - start_ns) // 1000
+        with self.lock:
+            self.calls += 1
+            self.succeeded += succeeded
+            self.timeouts += timeouts
+            self.retransmissions += retransmissions
+            self.responses += responses
+            self.lost_responses += lost_responses
+            if succeeded:
+                self.latency_us.record(latency_us)
+
+
+class LoadHarness:
+    """Connects a pw_rpc Client to an EchoServer over simulated links."""
+
+    def __init__(
+        self,
+        link: LinkConfig = LinkConfig(),
+        rpc_metrics: Optional[metrics.RpcMetrics] = None,
+    ) -> None:
+        protos = python_protos.Library.from_strings(_PROTO)
+        self._payload = protos.packages.pw.rpc.load.Payload
+
+        # The client's output link is created after the server's, since each
+        # link delivers to the other end.
+        self._to_client = _Link(
+            'server->client',
+            self._process_client_packet,
+            link,
+            seed_offset=1,
+        )
+        self.client = client.Client.from_modules(
+            callback_client.Impl(),
+            [client.Channel(_CHANNEL_ID, self._send_to_server)],
+            protos.modules(),
+            metrics=rpc_metrics,
+        )
+        self._server = EchoServer(self.client.services, self._to_client.send)
+        self._to_server = _Link(
+            'client->server', self._server.process_packet, link, seed_offset=0
+        )
+        self._service = self.client.channel(_CHANNEL_ID).rpcs.pw.rpc.load.Load
+
+    def _process_client_packet(self, packet: bytes) -> None:
+        self.client.process_packet(packet)
+
+    def _send_to_server(self, packet: bytes) -> None:
+        self._to_server.send(packet)
+
+    def close(self) -> None:
+        self._to_server.close()
+        self._to_client.close()
+
+    def __enter__(self) -> 'LoadHarness':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def run(self, pattern: str, config: LoadConfig) -> PatternResult:
+        """Runs one load pattern to completion."""
+        worker = {
+            'unary': self._unary_worker,
+            'server_stream': self._server_stream_worker,
+            'bidi': self._bidi_worker,
+        }[pattern]
+
+        stats = _Stats()
+        threads = [
+            threading.Thread(target=worker, args=(config, stats), daemon=True)
+            for _ in range(config.concurrency)
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed_s = time.perf_counter() - start
+
+        return PatternResult(
+            pattern=pattern,
+            calls=stats.calls,
+            succeeded=stats.succeeded,
+            timeouts=stats.timeouts,
+            retransmissions=stats.retransmissions,
+            responses=stats.responses,
+            lost_responses=stats.lost_responses,
+            elapsed_s=elapsed_s,
+            latency_us=stats.latency_us.snapshot(),
+        )
+
+    def _unary_worker(self, config: LoadConfig, stats: _Stats) -> None:
+        data = b'\x55' * config.payload_size
+
+        for _ in range(config.calls_per_worker):
+            start_ns = time.perf_counter_ns()
+            attempts = 0
+            timeouts = 0
+            succeeded = False
+
+            for _ in range(config.retries + 1):
+                attempts += 1
+                call = self._service.Echo.invoke(self._payload(data=data))
+                try:
+                    status, _ = call.wait(config.timeout_s)
+                    succeeded = status.ok()
+                    break
+                except callback_client.RpcTimeout:
+                    timeouts += 1
+                    call.cancel()
+                except callback_client.RpcError:
+                    break
+
+            stats.record_call(
+                succeeded,
+                start_ns,
+                timeouts=timeouts,
+                retransmissions=attempts - 1,
+                responses=int(succeeded),
+            )
+
+    def _server_stream_worker(self, config: LoadConfig, stats: _Stats) -> None:
+        for _ in range(config.calls_per_worker):
+            start_ns = time.perf_counter_ns()
+            received = 0
+            timeouts = 0
+            succeeded = False
+
+            call = self._service.Stream.invoke(
+                request_args=dict(
+                    count=config.stream_length, size=config.payload_size
+                ),
+                response_buffer=callback_client.ResponseBuffer(
+                    max_size=config.stream_length
+                ),
+            )
+            try:
+                for _ in call.get_responses(timeout_s=config.timeout_s):
+                    received += 1
+                succeeded = call.status is not None and call.status.ok()
+            except callback_client.RpcTimeout:
+                timeouts += 1
+                call.cancel()
+            except callback_client.RpcError:
+                pass
+
+            stats.record_call(
+                succeeded and received == config.stream_length,
+                start_ns,
+                timeouts=timeouts,
+                responses=received,
+                lost_responses=max(0, config.stream_length - received),
+            )
+
+    def _bidi_worker(self, config: LoadConfig, stats: _Stats) -> None:
+        data = b'\x55' * config.payload_size
+
+        for _ in range(config.calls_per_worker):
+            start_ns = time.perf_counter_ns()
+            received = 0
+            timeouts = 0
+            retransmissions = 0
+
+            succeeded = False
+            call = self._service.BidiEcho.invoke()
+            try:
+                for _ in range(config.stream_length):
+                    echoed, attempts = self._bidi_echo(call, data, config)
+                    retransmissions += attempts - 1
+                    timeouts += attempts - echoed
+                    if not echoed:
+                        break
+                    received += 1
+                else:
+                    call.finish_and_wait(timeout_s=config.timeout_s)
+                    succeeded = True
+            except callback_client.RpcTimeout:
+                timeouts += 1
+            except (callback_client.RpcError, client.Error):
+                pass
+
+            call.cancel()
+
+            stats.record_call(
+                succeeded,
+                start_ns,
+                timeouts=timeouts,
+                retransmissions=retransmissions,
+                responses=received,
+                lost_responses=max(0, config.stream_length - received),
+            )
+
+    def _bidi_echo(
+        self, call, data: bytes, config: LoadConfig
+    ) -> Tuple[bool, int]:
+        """Sends a request until it is echoed; returns (echoed, attempts)."""
+        request = self._payload(data=data)
+
+        for attempt in range(1, config.retries + 2):
+            call.send(request)
+            try:
+                for _ in call.get_responses(
+                    count=1, timeout_s=config.timeout_s
+                ):
+                    return True, attempt
+                return False, attempt  # The call completed unexpectedly.
+            except callback_client.RpcTimeout:
+                pass
+
+        return False, config.retries + 1
+
+
+def _print_results(results: List[PatternResult]) -> None:
+    header = (
+        f'{"pattern":<14} {"calls":>7} {"failed":>7} {"calls/s":>10} '
+        f'{"p50 us":>9} {"p99 us":>9} {"timeouts":>9} {"retrans":>8} '
+        f'{"lost rsp":>9}'
+    )
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(
+            f'{result.pattern:<14} {result.calls:>7} {result.failed:>7} '
+            f'{result.calls_per_s:>10.1f} '
+            f'{result.latency_us.percentile(50):>9} '
+            f'{result.latency_us.percentile(99):>9} '
+            f'{result.timeouts:>9} {result.retransmissions:>8} '
+            f'{result.lost_responses:>9}'
+        )
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--pattern',
+        choices=(*PATTERNS, 'all'),
+        default='all',
+        help='Load pattern to run',
+    )
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--calls', type=int, default=100, dest='calls')
+    parser.add_argument('--payload-size', type=int, default=64)
+    parser.add_argument('--stream-length', type=int, default=16)
+    parser.add_argument('--timeout', type=float, default=0.5)
+    parser.add_argument('--retries', type=int, default=2)
+    parser.add_argument(
+        '--drop', type=float, default=0.0, help='Packet drop probability'
+    )
+    parser.add_argument(
+        '--delay', type=float, default=0.0, help='Packet delay probability'
+    )
+    parser.add_argument(
+        '--delay-ms',
+        type=int,
+        nargs=2,
+        default=(1, 5),
+        metavar=('MIN', 'MAX'),
+        help='Range of packet delays',
+    )
+    parser.add_argument(
+        '--duplicate',
+        type=float,
+        default=0.0,
+        help='Packet duplication probability',
+    )
+    parser.add_argument(
+        '--reorder', type=float, default=0.0, help='Packet reorder probability'
+    )
+    parser.add_argument('--seed', type=int, help='Seed for link impairments')
+    parser.add_argument(
+        '--hdlc', action='store_true', help='Frame packets with HDLC'
+    )
+    parser.add_argument(
+        '--json',
+        type=Path,
+        help='Write results and pw_rpc client metrics to this JSON file',
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Runs the load patterns and prints the results."""
+    args = _parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    link = LinkConfig(
+        drop_probability=args.drop,
+        delay_probability=args.delay,
+        delay_range_ms=tuple(args.delay_ms),
+        duplicate_probability=args.duplicate,
+        reorder_probability=args.reorder,
+        seed=args.seed,
+        hdlc=args.hdlc,
+    )
+    config = LoadConfig(
+        concurrency=args.concurrency,
+        calls_per_worker=args.calls,
+        payload_size=args.payload_size,
+        stream_length=args.stream_length,
+        timeout_s=args.timeout,
+        retries=args.retries,
+    )
+    rpc_metrics = metrics.RpcMetrics()
+
+    with LoadHarness(link, rpc_metrics) as harness:
+        patterns = PATTERNS if args.pattern == 'all' else (args.pattern,)
+        results = [harness.run(pattern, config) for pattern in patterns]
+
+    _print_results(results)
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                {
+                    'results': [result.to_dict() for result in results],
+                    'client_metrics': json.loads(rpc_metrics.to_json()),
+                },
+                indent=2,
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests pw_rpc client metrics."""
+
+import json
+import unittest
+from typing import List
+
+from pw_protobuf_compiler import python_protos
+from pw_status import Status
+
+from pw_rpc import callback_client, client
+from pw_rpc.internal.packet_pb2 import PacketType, RpcPacket
+from pw_rpc.metrics import Histogram, RpcMetrics
+
+TEST_PROTO = """\
+syntax = "proto3";
+
+package pw.test_metrics;
+
+message Message {
+  string payload = 1;
+}
+
+service Service {
+  rpc Unary(Message) returns (Message) {}
+  rpc ServerStream(Message) returns (stream Message) {}
+}
+"""
+
+CHANNEL_ID = 5
+
+
+class HistogramTest(unittest.TestCase):
+    """Tests the log-bucketed histogram."""
+
+    def test_small_values_are_exact(self) -> None:
+        histogram = Histogram(sub_bucket_bits=4)
+        for value in range(16):
+            histogram.record(value)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(16, snapshot.count)
+        self.assertEqual(0, snapshot.min)
+        self.assertEqual(15, snapshot.max)
+        self.assertEqual(7.5, snapshot.mean)
+        self.assertEqual(7, snapshot.percentile(50))
+        self.assertEqual(15, snapshot.percentile(100))
+        self.assertTrue(all(low == high for low, high, _ in snapshot.buckets))
+
+    def test_buckets_cover_values_without_gaps(self) -> None:
+        histogram = Histogram(sub_bucket_bits=3)
+        previous_high = -1
+        for index in range(200):
+            low, high = histogram.bucket_range(index)
+            self.assertEqual(previous_high + 1, low)
+            previous_high = high
+
+    def test_large_values_within_precision(self) -> None:
+        histogram = Histogram(sub_bucket_bits=5)
+        for value in (1_000, 12_345, 1_000_000, 2**40 + 17):
+            histogram.record(value)
+            low, high, _ = histogram.snapshot().buckets[-1]
+            self.assertLessEqual(low, value)
+            self.assertLessEqual(value, high)
+            self.assertLessEqual(high - low, value / 32)
+
+    def test_percentiles(self) -> None:
+        histogram = Histogram()
+        for value in range(1, 1001):
+            histogram.record(value)
+
+        snapshot = histogram.snapshot()
+        self.assertAlmostEqual(500, snapshot.percentile(50), delta=500 / 32)
+        self.assertAlmostEqual(990, snapshot.percentile(99), delta=990 / 32)
+        self.assertEqual(1000, snapshot.percentile(100))
+
+        with self.assertRaises(ValueError):
+            snapshot.percentile(101)
+
+    def test_empty(self) -> None:
+        snapshot = Histogram().snapshot()
+        self.assertEqual(0, snapshot.count)
+        self.assertEqual(0, snapshot.percentile(99))
+        self.assertEqual(0.0, snapshot.mean)
+
+
+class ClientMetricsTest(unittest.TestCase):
+    """Tests metrics collected by a pw_rpc Client."""
+
+    def setUp(self) -> None:
+        self._now_ns = 0
+        self._metrics = RpcMetrics(clock_ns=lambda: self._now_ns)
+        self._sent: List[bytes] = []
+
+        protos = python_protos.Library.from_strings(TEST_PROTO)
+        self._message = protos.packages.pw.test_metrics.Message
+        self._client = client.Client.from_modules(
+            callback_client.Impl(),
+            [client.Channel(CHANNEL_ID, self._sent.append)],
+            protos.modules(),
+            metrics=self._metrics,
+        )
+        self._service = self._client.channel(
+            CHANNEL_ID
+        ).rpcs.pw.test_metrics.Service
+
+    def _packet(
+        self,
+        packet_type: PacketType.ValueType,
+        call,
+        payload: str = '',
+        status: Status = Status.OK,
+    ) -> bytes:
+        return RpcPacket(
+            type=packet_type,
+            channel_id=CHANNEL_ID,
+            service_id=call.method.service.id,
+            method_id=call.method.id,
+            call_id=call.call_id,
+            status=status.value,
+            payload=self._message(payload=payload).SerializeToString(),
+        ).SerializeToString()
+
+    def _process(self, packet: bytes, advance_us: int = 0) -> None:
+        self._now_ns += advance_us * 1000
+        self.assertIs(Status.OK, self._client.process_packet(packet))
+
+    def _method(self, name: str):
+        (snapshot,) = (
+            s
+            for s in self._metrics.snapshot()
+            if s.name == f'pw.test_metrics.Service.{name}'
+        )
+        return snapshot
+
+    def test_disabled_by_default(self) -> None:
+        rpc_client = client.Client.from_modules(
+            callback_client.Impl(), [client.Channel(1, lambda _: None)], []
+        )
+        self.assertIsNone(rpc_client.metrics)
+
+    def test_unary(self) -> None:
+        call = self._service.Unary.invoke()
+        response = self._packet(PacketType.RESPONSE, call, 'hello')
+        self._process(response, advance_us=250)
+
+        method = self._method('Unary')
+        self.assertEqual(CHANNEL_ID, method.channel_id)
+        self.assertEqual(1, method.calls)
+        self.assertEqual(1, method.completed)
+        self.assertEqual(1, method.responses)
+        self.assertEqual(len(self._sent[0]), method.bytes_out)
+        self.assertEqual(len(response), method.bytes_in)
+        self.assertEqual(250, method.first_response_latency_us.max)
+        self.assertEqual(250, method.call_duration_us.max)
+        self.assertEqual(7, method.response_size_bytes.max)
+
+    def test_server_stream_gaps(self) -> None:
+        call = self._service.ServerStream.invoke()
+        self._process(self._packet(PacketType.SERVER_STREAM, call, 'a'), 100)
+        self._process(self._packet(PacketType.SERVER_STREAM, call, 'b'), 10)
+        self._process(self._packet(PacketType.SERVER_STREAM, call, 'c'), 20)
+        self._process(self._packet(PacketType.RESPONSE, call), 5)
+
+        method = self._method('ServerStream')
+        self.assertEqual(3, method.responses)
+        self.assertEqual(1, method.completed)
+        self.assertEqual(100, method.first_response_latency_us.max)
+        self.assertEqual(2, method.response_gap_us.count)
+        self.assertEqual(10, method.response_gap_us.min)
+        self.assertEqual(20, method.response_gap_us.max)
+        self.assertEqual(135, method.call_duration_us.max)
+
+    def test_errors_by_status(self) -> None:
+        for _ in range(2):
+            call = self._service.Unary.invoke()
+            self._process(
+                self._packet(
+                    PacketType.SERVER_ERROR, call, status=Status.UNAVAILABLE
+                )
+            )
+
+        call = self._service.Unary.invoke()
+        call.cancel()
+
+        method = self._method('Unary')
+        self.assertEqual(3, method.calls)
+        self.assertEqual(0, method.completed)
+        self.assertEqual(1, method.cancelled)
+        self.assertEqual({'UNAVAILABLE': 2}, method.errors)
+        self.assertEqual(sum(len(p) for p in self._sent), method.bytes_out)
+
+    def test_to_json(self) -> None:
+        call = self._service.Unary.invoke()
+        self._process(self._packet(PacketType.RESPONSE, call, 'x'), 42)
+
+        exported = json.loads(self._metrics.to_json())
+        (method,) = exported['methods']
+        self.assertEqual('pw.test_metrics.Service.Unary', method['name'])
+        self.assertEqual(1, method['completed'])
+        self.assertEqual(42, method['first_response_latency_us']['p99'])
+        self.assertEqual([[42, 42, 1]], method['call_duration_us']['buckets'])
+
+    def test_reset(self) -> None:
+        self._service.Unary.invoke()
+        self._metrics.reset()
+        self.assertEqual([], self._metrics.snapshot())
+
+
+if __name__ == '__main__':
+    unittest.main()
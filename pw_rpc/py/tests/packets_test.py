@@ -16,6 +16,7 @@
 
 import unittest
 
+from google.protobuf import message
 from pw_status import Status
 
 from pw_rpc.internal.packet_pb2 import PacketType, RpcPacket
@@ -51,6 +52,24 @@ class PacketsTest(unittest.TestCase):
 
         self.assertEqual(_TEST_REQUEST, packet)
 
+    def test_encode_serialized_request(self):
+        data = packets.encode_request(
+            _TEST_IDS, RpcPacket(status=_TEST_STATUS).SerializeToString()
+        )
+        packet = RpcPacket()
+        packet.ParseFromString(data)
+
+        self.assertEqual(_TEST_REQUEST, packet)
+
+    def test_encode_serialized_client_stream(self):
+        payload = RpcPacket(status=_TEST_STATUS).SerializeToString()
+        packet = RpcPacket.FromString(
+            packets.encode_client_stream(_TEST_IDS, payload)
+        )
+
+        self.assertEqual(packet.type, PacketType.CLIENT_STREAM)
+        self.assertEqual(packet.payload, payload)
+
     def test_encode_response(self):
         data = packets.encode_response(
             _TEST_IDS, RpcPacket(status=_TEST_STATUS)
@@ -106,5 +125,50 @@ class PacketsTest(unittest.TestCase):
         self.assertFalse(packets.for_server(_TEST_RESPONSE))
 
 
+class LazyPayloadTest(unittest.TestCase):
+    """Tests deferred payload decoding."""
+
+    def setUp(self) -> None:
+        self._data = _TEST_RESPONSE.SerializeToString()
+        self._payload = packets.LazyPayload(self._data, RpcPacket)
+
+    def test_not_decoded_until_used(self) -> None:
+        self.assertFalse(self._payload.decoded())
+        self.assertEqual(self._data, bytes(self._payload))
+        self.assertEqual(self._data, self._payload.data)
+        self.assertIn('pw.rpc.internal.RpcPacket', repr(self._payload))
+        self.assertFalse(self._payload.decoded())
+
+    def test_attribute_access_decodes(self) -> None:
+        self.assertEqual(_TEST_IDS.call_id, self._payload.call_id)
+        self.assertTrue(self._payload.decoded())
+        self.assertIs(self._payload.decode(), self._payload.decode())
+        self.assertEqual(self._payload, _TEST_RESPONSE)
+
+    def test_equality(self) -> None:
+        self.assertEqual(
+            packets.LazyPayload(self._data, RpcPacket), self._payload
+        )
+        self.assertNotEqual(
+            packets.LazyPayload(_TEST_REQUEST.SerializeToString(), RpcPacket),
+            self._payload,
+        )
+
+    def test_decode_error_raised_on_use(self) -> None:
+        payload = packets.LazyPayload(b'\xff', RpcPacket)
+        with self.assertRaises(message.DecodeError):
+            _ = payload.call_id
+
+    def test_payload_decoder(self) -> None:
+        decode = packets.payload_decoder(RpcPacket, packets.PayloadMode.MESSAGE)
+        self.assertEqual(_TEST_RESPONSE, decode(self._data))
+
+        decode = packets.payload_decoder(RpcPacket, packets.PayloadMode.LAZY)
+        self.assertIsInstance(decode(self._data), packets.LazyPayload)
+
+        decode = packets.payload_decoder(RpcPacket, packets.PayloadMode.RAW)
+        self.assertEqual(self._data, decode(self._data))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests the pw_rpc protoc plugin and its codegen cache."""
+
+import os
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+from google.protobuf.compiler import plugin_pb2
+from google.protobuf.descriptor_pb2 import FileDescriptorProto
+from pw_protobuf import codegen_cache, options, symbol_name_mapping
+from pw_protobuf_compiler import python_protos
+
+from pw_rpc import codegen_pwpb, codegen_raw, ids, plugin
+
+TEST_PROTO = """\
+syntax = "proto3";
+
+package pw.test_plugin;
+
+message Message {
+  uint32 value = 1;
+}
+
+service Service {
+  rpc Unary(Message) returns (Message) {}
+  rpc ServerStream(Message) returns (stream Message) {}
+}
+"""
+
+
+_PROTO_FILES = [
+    FileDescriptorProto.FromString(module.DESCRIPTOR.serialized_pb)
+    for module in python_protos.Library.from_strings(
+        [TEST_PROTO, TEST_PROTO.replace('test_plugin', 'test_plugin_2')]
+    ).modules()
+]
+
+
+def _request(index: int = 0) -> plugin_pb2.CodeGeneratorRequest:
+    request = plugin_pb2.CodeGeneratorRequest()
+    request.proto_file.append(_PROTO_FILES[index])
+    return request
+
+
+def _generate(
+    codegen: plugin.Codegen, request: plugin_pb2.CodeGeneratorRequest
+) -> plugin_pb2.CodeGeneratorResponse:
+    response = plugin_pb2.CodeGeneratorResponse()
+    plugin.process_proto_request(codegen, request, response)
+    return response
+
+
+def _without_timestamp(response: plugin_pb2.CodeGeneratorResponse):
+    """pw_rpc headers record when they were generated, so ignore that line."""
+    return [
+        (
+            file.name,
+            [
+                l
+                for l in file.content.splitlines()
+                if not l.startswith('// on ')
+            ],
+        )
+        for file in response.file
+    ]
+
+
+class PluginCacheTest(unittest.TestCase):
+    """Tests caching generated code across plugin invocations."""
+
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._cache_dir = Path(self._temp_dir.name)
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def _cache_entries(self):
+        return sorted(self._cache_dir.glob('*/*.pb'))
+
+    def test_disabled_without_environment_variable(self) -> None:
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertIsNone(codegen_cache.from_environment('test', plugin))
+            response = _generate(plugin.Codegen.RAW, _request())
+
+        self.assertEqual(1, len(response.file))
+        self.assertEqual([], self._cache_entries())
+
+    def test_cached_output_matches_generated_output(self) -> None:
+        uncached = _generate(plugin.Codegen.PWPB, _request())
+
+        env = {codegen_cache.CACHE_DIR_ENV_VAR: str(self._cache_dir)}
+        with mock.patch.dict(os.environ, env):
+            first = _generate(plugin.Codegen.PWPB, _request())
+            self.assertEqual(1, len(self._cache_entries()))
+
+            with mock.patch.object(
+                codegen_pwpb, 'process_proto_file'
+            ) as process_proto_file:
+                second = _generate(plugin.Codegen.PWPB, _request())
+
+        process_proto_file.assert_not_called()
+        self.assertEqual(
+            _without_timestamp(uncached), _without_timestamp(first)
+        )
+        self.assertEqual(first, second)
+
+    def test_generators_and_protos_have_separate_entries(self) -> None:
+        env = {codegen_cache.CACHE_DIR_ENV_VAR: str(self._cache_dir)}
+        with mock.patch.dict(os.environ, env):
+            raw = _generate(plugin.Codegen.RAW, _request())
+            pwpb = _generate(plugin.Codegen.PWPB, _request())
+            changed = _generate(plugin.Codegen.RAW, _request(1))
+
+        self.assertEqual(3, len(self._cache_entries()))
+        self.assertNotEqual(raw, pwpb)
+        self.assertNotEqual(raw, changed)
+
+    def test_corrupt_entry_is_regenerated(self) -> None:
+        env = {codegen_cache.CACHE_DIR_ENV_VAR: str(self._cache_dir)}
+        with mock.patch.dict(os.environ, env):
+            expected = _generate(plugin.Codegen.RAW, _request())
+            (entry,) = self._cache_entries()
+            entry.write_bytes(b'\xff\xff')
+
+            with self.assertLogs(codegen_cache.__name__, 'WARNING'):
+                regenerated = _generate(plugin.Codegen.RAW, _request())
+
+        self.assertEqual(
+            _without_timestamp(expected), _without_timestamp(regenerated)
+        )
+
+    def test_cache_version_covers_generator_dependencies(self) -> None:
+        with mock.patch.object(
+            codegen_cache, 'from_environment', return_value=None
+        ) as from_environment:
+            _generate(plugin.Codegen.RAW, _request())
+
+        _name, *modules = from_environment.call_args.args
+        for module in (codegen_raw, ids, options, symbol_name_mapping):
+            self.assertIn(module, modules)
+
+    def test_cache_key_includes_generator_version(self) -> None:
+        request = _request()
+        old = codegen_cache.CodegenCache(self._cache_dir, 'raw', 'v1')
+        new = codegen_cache.CodegenCache(self._cache_dir, 'raw', 'v2')
+
+        files = old.generate(
+            request.proto_file[0],
+            (),
+            lambda: codegen_raw.process_proto_file(request.proto_file[0]),
+        )
+        self.assertIsNone(new.get(new.key(request.proto_file[0])))
+        self.assertEqual(files, old.get(old.key(request.proto_file[0])))
+        self.assertEqual((0, 1), (old.hits, old.misses))
+
+
+if __name__ == '__main__':
+    unittest.main()
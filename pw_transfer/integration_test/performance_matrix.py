@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Measures pw_transfer performance across a matrix of link conditions.
+
+Usage:
+
+   bazel run pw_transfer/integration_test:performance_matrix -- \
+       --clients python cpp --bandwidth 0 20000 --loss 0 0.02 \
+       --output after.json --baseline before.json
+
+Every combination of client, direction, bandwidth, loss, window size, and chunk
+size transfers a payload between the client and the server through the proxy.
+The window size of reads is only configurable for the Python client, so other
+clients' reads run with the first window size only. The chunk size sets the
+server's chunk buffer and the largest chunk the Python client requests in
+reads; other clients' reads are also limited by their own fixed maximum chunk
+size. The time each client takes to complete its transfer, and the resulting
+throughput, are printed and optionally saved as JSON. The results of an earlier
+run can be passed with --baseline to compare the two, which shows the effect of
+a change on transfer speed.
+
+Each run of a combination uses the same payload and loss pattern, so runs are
+comparable across builds. Client run times include process startup, so use
+payloads large enough for the transfer to dominate.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import itertools
+import json
+import logging
+from pathlib import Path
+import random
+import statistics
+import sys
+import tempfile
+from typing import Dict, Iterable, List, Optional
+
+from pigweed.pw_transfer.integration_test import config_pb2
+import test_fixture
+from test_fixture import TransferIntegrationTestHarness
+
+_LOG = logging.getLogger('pw_transfer_performance_matrix')
+_LOG.level = logging.INFO
+_LOG.addHandler(logging.StreamHandler(sys.stdout))
+
+_RESOURCE_ID = 7
+
+_DIRECTIONS = {
+    'read': config_pb2.TransferAction.TransferType.READ_FROM_SERVER,
+    'write': config_pb2.TransferAction.TransferType.WRITE_TO_SERVER,
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class Case:
+    """One combination of settings in the matrix."""
+
+    client: str
+    direction: str
+    # Link bandwidth in each direction, in bytes per second. 0 is unlimited.
+    bandwidth: float
+    # Fraction of packets dropped in each direction.
+    loss: float
+    window_bytes: int
+    chunk_bytes: int
+
+    def window_applies(self) -> bool:
+        """Whether window_bytes configures this case.
+
+        Writes use the server's window. Only the Python client's read window
+        can be set.
+        """
+        return self.direction == 'write' or self.client == 'python'
+
+    def key(self) -> str:
+        """Identifies the case when comparing runs."""
+        return (
+            f'{self.client}/{self.direction}/bw={self.bandwidth:g}/'
+            f'loss={self.loss:g}/window={self.window_bytes}/'
+            f'chunk={self.chunk_bytes}'
+        )
+
+
+@dataclasses.dataclass
+class Result:
+    """Measurements of one case."""
+
+    case: Case
+    payload_bytes: int
+    # Client run times of the successful transfers.
+    elapsed_s: List[float] = dataclasses.field(default_factory=list)
+    failures: int = 0
+
+    def median_s(self) -> Optional[float]:
+        return statistics.median(self.elapsed_s) if self.elapsed_s else None
+
+    def throughput(self) -> Optional[float]:
+        """Median throughput, in bytes per second."""
+        median = self.median_s()
+        return None if not median else self.payload_bytes / median
+
+    def to_json(self) -> dict:
+        return {
+            **dataclasses.asdict(self.case),
+            'payload_bytes': self.payload_bytes,
+            'elapsed_s': self.elapsed_s,
+            'failures': self.failures,
+        }
+
+    @classmethod
+    def from_json(cls, fields: dict) -> 'Result':
+        case = Case(
+            **{f.name: fields[f.name] for f in dataclasses.fields(Case)}
+        )
+        return cls(
+            case,
+            fields['payload_bytes'],
+            list(fields['elapsed_s']),
+            fields['failures'],
+        )
+
+
+def _proxy_config(case: Case, seed: int) -> config_pb2.ProxyConfig:
+    config = config_pb2.ProxyConfig()
+
+    for i, stack in enumerate(
+        (config.client_filter_stack, config.server_filter_stack)
+    ):
+        stack.add(hdlc_packetizer=config_pb2.HdlcPacketizerConfig())
+        if case.bandwidth:
+            stack.add().rate_limiter.rate = case.bandwidth
+        if case.loss:
+            dropper = stack.add().data_dropper
+            dropper.rate = case.loss
+            dropper.seed = seed + i
+
+    return config
+
+
+def _run_transfer(
+    harness: TransferIntegrationTestHarness,
+    case: Case,
+    payload: bytes,
+    seed: int,
+) -> Optional[float]:
+    """Performs one transfer and returns the client's run time if it passed."""
+    server_config = test_fixture.TransferIntegrationTest.default_server_config()
+    server_config.chunk_size_bytes = case.chunk_bytes
+    server_config.pending_bytes = case.window_bytes
+
+    client_config = test_fixture.TransferIntegrationTest.default_client_config()
+    client_config.read_window_size_bytes = case.window_bytes
+    client_config.read_max_chunk_size_bytes = case.chunk_bytes
+
+    with tempfile.TemporaryDirectory() as directory:
+        server_file = Path(directory, 'server')
+        client_file = Path(directory, 'client')
+
+        resource = server_config.resources[_RESOURCE_ID]
+        if case.direction == 'read':
+            server_file.write_bytes(payload)
+            resource.source_paths.append(str(server_file))
+            received = client_file
+        else:
+            client_file.write_bytes(payload)
+            resource.destination_paths.append(str(server_file))
+            received = server_file
+
+        client_config.transfer_actions.append(
+            config_pb2.TransferAction(
+                resource_id=_RESOURCE_ID,
+                file_path=str(client_file),
+                transfer_type=_DIRECTIONS[case.direction],
+            )
+        )
+
+        exit_codes = asyncio.run(
+            harness.perform_transfers(
+                server_config,
+                case.client,
+                client_config,
+                _proxy_config(case, seed),
+            )
+        )
+
+        if exit_codes.client != 0 or exit_codes.server != 0:
+            _LOG.warning(
+                '%s failed: client exited with %s, server with %s',
+                case.key(),
+                exit_codes.client,
+                exit_codes.server,
+            )
+            return None
+
+        if not received.exists() or received.read_bytes() != payload:
+            _LOG.warning('%s transferred incorrect data', case.key())
+            return None
+
+        return exit_codes.client_elapsed_s
+
+
+def _format_rate(bytes_per_s: Optional[float]) -> str:
+    if bytes_per_s is None:
+        return '-'
+    if bytes_per_s >= 1e6:
+        return f'{bytes_per_s / 1e6:.2f} MB/s'
+    return f'{bytes_per_s / 1e3:.1f} kB/s'
+
+
+def _compare(result: Result, baseline: Optional[Result]) -> str:
+    """Describes the change in median time from the baseline."""
+    if baseline is None:
+        return 'new'
+
+    before, after = baseline.median_s(), result.median_s()
+    if before is None or after is None:
+        return f'failures {baseline.failures} -> {result.failures}'
+
+    return f'{(after - before) / before:+.1%} time'
+
+
+def print_results(
+    results: Iterable[Result], baseline: Dict[str, Result]
+) -> None:
+    """Prints a table of results, compared to the baseline if provided."""
+    columns = (
+        'client',
+        'dir',
+        'bandwidth',
+        'loss',
+        'window',
+        'chunk',
+        'time',
+        'throughput',
+        'fails',
+    )
+    rows = []
+    for result in results:
+        case = result.case
+        median = result.median_s()
+        row = [
+            case.client,
+            case.direction,
+            _format_rate(case.bandwidth) if case.bandwidth else 'unlimited',
+            f'{case.loss:.1%}',
+            str(case.window_bytes) if case.window_applies() else 'n/a',
+            str(case.chunk_bytes),
+            '-' if median is None else f'{median:.3f} s',
+            _format_rate(result.throughput()),
+            str(result.failures),
+        ]
+        if baseline:
+            row.append(_compare(result, baseline.get(case.key())))
+        rows.append(row)
+
+    if baseline:
+        columns += ('vs. baseline',)
+
+    widths = [
+        max(len(row[i]) for row in [list(columns), *rows])
+        for i in range(len(columns))
+    ]
+    for row in [list(columns), *rows]:
+        cells = (cell.ljust(width) for cell, width in zip(row, widths))
+        print('  '.join(cells).rstrip())
+
+
+def run_matrix(
+    harness: TransferIntegrationTestHarness,
+    cases: Iterable[Case],
+    payload_bytes: int,
+    repeat: int,
+    seed: int,
+) -> List[Result]:
+    """Runs every case repeat times."""
+    payload = random.Random(seed).randbytes(payload_bytes)
+
+    results = []
+    for case in cases:
+        result = Result(case, payload_bytes)
+        for run in range(repeat):
+            elapsed_s = _run_transfer(harness, case, payload, seed + 2 * run)
+            if elapsed_s is None:
+                result.failures += 1
+            else:
+                result.elapsed_s.append(elapsed_s)
+
+        _LOG.info('%s: %s', case.key(), _format_rate(result.throughput()))
+        results.append(result)
+
+    return results
+
+
+def matrix_cases(
+    clients: Iterable[str],
+    directions: Iterable[str],
+    bandwidths: Iterable[float],
+    losses: Iterable[float],
+    window_sizes: List[int],
+    chunk_sizes: Iterable[int],
+) -> List[Case]:
+    """Returns every combination of settings that changes the transfer."""
+    cases = [
+        Case(*values)
+        for values in itertools.product(
+            clients, directions, bandwidths, losses, window_sizes, chunk_sizes
+        )
+    ]
+    # Other window sizes would repeat the same transfer.
+    return [
+        case
+        for case in cases
+        if case.window_applies() or case.window_bytes == window_sizes[0]
+    ]
+
+
+def _load_results(path: Path) -> Dict[str, Result]:
+    results = (Result.from_json(r) for r in json.loads(path.read_text()))
+    return {result.case.key(): result for result in results}
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--clients',
+        nargs='+',
+        choices=('python', 'cpp', 'java'),
+        default=['python'],
+        help='Transfer clients to measure against the server',
+    )
+    parser.add_argument(
+        '--directions',
+        nargs='+',
+        choices=tuple(_DIRECTIONS),
+        default=list(_DIRECTIONS),
+    )
+    parser.add_argument(
+        '--bandwidth',
+        nargs='+',
+        type=float,
+        default=[0.0],
+        help='Link bandwidths in bytes per second; 0 is unlimited',
+    )
+    parser.add_argument(
+        '--loss',
+        nargs='+',
+        type=float,
+        default=[0.0, 0.01],
+        help='Fractions of packets to drop',
+    )
+    parser.add_argument(
+        '--window-bytes',
+        nargs='+',
+        type=int,
+        default=[32 * 1024],
+        help=(
+            'Window sizes; sets the server window for writes and the Python '
+            "client's window for reads. Other clients' reads use the first "
+            'size only'
+        ),
+    )
+    parser.add_argument(
+        '--chunk-bytes',
+        nargs='+',
+        type=int,
+        default=[216],
+        help=(
+            "Chunk sizes; sets the server's chunk buffer, and the largest "
+            'chunk the Python client requests in reads'
+        ),
+    )
+    parser.add_argument('--payload-bytes', type=int, default=64 * 1024)
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=3,
+        help='Times to run each case; the median time is reported',
+    )
+    parser.add_argument('--seed', type=int, default=1700000000)
+    parser.add_argument(
+        '--output', type=Path, help='Write the results to this JSON file'
+    )
+    parser.add_argument(
+        '--baseline',
+        type=Path,
+        help='Compare against results previously written with --output',
+    )
+    parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Log the output of the server, client, and proxy',
+    )
+    parser.add_argument('--server-port', type=int, default=3318)
+    parser.add_argument('--client-port', type=int, default=3319)
+    for binary in ('java-client', 'cpp-client', 'python-client', 'server'):
+        parser.add_argument(f'--{binary}-binary', type=Path)
+    parser.add_argument('--proxy-binary', type=Path)
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Runs the matrix and returns 1 if any transfer failed."""
+    args = _parse_args()
+
+    if not args.verbose:
+        # The harness logs everything the server, client, and proxy print.
+        logging.getLogger('pw_transfer_intergration_test_proxy').setLevel(
+            logging.WARNING
+        )
+
+    harness = TransferIntegrationTestHarness(
+        TransferIntegrationTestHarness.Config(
+            server_port=args.server_port,
+            client_port=args.client_port,
+            java_client_binary=args.java_client_binary,
+            cpp_client_binary=args.cpp_client_binary,
+            python_client_binary=args.python_client_binary,
+            proxy_binary=args.proxy_binary,
+            server_binary=args.server_binary,
+        )
+    )
+
+    cases = matrix_cases(
+        args.clients,
+        args.directions,
+        args.bandwidth,
+        args.loss,
+        args.window_bytes,
+        args.chunk_bytes,
+    )
+    baseline = {} if args.baseline is None else _load_results(args.baseline)
+
+    results = run_matrix(
+        harness, cases, args.payload_bytes, args.repeat, args.seed
+    )
+
+    if args.output is not None:
+        args.output.write_text(
+            json.dumps([result.to_json() for result in results], indent=2)
+        )
+
+    print_results(results, baseline)
+    return 0 if all(not result.failures for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -75,6 +75,12 @@ def _main() -> int:
         max_retries=config.max_retries,
         max_lifetime_retries=config.max_lifetime_retries,
         default_protocol_version=pw_transfer.ProtocolVersion.LATEST,
+        read_window_policy=(
+            (lambda: pw_transfer.FixedWindow(config.read_window_size_bytes))
+            if config.read_window_size_bytes
+            else None
+        ),
+        read_max_chunk_size_bytes=config.read_max_chunk_size_bytes or 1024,
     )
 
     transfer_logger = logging.getLogger('pw_transfer')
@@ -22,6 +22,7 @@ import pathlib
 from pathlib import Path
 import sys
 import tempfile
+import time
 from typing import BinaryIO, Iterable, List, NamedTuple, Optional
 import unittest
 
@@ -205,6 +206,8 @@ class TransferIntegrationTestHarness:
     class TransferExitCodes(NamedTuple):
         client: int
         server: int
+        # Time from starting the client until it exited, in seconds.
+        client_elapsed_s: Optional[float] = None
 
     def __init__(self, harness_config: Config) -> None:
         # TODO(tpudlik): This is Bazel-only. Support gn, too.
@@ -299,7 +302,7 @@ class TransferIntegrationTestHarness:
           proxy_config: Proxy configuration.
 
         Returns:
-          Exit code of the client and server as a tuple.
+          Exit code of the client and server, and the client's run time.
         """
         # Timeout for components (server, proxy) to come up or shut down after
         # write is finished or a signal is sent. Approximately arbitrary. Should
@@ -307,6 +310,8 @@ class TransferIntegrationTestHarness:
         # from shutting down.
         TIMEOUT = 5  # seconds
 
+        client_elapsed_s = None
+
         try:
             await self._start_proxy(proxy_config)
             await self._proxy.wait_for_line(
@@ -318,10 +323,12 @@ class TransferIntegrationTestHarness:
                 "stderr", "Starting pw_rpc server on port", TIMEOUT
             )
 
+            client_start = time.monotonic()
             await self._start_client(client_type, client_config)
             # No timeout: the client will only exit once the transfer
             # completes, and this can take a long time for large payloads.
             await self._client.wait_for_termination(None)
+            client_elapsed_s = time.monotonic() - client_start
 
             # Wait for the server to exit.
             await self._server.wait_for_termination(TIMEOUT)
@@ -337,7 +344,9 @@ class TransferIntegrationTestHarness:
                 await self._proxy.terminate_and_wait(TIMEOUT)
 
             return self.TransferExitCodes(
-                self._client.returncode(), self._server.returncode()
+                self._client.returncode(),
+                self._server.returncode(),
+                client_elapsed_s,
             )
 
 
@@ -18,4 +18,7 @@ from pw_transfer.transfer import (
     ProgressStats,
     ProtocolVersion,
 )
-from pw_transfer.client import Error, Manager
+from pw_transfer.client import Error, Manager, ReadSink
+from pw_transfer.source import WriteData, WriteSource
+from pw_transfer.stats import TransferStats
+from pw_transfer.window import AimdWindow, FixedWindow, WindowPolicy
@@ -0,0 +1,271 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Checkpoints for resuming interrupted read transfers.
+
+A resumable read writes its data to a file and periodically records a
+checkpoint alongside it: the resource, the offset up to which the data is
+durably in the file, a SHA-256 digest of that data, the protocol version, and
+the expected SHA-256 digest of the complete resource. A later read of the same
+resource into the same file verifies the file against the checkpoint and
+continues from the checkpoint's offset instead of starting over.
+
+Only reads with the same expected digest are resumed, so the complete file is
+always verified; otherwise a resource that changed between reads could leave
+old data joined to new. If the file or the expected digest don't match, the
+read starts from the beginning.
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+from typing import BinaryIO, Optional, Union
+
+from pw_transfer.transfer import ProtocolVersion
+
+_LOG = logging.getLogger(__package__)
+
+# Extension of the checkpoint file stored next to the destination file.
+CHECKPOINT_SUFFIX = '.checkpoint'
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+@dataclasses.dataclass(frozen=True)
+class Checkpoint:
+    """The progress of a read transfer into a file."""
+
+    resource_id: int
+    offset: int
+    sha256: str
+    protocol_version: ProtocolVersion
+    expected_sha256: Optional[str] = None
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                'resource_id': self.resource_id,
+                'offset': self.offset,
+                'sha256': self.sha256,
+                'protocol_version': self.protocol_version.value,
+                'expected_sha256': self.expected_sha256,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, text: str) -> 'Checkpoint':
+        fields = json.loads(text)
+        return cls(
+            int(fields['resource_id']),
+            int(fields['offset']),
+            str(fields['sha256']),
+            ProtocolVersion(fields['protocol_version']),
+            fields.get('expected_sha256'),
+        )
+
+
+class CheckpointFile:
+    """Stores a Checkpoint as JSON in a file."""
+
+    def __init__(self, path: Union[Path, str]) -> None:
+        self.path = Path(path)
+
+    def load(self) -> Optional[Checkpoint]:
+        """Returns the stored checkpoint, or None if there is no valid one."""
+        try:
+            return Checkpoint.from_json(self.path.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            _LOG.warning('Ignoring invalid checkpoint %s: %s', self.path, err)
+            return None
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        """Replaces the stored checkpoint atomically."""
+        with tempfile.NamedTemporaryFile(
+            'w', dir=self.path.parent, prefix=f'.{self.path.name}', delete=False
+        ) as temp:
+            temp.write(checkpoint.to_json())
+            temp.flush()
+            os.fsync(temp.fileno())
+        os.replace(temp.name, self.path)
+
+    def remove(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ResumableFile:
+    """The destination file of a resumable read transfer.
+
+    Data is written with write(). Every interval_bytes, the data is flushed to
+    disk and a checkpoint is saved. close() saves a final checkpoint if the
+    transfer failed, or removes the checkpoint if it completed.
+
+    A checkpoint is only resumed if expected_sha256, the digest of the complete
+    resource, is provided and matches the checkpoint's. The caller must check
+    the digest of the complete file.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        resource_id: int,
+        protocol_version: ProtocolVersion,
+        interval_bytes: int = 1024 * 1024,
+        expected_sha256: Optional[str] = None,
+    ) -> None:
+        if interval_bytes <= 0:
+            raise ValueError('The checkpoint interval must be positive')
+
+        self.path = Path(path)
+        self.checkpoints = CheckpointFile(f'{self.path}{CHECKPOINT_SUFFIX}')
+        self.resource_id = resource_id
+        self.protocol_version = protocol_version
+        self.expected_sha256 = expected_sha256
+        self.offset = 0
+
+        self._interval_bytes = interval_bytes
+        self._checkpointed_offset = 0
+        self._hasher = hashlib.sha256()
+        self._file: Optional[BinaryIO] = None
+
+    def open(self) -> int:
+        """Opens the file for writing and returns the offset to read from.
+
+        If there is a checkpoint for this resource and expected digest, and the
+        file's data matches it, the file is kept up to the checkpoint's offset
+        and the transfer resumes with the checkpoint's protocol version.
+        Otherwise, the file is truncated.
+        """
+        checkpoint = self.checkpoints.load()
+        if checkpoint is not None and self._matches(checkpoint):
+            _LOG.info(
+                'Resuming read of resource %d into %s at offset %d',
+                self.resource_id,
+                self.path,
+                checkpoint.offset,
+            )
+            self.offset = checkpoint.offset
+            self.protocol_version = checkpoint.protocol_version
+        else:
+            self.offset = 0
+            self._hasher = hashlib.sha256()
+
+        self._checkpointed_offset = self.offset
+        self._file = open(self.path, 'r+b' if self.path.exists() else 'wb')
+        self._file.truncate(self.offset)
+        self._file.seek(self.offset)
+        return self.offset
+
+    def _matches(self, checkpoint: Checkpoint) -> bool:
+        """Checks the file against a checkpoint, hashing the verified data."""
+        if checkpoint.resource_id != self.resource_id:
+            _LOG.warning(
+                'Checkpoint %s is for resource %d, not %d; starting over',
+                self.checkpoints.path,
+                checkpoint.resource_id,
+                self.resource_id,
+            )
+            return False
+
+        if self.expected_sha256 is None:
+            _LOG.warning(
+                'Cannot verify a resumed read of %s without its expected '
+                'SHA-256; starting over',
+                self.path,
+            )
+            return False
+
+        if checkpoint.expected_sha256 != self.expected_sha256:
+            _LOG.warning(
+                'Checkpoint %s is for a resource with SHA-256 %s, not %s; '
+                'starting over',
+                self.checkpoints.path,
+                checkpoint.expected_sha256,
+                self.expected_sha256,
+            )
+            return False
+
+        self._hasher = hashlib.sha256()
+        remaining = checkpoint.offset
+        try:
+            with open(self.path, 'rb') as file:
+                while remaining:
+                    block = file.read(min(remaining, _HASH_BLOCK_SIZE))
+                    if not block:
+                        break
+                    self._hasher.update(block)
+                    remaining -= len(block)
+        except FileNotFoundError:
+            return False
+
+        if remaining or self._hasher.hexdigest() != checkpoint.sha256:
+            _LOG.warning(
+                '%s does not match its checkpoint; starting over', self.path
+            )
+            return False
+
+        return True
+
+    def sha256(self) -> str:
+        """The SHA-256 digest of the data in the file."""
+        return self._hasher.hexdigest()
+
+    def write(self, data: bytes) -> None:
+        assert self._file is not None
+        self._file.write(data)
+        self._hasher.update(data)
+        self.offset += len(data)
+
+        if self.offset - self._checkpointed_offset >= self._interval_bytes:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Flushes the data to disk and saves a checkpoint at its end."""
+        assert self._file is not None
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self.checkpoints.save(
+            Checkpoint(
+                self.resource_id,
+                self.offset,
+                self.sha256(),
+                self.protocol_version,
+                self.expected_sha256,
+            )
+        )
+        self._checkpointed_offset = self.offset
+
+    def close(self, completed: bool) -> None:
+        """Closes the file, keeping a checkpoint if it is incomplete."""
+        if self._file is None:
+            return
+
+        if completed:
+            self._file.close()
+            self.checkpoints.remove()
+        else:
+            self.checkpoint()
+            self._file.close()
+
+        self._file = None
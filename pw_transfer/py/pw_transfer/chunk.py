@@ -14,7 +14,7 @@
 """Protocol version-aware chunk message wrapper."""
 
 import enum
-from typing import Any, Optional
+from typing import Any, Dict, Optional, Tuple, Union
 
 from pw_status import Status
 
@@ -46,6 +46,119 @@ class ProtocolVersion(enum.Enum):
 
 _ChunkType = transfer_pb2.Chunk.Type
 
+# Keys of the Chunk message fields (field number << 3 | wire type).
+_TRANSFER_ID = 1 << 3
+_PENDING_BYTES = 2 << 3
+_MAX_CHUNK_SIZE_BYTES = 3 << 3
+_MIN_DELAY_MICROSECONDS = 4 << 3
+_OFFSET = 5 << 3
+_DATA = 6 << 3 | 2
+_REMAINING_BYTES = 7 << 3
+_STATUS = 8 << 3
+_WINDOW_END_OFFSET = 9 << 3
+_TYPE = 10 << 3
+_RESOURCE_ID = 11 << 3
+_SESSION_ID = 12 << 3
+_PROTOCOL_VERSION = 13 << 3
+_DESIRED_SESSION_ID = 14 << 3
+
+_UINT32_MAX = 0xFFFFFFFF
+_INT32_MAX = 0x7FFFFFFF
+_UINT64_MAX = 0xFFFFFFFFFFFFFFFF
+
+# Names and maximum values of the varint fields, by key.
+_VARINT_FIELDS = {
+    _TRANSFER_ID: ('transfer_id', _UINT32_MAX),
+    _PENDING_BYTES: ('pending_bytes', _UINT32_MAX),
+    _MAX_CHUNK_SIZE_BYTES: ('max_chunk_size_bytes', _UINT32_MAX),
+    _MIN_DELAY_MICROSECONDS: ('min_delay_microseconds', _UINT32_MAX),
+    _OFFSET: ('offset', _UINT64_MAX),
+    _REMAINING_BYTES: ('remaining_bytes', _UINT64_MAX),
+    _STATUS: ('status', _UINT32_MAX),
+    _WINDOW_END_OFFSET: ('window_end_offset', _UINT32_MAX),
+    _TYPE: ('type', _INT32_MAX),
+    _RESOURCE_ID: ('resource_id', _UINT32_MAX),
+    _SESSION_ID: ('session_id', _UINT32_MAX),
+    _PROTOCOL_VERSION: ('protocol_version', _UINT32_MAX),
+    _DESIRED_SESSION_ID: ('desired_session_id', _UINT32_MAX),
+}
+
+
+def _append_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _encode_varint(
+    out: bytearray, key: int, value: int, max_value: int = _UINT32_MAX
+) -> None:
+    if not 0 <= value <= max_value:
+        raise ValueError(f'Value {value} is out of range for field {key >> 3}')
+    out.append(key)
+    _append_varint(out, value)
+
+
+class _FallBack(Exception):
+    """The fast decoder cannot parse a message."""
+
+
+def _decode_fields(data: memoryview) -> Dict[str, Any]:
+    """Decodes the fields in a serialized Chunk message by name.
+
+    Raises:
+      _FallBack: The message has unknown fields or is malformed.
+    """
+    fields: Dict[str, Any] = {}
+    position = 0
+    end = len(data)
+
+    while position < end:
+        key = data[position]
+        position += 1
+
+        # Every known field number fits in a one-byte key, and all fields but
+        # data are varints.
+        if key == _DATA:
+            size, position = _decode_varint(data, position)
+            if position + size > end:
+                raise _FallBack()
+            fields['data'] = data[position : position + size]
+            position += size
+            continue
+
+        try:
+            name, max_value = _VARINT_FIELDS[key]
+        except KeyError:
+            raise _FallBack() from None
+
+        fields[name], position = _decode_varint(data, position)
+        if fields[name] > max_value:
+            raise _FallBack()
+
+    return fields
+
+
+def _decode_varint(data: memoryview, position: int) -> Tuple[int, int]:
+    """Returns a varint and the position after it."""
+    value = 0
+    shift = 0
+    while True:
+        try:
+            byte = data[position]
+        except IndexError:
+            raise _FallBack() from None
+
+        value |= (byte & 0x7F) << shift
+        position += 1
+        if not byte & 0x80:
+            return value, position
+
+        shift += 7
+        if shift >= 64:
+            raise _FallBack()
+
 
 class Chunk:
     """A chunk exchanged in a pw_transfer stream.
@@ -87,7 +200,7 @@ class Chunk:
         resource_id: Optional[int] = None,
         offset: int = 0,
         window_end_offset: int = 0,
-        data: bytes = b'',
+        data: Union[bytes, memoryview] = b'',
         remaining_bytes: Optional[int] = None,
         max_chunk_size_bytes: Optional[int] = None,
         min_delay_microseconds: Optional[int] = None,
@@ -130,6 +243,31 @@ class Chunk:
     @classmethod
     def from_message(cls, message: transfer_pb2.Chunk) -> 'Chunk':
         """Parses a Chunk from a protobuf message."""
+        return cls._from_fields(
+            {field.name: value for field, value in message.ListFields()}
+        )
+
+    @classmethod
+    def decode(cls, data: Union[bytes, memoryview]) -> 'Chunk':
+        """Parses a Chunk from a serialized protobuf message.
+
+        The chunk's data is a view into the serialized message rather than a
+        copy. Messages the fast decoder does not handle, such as ones with
+        unknown fields, are parsed with the protobuf library instead.
+
+        Raises:
+          google.protobuf.message.DecodeError: The message is malformed.
+        """
+        try:
+            return cls._from_fields(_decode_fields(memoryview(data)))
+        except _FallBack:
+            return cls.from_message(transfer_pb2.Chunk.FromString(bytes(data)))
+
+    @classmethod
+    def _from_fields(cls, fields: Dict[str, Any]) -> 'Chunk':
+        """Creates a Chunk from the fields present in a Chunk message."""
+        offset = fields.get('offset', 0)
+        data = fields.get('data', b'')
 
         # Some very old versions of transfer don't always encode chunk types,
         # so they must be deduced.
@@ -137,15 +275,11 @@ class Chunk:
         # The type-less legacy transfer protocol doesn't support handshakes or
         # continuation parameters. Therefore, there are only three possible
         # types: start, data, and retransmit.
-        if message.HasField('type'):
-            chunk_type = message.type
-        elif (
-            message.offset == 0
-            and not message.data
-            and not message.HasField('status')
-        ):
+        if 'type' in fields:
+            chunk_type = fields['type']
+        elif offset == 0 and not data and 'status' not in fields:
             chunk_type = Chunk.Type.START
-        elif message.data:
+        elif data:
             chunk_type = Chunk.Type.DATA
         else:
             chunk_type = Chunk.Type.PARAMETERS_RETRANSMIT
@@ -153,44 +287,44 @@ class Chunk:
         chunk = cls(
             ProtocolVersion.UNKNOWN,
             chunk_type,
-            offset=message.offset,
-            window_end_offset=message.window_end_offset,
-            data=message.data,
+            offset=offset,
+            window_end_offset=fields.get('window_end_offset', 0),
+            data=data,
         )
 
-        if message.HasField('session_id'):
+        if 'session_id' in fields:
             chunk.protocol_version = ProtocolVersion.VERSION_TWO
-            chunk.session_id = message.session_id
+            chunk.session_id = fields['session_id']
         else:
             chunk.protocol_version = ProtocolVersion.LEGACY
-            chunk.session_id = message.transfer_id
+            chunk.session_id = fields.get('transfer_id', 0)
 
-        if message.HasField('desired_session_id'):
+        if 'desired_session_id' in fields:
             chunk.protocol_version = ProtocolVersion.VERSION_TWO
-            chunk.desired_session_id = message.desired_session_id
+            chunk.desired_session_id = fields['desired_session_id']
 
-        if message.HasField('resource_id'):
-            chunk.resource_id = message.resource_id
+        if 'resource_id' in fields:
+            chunk.resource_id = fields['resource_id']
 
-        if message.HasField('protocol_version'):
+        if 'protocol_version' in fields:
             # An explicitly specified protocol version overrides any inferred
             # one.
-            chunk.protocol_version = ProtocolVersion(message.protocol_version)
+            chunk.protocol_version = ProtocolVersion(fields['protocol_version'])
 
-        if message.HasField('pending_bytes'):
-            chunk.window_end_offset = message.offset + message.pending_bytes
+        if 'pending_bytes' in fields:
+            chunk.window_end_offset = offset + fields['pending_bytes']
 
-        if message.HasField('remaining_bytes'):
-            chunk.remaining_bytes = message.remaining_bytes
+        if 'remaining_bytes' in fields:
+            chunk.remaining_bytes = fields['remaining_bytes']
 
-        if message.HasField('max_chunk_size_bytes'):
-            chunk.max_chunk_size_bytes = message.max_chunk_size_bytes
+        if 'max_chunk_size_bytes' in fields:
+            chunk.max_chunk_size_bytes = fields['max_chunk_size_bytes']
 
-        if message.HasField('min_delay_microseconds'):
-            chunk.min_delay_microseconds = message.min_delay_microseconds
+        if 'min_delay_microseconds' in fields:
+            chunk.min_delay_microseconds = fields['min_delay_microseconds']
 
-        if message.HasField('status'):
-            chunk.status = Status(message.status)
+        if 'status' in fields:
+            chunk.status = Status(fields['status'])
 
         if chunk.protocol_version is ProtocolVersion.UNKNOWN:
             # If no fields in the chunk specified its protocol version,
@@ -232,7 +366,8 @@ class Chunk:
                 message.pending_bytes = self.window_end_offset - self.offset
 
         if self.data:
-            message.data = self.data
+            # Serializing copies the data, so it may be a view until then.
+            message.data = bytes(self.data)
 
         if self.remaining_bytes is not None:
             message.remaining_bytes = self.remaining_bytes
@@ -253,6 +388,96 @@ class Chunk:
 
         return message
 
+    def encode(self) -> bytes:
+        """Serializes the chunk to the same bytes as to_message().
+
+        The fields are encoded directly, and the data is copied only once,
+        into the returned bytes.
+        """
+        try:
+            return self._encode()
+        except ValueError:
+            # Let the protobuf library report the invalid field.
+            return self.to_message().SerializeToString()
+
+    def _encode(self) -> bytes:
+        """Encodes the fields set by to_message(), in field number order."""
+        head = bytearray()
+
+        if self._should_encode_legacy_fields():
+            if self.resource_id is not None:
+                transfer_id = self.resource_id
+            else:
+                assert self.session_id != 0
+                transfer_id = self.session_id
+
+            if transfer_id != 0:
+                _encode_varint(head, _TRANSFER_ID, transfer_id)
+
+            if self.window_end_offset != 0:
+                _encode_varint(
+                    head,
+                    _PENDING_BYTES,
+                    self.window_end_offset - self.offset,
+                )
+
+        if self.max_chunk_size_bytes is not None:
+            _encode_varint(
+                head, _MAX_CHUNK_SIZE_BYTES, self.max_chunk_size_bytes
+            )
+
+        if self.min_delay_microseconds is not None:
+            _encode_varint(
+                head, _MIN_DELAY_MICROSECONDS, self.min_delay_microseconds
+            )
+
+        if self.offset != 0:
+            _encode_varint(head, _OFFSET, self.offset, _UINT64_MAX)
+
+        if self.data:
+            head.append(_DATA)
+            _append_varint(head, len(self.data))
+
+        tail = bytearray()
+
+        if self.remaining_bytes is not None:
+            _encode_varint(
+                tail, _REMAINING_BYTES, self.remaining_bytes, _UINT64_MAX
+            )
+
+        if self.status is not None:
+            _encode_varint(tail, _STATUS, self.status.value)
+
+        if self.window_end_offset != 0:
+            _encode_varint(tail, _WINDOW_END_OFFSET, self.window_end_offset)
+
+        if not 0 <= self.type <= _INT32_MAX:
+            raise ValueError(f'Unsupported chunk type {self.type}')
+        _encode_varint(tail, _TYPE, self.type)
+
+        if self.resource_id is not None:
+            _encode_varint(tail, _RESOURCE_ID, self.resource_id)
+
+        if self.protocol_version is ProtocolVersion.VERSION_TWO:
+            if self.session_id != 0:
+                assert self.desired_session_id is None
+                _encode_varint(tail, _SESSION_ID, self.session_id)
+
+        if self._is_initial_handshake_chunk():
+            _encode_varint(tail, _PROTOCOL_VERSION, self.protocol_version.value)
+
+        if self.protocol_version is ProtocolVersion.VERSION_TWO:
+            if self.desired_session_id is not None:
+                _encode_varint(
+                    tail, _DESIRED_SESSION_ID, self.desired_session_id
+                )
+
+        if self.data:
+            return b''.join((head, self.data, tail))
+
+        head += tail
+        return bytes(head)
+
     def id(self) -> int:
         """Returns the transfer context identifier for a chunk.
 
@@ -14,11 +14,26 @@
 """Client for the pw_transfer service, which transmits data over pw_rpc."""
 
 import asyncio
+import collections
+from concurrent.futures import Future
 import ctypes
 import logging
+from pathlib import Path
 import threading
-from typing import Any, Dict, Optional, Union
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Optional,
+    Set,
+    TypeVar,
+    Union,
+)
 
+from google.protobuf.message import DecodeError
+from pw_rpc import PayloadMode
 from pw_rpc.callback_client import BidirectionalStreamingCall
 from pw_status import Status
 
@@ -29,18 +44,41 @@ from pw_transfer.transfer import (
     Transfer,
     WriteTransfer,
 )
+from pw_transfer.checkpoint import ResumableFile
 from pw_transfer.chunk import Chunk
-
-try:
-    from pw_transfer import transfer_pb2
-except ImportError:
-    # For the bazel build, which puts generated protos in a different location.
-    from pigweed.pw_transfer import transfer_pb2  # type: ignore
+from pw_transfer.source import WriteData, open_source
+from pw_transfer.stats import TransferStats
+from pw_transfer.window import WindowPolicy
 
 _LOG = logging.getLogger(__package__)
 
 _TransferDict = Dict[int, Transfer]
 
+# A destination for streamed read data: a binary file or a callable that is
+# passed each piece of data in order.
+ReadSink = Union[BinaryIO, Callable[[bytes], Any]]
+
+_T = TypeVar('_T')
+
+
+def _transfer_future(
+    transfer: Transfer, result: Callable[[Transfer], _T]
+) -> 'Future[_T]':
+    """Returns a Future that is resolved when the transfer finishes."""
+    future: 'Future[_T]' = Future()
+    future.set_running_or_notify_cancel()  # Transfers cannot be cancelled.
+
+    def on_done(transfer: Transfer) -> None:
+        if transfer.status.ok():
+            future.set_result(result(transfer))
+        else:
+            future.set_exception(
+                Error(transfer.resource_id, transfer.status, transfer.stats())
+            )
+
+    transfer.add_done_callback(on_done)
+    return future
+
 
 class Manager:  # pylint: disable=too-many-instance-attributes
     """A manager for transmitting data through an RPC TransferService.
@@ -50,7 +88,13 @@ class Manager:  # pylint: disable=too-many-instance-attributes
     -- the Manager supports multiple simultaneous transfers.
 
     When created, a Manager starts a separate thread in which transfer
-    communications and events are handled.
+    communications and events are handled. Transfers run concurrently on that
+    thread: read() and write() block the calling thread until their transfer
+    completes, while start_read() and start_write() return futures, and
+    read_async() and write_async() may be awaited from asyncio code.
+
+    Active write transfers take turns sending chunks, one chunk each, so a
+    large transfer does not hold up smaller ones started after it.
     """
 
     def __init__(
@@ -62,6 +106,10 @@ class Manager:  # pylint: disable=too-many-instance-attributes
         max_retries: int = 3,
         max_lifetime_retries: int = 1500,
         default_protocol_version=ProtocolVersion.LEGACY,
+        read_window_policy: Optional[Callable[[], WindowPolicy]] = None,
+        reassemble_out_of_order_reads: bool = False,
+        max_concurrent_transfers: Optional[int] = None,
+        read_max_chunk_size_bytes: int = 1024,
     ):
         """Initializes a Manager on top of a TransferService.
 
@@ -73,19 +121,48 @@ class Manager:  # pylint: disable=too-many-instance-attributes
           max_retires: number of times to retry a single package after a timeout
           max_lifetime_retires: Cumulative maximum number of times to retry over
               the course of the transfer before giving up.
+          read_window_policy: Optional factory for the WindowPolicy that sizes
+              each read transfer's receive window, e.g. AimdWindow. By
+              default, read transfers use a fixed window.
+          reassemble_out_of_order_reads: If True, read transfers buffer
+              chunks that arrive out of order and request only the missing
+              data, rather than discarding everything after a gap.
+          max_concurrent_transfers: Optional limit on the number of read and
+              write transfers in progress at once. Additional transfers wait
+              and begin in the order they were started.
+          read_max_chunk_size_bytes: The largest chunk the server may send in
+              a read transfer, in bytes.
         """
+        if (
+            max_concurrent_transfers is not None
+            and max_concurrent_transfers < 1
+        ):
+            raise ValueError('max_concurrent_transfers must be at least 1')
+
+        if read_max_chunk_size_bytes < 1:
+            raise ValueError('read_max_chunk_size_bytes must be at least 1')
+
         self._service: Any = rpc_transfer_service
         self._default_response_timeout_s = default_response_timeout_s
         self._initial_response_timeout_s = initial_response_timeout_s
         self.max_retries = max_retries
         self.max_lifetime_retries = max_lifetime_retries
         self._default_protocol_version = default_protocol_version
+        self._read_window_policy = read_window_policy
+        self._reassemble_out_of_order_reads = reassemble_out_of_order_reads
+        self._max_concurrent_transfers = max_concurrent_transfers
+        self._read_max_chunk_size_bytes = read_max_chunk_size_bytes
 
         # Ongoing transfers in the service by resource ID.
         self._read_transfers: _TransferDict = {}
         self._write_transfers: _TransferDict = {}
         self._next_session_id = ctypes.c_uint32(1)
 
+        # Transfers that have begun, and those waiting to begin when there are
+        # fewer than max_concurrent_transfers. Only used by the transfer thread.
+        self._active_transfers: Set[Transfer] = set()
+        self._queued_transfers: Deque[Transfer] = collections.deque()
+
         # RPC streams for read and write transfers. These are shareable by
         # multiple transfers of the same type.
         self._read_stream: Optional[BidirectionalStreamingCall] = None
@@ -132,7 +209,193 @@ class Manager:  # pylint: disable=too-many-instance-attributes
         Raises:
           Error: the transfer failed to complete
         """
+        return self.start_read(
+            resource_id, progress_callback, protocol_version
+        ).result()
+
+    def start_read(
+        self,
+        resource_id: int,
+        progress_callback: Optional[ProgressCallback] = None,
+        protocol_version: Optional[ProtocolVersion] = None,
+    ) -> 'Future[bytes]':
+        """Starts a read transfer without waiting for it to complete.
+
+        The transfer runs on the Manager's thread, concurrently with any other
+        transfers, so a single thread can start many transfers and then wait
+        on their futures.
+
+        Returns:
+          A concurrent.futures.Future that resolves to the data read, or raises
+          Error if the transfer fails.
+
+        Raises:
+          ValueError: a read of the resource is already in progress
+        """
+        transfer = self._new_read_transfer(
+            resource_id, progress_callback, protocol_version
+        )
+        future = _transfer_future(transfer, lambda t: t.data)
+        self._start_read_transfer(transfer)
+        return future
+
+    async def read_async(
+        self,
+        resource_id: int,
+        progress_callback: Optional[ProgressCallback] = None,
+        protocol_version: Optional[ProtocolVersion] = None,
+    ) -> bytes:
+        """Receives data from the server without blocking the event loop.
+
+        Awaits the transfer started by start_read() in the running asyncio
+        event loop.
+
+        Raises:
+          Error: the transfer failed to complete
+        """
+        return await asyncio.wrap_future(
+            self.start_read(resource_id, progress_callback, protocol_version)
+        )
+
+    def read_to(
+        self,
+        resource_id: int,
+        sink: ReadSink,
+        progress_callback: Optional[ProgressCallback] = None,
+        protocol_version: Optional[ProtocolVersion] = None,
+        *,
+        hasher: Optional[Any] = None,
+    ) -> int:
+        """Receives data from the server, streaming it to a sink.
+
+        Unlike read(), the received data is not kept in memory. Each chunk is
+        written to the sink as soon as all data before it has arrived, so
+        resources of any size can be read with constant memory use.
 
+        Args:
+          resource_id: ID of the resource from which to read.
+          sink: A binary file-like object, or a callable that is passed each
+              piece of data in order.
+          progress_callback: Optional callback periodically invoked throughout
+              the transfer with the transfer state.
+          hasher: Optional hashlib object, such as hashlib.sha256(), that is
+              updated with the data as it is received.
+
+        Returns:
+          The number of bytes read.
+
+        Raises:
+          Error: the transfer failed to complete, including if the sink raised
+              an exception (DATA_LOSS)
+        """
+        write: Callable[[bytes], Any] = (
+            sink.write  # type: ignore[union-attr]
+            if hasattr(sink, 'write')
+            else sink
+        )
+
+        if hasher is not None:
+            write_data = write
+
+            def write(data: bytes) -> None:
+                hasher.update(data)
+                write_data(data)
+
+        transfer = self._new_read_transfer(
+            resource_id, progress_callback, protocol_version, write
+        )
+        future = _transfer_future(transfer, lambda t: t.size())
+        self._start_read_transfer(transfer)
+        return future.result()
+
+    def read_resumable(
+        self,
+        resource_id: int,
+        path: Union[Path, str],
+        progress_callback: Optional[ProgressCallback] = None,
+        protocol_version: Optional[ProtocolVersion] = None,
+        *,
+        checkpoint_interval_bytes: int = 1024 * 1024,
+        expected_sha256: Optional[str] = None,
+    ) -> int:
+        """Reads data into a file, resuming an earlier interrupted read.
+
+        While the data is written to the file, a checkpoint is saved next to it
+        (in path + '.checkpoint') every checkpoint_interval_bytes, and when the
+        transfer fails. If a previous read of the resource into the file was
+        interrupted with the same expected_sha256, the file is verified against
+        its checkpoint and the read continues from the checkpoint, using the
+        same protocol version. The checkpoint is removed when the read
+        completes.
+
+        Args:
+          resource_id: ID of the resource from which to read.
+          path: The file to write.
+          progress_callback: Optional callback periodically invoked throughout
+              the transfer with the transfer state.
+          protocol_version: The protocol version for a new transfer.
+          checkpoint_interval_bytes: How often to flush the file and save a
+              checkpoint.
+          expected_sha256: Hex SHA-256 digest of the complete resource. If
+              the data read doesn't match, the read fails with DATA_LOSS and
+              the next read starts over. Required to resume a read, since
+              otherwise data from a resource that changed between reads could
+              not be detected; without it, every read starts over.
+
+        Returns:
+          The size of the resource.
+
+        Raises:
+          Error: the transfer failed to complete
+        """
+        file = ResumableFile(
+            path,
+            resource_id,
+            self._default_protocol_version
+            if protocol_version is None
+            else protocol_version,
+            checkpoint_interval_bytes,
+            expected_sha256,
+        )
+        offset = file.open()
+
+        completed = False
+        try:
+            transfer = self._new_read_transfer(
+                resource_id,
+                progress_callback,
+                file.protocol_version,
+                file.write,
+                initial_offset=offset,
+            )
+            future = _transfer_future(transfer, lambda t: t.size())
+            self._start_read_transfer(transfer)
+            size = future.result()
+            completed = True
+        finally:
+            file.close(completed)
+
+        if expected_sha256 is not None and file.sha256() != expected_sha256:
+            _LOG.error(
+                'Read of resource %d into %s has SHA-256 %s, expected %s',
+                resource_id,
+                file.path,
+                file.sha256(),
+                expected_sha256,
+            )
+            raise Error(resource_id, Status.DATA_LOSS, transfer.stats())
+
+        return size
+
+    def _new_read_transfer(
+        self,
+        resource_id: int,
+        progress_callback: Optional[ProgressCallback],
+        protocol_version: Optional[ProtocolVersion],
+        sink: Optional[Callable[[bytes], Any]] = None,
+        initial_offset: int = 0,
+    ) -> ReadTransfer:
+        """Creates a read transfer to pass to _start_read_transfer."""
         if resource_id in self._read_transfers:
             raise ValueError(
                 f'Read transfer for resource {resource_id} already exists'
@@ -147,7 +410,7 @@ class Manager:  # pylint: disable=too-many-instance-attributes
             else self.assign_session_id()
         )
 
-        transfer = ReadTransfer(
+        return ReadTransfer(
             session_id,
             resource_id,
             self._send_read_chunk,
@@ -158,28 +421,35 @@ class Manager:  # pylint: disable=too-many-instance-attributes
             self.max_lifetime_retries,
             protocol_version,
             progress_callback=progress_callback,
+            window_policy=(
+                None
+                if self._read_window_policy is None
+                else self._read_window_policy()
+            ),
+            reassemble_out_of_order=self._reassemble_out_of_order_reads,
+            sink=sink,
+            initial_offset=initial_offset,
+            max_chunk_size=self._read_max_chunk_size_bytes,
         )
-        self._start_read_transfer(transfer)
-
-        transfer.done.wait()
-
-        if not transfer.status.ok():
-            raise Error(transfer.resource_id, transfer.status)
-
-        return transfer.data
 
     def write(
         self,
         resource_id: int,
-        data: Union[bytes, str],
+        data: WriteData,
         progress_callback: Optional[ProgressCallback] = None,
         protocol_version: Optional[ProtocolVersion] = None,
     ) -> None:
         """Transmits ("uploads") data to the server.
 
+        Data in memory or in a file is sent without copying it; files are
+        memory-mapped. Data from an iterator is read as the transfer proceeds,
+        so its total size need not be known in advance.
+
         Args:
           resource_id: ID of the resource to which to write.
-          data: Data to send to the server.
+          data: Data to send to the server: bytes or another object that
+              supports the buffer protocol (such as a memoryview or mmap), a
+              str, a path to a file (os.PathLike), or an iterable of bytes.
           progress_callback: Optional callback periodically invoked throughout
               the transfer with the transfer state. Can be used to provide user-
               facing status updates such as progress bars.
@@ -187,7 +457,28 @@ class Manager:  # pylint: disable=too-many-instance-attributes
         Raises:
           Error: the transfer failed to complete
         """
+        self.start_write(
+            resource_id, data, progress_callback, protocol_version
+        ).result()
 
+    def start_write(
+        self,
+        resource_id: int,
+        data: WriteData,
+        progress_callback: Optional[ProgressCallback] = None,
+        protocol_version: Optional[ProtocolVersion] = None,
+    ) -> 'Future[None]':
+        """Starts a write transfer without waiting for it to complete.
+
+        Takes the same arguments as write().
+
+        Returns:
+          A concurrent.futures.Future that resolves to None when the transfer
+          completes, or raises Error if the transfer fails.
+
+        Raises:
+          ValueError: a write to the resource is already in progress
+        """
         if isinstance(data, str):
             data = data.encode()
 
@@ -208,7 +499,7 @@ class Manager:  # pylint: disable=too-many-instance-attributes
         transfer = WriteTransfer(
             session_id,
             resource_id,
-            data,
+            data if isinstance(data, bytes) else open_source(data),
             self._send_write_chunk,
             self._end_write_transfer,
             self._default_response_timeout_s,
@@ -218,20 +509,38 @@ class Manager:  # pylint: disable=too-many-instance-attributes
             protocol_version,
             progress_callback=progress_callback,
         )
+        future = _transfer_future(transfer, lambda t: None)
         self._start_write_transfer(transfer)
+        return future
 
-        transfer.done.wait()
+    async def write_async(
+        self,
+        resource_id: int,
+        data: WriteData,
+        progress_callback: Optional[ProgressCallback] = None,
+        protocol_version: Optional[ProtocolVersion] = None,
+    ) -> None:
+        """Transmits data to the server without blocking the event loop.
 
-        if not transfer.status.ok():
-            raise Error(transfer.resource_id, transfer.status)
+        Awaits the transfer started by start_write() in the running asyncio
+        event loop.
+
+        Raises:
+          Error: the transfer failed to complete
+        """
+        await asyncio.wrap_future(
+            self.start_write(
+                resource_id, data, progress_callback, protocol_version
+            )
+        )
 
     def _send_read_chunk(self, chunk: Chunk) -> None:
         assert self._read_stream is not None
-        self._read_stream.send(chunk.to_message())
+        self._read_stream.send(chunk.encode())
 
     def _send_write_chunk(self, chunk: Chunk) -> None:
         assert self._write_stream is not None
-        self._write_stream.send(chunk.to_message())
+        self._write_stream.send(chunk.encode())
 
     def assign_session_id(self) -> int:
         new_id = self._next_session_id.value
@@ -274,7 +583,8 @@ class Manager:  # pylint: disable=too-many-instance-attributes
                 break
 
             if new_transfer in done:
-                await new_transfer.result().begin()
+                self._queued_transfers.append(new_transfer.result())
+                await self._begin_queued_transfers()
                 new_transfer = self._loop.create_task(
                     self._new_transfer_queue.get()
                 )
@@ -301,10 +611,32 @@ class Manager:  # pylint: disable=too-many-instance-attributes
 
         self._loop.stop()
 
+    async def _begin_queued_transfers(self) -> None:
+        """Begins queued transfers while under the concurrency limit."""
+        while self._queued_transfers and (
+            self._max_concurrent_transfers is None
+            or len(self._active_transfers) < self._max_concurrent_transfers
+        ):
+            transfer = self._queued_transfers.popleft()
+
+            # The transfer may have been ended by a stream error while queued.
+            if not transfer.done.is_set():
+                self._active_transfers.add(transfer)
+                await transfer.begin()
+
+    def _on_transfer_done(self, transfer: Transfer) -> None:
+        """Frees a finished transfer's slot for the next queued transfer."""
+
+        def begin_next() -> None:
+            self._active_transfers.discard(transfer)
+            self._loop.create_task(self._begin_queued_transfers())
+
+        # Transfers are usually finished in the transfer thread, but may be
+        # finished by RPC stream errors in other threads.
+        self._loop.call_soon_threadsafe(begin_next)
+
     @staticmethod
-    async def _handle_chunk(
-        transfers: _TransferDict, message: transfer_pb2.Chunk
-    ) -> None:
+    async def _handle_chunk(transfers: _TransferDict, message: bytes) -> None:
         """Processes an incoming chunk from a stream.
 
         The chunk is dispatched to an active transfer based on its ID. If the
@@ -312,7 +644,11 @@ class Manager:  # pylint: disable=too-many-instance-attributes
         is invoked.
         """
 
-        chunk = Chunk.from_message(message)
+        try:
+            chunk = Chunk.decode(message)
+        except DecodeError as err:
+            _LOG.error('TransferManager received a malformed chunk: %s', err)
+            return
 
         # Find a transfer for the chunk in the list of active transfers.
         try:
@@ -342,6 +678,8 @@ class Manager:  # pylint: disable=too-many-instance-attributes
                 self._read_chunk_queue.put_nowait, chunk
             ),
             on_error=lambda _, status: self._on_read_error(status),
+            # Chunks are decoded by Chunk.decode, which avoids copying data.
+            payload_mode=PayloadMode.RAW,
         )
 
     def _on_read_error(self, status: Status) -> None:
@@ -371,6 +709,8 @@ class Manager:  # pylint: disable=too-many-instance-attributes
                 self._write_chunk_queue.put_nowait, chunk
             ),
             on_error=lambda _, status: self._on_write_error(status),
+            # Chunks are decoded by Chunk.decode, which avoids copying data.
+            payload_mode=PayloadMode.RAW,
         )
 
     def _on_write_error(self, status: Status) -> None:
@@ -398,6 +738,7 @@ class Manager:  # pylint: disable=too-many-instance-attributes
         """Begins a new read transfer, opening the stream if it isn't."""
 
         self._read_transfers[transfer.resource_id] = transfer
+        transfer.add_done_callback(self._on_transfer_done)
 
         if not self._read_stream:
             self._open_read_stream()
@@ -428,6 +769,7 @@ class Manager:  # pylint: disable=too-many-instance-attributes
         """Begins a new write transfer, opening the stream if it isn't."""
 
         self._write_transfers[transfer.resource_id] = transfer
+        transfer.add_done_callback(self._on_transfer_done)
 
         if not self._write_stream:
             self._open_write_stream()
@@ -458,10 +800,17 @@ class Manager:  # pylint: disable=too-many-instance-attributes
 class Error(Exception):
     """Exception raised when a transfer fails.
 
-    Stores the ID of the failed transfer resource and the error that occurred.
+    Stores the ID of the failed transfer resource and the error that occurred,
+    and the transfer's performance statistics, if available.
     """
 
-    def __init__(self, resource_id: int, status: Status):
+    def __init__(
+        self,
+        resource_id: int,
+        status: Status,
+        stats: Optional[TransferStats] = None,
+    ):
         super().__init__(f'Transfer {resource_id} failed with status {status}')
         self.resource_id = resource_id
         self.status = status
+        self.stats = stats
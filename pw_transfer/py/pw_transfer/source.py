@@ -0,0 +1,195 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Sources of data for write transfers.
+
+A write transfer reads its data in chunks through a WriteSource. Data in memory
+or in a file is sliced with memoryviews rather than copied, and files are
+memory-mapped rather than read. Data from an iterator is buffered only from the
+oldest offset the receiver may still request until the end of the data sent.
+"""
+
+import abc
+import collections
+import logging
+import mmap
+import os
+from typing import Deque, Iterable, Iterator, Optional, Union
+
+_LOG = logging.getLogger(__package__)
+
+# Data that can be written in a transfer. Strings are encoded as UTF-8, and
+# os.PathLike objects are paths to files to send. Objects that support the
+# buffer protocol, such as bytes, memoryview, and mmap, are sent directly.
+# Other iterables provide the data as a sequence of bytes objects.
+WriteData = Union[
+    bytes,
+    bytearray,
+    memoryview,
+    mmap.mmap,
+    str,
+    'os.PathLike[str]',
+    Iterable[bytes],
+]
+
+
+class WriteSource(abc.ABC):
+    """Provides the data for a write transfer by offset."""
+
+    @abc.abstractmethod
+    def size(self) -> Optional[int]:
+        """The total size of the data, or None if it is not yet known."""
+
+    @abc.abstractmethod
+    def read(self, offset: int, max_size: int) -> memoryview:
+        """Returns up to max_size bytes starting at offset.
+
+        Returns fewer bytes only at the end of the data.
+
+        Raises:
+          IndexError: The data at offset is no longer available.
+        """
+
+    def release(self, offset: int) -> None:
+        """Indicates that data before offset will not be read again."""
+
+    def close(self) -> None:
+        """Frees any resources held by the source."""
+
+
+class BufferSource(WriteSource):
+    """Data in an object that supports the buffer protocol."""
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview, mmap.mmap]):
+        self._view = memoryview(data).cast('B')
+        self._size = len(self._view)
+
+    def size(self) -> int:
+        return self._size
+
+    def read(self, offset: int, max_size: int) -> memoryview:
+        return self._view[offset : offset + max_size]
+
+    def close(self) -> None:
+        self._view.release()
+
+
+class FileSource(BufferSource):
+    """A memory-mapped file."""
+
+    def __init__(self, path: 'os.PathLike[str]') -> None:
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            # Empty files cannot be mapped.
+            self._map: Optional[mmap.mmap] = (
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                if size
+                else None
+            )
+
+        super().__init__(b'' if self._map is None else self._map)
+
+    def close(self) -> None:
+        super().close()
+
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Chunks that still refer to the data keep the mapping alive;
+                # it is unmapped when they are garbage collected.
+                _LOG.debug('Deferring unmapping of a file still in use')
+
+
+class IteratorSource(WriteSource):
+    """Data produced by an iterator of bytes objects.
+
+    The total size is learned when the iterator is exhausted. Pieces are kept
+    until data after them is released, so rewinding to earlier data is an
+    error. Chunks within a single piece are views of it; only chunks that span
+    pieces are copied.
+    """
+
+    def __init__(self, pieces: Iterable[bytes]) -> None:
+        self._iterator: Iterator[bytes] = iter(pieces)
+        # Buffered pieces and the offset of the first one.
+        self._pieces: Deque[memoryview] = collections.deque()
+        self._start_offset = 0
+        self._end_offset = 0
+        self._size: Optional[int] = None
+
+    def size(self) -> Optional[int]:
+        return self._size
+
+    def _fill(self, end_offset: int) -> None:
+        """Buffers data from the iterator up to end_offset, if available."""
+        while self._size is None and self._end_offset < end_offset:
+            try:
+                piece = memoryview(next(self._iterator)).cast('B')
+            except StopIteration:
+                self._size = self._end_offset
+                break
+
+            if piece:
+                self._pieces.append(piece)
+                self._end_offset += len(piece)
+
+    def read(self, offset: int, max_size: int) -> memoryview:
+        if offset < self._start_offset:
+            raise IndexError(
+                f'Offset {offset} was released; data is only available from '
+                f'{self._start_offset}'
+            )
+
+        # Read one byte further so the end of the data is known as soon as
+        # the final chunk is read.
+        self._fill(offset + max_size + 1)
+
+        parts = []
+        remaining = max_size
+        piece_offset = self._start_offset
+        for piece in self._pieces:
+            if not remaining:
+                break
+
+            piece_end = piece_offset + len(piece)
+            if piece_end > offset:
+                start = max(offset - piece_offset, 0)
+                part = piece[start : start + remaining]
+                parts.append(part)
+                remaining -= len(part)
+            piece_offset = piece_end
+
+        if len(parts) == 1:
+            return parts[0]
+        return memoryview(b''.join(parts))
+
+    def release(self, offset: int) -> None:
+        while self._pieces and self._start_offset + len(self._pieces[0]) <= (
+            offset
+        ):
+            self._start_offset += len(self._pieces.popleft())
+
+
+def open_source(data: WriteData) -> WriteSource:
+    """Creates the WriteSource for data passed to a write transfer."""
+    if isinstance(data, str):
+        return BufferSource(data.encode())
+
+    if isinstance(data, os.PathLike):
+        return FileSource(data)
+
+    if isinstance(data, (bytes, bytearray, memoryview, mmap.mmap)):
+        return BufferSource(data)
+
+    return IteratorSource(data)
@@ -0,0 +1,234 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Performance statistics for transfers.
+
+Every transfer records its throughput, round trip times, losses, and how long
+it spends waiting for the receiver to open a new window. Recording costs a
+clock read and a few additions per chunk, so it is always on.
+"""
+
+from dataclasses import dataclass
+import time
+from typing import Callable, Optional
+
+# Throughput is sampled at most this often and smoothed across samples.
+_THROUGHPUT_INTERVAL_S = 0.1
+_THROUGHPUT_SMOOTHING = 0.25
+
+
+@dataclass(frozen=True)
+class TransferStats:
+    """A snapshot of a transfer's performance.
+
+    Attributes:
+      elapsed_s: Time since the transfer began.
+      data_bytes: Bytes in all data chunks sent or received, including
+          retransmitted and discarded data.
+      throughput_bytes_per_s: Moving average of the rate at which the
+          receiver confirms data.
+      rtt_samples: Number of round trip time measurements. A read measures
+          from a parameters chunk to the first data it requested; a write
+          measures from the end of a window to the next parameters chunk.
+      last_rtt_s: The most recent round trip time.
+      min_rtt_s: The shortest round trip time.
+      smoothed_rtt_s: Smoothed round trip time, as in TCP (RFC 6298).
+      retransmit_requests: Times the receiver asked for data to be sent again
+          after a loss or timeout.
+      out_of_order_chunks: Data chunks received at an unexpected offset.
+      timeouts: Times no response arrived in time.
+      window_wait_s: Time spent with no window open, waiting for the receiver
+          to request more data. High values point to round trip time or
+          receiver processing time; try larger windows.
+      streaming_s: The rest of the elapsed time, while data was in flight.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    elapsed_s: float
+    data_bytes: int
+    throughput_bytes_per_s: float
+    rtt_samples: int
+    last_rtt_s: Optional[float]
+    min_rtt_s: Optional[float]
+    smoothed_rtt_s: Optional[float]
+    retransmit_requests: int
+    out_of_order_chunks: int
+    timeouts: int
+    window_wait_s: float
+    streaming_s: float
+
+    def __str__(self) -> str:
+        rtt = (
+            'no RTT samples'
+            if self.smoothed_rtt_s is None
+            else f'RTT {self.smoothed_rtt_s * 1e3:.1f} ms'
+        )
+        return (
+            f'{self.throughput_bytes_per_s / 1e3:.1f} kB/s, {rtt}, '
+            f'{self.retransmit_requests} retransmits, '
+            f'{self.out_of_order_chunks} out of order, '
+            f'{self.timeouts} timeouts, '
+            f'{self.window_wait_s:.3f} s of {self.elapsed_s:.3f} s waiting '
+            'for windows'
+        )
+
+
+class RttEstimator:
+    """Tracks the minimum and smoothed round trip times of a transfer."""
+
+    def __init__(self) -> None:
+        self.samples = 0
+        self.last_s: Optional[float] = None
+        self.min_s: Optional[float] = None
+        self.smoothed_s: Optional[float] = None
+
+    def on_sample(self, rtt_s: float) -> None:
+        self.samples += 1
+        self.last_s = rtt_s
+
+        if self.min_s is None or rtt_s < self.min_s:
+            self.min_s = rtt_s
+
+        if self.smoothed_s is None:
+            self.smoothed_s = rtt_s
+        else:
+            # Same smoothing as TCP's SRTT (RFC 6298).
+            self.smoothed_s += (rtt_s - self.smoothed_s) / 8
+
+
+class StatsTracker:
+    """Records the events that make up a transfer's TransferStats."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        initial_bytes: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Starts tracking a transfer.
+
+        Args:
+          initial_bytes: Data the receiver already had when the transfer
+              started, such as in a resumed transfer.
+          clock: Returns the current time in seconds.
+        """
+        self._clock = clock
+        self._start_time = clock()
+
+        self.data_bytes = 0
+        self.retransmit_requests = 0
+        self.out_of_order_chunks = 0
+        self.timeouts = 0
+
+        self.rtt = RttEstimator()
+
+        self._throughput: Optional[float] = None
+        self._sample_time = self._start_time
+        self._initial_bytes = initial_bytes
+        self._sample_bytes = initial_bytes
+        self._confirmed_bytes = initial_bytes
+
+        self._window_wait_s = 0.0
+        self._window_wait_start: Optional[float] = None
+
+    def begin(self) -> None:
+        """Restarts the clock when the transfer begins.
+
+        The transfer has no window open until the receiver responds.
+        """
+        self._start_time = self._sample_time = self._clock()
+        self._window_wait_start = self._start_time
+
+    def on_data(self, num_bytes: int) -> None:
+        self.data_bytes += num_bytes
+
+    def on_confirmed(self, confirmed_bytes: int) -> None:
+        """Records the number of bytes the receiver has confirmed."""
+        self._confirmed_bytes = confirmed_bytes
+
+        now = self._clock()
+        interval_s = now - self._sample_time
+        if interval_s < _THROUGHPUT_INTERVAL_S:
+            return
+
+        rate = (confirmed_bytes - self._sample_bytes) / interval_s
+        if self._throughput is None:
+            self._throughput = rate
+        else:
+            self._throughput += _THROUGHPUT_SMOOTHING * (
+                rate - self._throughput
+            )
+
+        self._sample_time = now
+        self._sample_bytes = confirmed_bytes
+
+    def on_rtt_sample(self, rtt_s: float) -> None:
+        self.rtt.on_sample(rtt_s)
+
+    def on_retransmit_request(self) -> None:
+        self.retransmit_requests += 1
+
+    def on_out_of_order_chunk(self) -> None:
+        self.out_of_order_chunks += 1
+
+    def on_timeout(self) -> None:
+        self.timeouts += 1
+
+    def start_window_wait(self) -> float:
+        """Marks that no window is open. Returns the current time."""
+        now = self._clock()
+        if self._window_wait_start is None:
+            self._window_wait_start = now
+        return now
+
+    def end_window_wait(self) -> float:
+        """Marks that a window is open. Returns the current time."""
+        now = self._clock()
+        if self._window_wait_start is not None:
+            self._window_wait_s += now - self._window_wait_start
+            self._window_wait_start = None
+        return now
+
+    def snapshot(self) -> TransferStats:
+        now = self._clock()
+        elapsed_s = now - self._start_time
+
+        window_wait_s = self._window_wait_s
+        if self._window_wait_start is not None:
+            window_wait_s += now - self._window_wait_start
+
+        if self._throughput is not None:
+            throughput = self._throughput
+        elif elapsed_s > 0:
+            throughput = (
+                self._confirmed_bytes - self._initial_bytes
+            ) / elapsed_s
+        else:
+            throughput = 0.0
+
+        return TransferStats(
+            elapsed_s=elapsed_s,
+            data_bytes=self.data_bytes,
+            throughput_bytes_per_s=throughput,
+            rtt_samples=self.rtt.samples,
+            last_rtt_s=self.rtt.last_s,
+            min_rtt_s=self.rtt.min_s,
+            smoothed_rtt_s=self.rtt.smoothed_s,
+            retransmit_requests=self.retransmit_requests,
+            out_of_order_chunks=self.out_of_order_chunks,
+            timeouts=self.timeouts,
+            window_wait_s=window_wait_s,
+            streaming_s=elapsed_s - window_wait_s,
+        )
@@ -15,24 +15,37 @@
 
 import abc
 import asyncio
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import enum
+import heapq
+import itertools
 import logging
 import math
 import threading
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import weakref
 
 from pw_status import Status
 from pw_transfer.chunk import Chunk, ProtocolVersion
+from pw_transfer.source import BufferSource, WriteSource
+from pw_transfer.stats import StatsTracker, TransferStats
+from pw_transfer.window import FixedWindow, WindowPolicy
 
 _LOG = logging.getLogger(__package__)
 
 
 @dataclass(frozen=True)
 class ProgressStats:
+    """The progress of a transfer, passed to its progress callback.
+
+    transfer_stats holds the transfer's performance statistics. It is not
+    compared when comparing ProgressStats.
+    """
+
     bytes_sent: int
     bytes_confirmed_received: int
     total_size_bytes: Optional[int]
+    transfer_stats: Optional[TransferStats] = field(default=None, compare=False)
 
     def percent_received(self) -> float:
         if self.total_size_bytes is None:
@@ -53,13 +66,101 @@ class ProgressStats:
 ProgressCallback = Callable[[ProgressStats], Any]
 
 
+class _TimerQueue:
+    """Runs the _Timers of an event loop from a single scheduled callback.
+
+    Each Manager runs its transfers in its own event loop, so all of a
+    Manager's transfers share one queue. Timers are kept in a heap ordered by
+    deadline, and only the earliest deadline is scheduled with the event loop.
+
+    Restarting a timer usually moves its deadline later, as a transfer's
+    response timeout does with every chunk. That only updates the timer; its
+    heap entry stays in place and is re-queued at the new deadline when it
+    comes due. Stopping a timer clears its deadline and its entry is discarded
+    when it comes due. Both are O(1), and neither creates or cancels a task.
+    """
+
+    # Queues by event loop.
+    _queues: 'weakref.WeakKeyDictionary[Any, _TimerQueue]' = (
+        weakref.WeakKeyDictionary()
+    )
+
+    @classmethod
+    def for_running_loop(cls) -> '_TimerQueue':
+        loop = asyncio.get_running_loop()
+        queue = cls._queues.get(loop)
+        if queue is None:
+            queue = cls._queues[loop] = cls(loop)
+        return queue
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        # (deadline, sequence number, timer). The sequence number orders
+        # timers with equal deadlines.
+        self._heap: List[Tuple[float, int, _Timer]] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._wakeup_time = math.inf
+
+    def time(self) -> float:
+        return self._loop.time()
+
+    def queue(self, timer: '_Timer', deadline: float) -> None:
+        """Adds a heap entry for a timer."""
+        heapq.heappush(self._heap, (deadline, next(self._sequence), timer))
+        timer.queued_deadline = deadline
+
+        if deadline < self._wakeup_time:
+            self._wake_at(deadline)
+
+    def _wake_at(self, when: float) -> None:
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = self._loop.call_at(when, self._run_expired)
+        self._wakeup_time = when
+
+    def _run_expired(self) -> None:
+        self._wakeup = None
+        self._wakeup_time = math.inf
+
+        now = self._loop.time()
+        while self._heap and self._heap[0][0] <= now:
+            queued_deadline, _, timer = heapq.heappop(self._heap)
+
+            # Skip entries superseded by an earlier deadline.
+            if queued_deadline != timer.queued_deadline:
+                continue
+
+            timer.queued_deadline = None
+            if timer.deadline is None:
+                continue  # The timer was stopped.
+
+            if timer.deadline > now:
+                self.queue(timer, timer.deadline)  # The timer was restarted.
+            else:
+                timer.deadline = None
+                try:
+                    timer.callback()
+                except Exception:  # pylint: disable=broad-except
+                    _LOG.exception('Timer callback %s failed', timer.callback)
+
+        if self._heap and self._heap[0][0] < self._wakeup_time:
+            self._wake_at(self._heap[0][0])
+
+
 class _Timer:
     """A timer which invokes a callback after a certain timeout."""
 
     def __init__(self, timeout_s: float, callback: Callable[[], Any]):
         self.timeout_s = timeout_s
-        self._callback = callback
-        self._task: Optional[asyncio.Task[Any]] = None
+        self.callback = callback
+
+        # When the timer expires, and the deadline of its entry in the
+        # _TimerQueue, in event loop time.
+        self.deadline: Optional[float] = None
+        self.queued_deadline: Optional[float] = None
+
+        self._queue: Optional[_TimerQueue] = None
 
     def start(self, timeout_s: Optional[float] = None) -> None:
         """Starts a new timer.
@@ -67,21 +168,22 @@ class _Timer:
         If a timer is already running, it is stopped and a new timer started.
         This can be used to implement watchdog-like behavior, where a callback
         is invoked after some time without a kick.
+
+        Must be called from the event loop in which the timer runs.
         """
-        self.stop()
+        if self._queue is None:
+            self._queue = _TimerQueue.for_running_loop()
+
         timeout_s = self.timeout_s if timeout_s is None else timeout_s
-        self._task = asyncio.create_task(self._run(timeout_s))
+        self.deadline = self._queue.time() + timeout_s
+
+        # The existing entry will re-queue the timer if it comes due first.
+        if self.queued_deadline is None or self.deadline < self.queued_deadline:
+            self._queue.queue(self, self.deadline)
 
     def stop(self) -> None:
         """Terminates a running timer."""
-        if self._task is not None:
-            self._task.cancel()
-            self._task = None
-
-    async def _run(self, timeout_s: float) -> None:
-        await asyncio.sleep(timeout_s)
-        self._task = None
-        self._callback()
+        self.deadline = None
 
 
 class Transfer(abc.ABC):
@@ -164,6 +266,8 @@ class Transfer(abc.ABC):
         self._initial_response_timeout_s = initial_response_timeout_s
 
         self._progress_callback = progress_callback
+        self._stats = StatsTracker()
+        self._done_callbacks: List[Callable[['Transfer'], Any]] = []
 
     async def begin(self) -> None:
         """Sends the initial chunk of the transfer."""
@@ -193,9 +297,22 @@ class Transfer(abc.ABC):
         # on the opening chunk, in case the server only runs legacy.
         self._set_initial_chunk_fields(initial_chunk)
 
+        self._stats.begin()
         self._send_chunk(initial_chunk)
         self._response_timer.start(self._initial_response_timeout_s)
 
+    def add_done_callback(self, callback: Callable[['Transfer'], Any]) -> None:
+        """Registers a callback to invoke with the transfer when it finishes.
+
+        Callbacks run in the thread that finishes the transfer, after done is
+        set. They must be added before the transfer begins.
+        """
+        self._done_callbacks.append(callback)
+
+    def stats(self) -> TransferStats:
+        """Returns the transfer's performance statistics so far."""
+        return self._stats.snapshot()
+
     @property
     def id(self) -> int:
         """Returns the identifier for the active transfer."""
@@ -211,6 +328,10 @@ class Transfer(abc.ABC):
     def data(self) -> bytes:
         """Returns the data read or written in this transfer."""
 
+    def size(self) -> int:
+        """Returns the number of bytes read or written in this transfer."""
+        return len(self.data)
+
     @abc.abstractmethod
     def _set_initial_chunk_fields(self, chunk: Chunk) -> None:
         """Sets fields for the initial non-handshake chunk of the transfer."""
@@ -229,7 +350,8 @@ class Transfer(abc.ABC):
         self._response_timer.stop()
         self._retries = 0  # Received data from service, so reset the retries.
 
-        _LOG.debug('Received chunk\n%s', str(chunk.to_message()).rstrip())
+        if _LOG.isEnabledFor(logging.DEBUG):
+            _LOG.debug('Received chunk\n%s', str(chunk.to_message()).rstrip())
 
         # Status chunks are only used to terminate a transfer. They do not
         # contain any data that requires processing.
@@ -331,6 +453,7 @@ class Transfer(abc.ABC):
 
         self._retries += 1
         self._lifetime_retries += 1
+        self._stats.on_timeout()
 
         if (
             self._retries > self._max_retries
@@ -373,9 +496,11 @@ class Transfer(abc.ABC):
         self.status = status
 
         if status.ok():
-            total_size = len(self.data)
+            total_size = self.size()
             self._update_progress(total_size, total_size, total_size)
 
+        _LOG.debug('Transfer %d finished: %s', self.id, self._stats.snapshot())
+
         if not skip_callback:
             self._end_transfer(self)
 
@@ -383,6 +508,9 @@ class Transfer(abc.ABC):
         self._state = Transfer._State.COMPLETE
         self.done.set()
 
+        for callback in self._done_callbacks:
+            callback(self)
+
     def _update_progress(
         self,
         bytes_sent: int,
@@ -391,8 +519,18 @@ class Transfer(abc.ABC):
     ) -> None:
         """Invokes the provided progress callback, if any, with the progress."""
 
+        self._stats.on_confirmed(bytes_confirmed_received)
+
+        if self._progress_callback is None and not _LOG.isEnabledFor(
+            logging.DEBUG
+        ):
+            return
+
         stats = ProgressStats(
-            bytes_sent, bytes_confirmed_received, total_size_bytes
+            bytes_sent,
+            bytes_confirmed_received,
+            total_size_bytes,
+            self._stats.snapshot(),
         )
         _LOG.debug('Transfer %d progress: %s', self.id, stats)
 
@@ -420,13 +558,18 @@ class Transfer(abc.ABC):
 
 
 class WriteTransfer(Transfer):
-    """A client -> server write transfer."""
+    """A client -> server write transfer.
+
+    The data is either bytes or a WriteSource, which produces chunks without
+    copying them and may not know the total size until its data runs out. The
+    transfer closes the source when it finishes.
+    """
 
     def __init__(  # pylint: disable=too-many-arguments
         self,
         session_id: int,
         resource_id: int,
-        data: bytes,
+        data: Union[bytes, WriteSource],
         send_chunk: Callable[[Chunk], None],
         end_transfer: Callable[[Transfer], None],
         response_timeout_s: float,
@@ -448,7 +591,12 @@ class WriteTransfer(Transfer):
             protocol_version,
             progress_callback,
         )
-        self._data = data
+        if isinstance(data, WriteSource):
+            self._data = b''
+            self._source = data
+        else:
+            self._data = data
+            self._source = BufferSource(data)
 
         self._offset = 0
         self._window_end_offset = 0
@@ -460,10 +608,26 @@ class WriteTransfer(Transfer):
 
         self._bytes_confirmed_received = 0
 
+        # When the last chunk of a window was sent, for an RTT sample when the
+        # next parameters chunk arrives.
+        self._window_sent_time: Optional[float] = None
+
     @property
     def data(self) -> bytes:
+        """The data being written, or empty if it is from a WriteSource."""
         return self._data
 
+    def size(self) -> int:
+        size = self._source.size()
+        return self._offset if size is None else size
+
+    def finish(self, status: Status, skip_callback: bool = False) -> None:
+        # Drop all views of the data before the transfer is marked done, as
+        # the caller may then close the underlying buffer (e.g. an mmap).
+        self._last_chunk = None
+        self._source.close()
+        super().finish(status, skip_callback)
+
     def _set_initial_chunk_fields(self, chunk: Chunk) -> None:
         # Nothing to tag onto the initial chunk in a write transfer.
         pass
@@ -481,6 +645,11 @@ class WriteTransfer(Transfer):
 
         assert self._state is Transfer._State.WAITING
 
+        now = self._stats.end_window_wait()
+        if self._window_sent_time is not None:
+            self._stats.on_rtt_sample(now - self._window_sent_time)
+            self._window_sent_time = None
+
         if not self._handle_parameters_update(chunk):
             return
 
@@ -508,18 +677,37 @@ class WriteTransfer(Transfer):
             _LOG.debug('Transfer %d: Skipping stale window', self.id)
             return
 
-        chunk = self._next_chunk()
+        try:
+            chunk = self._next_chunk()
+        except Exception:  # pylint: disable=broad-except
+            _LOG.exception(
+                'Transfer %d: failed to read data at offset %d from source',
+                self.id,
+                self._offset,
+            )
+            self._send_final_chunk(Status.DATA_LOSS)
+            return
+
+        if chunk is None:
+            self._send_final_chunk(Status.OUT_OF_RANGE)
+            return
+
         self._offset += len(chunk.data)
+        self._stats.on_data(len(chunk.data))
 
-        sent_requested_bytes = self._offset == self._window_end_offset
+        sent_requested_bytes = (
+            self._offset == self._window_end_offset
+            or chunk.remaining_bytes == 0
+        )
 
         self._send_chunk(chunk)
         self._update_progress(
-            self._offset, self._bytes_confirmed_received, len(self.data)
+            self._offset, self._bytes_confirmed_received, self._source.size()
         )
 
         if sent_requested_bytes:
             self._state = Transfer._State.WAITING
+            self._window_sent_time = self._stats.start_window_wait()
         else:
             asyncio.create_task(
                 self._transmit_next_chunk(
@@ -530,13 +718,24 @@ class WriteTransfer(Transfer):
     def _handle_parameters_update(self, chunk: Chunk) -> bool:
         """Updates transfer state based on a transfer parameters update."""
 
-        if chunk.offset > len(self.data):
+        try:
+            data_available = self._data_available(chunk.offset)
+        except Exception:  # pylint: disable=broad-except
+            _LOG.exception(
+                'Transfer %d: failed to read data at offset %d from source',
+                self.id,
+                chunk.offset,
+            )
+            self._send_final_chunk(Status.DATA_LOSS)
+            return False
+
+        if not data_available:
             # Bad offset; terminate the transfer.
             _LOG.error(
-                'Transfer %d: server requested invalid offset %d (size %d)',
+                'Transfer %d: server requested invalid offset %d (size %s)',
                 self.id,
                 chunk.offset,
-                len(self.data),
+                self._source.size(),
             )
 
             self._send_final_chunk(Status.OUT_OF_RANGE)
@@ -551,7 +750,14 @@ class WriteTransfer(Transfer):
             return False
 
         # Extend the window to the new end offset specified by the server.
-        self._window_end_offset = min(chunk.window_end_offset, len(self.data))
+        self._window_end_offset = chunk.window_end_offset
+        size = self._source.size()
+        if size is not None:
+            self._window_end_offset = min(self._window_end_offset, size)
+
+        # The receiver has everything before its offset, so it won't be sent
+        # again.
+        self._source.release(chunk.offset)
 
         if chunk.requests_transmission_from_offset():
             # Check whether the client has sent a previous data offset, which
@@ -563,6 +769,7 @@ class WriteTransfer(Transfer):
                     chunk.offset,
                     self._offset,
                 )
+                self._stats.on_retransmit_request()
 
             self._offset = chunk.offset
 
@@ -579,10 +786,28 @@ class WriteTransfer(Transfer):
             self._state is Transfer._State.WAITING
             and self._last_chunk is not None
         ):
+            # A response to a retried chunk can't be matched to a specific
+            # chunk, so it doesn't give an RTT sample.
+            self._window_sent_time = None
             self._send_chunk(self._last_chunk)
 
-    def _next_chunk(self) -> Chunk:
-        """Returns the next Chunk message to send in the data transfer."""
+    def _data_available(self, offset: int) -> bool:
+        """Checks that the data at an offset can be sent."""
+        try:
+            # Reading ensures the size is known if the data ends before offset.
+            self._source.read(offset, 0)
+        except IndexError:
+            return False
+
+        size = self._source.size()
+        return size is None or offset <= size
+
+    def _next_chunk(self) -> Optional[Chunk]:
+        """Returns the next Chunk message to send in the data transfer.
+
+        Returns None if the data at the current offset is unavailable. Other
+        errors from the source are raised.
+        """
         chunk = Chunk(
             self._configured_protocol_version,
             Chunk.Type.DATA,
@@ -593,10 +818,14 @@ class WriteTransfer(Transfer):
         max_bytes_in_chunk = min(
             self._max_chunk_size, self._window_end_offset - self._offset
         )
-        chunk.data = self.data[self._offset : self._offset + max_bytes_in_chunk]
+        try:
+            chunk.data = self._source.read(self._offset, max_bytes_in_chunk)
+        except IndexError as err:
+            _LOG.error('Transfer %d: %s', self.id, err)
+            return None
 
         # Mark the final chunk of the transfer.
-        if len(self.data) - self._offset <= max_bytes_in_chunk:
+        if self._offset + len(chunk.data) == self._source.size():
             chunk.remaining_bytes = 0
 
         return chunk
@@ -608,8 +837,20 @@ class ReadTransfer(Transfer):
     Although Python can effectively handle an unlimited transfer window, this
     client sets a conservative window and chunk size to avoid overloading the
     device. These are configurable in the constructor.
+
+    If a sink is provided, each chunk's data is passed to it as soon as all
+    data before it has been received, and the data is not kept in memory.
+
+    The window is sized by a WindowPolicy. By default, every window is
+    max_bytes_to_receive bytes; an adaptive policy such as AimdWindow resizes
+    windows as chunks arrive or are lost.
+
+    A nonzero initial_offset asks the server to start sending from that offset,
+    to resume an interrupted transfer. size() includes the skipped data.
     """
 
+    # pylint: disable=too-many-instance-attributes
+
     # The fractional position within a window at which a receive transfer should
     # extend its window size to minimize the amount of time the transmitter
     # spends blocked.
@@ -619,6 +860,11 @@ class ReadTransfer(Transfer):
     # third of the window, and so on.
     EXTEND_WINDOW_DIVISOR = 2
 
+    # When out-of-order reassembly is enabled, the number of chunks buffered
+    # after a gap before the gap is assumed lost and requested again. Chunks
+    # that are only reordered fill the gap before this and need no retransmit.
+    REORDER_THRESHOLD = 3
+
     def __init__(  # pylint: disable=too-many-arguments
         self,
         session_id: int,
@@ -634,6 +880,10 @@ class ReadTransfer(Transfer):
         max_chunk_size: int = 1024,
         chunk_delay_us: Optional[int] = None,
         progress_callback: Optional[ProgressCallback] = None,
+        window_policy: Optional[WindowPolicy] = None,
+        reassemble_out_of_order: bool = False,
+        sink: Optional[Callable[[bytes], Any]] = None,
+        initial_offset: int = 0,
     ):
         super().__init__(
             session_id,
@@ -647,21 +897,53 @@ class ReadTransfer(Transfer):
             protocol_version,
             progress_callback,
         )
-        self._max_bytes_to_receive = max_bytes_to_receive
         self._max_chunk_size = max_chunk_size
         self._chunk_delay_us = chunk_delay_us
+        self._window_policy = (
+            FixedWindow(max_bytes_to_receive)
+            if window_policy is None
+            else window_policy
+        )
 
         self._remaining_transfer_size: Optional[int] = None
         self._data = bytearray()
-        self._offset = 0
-        self._window_end_offset = max_bytes_to_receive
+        self._sink = sink
+        self._offset = initial_offset
+        self._stats = StatsTracker(initial_bytes=initial_offset)
+        self._window_end_offset = (
+            initial_offset + self._window_policy.window_size()
+        )
+
+        # The furthest end offset ever requested. An adaptive window may shrink,
+        # but chunks sent for an earlier, larger window may still arrive.
+        self._max_window_end_offset = self._window_end_offset
         self._last_chunk_offset: Optional[int] = None
 
+        # The offset and time of a parameters chunk whose response will be
+        # used as a round trip time sample.
+        self._rtt_probe: Optional[Tuple[int, float]] = None
+
+        # Chunks received ahead of the expected offset, by offset, or None if
+        # out-of-order chunks are discarded.
+        self._reassembly: Optional[Dict[int, Chunk]] = (
+            {} if reassemble_out_of_order else None
+        )
+
+    @property
+    def window_policy(self) -> WindowPolicy:
+        return self._window_policy
+
     @property
     def data(self) -> bytes:
-        """Returns an immutable copy of the data that has been read."""
+        """Returns an immutable copy of the data that has been read.
+
+        Empty if the data was passed to a sink.
+        """
         return bytes(self._data)
 
+    def size(self) -> int:
+        return self._offset
+
     def _set_initial_chunk_fields(self, chunk: Chunk) -> None:
         self._set_transfer_parameters(chunk)
 
@@ -671,6 +953,14 @@ class ReadTransfer(Transfer):
         In a read transfer, the client receives data chunks from the server.
         Once all pending data is received, the transfer parameters are updated.
         """
+        self._stats.on_data(len(chunk.data))
+
+        if chunk.offset != self._offset:
+            self._stats.on_out_of_order_chunk()
+
+            if self._reassembly is not None:
+                self._buffer_out_of_order_chunk(chunk, self._reassembly)
+                return
 
         if self._state is Transfer._State.RECOVERY:
             if chunk.offset != self._offset:
@@ -681,11 +971,7 @@ class ReadTransfer(Transfer):
                         self.id,
                         chunk.offset,
                     )
-                    self._send_chunk(
-                        self._transfer_parameters(
-                            Chunk.Type.PARAMETERS_RETRANSMIT
-                        )
-                    )
+                    self._request_retransmit()
                 else:
                     _LOG.debug(
                         'Transfer %d waiting for offset %d, ignoring %d',
@@ -717,14 +1003,72 @@ class ReadTransfer(Transfer):
                 chunk.offset,
             )
             self._state = Transfer._State.RECOVERY
+            self._rtt_probe = None
+            self._window_policy.on_loss()
+            self._request_retransmit()
+            return
+
+        now = self._stats.end_window_wait()
+        if self._rtt_probe is not None and self._rtt_probe[0] == chunk.offset:
+            rtt_s = now - self._rtt_probe[1]
+            self._window_policy.on_rtt_sample(rtt_s)
+            self._stats.on_rtt_sample(rtt_s)
+            self._rtt_probe = None
+
+        if not self._commit_chunk(chunk):
+            return
+
+        if self._reassembly:
+            # Commit buffered chunks that the new data made contiguous.
+            while self._offset in self._reassembly:
+                if not self._commit_chunk(self._reassembly.pop(self._offset)):
+                    return
+
+            for offset in [o for o in self._reassembly if o < self._offset]:
+                del self._reassembly[offset]
 
+        remaining_window_size = self._window_end_offset - self._offset
+        extend_window = (
+            remaining_window_size
+            <= self._window_policy.window_size()
+            / ReadTransfer.EXTEND_WINDOW_DIVISOR
+        )
+
+        if self._offset >= self._window_end_offset:
+            # All pending data was received. Send out a new parameters chunk for
+            # the next block.
             self._send_chunk(
                 self._transfer_parameters(Chunk.Type.PARAMETERS_RETRANSMIT)
             )
-            return
+            self._rtt_probe = (self._offset, self._stats.start_window_wait())
+        elif extend_window:
+            self._send_chunk(
+                self._transfer_parameters(Chunk.Type.PARAMETERS_CONTINUE)
+            )
+
+    def _commit_chunk(self, chunk: Chunk) -> bool:
+        """Appends an in-order chunk's data to the transfer.
+
+        Returns:
+          False if the chunk ended the transfer.
+        """
+        if self._sink is None:
+            self._data += chunk.data
+        else:
+            try:
+                self._sink(bytes(chunk.data))
+            except Exception:  # pylint: disable=broad-except
+                _LOG.exception(
+                    'Transfer %d: failed to write %d B at offset %d to sink',
+                    self.id,
+                    len(chunk.data),
+                    chunk.offset,
+                )
+                self._send_final_chunk(Status.DATA_LOSS)
+                return False
 
-        self._data += chunk.data
         self._offset += len(chunk.data)
+        self._window_policy.on_data_received(len(chunk.data))
 
         # Update the last offset seen so that retries can be detected.
         self._last_chunk_offset = chunk.offset
@@ -733,7 +1077,7 @@ class ReadTransfer(Transfer):
             if chunk.remaining_bytes == 0:
                 # No more data to read. Acknowledge receipt and finish.
                 self._send_final_chunk(Status.OK)
-                return
+                return False
 
             # The server may indicate if the amount of remaining data is known.
             self._remaining_transfer_size = chunk.remaining_bytes
@@ -762,9 +1106,9 @@ class ReadTransfer(Transfer):
                     self._offset,
                 )
                 self._send_final_chunk(Status.INTERNAL)
-                return
+                return False
 
-            if chunk.window_end_offset > self._window_end_offset:
+            if chunk.window_end_offset > self._max_window_end_offset:
                 _LOG.error(
                     'Transfer %d: transmitter sent invalid later end offset '
                     '%d (receiver end offset %d)',
@@ -773,38 +1117,100 @@ class ReadTransfer(Transfer):
                     self._window_end_offset,
                 )
                 self._send_final_chunk(Status.INTERNAL)
-                return
+                return False
 
-            self._window_end_offset = chunk.window_end_offset
+            # The transmitter may shorten the window, but a chunk sent before
+            # the window was last shrunk does not extend it again.
+            self._window_end_offset = min(
+                chunk.window_end_offset, self._window_end_offset
+            )
 
-        remaining_window_size = self._window_end_offset - self._offset
-        extend_window = (
-            remaining_window_size
-            <= self._max_bytes_to_receive / ReadTransfer.EXTEND_WINDOW_DIVISOR
-        )
+        return True
 
-        if self._offset == self._window_end_offset:
-            # All pending data was received. Send out a new parameters chunk for
-            # the next block.
-            self._send_chunk(
-                self._transfer_parameters(Chunk.Type.PARAMETERS_RETRANSMIT)
-            )
-        elif extend_window:
-            self._send_chunk(
-                self._transfer_parameters(Chunk.Type.PARAMETERS_CONTINUE)
+    def _buffer_out_of_order_chunk(
+        self, chunk: Chunk, reassembly: Dict[int, Chunk]
+    ) -> None:
+        """Holds a chunk received ahead of the expected offset.
+
+        Once REORDER_THRESHOLD chunks are buffered, or the transmitter reaches
+        the end of its window, the data before the first buffered chunk is
+        assumed lost and only that range is requested again.
+        """
+        end_offset = chunk.offset + len(chunk.data)
+        if chunk.offset < self._offset or end_offset > (
+            self._max_window_end_offset
+        ):
+            _LOG.debug(
+                'Transfer %d discarding chunk [%d, %d) outside the window',
+                self.id,
+                chunk.offset,
+                end_offset,
             )
+            return
+
+        repeated = chunk.offset in reassembly
+        reassembly[chunk.offset] = chunk
+
+        if self._state is Transfer._State.RECOVERY:
+            if repeated:
+                _LOG.debug(
+                    'Transfer %d received repeated offset %d: '
+                    'retry detected, resending transfer parameters',
+                    self.id,
+                    chunk.offset,
+                )
+                self._request_retransmit()
+            return
+
+        if (
+            len(reassembly) < ReadTransfer.REORDER_THRESHOLD
+            and end_offset < self._window_end_offset
+            and chunk.remaining_bytes != 0
+        ):
+            # More chunks are on the way, and may fill the gap.
+            return
+
+        _LOG.debug(
+            'Transfer %d missing [%d, %d): entering recovery state',
+            self.id,
+            self._offset,
+            min(reassembly),
+        )
+        self._state = Transfer._State.RECOVERY
+        self._rtt_probe = None
+        self._window_policy.on_loss()
+        self._request_retransmit()
+
+    def _request_retransmit(self) -> None:
+        """Asks the server to resend data from the current offset."""
+        self._stats.on_retransmit_request()
+        self._send_chunk(
+            self._transfer_parameters(Chunk.Type.PARAMETERS_RETRANSMIT)
+        )
 
     def _retry_after_data_timeout(self) -> None:
         if (
             self._state is Transfer._State.WAITING
             or self._state is Transfer._State.RECOVERY
         ):
-            self._send_chunk(
-                self._transfer_parameters(Chunk.Type.PARAMETERS_RETRANSMIT)
-            )
+            # A response to a retried request can't be matched to a specific
+            # request, so it doesn't give an RTT sample.
+            self._rtt_probe = None
+            self._window_policy.on_timeout()
+            self._request_retransmit()
 
     def _set_transfer_parameters(self, chunk: Chunk) -> None:
-        self._window_end_offset = self._offset + self._max_bytes_to_receive
+        self._window_end_offset = (
+            self._offset + self._window_policy.window_size()
+        )
+        if self._reassembly and chunk.type is Chunk.Type.PARAMETERS_RETRANSMIT:
+            # Only request the data missing before the buffered chunks.
+            self._window_end_offset = min(
+                self._window_end_offset, *self._reassembly
+            )
+        self._max_window_end_offset = max(
+            self._max_window_end_offset, self._window_end_offset
+        )
 
         chunk.offset = self._offset
         chunk.window_end_offset = self._window_end_offset
@@ -0,0 +1,187 @@
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Policies that size the receive window of a read transfer.
+
+A read transfer asks the server for a window of data at a time. A window that
+is too small leaves the link idle while the server waits for the next
+parameters chunk; one that is too large wastes the rest of the window whenever
+a chunk is lost, since the server must resend everything after the lost chunk.
+
+A WindowPolicy observes a transfer's chunks, losses, timeouts, and round trip
+times and chooses the size of each window the transfer requests.
+"""
+
+import abc
+import logging
+from typing import Optional
+
+from pw_transfer.stats import RttEstimator
+
+_LOG = logging.getLogger(__package__)
+
+
+class WindowPolicy(abc.ABC):
+    """Chooses how many bytes a read transfer requests at a time.
+
+    Each ReadTransfer has its own policy instance. The transfer calls the
+    on_* methods as events occur and reads window_size() whenever it sends
+    transfer parameters.
+    """
+
+    @abc.abstractmethod
+    def window_size(self) -> int:
+        """The number of bytes to request in the next window."""
+
+    def on_data_received(self, num_bytes: int) -> None:
+        """Called for each in-order data chunk the transfer accepts."""
+
+    def on_rtt_sample(self, rtt_s: float) -> None:
+        """Called with the time from requesting a window to its first chunk."""
+
+    def on_loss(self) -> None:
+        """Called when a chunk arrives out of order, indicating data loss."""
+
+    def on_timeout(self) -> None:
+        """Called when no chunk arrives before the response timeout."""
+
+
+class FixedWindow(WindowPolicy):
+    """Always requests the same number of bytes."""
+
+    def __init__(self, size: int) -> None:
+        if size <= 0:
+            raise ValueError('Window size must be positive')
+        self._size = size
+
+    def window_size(self) -> int:
+        return self._size
+
+
+class AimdWindow(WindowPolicy):
+    """Additive-increase, multiplicative-decrease window sizing.
+
+    The window starts small and grows like a TCP congestion window:
+
+    - In slow start, the window grows by the size of each received chunk,
+      doubling every window.
+    - Once it reaches the slow start threshold, it grows by one chunk per
+      window (congestion avoidance).
+    - When a chunk is lost, the threshold and window are cut to
+      decrease_factor of the window.
+    - On a timeout, the window falls back to min_size and slow starts again.
+
+    If rtt_growth_limit is set, slow start also ends when a round trip takes
+    that many times longer than the fastest round trip seen, since a growing
+    round trip time means data is queueing on the link.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        max_chunk_size: int = 1024,
+        *,
+        initial_size: Optional[int] = None,
+        min_size: Optional[int] = None,
+        max_size: int = 64 * 1024,
+        decrease_factor: float = 0.5,
+        rtt_growth_limit: Optional[float] = 2.0,
+    ) -> None:
+        """Creates an AIMD window policy.
+
+        Args:
+          max_chunk_size: The transfer's maximum chunk size; the window grows
+              by this much per window in congestion avoidance.
+          initial_size: The first window's size. Defaults to two chunks.
+          min_size: The smallest window. Defaults to one chunk.
+          max_size: The largest window.
+          decrease_factor: The fraction of the window kept after a loss.
+          rtt_growth_limit: End slow start when a round trip takes this many
+              times the minimum round trip time. None disables the check.
+        """
+        if max_chunk_size <= 0:
+            raise ValueError('max_chunk_size must be positive')
+        if not 0.0 < decrease_factor < 1.0:
+            raise ValueError('decrease_factor must be between 0 and 1')
+
+        self._chunk_size = max_chunk_size
+        self.min_size = max_chunk_size if min_size is None else min_size
+        self.max_size = max_size
+
+        if not 0 < self.min_size <= self.max_size:
+            raise ValueError('Window sizes must satisfy 0 < min <= max')
+
+        self._decrease_factor = decrease_factor
+        self._rtt_growth_limit = rtt_growth_limit
+
+        initial = 2 * max_chunk_size if initial_size is None else initial_size
+        self._window = float(self._clamp(initial))
+        self._slow_start_threshold = float(max_size)
+
+        self._rtt = RttEstimator()
+
+    @property
+    def min_rtt_s(self) -> Optional[float]:
+        return self._rtt.min_s
+
+    @property
+    def smoothed_rtt_s(self) -> Optional[float]:
+        return self._rtt.smoothed_s
+
+    def _clamp(self, size: float) -> float:
+        return min(max(size, self.min_size), self.max_size)
+
+    def window_size(self) -> int:
+        return int(self._window)
+
+    def in_slow_start(self) -> bool:
+        return self._window < self._slow_start_threshold
+
+    def on_data_received(self, num_bytes: int) -> None:
+        if self.in_slow_start():
+            self._window += num_bytes
+        else:
+            self._window += self._chunk_size * num_bytes / self._window
+
+        self._window = self._clamp(self._window)
+
+    def on_rtt_sample(self, rtt_s: float) -> None:
+        self._rtt.on_sample(rtt_s)
+        min_rtt_s = self._rtt.min_s
+        assert min_rtt_s is not None
+
+        if (
+            self._rtt_growth_limit is not None
+            and self.in_slow_start()
+            and rtt_s > min_rtt_s * self._rtt_growth_limit
+        ):
+            _LOG.debug(
+                'RTT grew from %.3fs to %.3fs; ending slow start at %d B',
+                min_rtt_s,
+                rtt_s,
+                self.window_size(),
+            )
+            self._slow_start_threshold = self._window
+
+    def on_loss(self) -> None:
+        self._slow_start_threshold = self._clamp(
+            self._window * self._decrease_factor
+        )
+        self._window = self._slow_start_threshold
+
+    def on_timeout(self) -> None:
+        self._slow_start_threshold = self._clamp(
+            self._window * self._decrease_factor
+        )
+        self._window = float(self.min_size)
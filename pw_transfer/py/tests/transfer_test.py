@@ -14,18 +14,38 @@
 # the License.
 """Tests for the transfer service client."""
 
+import asyncio
 import enum
+import hashlib
+import io
 import math
+import mmap
 import os
+from pathlib import Path
+import random
+import tempfile
 import unittest
-from typing import Iterable, List
-
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+)
+
+from google.protobuf.message import DecodeError
 from pw_status import Status
-from pw_rpc import callback_client, client, ids, packets
+from pw_rpc import callback_client, client, ids, lossy_channel, packets
 from pw_rpc.internal import packet_pb2
 
 import pw_transfer
-from pw_transfer import ProtocolVersion
+from pw_transfer import ProtocolVersion, checkpoint, transfer
+from pw_transfer.chunk import Chunk
+from pw_transfer.source import IteratorSource
+from pw_transfer.stats import StatsTracker
 
 try:
     from pw_transfer import transfer_pb2
@@ -136,6 +156,30 @@ class TransferManagerTest(unittest.TestCase):
         self.assertTrue(self._sent_chunks[-1].HasField('status'))
         self.assertEqual(self._sent_chunks[-1].status, 0)
 
+    def test_start_read_and_read_async(self) -> None:
+        manager = pw_transfer.Manager(
+            self._service, default_response_timeout_s=DEFAULT_TIMEOUT_S
+        )
+
+        for data in (b'abc', b'def'):
+            self._enqueue_server_responses(
+                _Method.READ,
+                (
+                    (
+                        transfer_pb2.Chunk(
+                            transfer_id=3,
+                            offset=0,
+                            data=data,
+                            remaining_bytes=0,
+                        ),
+                    ),
+                    (),
+                ),
+            )
+
+        self.assertEqual(manager.start_read(3).result(), b'abc')
+        self.assertEqual(asyncio.run(manager.read_async(3)), b'def')
+
     def test_read_transfer_multichunk(self) -> None:
         manager = pw_transfer.Manager(
             self._service, default_response_timeout_s=DEFAULT_TIMEOUT_S
@@ -303,6 +347,149 @@ class TransferManagerTest(unittest.TestCase):
             self._sent_chunks[3].type, transfer_pb2.Chunk.Type.COMPLETION
         )
 
+    def test_read_to_file(self) -> None:
+        manager = pw_transfer.Manager(
+            self._service, default_response_timeout_s=DEFAULT_TIMEOUT_S
+        )
+
+        self._enqueue_server_responses(
+            _Method.READ,
+            (
+                (
+                    transfer_pb2.Chunk(transfer_id=3, offset=0, data=b'abc'),
+                    transfer_pb2.Chunk(
+                        transfer_id=3, offset=3, data=b'def', remaining_bytes=0
+                    ),
+                ),
+            ),
+        )
+
+        sink = io.BytesIO()
+        hasher = hashlib.sha256()
+        self.assertEqual(manager.read_to(3, sink, hasher=hasher), 6)
+        self.assertEqual(sink.getvalue(), b'abcdef')
+        self.assertEqual(hasher.digest(), hashlib.sha256(b'abcdef').digest())
+
+    def test_read_to_callable_streams_each_chunk(self) -> None:
+        manager = pw_transfer.Manager(
+            self._service, default_response_timeout_s=DEFAULT_TIMEOUT_S
+        )
+
+        self._enqueue_server_responses(
+            _Method.READ,
+            (
+                (
+                    transfer_pb2.Chunk(transfer_id=3, offset=0, data=b'abc'),
+                    transfer_pb2.Chunk(transfer_id=3, offset=3, data=b'def'),
+                    transfer_pb2.Chunk(
+                        transfer_id=3, offset=6, data=b'ghi', remaining_bytes=0
+                    ),
+                ),
+            ),
+        )
+
+        received: List[bytes] = []
+        progress: List[pw_transfer.ProgressStats] = []
+        self.assertEqual(
+            manager.read_to(3, received.append, progress.append), 9
+        )
+        self.assertEqual(received, [b'abc', b'def', b'ghi'])
+        self.assertEqual(progress[-1], pw_transfer.ProgressStats(9, 9, 9))
+
+    def test_read_to_sink_error(self) -> None:
+        manager = pw_transfer.Manager(
+            self._service, default_response_timeout_s=DEFAULT_TIMEOUT_S
+        )
+
+        self._enqueue_server_responses(
+            _Method.READ,
+            (
+                (
+                    transfer_pb2.Chunk(
+                        transfer_id=3, offset=0, data=b'abc', remaining_bytes=0
+                    ),
+                ),
+            ),
+        )
+
+        def sink(_: bytes) -> None:
+            raise OSError('No space left on device')
+
+        with self.assertLogs('pw_transfer', 'ERROR'):
+            with self.assertRaises(pw_transfer.Error) as context:
+                manager.read_to(3, sink)
+
+        self.assertIs(context.exception.status, Status.DATA_LOSS)
+        self.assertEqual(self._sent_chunks[-1].status, Status.DATA_LOSS.value)
+
+    def test_read_transfer_reassembles_reordered_chunks(self) -> None:
+        manager = pw_transfer.Manager(
+            self._service,
+            default_response_timeout_s=DEFAULT_TIMEOUT_S,
+            reassemble_out_of_order_reads=True,
+        )
+
+        self._enqueue_server_responses(
+            _Method.READ,
+            (
+                (
+                    transfer_pb2.Chunk(transfer_id=3, offset=0, data=b'abc'),
+                    transfer_pb2.Chunk(transfer_id=3, offset=6, data=b'ghi'),
+                    transfer_pb2.Chunk(transfer_id=3, offset=3, data=b'def'),
+                    transfer_pb2.Chunk(
+                        transfer_id=3, offset=9, data=b'jkl', remaining_bytes=0
+                    ),
+                ),
+            ),
+        )
+
+        self.assertEqual(manager.read(3), b'abcdefghijkl')
+
+        # No retransmission was requested.
+        self.assertEqual(len(self._sent_chunks), 2)
+        self.assertEqual(
+            self._sent_chunks[0].type, transfer_pb2.Chunk.Type.START
+        )
+        self.assertEqual(
+            self._sent_chunks[1].type, transfer_pb2.Chunk.Type.COMPLETION
+        )
+
+    def test_read_transfer_reassembly_requests_missing_range(self) -> None:
+        manager = pw_transfer.Manager(
+            self._service,
+            default_response_timeout_s=DEFAULT_TIMEOUT_S,
+            reassemble_out_of_order_reads=True,
+        )
+
+        self._enqueue_server_responses(
+            _Method.READ,
+            (
+                (
+                    transfer_pb2.Chunk(transfer_id=3, offset=0, data=b'abc'),
+                    # The chunk at offset 3 is lost.
+                    transfer_pb2.Chunk(transfer_id=3, offset=6, data=b'ghi'),
+                    transfer_pb2.Chunk(transfer_id=3, offset=9, data=b'jkl'),
+                    transfer_pb2.Chunk(
+                        transfer_id=3, offset=12, data=b'mno', remaining_bytes=0
+                    ),
+                ),
+                (transfer_pb2.Chunk(transfer_id=3, offset=3, data=b'def'),),
+            ),
+        )
+
+        self.assertEqual(manager.read(3), b'abcdefghijklmno')
+
+        self.assertEqual(len(self._sent_chunks), 3)
+        retransmit = self._sent_chunks[1]
+        self.assertEqual(
+            retransmit.type, transfer_pb2.Chunk.Type.PARAMETERS_RETRANSMIT
+        )
+        self.assertEqual(retransmit.offset, 3)
+        self.assertEqual(retransmit.window_end_offset, 6)
+        self.assertEqual(
+            self._sent_chunks[2].type, transfer_pb2.Chunk.Type.COMPLETION
+        )
+
     def test_read_transfer_retry_timeout(self) -> None:
         """Server doesn't respond to read transfer parameters."""
         manager = pw_transfer.Manager(
@@ -775,6 +962,120 @@ class TransferManagerTest(unittest.TestCase):
         self.assertEqual(exception.resource_id, 23)
         self.assertEqual(exception.status, Status.INTERNAL)
 
+    def _enqueue_write_windows(self, *offsets: int) -> None:
+        """Has the server request 8-byte windows, then end the transfer."""
+        self._enqueue_server_responses(
+            _Method.WRITE,
+            (
+                *(
+                    (
+                        transfer_pb2.Chunk(
+                            transfer_id=4,
+                            offset=offset,
+                            pending_bytes=8,
+                            max_chunk_size_bytes=8,
+                        ),
+                    )
+                    for offset in offsets
+                ),
+                (transfer_pb2.Chunk(transfer_id=4, status=Status.OK.value),),
+            ),
+        )
+
+    def test_write_from_file(self) -> None:
+        manager = pw_transfer.Manager(
+            self._service, default_response_timeout_s=DEFAULT_TIMEOUT_S
+        )
+        self._enqueue_write_windows(0, 8)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, 'data')
+            path.write_bytes(b'data to write')
+            manager.write(4, path)
+
+        self.assertEqual(self._received_data(), b'data to write')
+        self.assertEqual(self._sent_chunks[-1].remaining_bytes, 0)
+
+    def test_write_from_mmap(self) -> None:
+        manager = pw_transfer.Manager(
+            self._service, default_response_timeout_s=DEFAULT_TIMEOUT_S
+        )
+        self._enqueue_write_windows(0, 8)
+
+        with tempfile.TemporaryFile() as file:
+            file.write(b'data to write')
+            file.flush()
+            with mmap.mmap(file.fileno(), 0) as mapped:
+                manager.write(4, mapped)
+
+        self.assertEqual(self._received_data(), b'data to write')
+
+    def test_write_from_memoryview(self) -> None:
+        manager = pw_transfer.Manager(
+            self._service, default_response_timeout_s=DEFAULT_TIMEOUT_S
+        )
+        self._enqueue_write_windows(0, 8)
+
+        manager.write(4, memoryview(b'xxdata to writexx')[2:-2])
+        self.assertEqual(self._received_data(), b'data to write')
+
+    def test_write_from_iterator(self) -> None:
+        manager = pw_transfer.Manager(
+            self._service, default_response_timeout_s=DEFAULT_TIMEOUT_S
+        )
+        self._enqueue_write_windows(0, 8)
+
+        progress: List[pw_transfer.ProgressStats] = []
+        manager.write(
+            4, iter([b'data', b' to ', b'', b'write']), progress.append
+        )
+
+        self.assertEqual(self._received_data(), b'data to write')
+        self.assertEqual(self._sent_chunks[1].data, b'data to ')
+        self.assertFalse(self._sent_chunks[1].HasField('remaining_bytes'))
+        self.assertEqual(self._sent_chunks[2].remaining_bytes, 0)
+
+        # The size is unknown until the end of the data is read.
+        self.assertEqual(
+            progress,
+            [
+                pw_transfer.ProgressStats(8, 0, None),
+                pw_transfer.ProgressStats(13, 8, 13),
+                pw_transfer.ProgressStats(13, 13, 13),
+            ],
+        )
+
+    def test_write_from_iterator_error(self) -> None:
+        manager = pw_transfer.Manager(
+            self._service, default_response_timeout_s=DEFAULT_TIMEOUT_S
+        )
+        self._enqueue_write_windows(0, 8)
+
+        def data() -> Iterator[bytes]:
+            yield b'data'
+            raise OSError('Input/output error')
+
+        with self.assertLogs('pw_transfer', 'ERROR'):
+            with self.assertRaises(pw_transfer.Error) as context:
+                manager.write(4, data())
+
+        self.assertIs(context.exception.status, Status.DATA_LOSS)
+        self.assertEqual(self._sent_chunks[-1].status, Status.DATA_LOSS.value)
+        stats = context.exception.stats
+        assert stats is not None
+        self.assertEqual(stats.timeouts, 0)
+
+    def test_write_from_iterator_rewind_past_released_data(self) -> None:
+        manager = pw_transfer.Manager(
+            self._service, default_response_timeout_s=DEFAULT_TIMEOUT_S
+        )
+        self._enqueue_write_windows(0, 8, 4)
+
+        with self.assertRaises(pw_transfer.Error) as context:
+            manager.write(4, iter([b'data', b' to ', b'write']))
+
+        self.assertEqual(context.exception.status, Status.OUT_OF_RANGE)
+
     def test_v2_read_transfer_basic(self) -> None:
         """Tests a simple protocol version 2 read transfer."""
         manager = pw_transfer.Manager(
@@ -1387,6 +1688,227 @@ class TransferManagerTest(unittest.TestCase):
         self.assertEqual(data, b'dropped completion')
 
 
+class IteratorSourceTest(unittest.TestCase):
+    """Tests reading data from an iterator without copying it."""
+
+    def test_reads_within_a_piece_are_views(self) -> None:
+        piece = b'0123456789'
+        source = IteratorSource([piece, b'abc'])
+
+        view = source.read(2, 4)
+        self.assertEqual(view, b'2345')
+        self.assertIs(view.obj, piece)
+
+    def test_reads_across_pieces(self) -> None:
+        source = IteratorSource([b'0123', b'4567', b'89'])
+        self.assertEqual(source.read(2, 7), b'2345678')
+        self.assertIsNone(source.size())
+        self.assertEqual(source.read(9, 8), b'9')
+        self.assertEqual(source.size(), 10)
+
+    def test_size_known_at_final_chunk(self) -> None:
+        source = IteratorSource([b'0123', b'4567'])
+        self.assertEqual(source.read(0, 4), b'0123')
+        self.assertIsNone(source.size())
+        self.assertEqual(source.read(4, 4), b'4567')
+        self.assertEqual(source.size(), 8)
+
+    def test_release(self) -> None:
+        source = IteratorSource([b'0123', b'4567', b'89'])
+        self.assertEqual(source.read(0, 10), b'0123456789')
+
+        source.release(6)
+        self.assertEqual(source.read(4, 2), b'45')
+        with self.assertRaises(IndexError):
+            source.read(3, 2)
+
+
+def _chunk_fields(chunk: Chunk) -> Dict[str, Any]:
+    fields = vars(chunk).copy()
+    fields['data'] = bytes(chunk.data)
+    return fields
+
+
+class ChunkEncodingTest(unittest.TestCase):
+    """Cross-checks the chunk encoder and decoder with the protobuf library."""
+
+    @staticmethod
+    def _random_chunk(rng: random.Random) -> Chunk:
+        def maybe(value: int) -> Optional[int]:
+            return value if rng.random() < 0.5 else None
+
+        version = rng.choice(
+            [ProtocolVersion.LEGACY, ProtocolVersion.VERSION_TWO]
+        )
+        offset = rng.choice([0, rng.randrange(1 << 20)])
+        chunk = Chunk(
+            version,
+            rng.choice(list(Chunk.Type.values())),
+            session_id=rng.choice([1, rng.randrange(1 << 32)]),
+            resource_id=maybe(rng.choice([0, rng.randrange(1 << 32)])),
+            offset=offset,
+            window_end_offset=rng.choice([0, offset + rng.randrange(4096)]),
+            data=bytes(rng.randrange(256) for _ in range(rng.choice([0, 9]))),
+            remaining_bytes=maybe(rng.randrange(1 << 40)),
+            max_chunk_size_bytes=maybe(rng.randrange(1 << 16)),
+            min_delay_microseconds=maybe(rng.randrange(1000)),
+        )
+        if rng.random() < 0.2:
+            chunk.status = rng.choice(list(Status))
+        if version is ProtocolVersion.VERSION_TWO and rng.random() < 0.2:
+            chunk.session_id = 0
+            chunk.desired_session_id = rng.randrange(1 << 32)
+            chunk.resource_id = rng.randrange(1 << 32)
+        return chunk
+
+    def test_encode_matches_protobuf(self) -> None:
+        rng = random.Random(45)
+        for _ in range(2000):
+            chunk = self._random_chunk(rng)
+            self.assertEqual(
+                chunk.encode(),
+                chunk.to_message().SerializeToString(),
+                _chunk_fields(chunk),
+            )
+
+    def test_decode_matches_protobuf(self) -> None:
+        rng = random.Random(45)
+        for _ in range(2000):
+            data = self._random_chunk(rng).to_message().SerializeToString()
+            self.assertEqual(
+                _chunk_fields(Chunk.decode(data)),
+                _chunk_fields(
+                    Chunk.from_message(transfer_pb2.Chunk.FromString(data))
+                ),
+            )
+
+    def test_decoded_data_is_a_view(self) -> None:
+        data = Chunk(
+            ProtocolVersion.VERSION_TWO,
+            Chunk.Type.DATA,
+            session_id=5,
+            offset=1024,
+            data=b'123456',
+        ).encode()
+
+        chunk = Chunk.decode(data)
+        self.assertIsInstance(chunk.data, memoryview)
+        self.assertIs(chunk.data.obj, data)  # type: ignore[union-attr]
+        self.assertEqual(chunk.data, b'123456')
+
+    def test_decode_legacy_chunk_without_type(self) -> None:
+        data = transfer_pb2.Chunk(transfer_id=3, offset=0).SerializeToString()
+        chunk = Chunk.decode(data)
+        self.assertEqual(chunk.type, Chunk.Type.START)
+        self.assertIs(chunk.protocol_version, ProtocolVersion.LEGACY)
+        self.assertEqual(chunk.session_id, 3)
+
+    def test_decode_unknown_field_falls_back(self) -> None:
+        message = transfer_pb2.Chunk(session_id=7, offset=4, data=b'data')
+        # Field 100, varint 5.
+        data = message.SerializeToString() + b'\xa0\x06\x05'
+
+        chunk = Chunk.decode(data)
+        self.assertEqual(chunk.session_id, 7)
+        self.assertEqual(chunk.offset, 4)
+        self.assertEqual(chunk.data, b'data')
+
+    def test_decode_malformed(self) -> None:
+        # Data field longer than the message.
+        with self.assertRaises(DecodeError):
+            Chunk.decode(b'\x32\x10abc')
+
+        # Truncated varint.
+        with self.assertRaises(DecodeError):
+            Chunk.decode(b'\x28\x80')
+
+    def test_encode_out_of_range_raises(self) -> None:
+        chunk = Chunk(
+            ProtocolVersion.VERSION_TWO,
+            Chunk.Type.PARAMETERS_RETRANSMIT,
+            session_id=1,
+            window_end_offset=1 << 32,
+        )
+        with self.assertRaises(ValueError):
+            chunk.encode()
+
+
+class TimerTest(unittest.TestCase):
+    """Tests timers that share an event loop's timer queue."""
+
+    # pylint: disable=protected-access
+
+    @staticmethod
+    def _run(test: Callable[[List[str]], Any]) -> List[str]:
+        fired: List[str] = []
+        asyncio.run(test(fired))
+        return fired
+
+    def test_fires_once_after_timeout(self) -> None:
+        async def test(fired: List[str]) -> None:
+            timer = transfer._Timer(0.01, lambda: fired.append('timer'))
+            timer.start()
+            await asyncio.sleep(0.05)
+
+        self.assertEqual(self._run(test), ['timer'])
+
+    def test_restart_delays_timer(self) -> None:
+        async def test(fired: List[str]) -> None:
+            timer = transfer._Timer(0.03, lambda: fired.append('timer'))
+            timer.start()
+            await asyncio.sleep(0.02)
+            timer.start()
+            await asyncio.sleep(0.02)
+            fired.append('after first deadline')
+            await asyncio.sleep(0.03)
+
+        self.assertEqual(self._run(test), ['after first deadline', 'timer'])
+
+    def test_restart_with_earlier_deadline(self) -> None:
+        async def test(fired: List[str]) -> None:
+            timer = transfer._Timer(1.0, lambda: fired.append('timer'))
+            timer.start()
+            timer.start(0.01)
+            await asyncio.sleep(0.05)
+
+        self.assertEqual(self._run(test), ['timer'])
+
+    def test_stop(self) -> None:
+        async def test(fired: List[str]) -> None:
+            timer = transfer._Timer(0.01, lambda: fired.append('stopped'))
+            timer.start()
+            timer.stop()
+            await asyncio.sleep(0.03)
+
+        self.assertEqual(self._run(test), [])
+
+    def test_timers_fire_in_deadline_order(self) -> None:
+        async def test(fired: List[str]) -> None:
+            timers = [
+                transfer._Timer(timeout_s, lambda n=name: fired.append(n))
+                for name, timeout_s in (('c', 0.03), ('a', 0.01), ('b', 0.02))
+            ]
+            for timer in timers:
+                timer.start()
+            await asyncio.sleep(0.05)
+
+        self.assertEqual(self._run(test), ['a', 'b', 'c'])
+
+    def test_failed_callback_does_not_stop_other_timers(self) -> None:
+        def fail() -> None:
+            raise RuntimeError('callback failed')
+
+        async def test(fired: List[str]) -> None:
+            failing_timer = transfer._Timer(0.01, fail)
+            timer = transfer._Timer(0.05, lambda: fired.append('timer'))
+            failing_timer.start()
+            timer.start()
+            await asyncio.sleep(0.1)
+
+        with self.assertLogs(transfer._LOG, 'ERROR'):
+            self.assertEqual(self._run(test), ['timer'])
+
+
 class ProgressStatsTest(unittest.TestCase):
     def test_received_percent_known_total(self) -> None:
         self.assertEqual(
@@ -1424,6 +1946,643 @@ class ProgressStatsTest(unittest.TestCase):
         self.assertIn('unknown', stats)
 
 
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class StatsTrackerTest(unittest.TestCase):
+    """Tests recording transfer statistics."""
+
+    def setUp(self) -> None:
+        self._clock = _FakeClock()
+        self._tracker = StatsTracker(clock=self._clock)
+        self._tracker.begin()
+
+    def test_throughput_before_first_sample(self) -> None:
+        self._clock.now += 0.05
+        self._tracker.on_confirmed(1000)
+        self.assertAlmostEqual(
+            self._tracker.snapshot().throughput_bytes_per_s, 20000
+        )
+
+    def test_throughput_moving_average(self) -> None:
+        self._clock.now += 0.125
+        self._tracker.on_confirmed(1000)
+        self.assertEqual(self._tracker.snapshot().throughput_bytes_per_s, 8000)
+
+        self._clock.now += 0.125
+        self._tracker.on_confirmed(3000)
+        self.assertEqual(self._tracker.snapshot().throughput_bytes_per_s, 10000)
+
+    def test_resumed_transfer_throughput(self) -> None:
+        tracker = StatsTracker(initial_bytes=5000, clock=self._clock)
+        tracker.begin()
+        self._clock.now += 0.125
+        tracker.on_confirmed(6000)
+        self.assertEqual(tracker.snapshot().throughput_bytes_per_s, 8000)
+
+    def test_rtt(self) -> None:
+        for rtt_s in (0.2, 0.1, 0.3):
+            self._tracker.on_rtt_sample(rtt_s)
+
+        stats = self._tracker.snapshot()
+        self.assertEqual(stats.rtt_samples, 3)
+        self.assertEqual(stats.last_rtt_s, 0.3)
+        self.assertEqual(stats.min_rtt_s, 0.1)
+        assert stats.smoothed_rtt_s is not None
+        self.assertAlmostEqual(stats.smoothed_rtt_s, 0.2015625)
+
+    def test_window_wait(self) -> None:
+        # The transfer waits for the receiver's first response.
+        self._clock.now += 1.0
+        self._tracker.end_window_wait()
+        self._clock.now += 2.0
+        self._tracker.start_window_wait()
+        self._clock.now += 0.5
+        self._tracker.start_window_wait()  # Already waiting.
+        self._clock.now += 0.5
+
+        stats = self._tracker.snapshot()
+        self.assertEqual(stats.elapsed_s, 4.0)
+        self.assertEqual(stats.window_wait_s, 2.0)
+        self.assertEqual(stats.streaming_s, 2.0)
+
+        self._tracker.end_window_wait()
+        self._clock.now += 1.0
+        self.assertEqual(self._tracker.snapshot().window_wait_s, 2.0)
+
+
+class AimdWindowTest(unittest.TestCase):
+    def test_slow_start_doubles_window(self) -> None:
+        window = pw_transfer.AimdWindow(100, max_size=10000)
+        self.assertEqual(window.window_size(), 200)
+
+        for _ in range(2):
+            window.on_data_received(100)
+        self.assertEqual(window.window_size(), 400)
+
+        for _ in range(4):
+            window.on_data_received(100)
+        self.assertEqual(window.window_size(), 800)
+
+    def test_loss_halves_window_and_ends_slow_start(self) -> None:
+        window = pw_transfer.AimdWindow(100, initial_size=1600)
+        window.on_loss()
+        self.assertEqual(window.window_size(), 800)
+        self.assertFalse(window.in_slow_start())
+
+        # Congestion avoidance grows the window by one chunk per window.
+        for _ in range(8):
+            window.on_data_received(100)
+        self.assertAlmostEqual(window.window_size(), 900, delta=10)
+
+    def test_timeout_resets_to_min_size(self) -> None:
+        window = pw_transfer.AimdWindow(100, initial_size=1600, min_size=50)
+        window.on_timeout()
+        self.assertEqual(window.window_size(), 50)
+        self.assertTrue(window.in_slow_start())
+
+        # Slow start resumes until the window reaches half its old size.
+        for _ in range(8):
+            window.on_data_received(100)
+        self.assertEqual(window.window_size(), 850)
+        self.assertFalse(window.in_slow_start())
+
+    def test_window_is_clamped(self) -> None:
+        window = pw_transfer.AimdWindow(100, min_size=150, max_size=1000)
+        for _ in range(100):
+            window.on_data_received(100)
+        self.assertEqual(window.window_size(), 1000)
+
+        for _ in range(10):
+            window.on_loss()
+        self.assertEqual(window.window_size(), 150)
+
+    def test_rtt_growth_ends_slow_start(self) -> None:
+        window = pw_transfer.AimdWindow(100, rtt_growth_limit=2.0)
+        window.on_rtt_sample(0.010)
+        window.on_rtt_sample(0.015)
+        self.assertTrue(window.in_slow_start())
+
+        window.on_rtt_sample(0.030)
+        self.assertFalse(window.in_slow_start())
+        self.assertEqual(window.min_rtt_s, 0.010)
+
+    def test_invalid_arguments(self) -> None:
+        with self.assertRaises(ValueError):
+            pw_transfer.AimdWindow(0)
+        with self.assertRaises(ValueError):
+            pw_transfer.AimdWindow(100, decrease_factor=1.0)
+        with self.assertRaises(ValueError):
+            pw_transfer.AimdWindow(100, min_size=200, max_size=100)
+        with self.assertRaises(ValueError):
+            pw_transfer.FixedWindow(0)
+
+
+class _LossyReadServer:
+    """Serves a legacy read transfer through a LossyChannel.
+
+    Every window the client requests is sent in full as soon as the request
+    arrives, so bytes sent after a dropped chunk are wasted.
+    """
+
+    def __init__(self, data: bytes, loss: lossy_channel.LossController) -> None:
+        self.data = data
+        self.data_chunks_sent = 0
+        self.parameters_received = 0
+        self.client = client.Client.from_modules(
+            callback_client.Impl(),
+            [client.Channel(1, self.handle_request)],
+            (transfer_pb2,),
+        )
+
+        self._channel = lossy_channel.LossyChannel('to_client', loss)
+        self._channel.send_packet = self._deliver
+        self._offset = 0
+
+    def _deliver(self, packet: bytes) -> None:
+        self.client.process_packet(packet)
+
+    def handle_request(self, data: bytes) -> None:
+        packet = packets.decode(data)
+        if packet.type is not packet_pb2.PacketType.CLIENT_STREAM:
+            return
+
+        chunk = Chunk.from_message(
+            transfer_pb2.Chunk.FromString(packet.payload)
+        )
+        if chunk.status is not None:
+            return
+
+        self.parameters_received += 1
+        if chunk.requests_transmission_from_offset():
+            self._offset = chunk.offset
+
+        max_chunk_size = chunk.max_chunk_size_bytes or 1024
+        window_end = min(chunk.window_end_offset, len(self.data))
+
+        while self._offset < window_end:
+            size = min(max_chunk_size, window_end - self._offset)
+            response = transfer_pb2.Chunk(
+                transfer_id=3,
+                offset=self._offset,
+                data=self.data[self._offset : self._offset + size],
+            )
+            self._offset += size
+            if self._offset == len(self.data):
+                response.remaining_bytes = 0
+
+            self.data_chunks_sent += 1
+            self._channel(
+                packet_pb2.RpcPacket(
+                    type=packet_pb2.PacketType.SERVER_STREAM,
+                    channel_id=1,
+                    service_id=_TRANSFER_SERVICE_ID,
+                    method_id=_Method.READ.value,
+                    status=Status.OK.value,
+                    payload=response.SerializeToString(),
+                ).SerializeToString()
+            )
+
+
+def _drop_one_in(one_in: int) -> lossy_channel.LossController:
+    loss = lossy_channel.ManualPacketFilter()
+    if one_in:
+        loss.randomly_drop(one_in, random.Random(1))
+    return loss
+
+
+class LossyReadTest(unittest.TestCase):
+    """Evaluates read transfers against a LossyChannel."""
+
+    _DATA = bytes(range(256)) * 256
+
+    def _read(
+        self,
+        policy: Optional[Callable[[], pw_transfer.WindowPolicy]] = None,
+        loss: Optional[lossy_channel.LossController] = None,
+        **manager_options,
+    ) -> _LossyReadServer:
+        server = _LossyReadServer(
+            self._DATA, _drop_one_in(0) if loss is None else loss
+        )
+        progress_callback = manager_options.pop('progress_callback', None)
+        manager = pw_transfer.Manager(
+            server.client.channel(1).rpcs.pw.transfer.Transfer,
+            default_response_timeout_s=0.05,
+            max_retries=10,
+            read_window_policy=policy,
+            **manager_options,
+        )
+
+        self.assertEqual(manager.read(3, progress_callback), self._DATA)
+        return server
+
+    def test_aimd_grows_window_on_clean_link(self) -> None:
+        fixed = self._read(lambda: pw_transfer.FixedWindow(2048))
+        aimd = self._read(
+            lambda: pw_transfer.AimdWindow(1024, max_size=32 * 1024)
+        )
+
+        self.assertEqual(fixed.data_chunks_sent, len(self._DATA) // 1024)
+        self.assertEqual(aimd.data_chunks_sent, len(self._DATA) // 1024)
+        self.assertLess(aimd.parameters_received, fixed.parameters_received)
+
+    def test_read_max_chunk_size(self) -> None:
+        default = self._read(lambda: pw_transfer.FixedWindow(32 * 1024))
+        large = self._read(
+            lambda: pw_transfer.FixedWindow(32 * 1024),
+            read_max_chunk_size_bytes=4096,
+        )
+
+        self.assertEqual(default.data_chunks_sent, len(self._DATA) // 1024)
+        self.assertEqual(large.data_chunks_sent, len(self._DATA) // 4096)
+
+    def test_aimd_shrinks_window_on_loss(self) -> None:
+        fixed = self._read(
+            lambda: pw_transfer.FixedWindow(32 * 1024), _drop_one_in(20)
+        )
+        aimd = self._read(
+            lambda: pw_transfer.AimdWindow(1024, max_size=32 * 1024),
+            _drop_one_in(20),
+        )
+
+        self.assertLess(aimd.data_chunks_sent, fixed.data_chunks_sent)
+
+    def test_stats_count_losses(self) -> None:
+        progress: List[pw_transfer.ProgressStats] = []
+        server = self._read(
+            lambda: pw_transfer.FixedWindow(8192),
+            _drop_one_in(20),
+            progress_callback=progress.append,
+        )
+
+        stats = progress[-1].transfer_stats
+        assert stats is not None
+        # Dropped chunks are not received.
+        self.assertGreater(stats.data_bytes, len(self._DATA))
+        self.assertLess(stats.data_bytes, server.data_chunks_sent * 1024)
+        self.assertGreater(stats.retransmit_requests, 0)
+        self.assertGreater(stats.out_of_order_chunks, 0)
+        self.assertGreater(stats.throughput_bytes_per_s, 0)
+        self.assertAlmostEqual(
+            stats.window_wait_s + stats.streaming_s, stats.elapsed_s
+        )
+
+    def test_default_window_is_fixed(self) -> None:
+        server = _LossyReadServer(b'x' * 20000, _drop_one_in(0))
+        manager = pw_transfer.Manager(
+            server.client.channel(1).rpcs.pw.transfer.Transfer,
+            default_response_timeout_s=DEFAULT_TIMEOUT_S,
+        )
+
+        self.assertEqual(manager.read(3), b'x' * 20000)
+        # 8192-byte windows, extended halfway through each window.
+        self.assertEqual(server.parameters_received, 5)
+
+    def test_reassembly_avoids_retransmitting_window(self) -> None:
+        def loss() -> lossy_channel.LossController:
+            return lossy_channel.RandomLossGenerator(
+                duplicated_packet_probability=0.0,
+                max_duplications_per_packet=1,
+                out_of_order_probability=0.05,
+                delayed_packet_probability=0.0,
+                delayed_packet_range_ms=(0, 0),
+                dropped_packet_probability=0.02,
+                seed=2,
+            )
+
+        discarding = self._read(loss=loss())
+        reassembling = self._read(
+            loss=loss(), reassemble_out_of_order_reads=True
+        )
+
+        self.assertLess(
+            reassembling.data_chunks_sent, discarding.data_chunks_sent
+        )
+
+
+class ResumableReadTest(unittest.TestCase):
+    """Tests resuming interrupted reads from checkpoints."""
+
+    _DATA = bytes(range(256)) * 64
+    _SHA256 = hashlib.sha256(_DATA).hexdigest()
+
+    def setUp(self) -> None:
+        # The resource the server sends.
+        self._data = self._DATA
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name, 'resource.bin')
+        self._checkpoints = checkpoint.CheckpointFile(
+            f'{self._path}{checkpoint.CHECKPOINT_SUFFIX}'
+        )
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def _read(self, kept_chunks: Optional[int] = None, **options) -> int:
+        """Reads the resource, losing the connection after kept_chunks."""
+        loss = lossy_channel.ManualPacketFilter()
+        if kept_chunks is not None:
+            loss.keep(kept_chunks)
+            loss.drop_every(1)
+
+        server = _LossyReadServer(self._data, loss)
+        manager = pw_transfer.Manager(
+            server.client.channel(1).rpcs.pw.transfer.Transfer,
+            default_response_timeout_s=0.05,
+            initial_response_timeout_s=0.05,
+            max_retries=2,
+        )
+        manager.read_resumable(
+            3, self._path, checkpoint_interval_bytes=4096, **options
+        )
+        return server.data_chunks_sent
+
+    def _interrupted_read(
+        self, kept_chunks: int, expected_sha256: Optional[str] = _SHA256
+    ) -> None:
+        with self.assertRaises(pw_transfer.Error) as context:
+            self._read(kept_chunks, expected_sha256=expected_sha256)
+        self.assertEqual(context.exception.status, Status.DEADLINE_EXCEEDED)
+
+        stats = context.exception.stats
+        assert stats is not None
+        self.assertEqual(stats.timeouts, 3)
+
+    def test_complete_read_removes_checkpoint(self) -> None:
+        self.assertEqual(self._read(), 16)
+        self.assertEqual(self._path.read_bytes(), self._DATA)
+        self.assertIsNone(self._checkpoints.load())
+
+    def test_resumes_from_checkpoint(self) -> None:
+        self._interrupted_read(kept_chunks=10)
+
+        saved = self._checkpoints.load()
+        assert saved is not None
+        self.assertEqual(saved.offset, 10 * 1024)
+        self.assertEqual(
+            saved.sha256, hashlib.sha256(self._DATA[: 10 * 1024]).hexdigest()
+        )
+        self.assertEqual(saved.expected_sha256, self._SHA256)
+
+        self.assertEqual(self._read(expected_sha256=self._SHA256), 6)
+        self.assertEqual(self._path.read_bytes(), self._DATA)
+        self.assertIsNone(self._checkpoints.load())
+
+    def test_modified_file_starts_over(self) -> None:
+        self._interrupted_read(kept_chunks=10)
+
+        with open(self._path, 'r+b') as file:
+            file.write(b'corrupted')
+
+        with self.assertLogs('pw_transfer', 'WARNING'):
+            self.assertEqual(self._read(expected_sha256=self._SHA256), 16)
+        self.assertEqual(self._path.read_bytes(), self._DATA)
+
+    def test_resume_requires_expected_sha256(self) -> None:
+        self._interrupted_read(kept_chunks=10, expected_sha256=None)
+
+        with self.assertLogs('pw_transfer', 'WARNING'):
+            self.assertEqual(self._read(), 16)
+        self.assertEqual(self._path.read_bytes(), self._DATA)
+
+    def test_changed_expected_sha256_starts_over(self) -> None:
+        self._interrupted_read(
+            kept_chunks=10, expected_sha256=hashlib.sha256(b'old').hexdigest()
+        )
+
+        with self.assertLogs('pw_transfer', 'WARNING'):
+            self.assertEqual(self._read(expected_sha256=self._SHA256), 16)
+        self.assertEqual(self._path.read_bytes(), self._DATA)
+
+    def test_resource_changed_between_reads(self) -> None:
+        self._interrupted_read(kept_chunks=10)
+        offset = 12 * 1024
+        self._data = (
+            self._DATA[:offset] + b'changed!' + self._DATA[offset + 8 :]
+        )
+
+        # The old data joined to the changed data fails the complete check.
+        with self.assertRaises(pw_transfer.Error) as context:
+            self._read(expected_sha256=self._SHA256)
+        self.assertEqual(context.exception.status, Status.DATA_LOSS)
+        self.assertIsNone(self._checkpoints.load())
+
+    def test_checkpoint_for_other_resource_is_ignored(self) -> None:
+        self._checkpoints.save(
+            checkpoint.Checkpoint(
+                4, 1024, hashlib.sha256(b'').hexdigest(), ProtocolVersion.LEGACY
+            )
+        )
+
+        with self.assertLogs('pw_transfer', 'WARNING'):
+            self.assertEqual(self._read(), 16)
+        self.assertEqual(self._path.read_bytes(), self._DATA)
+
+    def test_expected_sha256_mismatch(self) -> None:
+        with self.assertRaises(pw_transfer.Error) as context:
+            self._read(expected_sha256=hashlib.sha256(b'other').hexdigest())
+
+        self.assertEqual(context.exception.status, Status.DATA_LOSS)
+        self.assertIsNone(self._checkpoints.load())
+
+    def test_expected_sha256_after_resume(self) -> None:
+        self._interrupted_read(kept_chunks=5)
+        self.assertEqual(self._read(expected_sha256=self._SHA256), 11)
+        self.assertEqual(self._path.read_bytes(), self._DATA)
+
+
+class _WriteServer:
+    """Receives legacy write transfers to any resource.
+
+    Requests windows of window_size bytes in chunks of up to 8 bytes, and
+    records the resource of each data chunk in the order they arrive.
+    """
+
+    def __init__(self, window_size: int = 16) -> None:
+        self.received: Dict[int, bytearray] = {}
+        self.chunk_order: List[int] = []
+        self.max_active = 0
+        self.reject: Set[int] = set()
+        self.client = client.Client.from_modules(
+            callback_client.Impl(),
+            [client.Channel(1, self.handle_request)],
+            (transfer_pb2,),
+        )
+
+        self._window_size = window_size
+        self._active: Set[int] = set()
+
+    def _respond(self, chunk: transfer_pb2.Chunk) -> None:
+        self.client.process_packet(
+            packet_pb2.RpcPacket(
+                type=packet_pb2.PacketType.SERVER_STREAM,
+                channel_id=1,
+                service_id=_TRANSFER_SERVICE_ID,
+                method_id=_Method.WRITE.value,
+                status=Status.OK.value,
+                payload=chunk.SerializeToString(),
+            ).SerializeToString()
+        )
+
+    def _request_window(self, resource_id: int) -> None:
+        self._respond(
+            transfer_pb2.Chunk(
+                transfer_id=resource_id,
+                offset=len(self.received[resource_id]),
+                pending_bytes=self._window_size,
+                max_chunk_size_bytes=8,
+            )
+        )
+
+    def _finish(self, resource_id: int, status: Status) -> None:
+        self._active.discard(resource_id)
+        self._respond(
+            transfer_pb2.Chunk(transfer_id=resource_id, status=status.value)
+        )
+
+    def handle_request(self, data: bytes) -> None:
+        packet = packets.decode(data)
+        if packet.type is not packet_pb2.PacketType.CLIENT_STREAM:
+            return
+
+        chunk = Chunk.from_message(
+            transfer_pb2.Chunk.FromString(packet.payload)
+        )
+        resource_id = chunk.session_id
+        if chunk.status is not None:
+            return
+
+        if chunk.type is Chunk.Type.START:
+            self._active.add(resource_id)
+            self.max_active = max(self.max_active, len(self._active))
+            self.received[resource_id] = bytearray()
+
+            if resource_id in self.reject:
+                self._finish(resource_id, Status.NOT_FOUND)
+            else:
+                self._request_window(resource_id)
+            return
+
+        received = self.received[resource_id]
+        received += chunk.data
+        self.chunk_order.append(resource_id)
+
+        if chunk.remaining_bytes == 0:
+            self._finish(resource_id, Status.OK)
+        elif len(received) % self._window_size == 0:
+            self._request_window(resource_id)
+
+
+class ConcurrentTransferTest(unittest.TestCase):
+    """Tests running multiple transfers at once from one thread."""
+
+    @staticmethod
+    def _manager(server: _WriteServer, **options) -> pw_transfer.Manager:
+        return pw_transfer.Manager(
+            server.client.channel(1).rpcs.pw.transfer.Transfer,
+            default_response_timeout_s=DEFAULT_TIMEOUT_S,
+            **options,
+        )
+
+    def test_start_write_futures(self) -> None:
+        server = _WriteServer()
+        manager = self._manager(server)
+
+        futures = [
+            manager.start_write(resource_id, bytes([resource_id]) * 40)
+            for resource_id in range(1, 5)
+        ]
+
+        for future in futures:
+            self.assertIsNone(future.result())
+        for resource_id in range(1, 5):
+            self.assertEqual(
+                server.received[resource_id], bytes([resource_id]) * 40
+            )
+
+    def test_small_write_is_not_starved_by_large_write(self) -> None:
+        server = _WriteServer(window_size=1 << 20)
+        manager = self._manager(server)
+
+        large = manager.start_write(1, b'x' * 8000)
+        small = manager.start_write(2, b'small')
+        large.result()
+        small.result()
+
+        # Both transfers' chunks are interleaved, so the small transfer
+        # finishes long before the large one.
+        order = server.chunk_order
+        self.assertEqual(order.count(1), 1000)
+        self.assertLess(order.index(2), order.count(1) // 2)
+
+    def test_write_stats(self) -> None:
+        server = _WriteServer()
+        manager = self._manager(server)
+
+        progress: List[pw_transfer.ProgressStats] = []
+        manager.write(1, b'data' * 20, progress.append)
+
+        stats = progress[-1].transfer_stats
+        assert stats is not None
+        self.assertEqual(stats.data_bytes, 80)
+        self.assertEqual(stats.rtt_samples, 4)  # 16-byte windows
+        self.assertEqual(stats.retransmit_requests, 0)
+        self.assertGreater(stats.window_wait_s, 0)
+
+    def test_max_concurrent_transfers(self) -> None:
+        server = _WriteServer()
+        manager = self._manager(server, max_concurrent_transfers=2)
+
+        futures = [
+            manager.start_write(resource_id, b'data' * 10)
+            for resource_id in range(1, 6)
+        ]
+        for future in futures:
+            future.result()
+
+        self.assertEqual(server.max_active, 2)
+        self.assertEqual(len(server.received), 5)
+
+    def test_failed_transfer_frees_its_slot(self) -> None:
+        server = _WriteServer()
+        server.reject.add(1)
+        manager = self._manager(server, max_concurrent_transfers=1)
+
+        failed = manager.start_write(1, b'rejected')
+        succeeded = manager.start_write(2, b'accepted')
+
+        with self.assertRaises(pw_transfer.Error) as context:
+            failed.result()
+        self.assertEqual(context.exception.status, Status.NOT_FOUND)
+
+        self.assertIsNone(succeeded.result())
+        self.assertEqual(server.received[2], b'accepted')
+
+    def test_write_async(self) -> None:
+        server = _WriteServer()
+        manager = self._manager(server)
+
+        async def write_all() -> None:
+            await asyncio.gather(
+                *(
+                    manager.write_async(resource_id, b'async data')
+                    for resource_id in range(1, 4)
+                )
+            )
+
+        asyncio.run(write_all())
+        self.assertEqual(
+            server.received,
+            {resource_id: b'async data' for resource_id in range(1, 4)},
+        )
+
+
 if __name__ == '__main__':
     # TODO(b/265975025): Only run this test in upstream Pigweed until the
     #     occasional hangs are fixed.
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Pigweed Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy of
+# the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Measures the event loop overhead of pw_transfer response timers.
+
+A transfer restarts its response timer for every chunk it sends or receives.
+This simulates many concurrent transfers exchanging chunks, each restarting its
+timer once per chunk, and reports the time per chunk with the shared timer
+queue and with the previous implementation, which created and cancelled an
+asyncio task for every restart.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Callable, Optional
+
+# pylint: disable=protected-access
+from pw_transfer.transfer import _Timer
+
+
+class _TaskTimer:
+    """The previous _Timer, which runs each timeout in a new task."""
+
+    def __init__(self, timeout_s: float, callback: Callable[[], Any]):
+        self.timeout_s = timeout_s
+        self._callback = callback
+        self._task: Optional[asyncio.Task[Any]] = None
+
+    def start(self, timeout_s: Optional[float] = None) -> None:
+        self.stop()
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        self._task = asyncio.create_task(self._run(timeout_s))
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self, timeout_s: float) -> None:
+        await asyncio.sleep(timeout_s)
+        self._task = None
+        self._callback()
+
+
+async def _run_transfers(
+    timer_class: type, transfers: int, chunks: int
+) -> float:
+    """Returns the time per chunk for transfers that each handle chunks."""
+    timers = [timer_class(2.0, lambda: None) for _ in range(transfers)]
+
+    start = time.perf_counter()
+    for _ in range(chunks):
+        for timer in timers:
+            # Each received chunk stops the timer, and each sent chunk starts
+            # it again.
+            timer.stop()
+            timer.start()
+        # Let the loop run, as it does between incoming chunks.
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    for timer in timers:
+        timer.stop()
+
+    return elapsed / (transfers * chunks)
+
+
+def benchmark(transfers: int, chunks: int) -> None:
+    print(f'{transfers} transfers, {chunks} chunks each')
+    for name, timer_class in (
+        ('task per timer', _TaskTimer),
+        ('queue', _Timer),
+    ):
+        per_chunk_s = asyncio.run(
+            _run_transfers(timer_class, transfers, chunks)
+        )
+        print(f'{name:>16}: {per_chunk_s * 1e6:7.2f} us per chunk')
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--transfers', type=int, default=16)
+    parser.add_argument('--chunks', type=int, default=5000)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    benchmark(args.transfers, args.chunks)
+
+
+if __name__ == '__main__':
+    main()